@@ -3,6 +3,22 @@ from django.utils.translation import ugettext_lazy
 
 from devilry.apps.core import models as core_models
 
+#: Compiled templates, with the template string as key. See :func:`._get_template`.
+_template_cache = {}
+
+
+def _get_template(templatestring):
+    """
+    Get a compiled template for the template string.
+
+    The templates are compiled once per process.
+    """
+    template = _template_cache.get(templatestring)
+    if template is None:
+        template = Template(templatestring)
+        _template_cache[templatestring] = template
+    return template
+
 
 class UserInfo(object):
     def __init__(self, groupuserlookup, user):
@@ -12,38 +28,23 @@ class UserInfo(object):
     @property
     def candidate(self):
         if not hasattr(self, '_candidate'):
-            try:
-                self._candidate = core_models.Candidate.objects.get(
-                    assignment_group=self.groupuserlookup.group,
-                    relatedstudent__user=self.user)
-            except core_models.Candidate.DoesNotExist:
-                self._candidate = None
+            self._candidate = self.groupuserlookup.lookup_candidate(user=self.user)
         return self._candidate
 
     @property
     def relatedexaminer(self):
         if not hasattr(self, '_relatedexaminer'):
-            try:
-                self._relatedexaminer = core_models.RelatedExaminer.objects.get(
-                    period_id=self.groupuserlookup.assignment.parentnode_id,
-                    user=self.user)
-            except core_models.RelatedExaminer.DoesNotExist:
-                self._relatedexaminer = None
+            self._relatedexaminer = self.groupuserlookup.lookup_relatedexaminer(user=self.user)
         return self._relatedexaminer
 
     @property
     def relatedstudent(self):
         if not hasattr(self, '_relatedstudent'):
-            try:
-                self._relatedstudent = core_models.RelatedStudent.objects.get(
-                    period_id=self.groupuserlookup.assignment.parentnode_id,
-                    user=self.user)
-            except core_models.RelatedStudent.DoesNotExist:
-                self._relatedstudent = None
+            self._relatedstudent = self.groupuserlookup.lookup_relatedstudent(user=self.user)
         return self._relatedstudent
 
     def _render_template(self, templatestring, **contextdata):
-        return Template(templatestring).render(Context(contextdata))
+        return _get_template(templatestring).render(Context(contextdata))
 
     def _render_span(self, cssclass, content):
         return self._render_template("""
@@ -101,6 +102,13 @@ class UserInfo(object):
 
 class GroupUserLookup(object):
     """
+    Lookup names of users in a group, anonymized when required by the
+    role of the requestuser.
+
+    The candidates, related students and related examiners for all the users
+    in the group (candidates, examiners and comment authors) are loaded the first
+    time they are needed, with a constant number of queries. Other users are looked up
+    one by one.
     """
     def __init__(self, assignment, group, requestuser_devilryrole, requestuser=None):
         """
@@ -115,6 +123,108 @@ class GroupUserLookup(object):
         self.requestuser = requestuser
         self.requestuser_devilryrole = requestuser_devilryrole
         self._usercache = {}
+        self._preloaded_user_ids = None
+        self._candidates_by_user_id = None
+        self._relatedstudents_by_user_id = None
+        self._relatedexaminers_by_user_id = None
+
+    def __get_group_user_ids_queryset(self):
+        from devilry.devilry_group.models import GroupComment, ImageAnnotationComment
+        return core_models.Candidate.objects\
+            .filter(assignment_group_id=self.group.id)\
+            .order_by()\
+            .values_list('relatedstudent__user_id', flat=True)\
+            .union(
+                core_models.Examiner.objects
+                .filter(assignmentgroup_id=self.group.id)
+                .order_by()
+                .values_list('relatedexaminer__user_id', flat=True),
+                GroupComment.objects
+                .filter(feedback_set__group_id=self.group.id)
+                .order_by()
+                .values_list('user_id', flat=True),
+                ImageAnnotationComment.objects
+                .filter(feedback_set__group_id=self.group.id)
+                .order_by()
+                .values_list('user_id', flat=True))
+
+    def __preload(self):
+        """
+        Preload the candidates of the group, and the related students and
+        related examiners for all the users in the group (candidates, examiners
+        and comment authors) with a constant number of queries.
+        """
+        if self._preloaded_user_ids is not None:
+            return
+        self._preloaded_user_ids = {user_id for user_id in self.__get_group_user_ids_queryset()
+                                    if user_id is not None}
+        self._candidates_by_user_id = {
+            candidate.relatedstudent.user_id: candidate
+            for candidate in core_models.Candidate.objects
+            .filter(assignment_group_id=self.group.id)
+            .select_related('relatedstudent')}
+        self._relatedstudents_by_user_id = {
+            relatedstudent.user_id: relatedstudent
+            for relatedstudent in core_models.RelatedStudent.objects
+            .filter(period_id=self.assignment.parentnode_id,
+                    user_id__in=self._preloaded_user_ids)}
+        self._relatedexaminers_by_user_id = {
+            relatedexaminer.user_id: relatedexaminer
+            for relatedexaminer in core_models.RelatedExaminer.objects
+            .filter(period_id=self.assignment.parentnode_id,
+                    user_id__in=self._preloaded_user_ids)}
+
+    def __is_preloaded(self, user):
+        self.__preload()
+        return user.id in self._preloaded_user_ids
+
+    def lookup_candidate(self, user):
+        """
+        Get the :class:`~devilry.apps.core.models.Candidate` for the user in the group.
+
+        Returns:
+            The Candidate, or ``None`` if the user is not candidate in the group.
+        """
+        if self.__is_preloaded(user=user):
+            return self._candidates_by_user_id.get(user.id)
+        try:
+            return core_models.Candidate.objects.get(
+                assignment_group=self.group,
+                relatedstudent__user=user)
+        except core_models.Candidate.DoesNotExist:
+            return None
+
+    def lookup_relatedstudent(self, user):
+        """
+        Get the :class:`~devilry.apps.core.models.RelatedStudent` for the user in the period.
+
+        Returns:
+            The RelatedStudent, or ``None`` if the user is not student on the period.
+        """
+        if self.__is_preloaded(user=user):
+            return self._relatedstudents_by_user_id.get(user.id)
+        try:
+            return core_models.RelatedStudent.objects.get(
+                period_id=self.assignment.parentnode_id,
+                user=user)
+        except core_models.RelatedStudent.DoesNotExist:
+            return None
+
+    def lookup_relatedexaminer(self, user):
+        """
+        Get the :class:`~devilry.apps.core.models.RelatedExaminer` for the user in the period.
+
+        Returns:
+            The RelatedExaminer, or ``None`` if the user is not examiner on the period.
+        """
+        if self.__is_preloaded(user=user):
+            return self._relatedexaminers_by_user_id.get(user.id)
+        try:
+            return core_models.RelatedExaminer.objects.get(
+                period_id=self.assignment.parentnode_id,
+                user=user)
+        except core_models.RelatedExaminer.DoesNotExist:
+            return None
 
     def is_requestuser(self, user):
         """
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.17 on 2026-10-17 12:00
+
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_auto_20180302_1139'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointtogrademap',
+            name='version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
@@ -848,6 +848,11 @@ class Assignment(models.Model, BaseNode, AbstractIsExaminer, AbstractIsCandidate
         The results are cached on this Assignment object, so multiple
         calls to this method on an Assignment object does not require any
         extra performance cost.
+
+        The dict has an entry for each possible number of points, so
+        :meth:`.points_to_grade` uses
+        :meth:`devilry.apps.core.models.PointToGradeMap.get_points_to_grade_lookup`
+        instead of this method.
         """
         if not hasattr(self, '_points_to_grade_map_as_cached_dict'):
             self._points_to_grade_map_as_cached_dict = self.get_point_to_grade_map() \
@@ -878,7 +883,7 @@ class Assignment(models.Model, BaseNode, AbstractIsExaminer, AbstractIsCandidate
         elif self.points_to_grade_mapper == self.POINTS_TO_GRADE_MAPPER_RAW_POINTS:
             return '{}/{}'.format(points, self.max_points)
         elif self.points_to_grade_mapper == self.POINTS_TO_GRADE_MAPPER_CUSTOM_TABLE:
-            return self.get_points_to_grade_map_as_cached_dict()[points]
+            return self.get_point_to_grade_map().get_points_to_grade_lookup().get_grade(points)
         else:
             raise ValueError(
                 'Assignment with id=#{} has invalid value '
@@ -2,7 +2,6 @@ import warnings
 
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _, pgettext_lazy
@@ -701,12 +700,7 @@ class AssignmentGroupQuerySet(models.QuerySet, BulkCreateQuerySetMixin):
         just need the information and have as AssignmentGroup object,
         you should use the :meth:`.AssignmentGroup.is_waiting_for_feedback` property.
         """
-        now = timezone.now()
-        whenquery = models.Q(
-            cached_data__last_feedbackset__grading_published_datetime__isnull=True,
-            cached_data__last_feedbackset__deadline_datetime__lt=now
-        )
-
+        whenquery = self.__get_is_waiting_for_feedback_whenquery(now=timezone.now())
         return self.annotate(
             annotated_is_waiting_for_feedback=models.Count(
                 models.Case(
@@ -715,6 +709,12 @@ class AssignmentGroupQuerySet(models.QuerySet, BulkCreateQuerySetMixin):
             )
         )
 
+    def __get_is_waiting_for_feedback_whenquery(self, now):
+        return models.Q(
+            cached_data__last_feedbackset__grading_published_datetime__isnull=True,
+            cached_data__last_feedbackset__deadline_datetime__lt=now
+        )
+
     def annotate_with_is_waiting_for_deliveries_count(self):
         """
         Annotate the queryset with ``annotated_is_waiting_for_deliveries``.
@@ -730,15 +730,7 @@ class AssignmentGroupQuerySet(models.QuerySet, BulkCreateQuerySetMixin):
         just need the information and have as AssignmentGroup object,
         you should use the :meth:`.AssignmentGroup.is_waiting_for_deliveries` property.
         """
-        now = timezone.now()
-        whenquery = models.Q(
-            models.Q(cached_data__last_feedbackset__grading_published_datetime__isnull=True)
-            |
-            models.Q(cached_data__last_feedbackset__grading_published_datetime__isnull=False,
-                     cached_data__last_feedbackset__deadline_datetime__gte=now)
-        ) & (
-                models.Q(cached_data__last_feedbackset__deadline_datetime__gte=now)
-        )
+        whenquery = self.__get_is_waiting_for_deliveries_whenquery(now=timezone.now())
         return self.annotate(
             annotated_is_waiting_for_deliveries=models.Count(
                 models.Case(
@@ -747,6 +739,16 @@ class AssignmentGroupQuerySet(models.QuerySet, BulkCreateQuerySetMixin):
             )
         )
 
+    def __get_is_waiting_for_deliveries_whenquery(self, now):
+        return models.Q(
+            models.Q(cached_data__last_feedbackset__grading_published_datetime__isnull=True)
+            |
+            models.Q(cached_data__last_feedbackset__grading_published_datetime__isnull=False,
+                     cached_data__last_feedbackset__deadline_datetime__gte=now)
+        ) & (
+                models.Q(cached_data__last_feedbackset__deadline_datetime__gte=now)
+        )
+
     def annotate_with_is_corrected_count(self):
         """
         Annotate the queryset with ``annotated_is_corrected``.
@@ -761,10 +763,7 @@ class AssignmentGroupQuerySet(models.QuerySet, BulkCreateQuerySetMixin):
         just need the information and have as AssignmentGroup object,
         you should use the :meth:`.AssignmentGroup.is_corrected` property.
         """
-        whenquery = models.Q(
-            models.Q(cached_data__last_feedbackset=models.F(
-                'cached_data__last_published_feedbackset')),
-        )
+        whenquery = self.__get_is_corrected_whenquery()
         return self.annotate(
             annotated_is_corrected=models.Count(
                 models.Case(
@@ -773,6 +772,47 @@ class AssignmentGroupQuerySet(models.QuerySet, BulkCreateQuerySetMixin):
             )
         )
 
+    def __get_is_corrected_whenquery(self):
+        return models.Q(
+            models.Q(cached_data__last_feedbackset=models.F(
+                'cached_data__last_published_feedbackset')),
+        )
+
+    def get_status_counts(self):
+        """
+        Count the groups in the queryset for each status with a single query.
+
+        Uses the same logic as :meth:`.annotate_with_is_waiting_for_feedback_count`,
+        :meth:`.annotate_with_is_waiting_for_deliveries_count` and
+        :meth:`.annotate_with_is_corrected_count`, but counts all the statuses
+        with conditional aggregates over ``cached_data`` instead of one
+        ``count()`` query for each status.
+
+        The queryset can be filtered and annotated (even with aggregates) - only the
+        IDs of the groups in the queryset are used.
+
+        Returns:
+            dict: A dict with the number of groups for each status. The keys are
+            ``"all"``, ``"waiting-for-feedback"``, ``"waiting-for-deliveries"`` and ``"corrected"``.
+        """
+        now = timezone.now()
+        counts = AssignmentGroup.objects\
+            .filter(id__in=self.order_by().values('id'))\
+            .aggregate(
+                all_count=models.Count('id'),
+                waiting_for_feedback_count=models.Count(models.Case(
+                    models.When(self.__get_is_waiting_for_feedback_whenquery(now=now), then=1))),
+                waiting_for_deliveries_count=models.Count(models.Case(
+                    models.When(self.__get_is_waiting_for_deliveries_whenquery(now=now), then=1))),
+                corrected_count=models.Count(models.Case(
+                    models.When(self.__get_is_corrected_whenquery(), then=1))))
+        return {
+            'all': counts['all_count'],
+            'waiting-for-feedback': counts['waiting_for_feedback_count'],
+            'waiting-for-deliveries': counts['waiting_for_deliveries_count'],
+            'corrected': counts['corrected_count'],
+        }
+
     def annotate_with_is_passing_grade_count(self):
         """
         Annotate the queryset with ``is_passing_grade``.
@@ -883,19 +923,21 @@ class AssignmentGroupManager(models.Manager):
         Returns:
             django.db.models.QuerySet: A queryset with the created groups.
         """
+        from devilry.devilry_dbcache.deferred_rebuild import defer_dbcache_rebuild
         batchoperation = BatchOperation.objects.create_synchronous(
             context_object=assignment,
             operationtype='create-groups-with-candidate-and-feedbackset')
-        group_queryset = self.__bulk_create_groups(assignment=assignment,
-                                                   batchoperation=batchoperation,
-                                                   relatedstudents=relatedstudents)
-        # We iterate over the groups multiple times, so we do this to avoid multiple queries
-        group_list = list(group_queryset)
-
-        self.__bulk_create_candidates(group_list=group_list,
-                                      relatedstudents=relatedstudents)
-        self.__bulk_update_feedbacksets(created_by_user=created_by_user,
-                                        group_list=group_list)
+        with defer_dbcache_rebuild():
+            group_queryset = self.__bulk_create_groups(assignment=assignment,
+                                                       batchoperation=batchoperation,
+                                                       relatedstudents=relatedstudents)
+            # We iterate over the groups multiple times, so we do this to avoid multiple queries
+            group_list = list(group_queryset)
+
+            self.__bulk_create_candidates(group_list=group_list,
+                                          relatedstudents=relatedstudents)
+            self.__bulk_update_feedbacksets(created_by_user=created_by_user,
+                                            group_list=group_list)
         batchoperation.finish()
         return group_queryset
 
@@ -1383,16 +1425,19 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
         Returns:
             :class:`~core.AssignmentGroup` a new assignmentgroup
         """
+        from devilry.apps.core.models import Examiner
         groupcopy = AssignmentGroup(parentnode=self.parentnode,
                                     name=self.name,
                                     is_open=self.is_open,
                                     delivery_status=self.delivery_status)
         groupcopy.full_clean()
         groupcopy.save()
-        for examiner in self.examiners.all():
-            groupcopy.examiners.create(relatedexaminer=examiner.relatedexaminer)
-        for tagobj in self.tags.all():
-            groupcopy.tags.create(tag=tagobj.tag)
+        Examiner.objects.bulk_create([
+            Examiner(assignmentgroup=groupcopy, relatedexaminer_id=relatedexaminer_id)
+            for relatedexaminer_id in self.examiners.values_list('relatedexaminer_id', flat=True)])
+        AssignmentGroupTag.objects.bulk_create([
+            AssignmentGroupTag(assignment_group=groupcopy, tag=tag)
+            for tag in self.tags.values_list('tag', flat=True)])
         return groupcopy
 
     def recalculate_delivery_numbers(self):
@@ -1458,12 +1503,8 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
             target: :class:`~core.AssignmentGroup` to be merged into
 
         """
-        for tag in self.tags.all():
-            if target.tags.filter(tag=tag.tag).exists():
-                tag.delete()
-            else:
-                tag.assignment_group = target
-                tag.save()
+        self.tags.filter(tag__in=target.tags.values('tag')).delete()
+        self.tags.update(assignment_group=target)
 
     def _merge_examiners_into(self, target):
         """
@@ -1474,12 +1515,10 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
             target: :class:`~core.AssignmentGroup` to be merged into
 
         """
-        for examiner in self.examiners.all():
-            if target.examiners.filter(relatedexaminer__user_id=examiner.relatedexaminer.user_id).exists():
-                examiner.delete()
-            else:
-                examiner.assignmentgroup = target
-                examiner.save()
+        self.examiners\
+            .filter(relatedexaminer__user_id__in=target.examiners.values('relatedexaminer__user_id'))\
+            .delete()
+        self.examiners.update(assignmentgroup=target)
 
     def _merge_candidates_into(self, target):
         """
@@ -1490,23 +1529,17 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
             target: :class:`~core.AssignmentGroup` to be merged into
 
         """
-        for candidate in self.candidates.all():
-            if target.candidates.filter(relatedstudent__user_id=candidate.relatedstudent.user_id).exists():
-                candidate.delete()
-            else:
-                candidate.assignment_group = target
-                candidate.save()
+        self.candidates\
+            .filter(relatedstudent__user_id__in=target.candidates.values('relatedstudent__user_id'))\
+            .delete()
+        self.candidates.update(assignment_group=target)
 
-    def _merge_feedbackset_into(self, target):
+    def _get_feedbackset_merge_type_expression(self):
         """
-        Merge feedbacksets from self to target.
+        Get a ``Case`` expression that maps ``feedbackset_type`` to
+        the corresponding merge type. Merge types are not changed.
 
-        Algorithm:
-            - Merge self feedbacksets into target AssignmentGroup and set feedbackset type to merge prefix
-            - For first Feedbackset we have to set the deadline since it's None by default
-
-        Args:
-            target: :class:`~core.AssignmentGroup` to be merged into
+        Can be used with ``QuerySet.update()`` on FeedbackSets.
         """
         from devilry.devilry_group.models import FeedbackSet
 
@@ -1516,16 +1549,27 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
             FeedbackSet.FEEDBACKSET_TYPE_NEW_ATTEMPT: FeedbackSet.FEEDBACKSET_TYPE_MERGE_NEW_ATTEMPT,
             FeedbackSet.FEEDBACKSET_TYPE_RE_EDIT: FeedbackSet.FEEDBACKSET_TYPE_MERGE_RE_EDIT
         }
+        return models.Case(
+            *[models.When(feedbackset_type=feedbackset_type, then=models.Value(merge_type))
+              for feedbackset_type, merge_type in feedbackset_type_merge_map.items()],
+            default=models.F('feedbackset_type'),
+            output_field=models.CharField())
 
-        feedbacksets = self.feedbackset_set.order_by_deadline_datetime()\
-            .select_related('group__parentnode')
+    def _merge_feedbackset_into(self, target):
+        """
+        Merge feedbacksets from self to target.
 
-        for feedbackset in feedbacksets:
-            # change feedbackset_type to merge prefix
-            if feedbackset.feedbackset_type in list(feedbackset_type_merge_map.keys()):
-                feedbackset.feedbackset_type = feedbackset_type_merge_map[feedbackset.feedbackset_type]
-            feedbackset.group = target
-            feedbackset.save()
+        Algorithm:
+            - Merge self feedbacksets into target AssignmentGroup and set feedbackset type to merge prefix
+
+        All the feedbacksets are moved with a single update query.
+
+        Args:
+            target: :class:`~core.AssignmentGroup` to be merged into
+        """
+        self.feedbackset_set.update(
+            group=target,
+            feedbackset_type=self._get_feedbackset_merge_type_expression())
 
     def merge_into(self, target):
         """
@@ -1573,18 +1617,8 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
         Args:
             target: :class:`~core.AssignmentGroup` the assignment group to add new feedbackset to.
         """
-        from devilry.devilry_group.models import FeedbackSet
-
-        # Map feedbackset_type to merge prefix
-        feedbackset_type_merge_map = {
-            FeedbackSet.FEEDBACKSET_TYPE_FIRST_ATTEMPT: FeedbackSet.FEEDBACKSET_TYPE_MERGE_FIRST_ATTEMPT,
-            FeedbackSet.FEEDBACKSET_TYPE_NEW_ATTEMPT: FeedbackSet.FEEDBACKSET_TYPE_MERGE_NEW_ATTEMPT,
-            FeedbackSet.FEEDBACKSET_TYPE_RE_EDIT: FeedbackSet.FEEDBACKSET_TYPE_MERGE_RE_EDIT
-        }
-        for feedbackset in target.feedbackset_set.all():
-            if feedbackset.feedbackset_type in list(feedbackset_type_merge_map.keys()):
-                feedbackset.feedbackset_type = feedbackset_type_merge_map[feedbackset.feedbackset_type]
-                feedbackset.save()
+        target.feedbackset_set.update(
+            feedbackset_type=self._get_feedbackset_merge_type_expression())
 
     def create_new_first_attempt_for_target_group(self, target):
         """
@@ -1609,6 +1643,11 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
         will be merged into target.
 
         For further explanation see: :ref:`assignmentgroup_merge`
+
+        The merge runs within
+        :func:`devilry.devilry_dbcache.deferred_rebuild.defer_dbcache_rebuild`, so the
+        cached data for the target group is rebuilt once.
+
         Args:
             groups: list with :class:`~core.AssignmentGroup`
 
@@ -1619,6 +1658,7 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
             raise ValidationError(_('Cannot merge less than 2 groups'))
 
         from devilry.apps.core.models import AssignmentGroupHistory
+        from devilry.devilry_dbcache.deferred_rebuild import defer_dbcache_rebuild
 
         target_group = groups.pop(0)
         # Check if we can merge
@@ -1634,7 +1674,7 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
         grouphistory.merge_assignment_group_history(groups)
 
         # Merge groups
-        with transaction.atomic():
+        with defer_dbcache_rebuild():
             for group in groups:
                 group.merge_into(target=target_group)
                 group.set_all_target_feedbacksets_to_merge_type(target=target_group)
@@ -1646,6 +1686,10 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
         Pops a candidate off the assignment group.
         Copy this Assignment group and all inherent Feedbacksets and comments
 
+        The Feedbacksets, comments and comment files are copied with
+        :func:`devilry.devilry_group.bulk_copy.copy_feedbacksets_into_group`, and the
+        cached data for both groups is rebuilt once.
+
         Args:
             candidate: :class:`~core.Candidate`
 
@@ -1660,16 +1704,14 @@ class AssignmentGroup(models.Model, AbstractIsAdmin, AbstractIsExaminer, Etag):
         if len(self.candidates.all()) < 2:
             raise GroupPopToFewCandidatesError('cannot pop candidate from AssignmentGroup when there is only one')
 
-        groupcopy = self.copy_all_except_candidates()
-        candidate.assignment_group = groupcopy
-        candidate.save()
-        self.cached_data.first_feedbackset.copy_feedbackset_into_group(
-            group=groupcopy,
-            target=groupcopy.cached_data.first_feedbackset
-        )
-        for feedbackset in self.feedbackset_set.order_by_deadline_datetime():
-            if feedbackset != self.cached_data.first_feedbackset:
-                feedbackset.copy_feedbackset_into_group(group=groupcopy)
+        from devilry.devilry_dbcache.deferred_rebuild import defer_dbcache_rebuild
+        from devilry.devilry_group.bulk_copy import copy_feedbacksets_into_group
+
+        with defer_dbcache_rebuild():
+            groupcopy = self.copy_all_except_candidates()
+            candidate.assignment_group = groupcopy
+            candidate.save()
+            copy_feedbacksets_into_group(source_group_id=self.id, target_group_id=groupcopy.id)
 
     def get_current_state(self):
         """
@@ -1,6 +1,12 @@
+import bisect
+import uuid
+
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _, ugettext_lazy
 
 from .assignment import Assignment
@@ -22,6 +28,63 @@ class DuplicateGradeError(Exception):
     pass
 
 
+class PointToGradeLookup(object):
+    """
+    Compact representation of a :class:`.PointToGradeMap` for looking up
+    the grade for a number of points.
+
+    Only the boundaries of the point ranges are stored, and lookups
+    use binary search on the sorted ``minimum_points`` of the ranges, so the
+    size does not depend on the max points of the assignment.
+
+    Use :meth:`.PointToGradeMap.get_points_to_grade_lookup` to get the
+    PointToGradeLookup for a PointToGradeMap.
+    """
+    def __init__(self, version, pointrangetogrades):
+        """
+        Args:
+            version: The :attr:`.PointToGradeMap.version` that this lookup was created for.
+            pointrangetogrades: Iterable of :class:`.PointRangeToGrade` objects ordered
+                by ``minimum_points``.
+        """
+        self.version = version
+        self.pointrangetogrades = list(pointrangetogrades)
+        self.minimum_points_list = [pointrange_to_grade.minimum_points
+                                    for pointrange_to_grade in self.pointrangetogrades]
+
+    def get_pointrangetograde(self, points):
+        """
+        Get the :class:`.PointRangeToGrade` matching the given ``points``.
+
+        Returns:
+            The PointRangeToGrade, or ``None`` if no range matches the points.
+        """
+        index = bisect.bisect_right(self.minimum_points_list, points) - 1
+        if index < 0:
+            return None
+        pointrange_to_grade = self.pointrangetogrades[index]
+        if points > pointrange_to_grade.maximum_points:
+            return None
+        return pointrange_to_grade
+
+    def get_grade(self, points):
+        """
+        Get the grade for the given ``points``.
+
+        Raises:
+            KeyError: If no range matches the points.
+        """
+        pointrange_to_grade = self.get_pointrangetograde(points)
+        if pointrange_to_grade is None:
+            raise KeyError(points)
+        return pointrange_to_grade.grade
+
+
+#: Process wide cache of :class:`.PointToGradeLookup` objects with PointToGradeMap ID as key.
+#: Only the lookup for the last seen version of each PointToGradeMap is kept.
+_points_to_grade_lookup_cache = {}
+
+
 class PointToGradeMapQuerySet(models.QuerySet):
     def prefetch_pointrange_to_grade(self):
         """
@@ -61,11 +124,18 @@ class PointToGradeMap(models.Model):
         This is set to ``True`` when the map has been invalidated because of
         changes to :attr:`devilry.apps.core.models.Assignment.max_points`,
         or when the map has been created, but it is empty.
+
+    .. attribute:: version
+
+        Changed each time a :class:`.PointRangeToGrade` in the map is saved or deleted.
+        Used as part of the key for the process wide cache used by
+        :meth:`.get_points_to_grade_lookup`.
     """
     objects = PointToGradeMapQuerySet.as_manager()
 
     assignment = models.OneToOneField(Assignment)
     invalid = models.BooleanField(default=True)
+    version = models.UUIDField(default=uuid.uuid4, editable=False)
 
     class Meta:
         app_label = 'core'
@@ -120,6 +190,18 @@ class PointToGradeMap(models.Model):
 
     def clear_map(self):
         self.pointrangetograde_set.all().delete()
+        self.bump_version()
+
+    def bump_version(self):
+        """
+        Change the :attr:`.version` of this map, both in the database and on this object.
+
+        This is done automatically when a :class:`.PointRangeToGrade` is saved or deleted,
+        but must be called if the PointRangeToGrade objects of the map is changed
+        with ``QuerySet.update()`` or ``bulk_create()``.
+        """
+        self.version = uuid.uuid4()
+        PointToGradeMap.objects.filter(id=self.id).update(version=self.version)
 
     def recreate_map(self, *minimum_points_to_grade_list):
         """
@@ -131,12 +213,37 @@ class PointToGradeMap(models.Model):
         """
         Convert the given ``points`` to a grade using this PointToGradeMap.
 
+        Uses :meth:`.get_points_to_grade_lookup`, so this does not query
+        the database except the first time a version of the map is used.
+
         :raises PointRangeToGrade.DoesNotExist:
             If no grade matching the given points exist.
         """
-        return PointRangeToGrade.objects \
-            .filter_grades_matching_points(points) \
-            .filter(point_to_grade_map=self).get()
+        pointrange_to_grade = self.get_points_to_grade_lookup().get_pointrangetograde(points)
+        if pointrange_to_grade is None:
+            raise PointRangeToGrade.DoesNotExist(
+                'No PointRangeToGrade matching {} points in {}'.format(points, self))
+        return pointrange_to_grade
+
+    def get_points_to_grade_lookup(self):
+        """
+        Get a :class:`.PointToGradeLookup` for this map.
+
+        The lookup is cached process wide with the ID and the :attr:`.version`
+        of this map as key. If the lookup is not cached, it is created from
+        :meth:`.prefetched_pointrangetogrades` if they are prefetched, and
+        from the database if not.
+        """
+        lookup = _points_to_grade_lookup_cache.get(self.id)
+        if lookup is None or lookup.version != self.version:
+            if hasattr(self, 'prefetched_pointrangetograde_objects'):
+                pointrangetogrades = self.prefetched_pointrangetograde_objects
+            else:
+                pointrangetogrades = self.pointrangetograde_set.order_by('minimum_points')
+            lookup = PointToGradeLookup(version=self.version,
+                                        pointrangetogrades=pointrangetogrades)
+            _points_to_grade_lookup_cache[self.id] = lookup
+        return lookup
 
     def as_choices(self):
         """
@@ -167,6 +274,9 @@ class PointToGradeMap(models.Model):
 
         Assumes the queryset for PointRangeToGrade is already ordered by ``minimum_points``,
         which it will be if you use
+
+        This creates a dict entry for each possible number of points, so use
+        :meth:`.get_points_to_grade_lookup` to lookup grades.
         """
         points_to_grade_dict = {}
         for pointrange_to_grade in self.prefetched_pointrangetogrades:
@@ -270,3 +380,13 @@ class PointRangeToGrade(models.Model):
 
     def __str__(self):
         return '{}-{}={}'.format(self.minimum_points, self.maximum_points, self.grade)
+
+
+@receiver([post_save, post_delete], sender=PointRangeToGrade)
+def _bump_point_to_grade_map_version(sender, instance, **kwargs):
+    if PointRangeToGrade.point_to_grade_map.is_cached(instance):
+        instance.point_to_grade_map.bump_version()
+    else:
+        PointToGradeMap.objects\
+            .filter(id=instance.point_to_grade_map_id)\
+            .update(version=uuid.uuid4())
@@ -7,7 +7,9 @@ from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from ievv_opensource.ievv_batchframework.models import BatchOperation
 from model_mommy import mommy
@@ -887,6 +889,38 @@ class TestAssignmentGroupMerge(TestCase):
             grading_published_datetime=None).count()
         self.assertEqual(merged_feedbacksets, 2)
 
+    def test_merge_cached_data_is_rebuilt(self):
+        testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+        group1 = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        group2 = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        core_mommy.candidate(group=group1)
+        core_mommy.candidate(group=group2)
+        core_mommy.examiner(group=group2)
+        group_mommy.feedbackset_new_attempt_unpublished(group=group2)
+        AssignmentGroup.merge_groups([group1, group2])
+        group1 = AssignmentGroup.objects.get(id=group1.id)
+        self.assertEqual(group1.cached_data.candidate_count, 2)
+        self.assertEqual(group1.cached_data.examiner_count, 1)
+        self.assertEqual(group1.cached_data.last_feedbackset.feedbackset_type,
+                         FeedbackSet.FEEDBACKSET_TYPE_FIRST_ATTEMPT)
+
+    def __count_queries_for_merge(self, feedbackset_count):
+        testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+        group1 = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        group2 = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        core_mommy.candidate(group=group2)
+        for index in range(feedbackset_count):
+            feedbackset = group_mommy.feedbackset_new_attempt_unpublished(group=group2)
+            mommy.make('devilry_group.GroupComment', feedback_set=feedbackset)
+        with CaptureQueriesContext(connection) as queries:
+            AssignmentGroup.merge_groups([group1, group2])
+        self.assertEqual(FeedbackSet.objects.filter(group=group1).count(), feedbackset_count + 3)
+        return len(queries)
+
+    def test_merge_num_queries_does_not_depend_on_feedbackset_count(self):
+        self.assertEqual(self.__count_queries_for_merge(feedbackset_count=1),
+                         self.__count_queries_for_merge(feedbackset_count=5))
+
 
 class TestAssignmentGroupPopCandidate(TestCase):
 
@@ -1043,6 +1077,75 @@ class TestAssignmentGroupPopCandidate(TestCase):
                     self.assertEqual(commentfile1.filename, commentfile2.filename)
                     self.assertEqual(commentfile1.file.path, commentfile2.file.path)
 
+    def test_commentfile_count_copied_into_new_group(self):
+        testgroup1, testcandidate1, testcandidate2 = self.make_test_data()
+        testgroup1.pop_candidate(testcandidate2)
+        testgroup2 = Candidate.objects.get(id=testcandidate2.id).assignment_group
+        self.assertEqual(CommentFile.objects.filter(comment__groupcomment__feedback_set__group=testgroup1).count(),
+                         18)
+        self.assertEqual(CommentFile.objects.filter(comment__groupcomment__feedback_set__group=testgroup2).count(),
+                         18)
+
+    def test_pop_candidate_feedbacksets_copied(self):
+        testgroup1, testcandidate1, testcandidate2 = self.make_test_data()
+        testgroup1.pop_candidate(testcandidate2)
+        testgroup2 = Candidate.objects.get(id=testcandidate2.id).assignment_group
+        fields = ['feedbackset_type', 'deadline_datetime', 'grading_published_datetime', 'grading_points']
+        feedbacksets1 = list(FeedbackSet.objects.filter(group=testgroup1)
+                             .order_by_deadline_datetime().values_list(*fields))
+        feedbacksets2 = list(FeedbackSet.objects.filter(group=testgroup2)
+                             .order_by_deadline_datetime().values_list(*fields))
+        self.assertEqual(len(feedbacksets2), 3)
+        self.assertEqual(feedbacksets1, feedbacksets2)
+
+    def test_pop_candidate_comment_visibility_is_copied(self):
+        testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+        testgroup1 = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        core_mommy.candidate(group=testgroup1)
+        testcandidate = core_mommy.candidate(group=testgroup1)
+        mommy.make('devilry_group.GroupComment',
+                   feedback_set=FeedbackSet.objects.get(group=testgroup1),
+                   user_role=GroupComment.USER_ROLE_EXAMINER,
+                   part_of_grading=True,
+                   visibility=GroupComment.VISIBILITY_PRIVATE)
+        testgroup1.pop_candidate(testcandidate)
+        testgroup2 = Candidate.objects.get(id=testcandidate.id).assignment_group
+        commentcopy = GroupComment.objects.get(feedback_set__group=testgroup2)
+        self.assertEqual(commentcopy.visibility, GroupComment.VISIBILITY_PRIVATE)
+        self.assertTrue(commentcopy.part_of_grading)
+
+    def test_pop_candidate_cached_data_is_rebuilt(self):
+        testgroup1, testcandidate1, testcandidate2 = self.make_test_data()
+        testgroup1.pop_candidate(testcandidate2)
+        testgroup1 = AssignmentGroup.objects.get(id=testgroup1.id)
+        testgroup2 = Candidate.objects.get(id=testcandidate2.id).assignment_group
+        self.assertEqual(testgroup2.cached_data.new_attempt_count, testgroup1.cached_data.new_attempt_count)
+        self.assertEqual(testgroup2.cached_data.public_total_comment_count,
+                         testgroup1.cached_data.public_total_comment_count)
+        self.assertEqual(testgroup2.cached_data.last_feedbackset.deadline_datetime,
+                         testgroup1.cached_data.last_feedbackset.deadline_datetime)
+        self.assertEqual(testgroup2.cached_data.examiner_count, testgroup1.cached_data.examiner_count)
+        self.assertEqual(testgroup2.cached_data.candidate_count, 1)
+
+    def __count_queries_for_pop_candidate(self, comment_count):
+        testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        core_mommy.candidate(group=testgroup)
+        testcandidate = core_mommy.candidate(group=testgroup)
+        feedbackset = group_mommy.feedbackset_new_attempt_published(testgroup)
+        for index in range(comment_count):
+            comment = mommy.make('devilry_group.GroupComment',
+                                 feedback_set=feedbackset,
+                                 user_role=GroupComment.USER_ROLE_STUDENT)
+            mommy.make('devilry_comment.CommentFile', comment=comment, filename='testfile.txt')
+        with CaptureQueriesContext(connection) as queries:
+            testgroup.pop_candidate(testcandidate)
+        return len(queries)
+
+    def test_pop_candidate_num_queries_does_not_depend_on_comment_count(self):
+        self.assertEqual(self.__count_queries_for_pop_candidate(comment_count=1),
+                         self.__count_queries_for_pop_candidate(comment_count=10))
+
 
 class TestAssignmentGroupGetCurrentState(TestCase):
     def setUp(self):
@@ -2240,6 +2343,60 @@ class TestAssignmentGroupQuerySetAnnotateWithIsCorrected(TestCase):
         self.assertFalse(annotated_groups.get(id=testgroup4.id).annotated_is_corrected)
 
 
+class TestAssignmentGroupQuerySetGetStatusCounts(TestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+
+    def test_no_groups(self):
+        self.assertEqual(
+            AssignmentGroup.objects.get_status_counts(),
+            {'all': 0, 'waiting-for-feedback': 0, 'waiting-for-deliveries': 0, 'corrected': 0})
+
+    def test_counts(self):
+        # Waiting for feedback
+        mommy.make('core.AssignmentGroup', parentnode__first_deadline=ACTIVE_PERIOD_START)
+        # Waiting for deliveries
+        mommy.make('core.AssignmentGroup', parentnode__first_deadline=ACTIVE_PERIOD_END)
+        mommy.make('core.AssignmentGroup', parentnode__first_deadline=ACTIVE_PERIOD_END)
+        # Corrected
+        corrected_group = mommy.make('core.AssignmentGroup', parentnode__first_deadline=ACTIVE_PERIOD_START)
+        devilry_group_mommy_factories.feedbackset_first_attempt_published(group=corrected_group)
+        self.assertEqual(
+            AssignmentGroup.objects.get_status_counts(),
+            {'all': 4, 'waiting-for-feedback': 1, 'waiting-for-deliveries': 2, 'corrected': 1})
+
+    def test_counts_match_annotations(self):
+        mommy.make('core.AssignmentGroup', parentnode__first_deadline=ACTIVE_PERIOD_START)
+        mommy.make('core.AssignmentGroup', parentnode__first_deadline=ACTIVE_PERIOD_END)
+        corrected_group = mommy.make('core.AssignmentGroup', parentnode__first_deadline=ACTIVE_PERIOD_START)
+        devilry_group_mommy_factories.feedbackset_first_attempt_published(group=corrected_group)
+        queryset = AssignmentGroup.objects\
+            .annotate_with_is_waiting_for_feedback_count()\
+            .annotate_with_is_waiting_for_deliveries_count()\
+            .annotate_with_is_corrected_count()
+        self.assertEqual(
+            queryset.get_status_counts(),
+            {
+                'all': queryset.count(),
+                'waiting-for-feedback': queryset.filter(annotated_is_waiting_for_feedback__gt=0).count(),
+                'waiting-for-deliveries': queryset.filter(annotated_is_waiting_for_deliveries__gt=0).count(),
+                'corrected': queryset.filter(annotated_is_corrected__gt=0).count(),
+            })
+
+    def test_filtered_queryset(self):
+        testassignment = mommy.make('core.Assignment', first_deadline=ACTIVE_PERIOD_START)
+        mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        mommy.make('core.AssignmentGroup', parentnode__first_deadline=ACTIVE_PERIOD_START)
+        counts = AssignmentGroup.objects.filter(parentnode=testassignment).get_status_counts()
+        self.assertEqual(counts['all'], 1)
+        self.assertEqual(counts['waiting-for-feedback'], 1)
+
+    def test_single_query(self):
+        mommy.make('core.AssignmentGroup', _quantity=3)
+        with self.assertNumQueries(1):
+            AssignmentGroup.objects.annotate_with_is_corrected_count().distinct().get_status_counts()
+
+
 class TestAssignmentGroupPublishedGradingPoints(TestCase):
     def setUp(self):
         AssignmentGroupDbCacheCustomSql().initialize()
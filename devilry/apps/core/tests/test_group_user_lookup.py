@@ -393,6 +393,34 @@ class TestGroupUserLookupViewroleExaminer(test.TestCase):
         self.assertEqual(group_user_lookup.get_long_name_from_user(user=test_examineruser, user_role='examiner'),
                          'Test Examiner (testexaminer@example.com)')
 
+    def __make_anonymized_group_with_commenting_students(self, student_count):
+        testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start',
+                                           anonymizationmode=core_models.Assignment.ANONYMIZATIONMODE_SEMI_ANONYMOUS)
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        feedbackset = mommy.make('devilry_group.FeedbackSet', group=testgroup)
+        studentusers = []
+        for index in range(student_count):
+            studentuser = mommy.make(settings.AUTH_USER_MODEL)
+            mommy.make('core.Candidate', assignment_group=testgroup, relatedstudent__user=studentuser,
+                       relatedstudent__automatic_anonymous_id='Anonymous {}'.format(index),
+                       relatedstudent__period=testassignment.parentnode)
+            mommy.make('devilry_group.GroupComment', feedback_set=feedbackset, user=studentuser,
+                       user_role='student')
+            studentusers.append(studentuser)
+        return testassignment, testgroup, studentusers
+
+    def test_user_role_student_get_anonymized_longname_num_queries(self):
+        testassignment, testgroup, studentusers = self.__make_anonymized_group_with_commenting_students(
+            student_count=10)
+        group_user_lookup = GroupUserLookup(assignment=testassignment, group=testgroup,
+                                            requestuser=mommy.make(settings.AUTH_USER_MODEL),
+                                            requestuser_devilryrole=self.viewrole)
+        with self.assertNumQueries(4):
+            for index, studentuser in enumerate(studentusers):
+                self.assertEqual(
+                    group_user_lookup.get_long_name_from_user(user=studentuser, user_role='student'),
+                    'Anonymous {}'.format(index))
+
 
 class TestGroupUserLookupViewroleAdmin(test.TestCase):
     viewrole = 'admin'
@@ -10,6 +10,7 @@ from devilry.apps.core.models import PointToGradeMap
 from devilry.apps.core.models.pointrange_to_grade import NonzeroSmallesMinimalPointsValidationError
 from devilry.apps.core.models.pointrange_to_grade import InvalidLargestMaximumPointsValidationError
 from devilry.apps.core.models.pointrange_to_grade import GapsInMapValidationError
+from devilry.apps.core.models.pointrange_to_grade import PointToGradeLookup
 
 
 class TestPointToGradeMapQuerySetPrefetchPointrangeToGrade(TestCase):
@@ -397,6 +398,53 @@ class TestPointToGradeMapOldTests(TestCase):
         self.assertEqual(better.grade, 'Better')
         self.assertEqual(good.grade, 'Good')
 
+    def test_points_to_grade_after_recreate_map(self):
+        point_to_grade_map = PointToGradeMap.objects.create(assignment=self.assignment)
+        point_to_grade_map.create_map(
+            (0, 'Bad'),
+            (30, 'Good'))
+        self.assertEqual(point_to_grade_map.points_to_grade(40).grade, 'Good')
+        point_to_grade_map.recreate_map(
+            (0, 'Bad'),
+            (50, 'Good'))
+        self.assertEqual(point_to_grade_map.points_to_grade(40).grade, 'Bad')
+        self.assertEqual(PointToGradeMap.objects.get(id=point_to_grade_map.id).points_to_grade(40).grade,
+                         'Bad')
+
+
+class TestPointToGradeLookup(TestCase):
+    def __make_lookup(self):
+        return PointToGradeLookup(version=None, pointrangetogrades=[
+            PointRangeToGrade(minimum_points=0, maximum_points=2, grade='Bad'),
+            PointRangeToGrade(minimum_points=3, maximum_points=6, grade='Medium'),
+            PointRangeToGrade(minimum_points=7, maximum_points=10, grade='Good'),
+        ])
+
+    def test_get_grade(self):
+        lookup = self.__make_lookup()
+        self.assertEqual(
+            ['Bad', 'Bad', 'Bad', 'Medium', 'Medium', 'Medium', 'Medium', 'Good', 'Good', 'Good', 'Good'],
+            [lookup.get_grade(points) for points in range(11)])
+
+    def test_get_grade_no_match(self):
+        lookup = self.__make_lookup()
+        with self.assertRaises(KeyError):
+            lookup.get_grade(11)
+        with self.assertRaises(KeyError):
+            lookup.get_grade(-1)
+
+    def test_get_pointrangetograde_gap(self):
+        lookup = PointToGradeLookup(version=None, pointrangetogrades=[
+            PointRangeToGrade(minimum_points=0, maximum_points=2, grade='Bad'),
+            PointRangeToGrade(minimum_points=5, maximum_points=10, grade='Good'),
+        ])
+        self.assertIsNone(lookup.get_pointrangetograde(3))
+        self.assertEqual(lookup.get_pointrangetograde(5).grade, 'Good')
+
+    def test_empty(self):
+        lookup = PointToGradeLookup(version=None, pointrangetogrades=[])
+        self.assertIsNone(lookup.get_pointrangetograde(0))
+
 
 class TestPointToGradeMap(TestCase):
     def test_prefetched_pointrangetogrades_property_not_prefetched(self):
@@ -465,3 +513,37 @@ class TestPointToGradeMap(TestCase):
             (3, 'Medium'),
             (7, 'Good'),
         ])
+
+    def test_version_changed_when_pointrangetograde_is_saved(self):
+        point_to_grade_map = mommy.make('core.PointToGradeMap')
+        version = point_to_grade_map.version
+        mommy.make('core.PointRangeToGrade', point_to_grade_map=point_to_grade_map)
+        self.assertNotEqual(version, point_to_grade_map.version)
+        point_to_grade_map.refresh_from_db()
+        self.assertNotEqual(version, point_to_grade_map.version)
+
+    def test_get_points_to_grade_lookup_cached(self):
+        point_to_grade_map = mommy.make('core.PointToGradeMap')
+        mommy.make('core.PointRangeToGrade',
+                   point_to_grade_map=point_to_grade_map,
+                   minimum_points=0,
+                   maximum_points=10,
+                   grade='Good')
+        point_to_grade_map = PointToGradeMap.objects.get(id=point_to_grade_map.id)
+        point_to_grade_map.get_points_to_grade_lookup()
+        point_to_grade_map = PointToGradeMap.objects.get(id=point_to_grade_map.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(point_to_grade_map.points_to_grade(5).grade, 'Good')
+            self.assertEqual(point_to_grade_map.get_points_to_grade_lookup().get_grade(10), 'Good')
+
+    def test_get_points_to_grade_lookup_prefetched(self):
+        point_to_grade_map = mommy.make('core.PointToGradeMap')
+        mommy.make('core.PointRangeToGrade',
+                   point_to_grade_map=point_to_grade_map,
+                   minimum_points=0,
+                   maximum_points=10,
+                   grade='Good')
+        prefetched_point_to_grade_map = PointToGradeMap.objects\
+            .prefetch_pointrange_to_grade().get(id=point_to_grade_map.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(prefetched_point_to_grade_map.get_points_to_grade_lookup().get_grade(5), 'Good')
@@ -1,5 +1,9 @@
 from django import test
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.db import connection
 from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
 from django.test import override_settings
 from django.utils import translation
 from mock import mock
@@ -42,9 +46,33 @@ class TestAccountMiddleware(test.TestCase):
         self.assertEqual('nb', translation.get_language())
         self.assertEqual('nb', mockrequest.LANGUAGE_CODE)
 
+    def test_process_request_authenticated_user_no_queries(self):
+        local_middleware = middleware.LocalMiddleware()
+        user = mommy.make('devilry_account.User', languagecode='nb')
+        mockrequest = self.__make_mock_request(user=user, is_authenticated=True)
+        with self.assertNumQueries(0):
+            local_middleware.process_request(request=mockrequest)
+        self.assertEqual('nb', mockrequest.LANGUAGE_CODE)
+
     def test_process_response(self):
         local_middleware = middleware.LocalMiddleware()
         translation.activate('nb')
         mockrequest = self.__make_mock_request(languagecode='nb')
         response = local_middleware.process_response(request=mockrequest, response=HttpResponse())
         self.assertEqual('nb', response['Content-Language'])
+
+
+class TestPageQueryCountBaseline(test.TestCase):
+    def test_authenticated_page_loads_user_once(self):
+        user = mommy.make('devilry_account.User', languagecode='nb')
+        self.client.force_login(user)
+        middleware_classes = ['devilry.utils.querycountmiddleware.QueryCountMiddleware'] + \
+            list(settings.MIDDLEWARE_CLASSES)
+        with self.settings(MIDDLEWARE_CLASSES=middleware_classes):
+            with CaptureQueriesContext(connection) as captured_queries:
+                response = self.client.get(reverse('devilry-help'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(str(len(captured_queries)), response['X-Devilry-Query-Count'])
+        user_queries = [query for query in captured_queries.captured_queries
+                        if 'FROM "devilry_account_user"' in query['sql']]
+        self.assertEqual(len(user_queries), 1)
@@ -15,6 +15,8 @@ class DevilryAdminAppConfig(AppConfig):
         from devilry.devilry_report import generator_registry as report_generator_registry
         from devilry.devilry_admin.views.period import all_results_generator
         from devilry.devilry_admin import tasks
+        # Connects the signal handlers that invalidate the cached period results.
+        from devilry.devilry_admin.views.period import overview_all_results_cache  # noqa
 
         backend_registry.Registry.get_instance().add(backends.DevilryAdminZipBackend)
 
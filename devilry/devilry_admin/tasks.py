@@ -45,12 +45,19 @@ class AssignmentCompressAction(AbstractBaseBatchAction, AssignmentBatchMixin):
         # get backend
         zipfile_backend = self.get_backend(zipfile_path=zipfile_path, archive_name=archive_name)
 
+        # Copy unchanged files from the previous archive instead of compressing them again.
+        from devilry.devilry_compressionutil.models import CompressedArchiveMeta
+        self.use_previous_archive(
+            compressed_archive_meta=CompressedArchiveMeta.objects.get_latest_archive_meta(
+                instance=assignment,
+                user=started_by_user,
+                user_role=CompressedArchiveMeta.CREATED_BY_ROLE_ADMIN))
+
         self.add_assignment_groups(user=started_by_user, zipfile_backend=zipfile_backend, assignment=assignment)
 
         zipfile_backend.close()
 
         # create archive meta entry
-        from devilry.devilry_compressionutil.models import CompressedArchiveMeta
         CompressedArchiveMeta.objects.create_meta(
             instance=assignment,
             zipfile_backend=zipfile_backend,
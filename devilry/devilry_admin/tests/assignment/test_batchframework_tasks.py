@@ -7,13 +7,16 @@ import shutil
 from zipfile import ZipFile
 
 # Third party imports
+import mock
 from ievv_opensource.ievv_batchframework.batchregistry import ActionGroupSynchronousExecutionError
 from model_mommy import mommy
 from ievv_opensource.ievv_batchframework import batchregistry
+from ievv_opensource.ievv_batchframework import rq_tasks
+from ievv_opensource.ievv_batchframework.models import BatchOperation
 
 # Django imports
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.core.files.base import ContentFile
 from django.utils import timezone
 from django.template import defaultfilters
@@ -25,6 +28,8 @@ from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
 from devilry.devilry_admin import tasks
 from devilry.devilry_group import devilry_group_mommy_factories as group_mommy
 from devilry.devilry_compressionutil import models as archivemodels
+from devilry.devilry_compressionutil.abstract_batch_action import AbstractBaseBatchAction
+from devilry.devilry_compressionutil.backends import backends_base
 
 
 class TestCompressed(TestCase):
@@ -722,3 +727,340 @@ class TestAssignmentBatchTask(TestCompressed):
             self.assertEqual(b'first upload', zipfileobject.read(path_to_old_duplicate_file))
             self.assertEqual(b'last upload after deadline', zipfileobject.read(path_to_last_file_after_deadline))
             self.assertEqual(b'first upload after deadline', zipfileobject.read(path_to_old_duplicate_file_after_deadline))
+
+
+class TestAssignmentBatchTaskIncremental(TestCompressed):
+    def __make_comment_file(self, feedback_set, file_name, file_content):
+        comment = mommy.make('devilry_group.GroupComment',
+                             feedback_set=feedback_set,
+                             user_role='student')
+        comment_file = mommy.make('devilry_comment.CommentFile', comment=comment,
+                                  filename=file_name)
+        comment_file.file.save(file_name, ContentFile(file_content))
+        return comment_file
+
+    def __make_group_with_file(self, assignment, shortname, file_content='testcontent'):
+        group = mommy.make('core.AssignmentGroup', parentnode=assignment)
+        feedbackset = group_mommy.feedbackset_first_attempt_unpublished(group=group)
+        self.__make_comment_file(feedback_set=feedbackset, file_name='testfile.txt',
+                                 file_content=file_content)
+        mommy.make('core.Candidate', assignment_group=group, relatedstudent__user__shortname=shortname)
+        return feedbackset
+
+    def __run_action(self, assignment, user):
+        action = tasks.AssignmentCompressAction(context_object=assignment, started_by=user)
+        action.execute()
+        return action
+
+    def __get_archive_path(self, shortname, feedbackset, *path):
+        return os.path.join(
+            shortname,
+            'deadline-{}'.format(defaultfilters.date(feedbackset.deadline_datetime, 'b.j.Y-H:i')),
+            *path)
+
+    def test_first_archive_compresses_all_files(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            self.__make_group_with_file(assignment=testassignment, shortname='april')
+            self.__make_group_with_file(assignment=testassignment, shortname='dewey')
+            action = self.__run_action(assignment=testassignment, user=testuser)
+            self.assertEqual(action.compressed_file_count, 2)
+            self.assertEqual(action.copied_file_count, 0)
+
+    def test_unchanged_files_are_copied(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            self.__make_group_with_file(assignment=testassignment, shortname='april',
+                                        file_content='april content')
+            self.__run_action(assignment=testassignment, user=testuser)
+            feedbackset = self.__make_group_with_file(assignment=testassignment, shortname='dewey',
+                                                      file_content='dewey content')
+            action = self.__run_action(assignment=testassignment, user=testuser)
+            self.assertEqual(action.compressed_file_count, 1)
+            self.assertEqual(action.copied_file_count, 1)
+
+            archive_meta = archivemodels.CompressedArchiveMeta.objects\
+                .filter(content_object_id=testassignment.id)\
+                .order_by('-created_datetime').first()
+            zipfileobject = ZipFile(archive_meta.archive_path)
+            self.assertIsNone(zipfileobject.testzip())
+            self.assertEqual(2, len(zipfileobject.namelist()))
+            self.assertEqual(
+                b'dewey content',
+                zipfileobject.read(self.__get_archive_path('dewey', feedbackset, 'testfile.txt')))
+
+    def test_file_replaced_by_new_upload_moved_to_old_duplicates(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start',
+                                               first_deadline=timezone.now() + timezone.timedelta(hours=1))
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            feedbackset = self.__make_group_with_file(assignment=testassignment, shortname='april',
+                                                      file_content='first upload')
+            self.__run_action(assignment=testassignment, user=testuser)
+            first_comment_file = feedbackset.groupcomment_set.first().commentfile_set.first()
+            self.__make_comment_file(feedback_set=feedbackset, file_name='testfile.txt',
+                                     file_content='last upload')
+            action = self.__run_action(assignment=testassignment, user=testuser)
+
+            # The first upload changes path in the archive, so both files are compressed.
+            self.assertEqual(action.compressed_file_count, 2)
+            self.assertEqual(action.copied_file_count, 0)
+            archive_meta = archivemodels.CompressedArchiveMeta.objects \
+                .filter(content_object_id=testassignment.id) \
+                .order_by('-created_datetime').first()
+            zipfileobject = ZipFile(archive_meta.archive_path)
+            self.assertEqual(
+                b'last upload',
+                zipfileobject.read(self.__get_archive_path('april', feedbackset, 'testfile.txt')))
+            self.assertEqual(
+                b'first upload',
+                zipfileobject.read(self.__get_archive_path(
+                    'april', feedbackset, 'old_duplicates', first_comment_file.get_filename_as_unique_string())))
+
+    def test_previous_archive_from_other_user_not_used(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            otheruser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            self.__make_group_with_file(assignment=testassignment, shortname='april')
+            self.__run_action(assignment=testassignment, user=otheruser)
+            action = self.__run_action(assignment=testassignment, user=testuser)
+            self.assertEqual(action.compressed_file_count, 1)
+            self.assertEqual(action.copied_file_count, 0)
+
+    def test_previous_archive_marked_as_deleted_is_used(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            self.__make_group_with_file(assignment=testassignment, shortname='april')
+            self.__run_action(assignment=testassignment, user=testuser)
+            archivemodels.CompressedArchiveMeta.objects.update(deleted_datetime=timezone.now())
+            action = self.__run_action(assignment=testassignment, user=testuser)
+            self.assertEqual(action.copied_file_count, 1)
+
+    def test_previous_archive_missing(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            self.__make_group_with_file(assignment=testassignment, shortname='april')
+            self.__run_action(assignment=testassignment, user=testuser)
+            os.remove(archivemodels.CompressedArchiveMeta.objects.get().archive_path)
+            action = self.__run_action(assignment=testassignment, user=testuser)
+            self.assertEqual(action.compressed_file_count, 1)
+            self.assertEqual(action.copied_file_count, 0)
+
+    def test_previous_archive_deleted_while_running(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            feedbackset = self.__make_group_with_file(assignment=testassignment, shortname='april',
+                                                      file_content='april content')
+            self.__run_action(assignment=testassignment, user=testuser)
+            use_previous_archive_path = AbstractBaseBatchAction.use_previous_archive_path
+
+            def use_and_delete_previous_archive_path(action, archive_path):
+                is_used = use_previous_archive_path(action, archive_path=archive_path)
+                os.remove(archive_path)
+                return is_used
+
+            with mock.patch.object(AbstractBaseBatchAction, 'use_previous_archive_path',
+                                   use_and_delete_previous_archive_path):
+                action = self.__run_action(assignment=testassignment, user=testuser)
+            self.assertEqual(action.compressed_file_count, 1)
+            self.assertEqual(action.copied_file_count, 0)
+            archive_meta = archivemodels.CompressedArchiveMeta.objects \
+                .filter(content_object_id=testassignment.id) \
+                .order_by('-created_datetime').first()
+            zipfileobject = ZipFile(archive_meta.archive_path)
+            self.assertEqual(
+                b'april content',
+                zipfileobject.read(self.__get_archive_path('april', feedbackset, 'testfile.txt')))
+
+    def test_copying_entries_not_supported_by_zipfile(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            feedbackset = self.__make_group_with_file(assignment=testassignment, shortname='april',
+                                                      file_content='april content')
+            self.__run_action(assignment=testassignment, user=testuser)
+            with mock.patch.object(backends_base, 'ZIPFILE_ATTRIBUTES_REQUIRED_TO_COPY_ENTRIES',
+                                   ('fp', 'attribute_removed_from_zipfile')):
+                action = self.__run_action(assignment=testassignment, user=testuser)
+            self.assertEqual(action.compressed_file_count, 1)
+            self.assertEqual(action.copied_file_count, 0)
+            archive_meta = archivemodels.CompressedArchiveMeta.objects \
+                .filter(content_object_id=testassignment.id) \
+                .order_by('-created_datetime').first()
+            zipfileobject = ZipFile(archive_meta.archive_path)
+            self.assertEqual(
+                b'april content',
+                zipfileobject.read(self.__get_archive_path('april', feedbackset, 'testfile.txt')))
+
+    def test_incremental_disabled(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path,
+                           DEVILRY_COMPRESSED_ARCHIVES_INCREMENTAL=False):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            self.__make_group_with_file(assignment=testassignment, shortname='april')
+            self.__run_action(assignment=testassignment, user=testuser)
+            action = self.__run_action(assignment=testassignment, user=testuser)
+            self.assertEqual(action.compressed_file_count, 1)
+            self.assertEqual(action.copied_file_count, 0)
+
+
+class AssignmentBatchTaskChunksMixin(object):
+    def _make_group_with_file(self, assignment, shortname):
+        group = mommy.make('core.AssignmentGroup', parentnode=assignment)
+        feedbackset = group_mommy.feedbackset_first_attempt_unpublished(group=group)
+        comment = mommy.make('devilry_group.GroupComment',
+                             feedback_set=feedbackset,
+                             user_role='student')
+        comment_file = mommy.make('devilry_comment.CommentFile', comment=comment,
+                                  filename='testfile.txt')
+        comment_file.file.save('testfile.txt', ContentFile('{} content'.format(shortname)))
+        mommy.make('core.Candidate', assignment_group=group, relatedstudent__user__shortname=shortname)
+        return feedbackset
+
+    def _get_archive_content(self, assignment):
+        archive_meta = archivemodels.CompressedArchiveMeta.objects.get(content_object_id=assignment.id)
+        zipfileobject = ZipFile(archive_meta.archive_path)
+        self.assertIsNone(zipfileobject.testzip())
+        return {
+            name.split('/')[0]: zipfileobject.read(name)
+            for name in zipfileobject.namelist()
+        }
+
+
+class TestAssignmentBatchTaskChunks(TestCompressed, AssignmentBatchTaskChunksMixin):
+    def test_progress_reported_for_each_chunk(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path,
+                           DEVILRY_COMPRESSED_ARCHIVES_GROUPS_PER_CHUNK=2):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            for shortname in ['april', 'dewey', 'huey']:
+                self._make_group_with_file(assignment=testassignment, shortname=shortname)
+            batchoperation = mommy.make('ievv_batchframework.BatchOperation',
+                                        status=BatchOperation.STATUS_RUNNING)
+            action = tasks.AssignmentCompressAction(context_object=testassignment, started_by=testuser,
+                                                    batchoperation_id=batchoperation.id)
+            with mock.patch.object(action, 'report_progress', wraps=action.report_progress) as report_progress:
+                action.execute()
+            self.assertEqual(report_progress.call_args_list, [
+                mock.call(completed_chunk_count=1, total_chunk_count=2),
+                mock.call(completed_chunk_count=2, total_chunk_count=2),
+            ])
+            batchoperation.refresh_from_db()
+            self.assertEqual(batchoperation.output_data,
+                             {'completed_chunk_count': 2, 'total_chunk_count': 2})
+            self.assertEqual(self._get_archive_content(assignment=testassignment), {
+                'april': b'april content',
+                'dewey': b'dewey content',
+                'huey': b'huey content',
+            })
+
+    def test_progress_reported_to_batchoperation_when_run_by_rq_task(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path,
+                           DEVILRY_COMPRESSED_ARCHIVES_GROUPS_PER_CHUNK=2):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            for shortname in ['april', 'dewey', 'huey']:
+                self._make_group_with_file(assignment=testassignment, shortname=shortname)
+            actiongroup = batchregistry.ActionGroup(
+                name='batchframework_assignment_progress',
+                mode=batchregistry.ActionGroup.MODE_ASYNCHRONOUS,
+                actions=[tasks.AssignmentCompressAction])
+            batchregistry.Registry.get_instance().add_actiongroup(actiongroup)
+            batchoperation = actiongroup.create_batchoperation(context_object=testassignment,
+                                                               started_by=testuser)
+
+            original_report_progress = AbstractBaseBatchAction.report_progress
+            reported_output_data = []
+
+            def report_progress(action, **kwargs):
+                original_report_progress(action, **kwargs)
+                reported_output_data.append(BatchOperation.objects.get(id=batchoperation.id).output_data)
+
+            with mock.patch.object(AbstractBaseBatchAction, 'report_progress', report_progress):
+                rq_tasks.BatchActionGroupTask().run_actiongroup(
+                    actiongroup_name='batchframework_assignment_progress',
+                    batchoperation_id=batchoperation.id)
+            self.assertEqual(reported_output_data, [
+                {'completed_chunk_count': 1, 'total_chunk_count': 2},
+                {'completed_chunk_count': 2, 'total_chunk_count': 2},
+            ])
+            batchoperation.refresh_from_db()
+            self.assertEqual(batchoperation.status, BatchOperation.STATUS_FINISHED)
+            self.assertEqual(batchoperation.result, BatchOperation.RESULT_SUCCESSFUL)
+
+    def test_no_batchoperation(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            self._make_group_with_file(assignment=testassignment, shortname='april')
+            tasks.AssignmentCompressAction(context_object=testassignment, started_by=testuser).execute()
+            self.assertEqual(self._get_archive_content(assignment=testassignment),
+                             {'april': b'april content'})
+
+    def test_worker_processes_not_used_in_transaction(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path,
+                           DEVILRY_COMPRESSED_ARCHIVES_GROUPS_PER_CHUNK=1,
+                           DEVILRY_COMPRESSED_ARCHIVES_WORKER_PROCESSES=2):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            self._make_group_with_file(assignment=testassignment, shortname='april')
+            self._make_group_with_file(assignment=testassignment, shortname='dewey')
+            with mock.patch('devilry.devilry_compressionutil.batchjob_mixins.assignment_mixin.ProcessPoolExecutor') \
+                    as mock_process_pool_executor:
+                tasks.AssignmentCompressAction(context_object=testassignment, started_by=testuser).execute()
+            mock_process_pool_executor.assert_not_called()
+            self.assertEqual(self._get_archive_content(assignment=testassignment), {
+                'april': b'april content',
+                'dewey': b'dewey content',
+            })
+
+
+class TestAssignmentBatchTaskWorkerProcesses(TransactionTestCase, AssignmentBatchTaskChunksMixin):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+        self.backend_path = os.path.join('devilry_testfiles', 'devilry_compressed_archives', '')
+
+    def tearDown(self):
+        shutil.rmtree(self.backend_path, ignore_errors=True)
+        shutil.rmtree('devilry_testfiles/filestore/', ignore_errors=True)
+
+    def test_chunks_compressed_in_worker_processes(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path,
+                           DEVILRY_COMPRESSED_ARCHIVES_GROUPS_PER_CHUNK=2,
+                           DEVILRY_COMPRESSED_ARCHIVES_WORKER_PROCESSES=2):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            shortnames = ['april', 'dewey', 'huey', 'louie', 'scrooge']
+            for shortname in shortnames:
+                self._make_group_with_file(assignment=testassignment, shortname=shortname)
+            action = tasks.AssignmentCompressAction(context_object=testassignment, started_by=testuser)
+            action.execute()
+            self.assertEqual(action.compressed_file_count, 5)
+            self.assertEqual(
+                self._get_archive_content(assignment=testassignment),
+                {shortname: '{} content'.format(shortname).encode('utf-8') for shortname in shortnames})
+            self.assertEqual(
+                sorted(os.listdir(os.path.dirname(
+                    archivemodels.CompressedArchiveMeta.objects.get().archive_path))),
+                [archivemodels.CompressedArchiveMeta.objects.get().archive_name])
+
+    def test_chunks_with_previous_archive(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path,
+                           DEVILRY_COMPRESSED_ARCHIVES_GROUPS_PER_CHUNK=1,
+                           DEVILRY_COMPRESSED_ARCHIVES_WORKER_PROCESSES=2):
+            testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+            testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+            self._make_group_with_file(assignment=testassignment, shortname='april')
+            self._make_group_with_file(assignment=testassignment, shortname='dewey')
+            tasks.AssignmentCompressAction(context_object=testassignment, started_by=testuser).execute()
+            self._make_group_with_file(assignment=testassignment, shortname='huey')
+            action = tasks.AssignmentCompressAction(context_object=testassignment, started_by=testuser)
+            action.execute()
+            self.assertEqual(action.copied_file_count, 2)
+            self.assertEqual(action.compressed_file_count, 1)
@@ -411,6 +411,36 @@ class TestAssignmentBatchDownloadApi(test.TestCase, TestHelper, TestCaseMixin):
             })
         self.assertEqual(mockresponse.response.content, b'{"status": "running"}')
 
+    def test_get_status_running_with_progress(self):
+        testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_start')
+        testuser = mommy.make(settings.AUTH_USER_MODEL, is_superuser=True)
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        testfeedbackset = devilry_group_mommy_factories.feedbackset_first_attempt_unpublished(group=testgroup)
+        testcomment = mommy.make('devilry_group.GroupComment',
+                                 feedback_set=testfeedbackset,
+                                 user_role='student',
+                                 user__shortname='testuser@example.com')
+        commentfile = mommy.make('devilry_comment.CommentFile', comment=testcomment, filename='testfile.txt')
+        commentfile.file.save('testfile.txt', ContentFile('testcontent'))
+        self._mock_batchoperation(context_object=testassignment,
+                                  status=BatchOperation.STATUS_RUNNING,
+                                  user=testuser)
+        BatchOperation.objects.update(output_data_json=json.dumps({
+            'completed_chunk_count': 3,
+            'total_chunk_count': 10
+        }))
+        mockresponse = self.mock_getrequest(
+            cradmin_app=self.__mock_cradmin_app(),
+            requestuser=testuser,
+            viewkwargs={
+                'content_object_id': testassignment.id
+            })
+        self.assertEqual(json.loads(mockresponse.response.content.decode('utf-8')), {
+            'status': 'running',
+            'completed_chunk_count': 3,
+            'total_chunk_count': 10
+        })
+
     def test_get_status_finished_with_link_to_downloadurl(self):
         # When the BatchOperation task is complete, it creates a CompressedArchiveMeta entry in
         # the database. This is simulated by NOT creating a BatchOperation, but just creating a CompressedArchive
@@ -0,0 +1,182 @@
+from datetime import timedelta
+
+import mock
+from django import test
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from model_mommy import mommy
+
+from devilry.apps.core.models import AssignmentGroup
+from devilry.devilry_admin.views.period import overview_all_results_cache
+from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
+from devilry.devilry_dbcache.deferred_rebuild import defer_dbcache_rebuild
+from devilry.devilry_dbcache.deferred_rebuild import deferred_dbcache_rebuild_flushed
+from devilry.devilry_group import devilry_group_mommy_factories as group_factory
+from devilry.devilry_group.models import FeedbackSet
+
+
+@test.override_settings(DEVILRY_ADMIN_PERIOD_ALL_RESULTS_CACHE_TIMEOUT=600)
+class TestPeriodResultsSnapshot(test.TestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def __make_student_with_result(self, period, grading_points):
+        testassignment = mommy.make('core.Assignment', parentnode=period)
+        relatedstudent = mommy.make('core.RelatedStudent', period=period)
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        mommy.make('core.Candidate', assignment_group=testgroup, relatedstudent=relatedstudent)
+        feedbackset = group_factory.feedbackset_first_attempt_published(
+            group=testgroup, grading_points=grading_points)
+        return relatedstudent, feedbackset
+
+    def test_snapshot_is_cached(self):
+        testperiod = mommy.make('core.Period')
+        relatedstudent, feedbackset = self.__make_student_with_result(period=testperiod, grading_points=10)
+        overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        with self.assertNumQueries(0):
+            collector = overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        self.assertEqual(collector.results[relatedstudent.id].get_total_result(), 10)
+
+    def test_snapshot_invalidated_on_feedbackset_change(self):
+        testperiod = mommy.make('core.Period')
+        relatedstudent, feedbackset = self.__make_student_with_result(period=testperiod, grading_points=10)
+        overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        feedbackset.grading_points = 20
+        feedbackset.save()
+        collector = overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        self.assertEqual(collector.results[relatedstudent.id].get_total_result(), 20)
+
+    def test_snapshot_invalidated_on_new_relatedstudent(self):
+        testperiod = mommy.make('core.Period')
+        self.__make_student_with_result(period=testperiod, grading_points=10)
+        overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        relatedstudent, feedbackset = self.__make_student_with_result(period=testperiod, grading_points=5)
+        collector = overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        self.assertEqual(collector.results[relatedstudent.id].get_total_result(), 5)
+
+    def test_snapshot_invalidated_on_bulk_deadline_move(self):
+        testperiod = mommy.make('core.Period')
+        testassignment = mommy.make('core.Assignment', parentnode=testperiod)
+        relatedstudent = mommy.make('core.RelatedStudent', period=testperiod)
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        mommy.make('core.Candidate', assignment_group=testgroup, relatedstudent=relatedstudent)
+        feedbackset = group_factory.feedbackset_first_attempt_unpublished(
+            group=testgroup, deadline_datetime=timezone.now() - timedelta(days=1))
+        collector = overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        self.assertIsNone(collector.next_deadline_datetime)
+        new_deadline_datetime = (timezone.now() + timedelta(days=7)).replace(microsecond=0)
+        with defer_dbcache_rebuild():
+            FeedbackSet.objects.filter(id__in=[feedbackset.id]).update(deadline_datetime=new_deadline_datetime)
+        collector = overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        self.assertEqual(collector.next_deadline_datetime, new_deadline_datetime)
+
+    def test_snapshot_invalidated_on_bulk_create_groups(self):
+        testperiod = mommy.make('core.Period')
+        testassignment = mommy.make('core.Assignment', parentnode=testperiod)
+        relatedstudent = mommy.make('core.RelatedStudent', period=testperiod)
+        collector = overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        self.assertFalse(collector.results[relatedstudent.id].student_is_registered_on_assignment(
+            testassignment.id))
+        AssignmentGroup.objects.bulk_create_groups(
+            created_by_user=mommy.make(settings.AUTH_USER_MODEL),
+            assignment=testassignment,
+            relatedstudents=[relatedstudent])
+        collector = overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        self.assertTrue(collector.results[relatedstudent.id].student_is_registered_on_assignment(
+            testassignment.id))
+
+    def __connect_deferred_dbcache_rebuild_flushed_handler(self):
+        handler = mock.Mock()
+        deferred_dbcache_rebuild_flushed.connect(handler)
+        self.addCleanup(deferred_dbcache_rebuild_flushed.disconnect, handler)
+        return handler
+
+    def test_merge_groups_bumps_target_group(self):
+        testperiod = mommy.make('core.Period')
+        testassignment = mommy.make('core.Assignment', parentnode=testperiod)
+        testgroup1 = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        testgroup2 = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        version = overview_all_results_cache.get_period_results_version(period_id=testperiod.id)
+        handler = self.__connect_deferred_dbcache_rebuild_flushed_handler()
+        with mock.patch('devilry.devilry_admin.views.period.overview_all_results_cache'
+                        '.bump_period_results_version',
+                        wraps=overview_all_results_cache.bump_period_results_version) as mock_bump:
+            AssignmentGroup.merge_groups([testgroup1, testgroup2])
+        self.assertEqual(handler.call_count, 1)
+        self.assertIn(testgroup1.id, handler.call_args[1]['group_ids'])
+        mock_bump.assert_any_call(period_id=testperiod.id)
+        self.assertNotEqual(overview_all_results_cache.get_period_results_version(period_id=testperiod.id),
+                            version)
+
+    def test_pop_candidate_bumps_source_and_new_group(self):
+        testperiod = mommy.make('core.Period')
+        testassignment = mommy.make('core.Assignment', parentnode=testperiod)
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        group_factory.feedbackset_first_attempt_published(group=testgroup, grading_points=10)
+        mommy.make('core.Candidate', assignment_group=testgroup)
+        testcandidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        version = overview_all_results_cache.get_period_results_version(period_id=testperiod.id)
+        handler = self.__connect_deferred_dbcache_rebuild_flushed_handler()
+        testgroup.pop_candidate(testcandidate)
+        testcandidate.refresh_from_db()
+        self.assertEqual(handler.call_count, 1)
+        self.assertIn(testgroup.id, handler.call_args[1]['group_ids'])
+        self.assertIn(testcandidate.assignment_group_id, handler.call_args[1]['group_ids'])
+        self.assertNotEqual(overview_all_results_cache.get_period_results_version(period_id=testperiod.id),
+                            version)
+
+    def test_deferred_dbcache_rebuild_flushed_bumps_periods_of_groups(self):
+        testperiod1 = mommy.make('core.Period')
+        testperiod2 = mommy.make('core.Period')
+        testgroup = mommy.make('core.AssignmentGroup', parentnode__parentnode=testperiod1)
+        version1 = overview_all_results_cache.get_period_results_version(period_id=testperiod1.id)
+        version2 = overview_all_results_cache.get_period_results_version(period_id=testperiod2.id)
+        deferred_dbcache_rebuild_flushed.send(sender=None, group_ids=[testgroup.id], using='default')
+        self.assertNotEqual(overview_all_results_cache.get_period_results_version(period_id=testperiod1.id),
+                            version1)
+        self.assertEqual(overview_all_results_cache.get_period_results_version(period_id=testperiod2.id),
+                         version2)
+
+    def test_bump_only_invalidates_the_period(self):
+        testperiod1 = mommy.make('core.Period')
+        testperiod2 = mommy.make('core.Period')
+        self.__make_student_with_result(period=testperiod1, grading_points=10)
+        self.__make_student_with_result(period=testperiod2, grading_points=10)
+        overview_all_results_cache.get_period_results_snapshot(period=testperiod1)
+        overview_all_results_cache.get_period_results_snapshot(period=testperiod2)
+        overview_all_results_cache.bump_period_results_version(period_id=testperiod1.id)
+        with self.assertNumQueries(0):
+            overview_all_results_cache.get_period_results_snapshot(period=testperiod2)
+
+    def test_get_subset(self):
+        testperiod = mommy.make('core.Period')
+        relatedstudent1, feedbackset1 = self.__make_student_with_result(period=testperiod, grading_points=10)
+        relatedstudent2, feedbackset2 = self.__make_student_with_result(period=testperiod, grading_points=20)
+        snapshot = overview_all_results_cache.get_period_results_snapshot(period=testperiod)
+        with self.assertNumQueries(0):
+            subset = snapshot.get_subset(related_student_ids=[relatedstudent2.id])
+            self.assertEqual(list(subset.results.keys()), [relatedstudent2.id])
+            self.assertEqual(subset.results[relatedstudent2.id].get_total_result(), 20)
+            self.assertEqual(
+                subset.results[relatedstudent2.id].get_result_for_assignment(
+                    assignment_id=feedbackset2.group.parentnode_id),
+                20)
+            self.assertIsNone(
+                subset.results[relatedstudent2.id].get_result_for_assignment(
+                    assignment_id=feedbackset1.group.parentnode_id))
+
+
+class TestPeriodResultsSnapshotDisabled(test.TestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+        cache.clear()
+
+    def test_bump_does_nothing(self):
+        testperiod = mommy.make('core.Period')
+        overview_all_results_cache.bump_period_results_version(period_id=testperiod.id)
+        self.assertIsNone(cache.get('devilry_admin.period_all_results.{}.version'.format(testperiod.id)))
@@ -500,8 +500,83 @@ class TestAllResultsCollector(test.TestCase):
 
             collector.results[relatedstudent_april.id].get_total_result()
 
+            collector.serialize_all_results()
+
+        # The cached_data is fetched with a single query for all the students the first time it is needed.
+        with self.assertNumQueries(1):
             collector.results[relatedstudent_donald.id].get_cached_data_list()
 
             collector.results[relatedstudent_april.id].get_cached_data_list()
 
-            collector.serialize_all_results()
+    def test_total_results_array(self):
+        testperiod = mommy.make('core.Period')
+        testassignment1 = mommy.make('core.Assignment', parentnode=testperiod)
+        testassignment2 = mommy.make('core.Assignment', parentnode=testperiod)
+        relatedstudent1 = mommy.make('core.RelatedStudent', period=testperiod)
+        relatedstudent2 = mommy.make('core.RelatedStudent', period=testperiod)
+        for testassignment, relatedstudent, grading_points in [(testassignment1, relatedstudent1, 5),
+                                                               (testassignment2, relatedstudent1, 7),
+                                                               (testassignment1, relatedstudent2, 3)]:
+            testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+            mommy.make('core.Candidate', assignment_group=testgroup, relatedstudent=relatedstudent)
+            group_factory.feedbackset_first_attempt_published(group=testgroup, grading_points=grading_points)
+        collector = PeriodAllResultsCollector(
+            period=testperiod,
+            related_student_ids=[relatedstudent1.id, relatedstudent2.id]
+        )
+        self.assertEqual(
+            sorted(collector.get_total_results_array().tolist()),
+            [3, 12])
+        self.assertEqual(collector.results[relatedstudent1.id].get_total_result(), 12)
+        self.assertEqual(collector.results[relatedstudent2.id].get_total_result(), 3)
+
+    def test_get_passing_count_for_assignment(self):
+        testperiod = mommy.make('core.Period')
+        testassignment = mommy.make('core.Assignment', parentnode=testperiod, passing_grade_min_points=5)
+        related_student_ids = []
+        for grading_points in [4, 5, 10]:
+            relatedstudent = mommy.make('core.RelatedStudent', period=testperiod)
+            related_student_ids.append(relatedstudent.id)
+            testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+            mommy.make('core.Candidate', assignment_group=testgroup, relatedstudent=relatedstudent)
+            group_factory.feedbackset_first_attempt_published(group=testgroup, grading_points=grading_points)
+
+        # Not published - not counted
+        relatedstudent = mommy.make('core.RelatedStudent', period=testperiod)
+        related_student_ids.append(relatedstudent.id)
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        mommy.make('core.Candidate', assignment_group=testgroup, relatedstudent=relatedstudent)
+        group_factory.feedbackset_first_attempt_unpublished(group=testgroup, grading_points=10)
+
+        collector = PeriodAllResultsCollector(period=testperiod, related_student_ids=related_student_ids)
+        self.assertEqual(collector.get_passing_count_for_assignment(assignment_id=testassignment.id), 2)
+
+    def test_get_passing_count_for_assignment_no_candidates(self):
+        testperiod = mommy.make('core.Period')
+        testassignment = mommy.make('core.Assignment', parentnode=testperiod)
+        relatedstudent = mommy.make('core.RelatedStudent', period=testperiod)
+        collector = PeriodAllResultsCollector(period=testperiod, related_student_ids=[relatedstudent.id])
+        self.assertEqual(collector.get_passing_count_for_assignment(assignment_id=testassignment.id), 0)
+
+    def test_iter_related_student_results_ordered_by_total_result(self):
+        testperiod = mommy.make('core.Period')
+        testassignment = mommy.make('core.Assignment', parentnode=testperiod)
+        relatedstudents = []
+        for grading_points in [5, 20, 10]:
+            relatedstudent = mommy.make('core.RelatedStudent', period=testperiod)
+            relatedstudents.append(relatedstudent)
+            testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+            mommy.make('core.Candidate', assignment_group=testgroup, relatedstudent=relatedstudent)
+            group_factory.feedbackset_first_attempt_published(group=testgroup, grading_points=grading_points)
+        collector = PeriodAllResultsCollector(
+            period=testperiod,
+            related_student_ids=[relatedstudent.id for relatedstudent in relatedstudents])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [result.get_total_result()
+                 for result in collector.iter_related_student_results_ordered_by_total_result()],
+                [20, 10, 5])
+            self.assertEqual(
+                [result.get_total_result()
+                 for result in collector.iter_related_student_results_ordered_by_total_result(descending=False)],
+                [5, 10, 20])
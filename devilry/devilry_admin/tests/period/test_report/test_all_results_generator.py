@@ -5,6 +5,8 @@ import mock
 import openpyxl
 from django import test
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from model_mommy import mommy
@@ -13,6 +15,7 @@ from io import BytesIO
 from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
 from devilry.devilry_group import devilry_group_mommy_factories as group_factory
 from devilry.devilry_admin.views.period import all_results_generator
+from devilry.devilry_admin.views.period.overview_all_results_collector import PeriodAllResultsCollector
 from devilry.devilry_report.models import DevilryReport
 
 
@@ -637,3 +640,94 @@ class TestAllResultsGeneratorGradesSheet(AllResultsGeneratorPreMixin, test.TestC
             self.assertEqual(worksheet.cell(row=1, column=1).value, 1)
             self.assertEqual(worksheet.cell(row=1, column=2).value, 1)
             self.assertEqual(worksheet.cell(row=1, column=3).value, 1)
+
+
+class TestAllResultsGeneratorStreaming(test.TestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+
+    def test_streaming_sanity(self):
+        requestuser = mommy.make(settings.AUTH_USER_MODEL)
+        period = mommy.make_recipe('devilry.apps.core.period_active')
+        testassignment = mommy.make('core.Assignment', parentnode=period, long_name='Assignment 1',
+                                    passing_grade_min_points=1, max_points=1)
+        teststudent = mommy.make('core.RelatedStudent', period=period, user__shortname='teststudent@example.com')
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        mommy.make('core.Candidate', assignment_group=testgroup, relatedstudent=teststudent)
+        group_factory.feedbackset_first_attempt_published(group=testgroup, grading_points=1)
+
+        with mock.patch.object(DevilryReport, 'generator', all_results_generator.AllResultsExcelReportGenerator):
+            devilry_report = DevilryReport(
+                generator_options={'period_id': period.id},
+                generator_type='semesterstudentresults',
+                generated_by_user=requestuser)
+            devilry_report.full_clean()
+            devilry_report.save()
+            with self.settings(DEVILRY_REPORT_STREAMING=True):
+                devilry_report.generate()
+        result_file = devilry_report.open_result()
+        try:
+            workbook = openpyxl.load_workbook(filename=BytesIO(result_file.read()))
+        finally:
+            result_file.close()
+            devilry_report.delete()
+        worksheet = workbook.get_sheet_by_name(name='Grades')
+        self.assertEqual(worksheet.cell(row=0, column=1).value, 'Assignment 1')
+        self.assertEqual(worksheet.cell(row=1, column=0).value, 'teststudent@example.com')
+        self.assertEqual(worksheet.cell(row=1, column=1).value, 'passed')
+        self.assertEqual(workbook.get_sheet_by_name(name='Points').cell(row=1, column=1).value, 1)
+
+
+class TestAllResultsGeneratorQueries(test.TestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+
+    def __make_period_with_students(self, student_count):
+        period = mommy.make_recipe('devilry.apps.core.period_active')
+        assignments = [
+            mommy.make('core.Assignment', parentnode=period, long_name='Assignment {}'.format(index),
+                       passing_grade_min_points=1, max_points=1)
+            for index in range(3)]
+        for index in range(student_count):
+            relatedstudent = mommy.make('core.RelatedStudent', period=period,
+                                        user__shortname='student{}@example.com'.format(index))
+            for assignment in assignments:
+                group = mommy.make('core.AssignmentGroup', parentnode=assignment)
+                mommy.make('core.Candidate', assignment_group=group, relatedstudent=relatedstudent)
+                group_factory.feedbackset_first_attempt_published(group=group, grading_points=1)
+        return period
+
+    def __make_devilry_report(self, period):
+        devilry_report = DevilryReport(
+            generator_options={'period_id': period.id},
+            generator_type='semesterstudentresults',
+            generated_by_user=mommy.make(settings.AUTH_USER_MODEL))
+        devilry_report.full_clean()
+        devilry_report.save()
+        return devilry_report
+
+    def test_collector_runs_once_for_all_worksheets(self):
+        devilry_report = self.__make_devilry_report(period=self.__make_period_with_students(student_count=2))
+        with mock.patch.object(DevilryReport, 'generator', all_results_generator.AllResultsExcelReportGenerator), \
+                mock.patch.object(all_results_generator, 'PeriodAllResultsCollector',
+                                  wraps=PeriodAllResultsCollector) as mock_collector:
+            devilry_report.generate()
+        self.assertEqual(devilry_report.status, DevilryReport.STATUS_CHOICES.SUCCESS.value)
+        self.assertEqual(mock_collector.call_count, 1)
+        workbook = openpyxl.load_workbook(filename=BytesIO(devilry_report.result))
+        for worksheet_name in ['Grades', 'Points', 'Passed Failed']:
+            worksheet = workbook.get_sheet_by_name(name=worksheet_name)
+            self.assertEqual(
+                {worksheet.cell(row=1, column=0).value, worksheet.cell(row=2, column=0).value},
+                {'student0@example.com', 'student1@example.com'})
+
+    def test_query_count_does_not_depend_on_number_of_students(self):
+        devilry_report1 = self.__make_devilry_report(period=self.__make_period_with_students(student_count=1))
+        devilry_report2 = self.__make_devilry_report(period=self.__make_period_with_students(student_count=5))
+        with mock.patch.object(DevilryReport, 'generator', all_results_generator.AllResultsExcelReportGenerator):
+            with CaptureQueriesContext(connection) as queries1:
+                devilry_report1.generate()
+            with CaptureQueriesContext(connection) as queries2:
+                devilry_report2.generate()
+        self.assertEqual(devilry_report2.status, DevilryReport.STATUS_CHOICES.SUCCESS.value)
+        self.assertEqual(len(queries1), len(queries2))
@@ -115,10 +115,23 @@ class GroupViewMixin(object):
     def __get_total_groupcount(self):
         return self.__get_unfiltered_queryset_for_role().count()
 
+    def get_status_counts(self):
+        """
+        Get the number of groups for each status with all filters except the status
+        filter applied.
+
+        See :meth:`devilry.apps.core.models.AssignmentGroupQuerySet.get_status_counts`.
+        """
+        if not hasattr(self, '_status_counts'):
+            self._status_counts = self.get_filterlist()\
+                .filter(queryobject=self.__get_unfiltered_queryset_for_role(),
+                        exclude={'status'})\
+                .get_status_counts()
+        return self._status_counts
+
     def __get_excluding_filters_is_applied(self, total_groupcount):
-        return self.get_filterlist().filter(
-            queryobject=self.__get_unfiltered_queryset_for_role()
-        ).count() < total_groupcount
+        filtered_groupcount = self.get_status_counts()[self.get_status_filter_value()]
+        return filtered_groupcount < total_groupcount
 
     def __get_distinct_relatedexaminer_ids(self):
         if not hasattr(self, '_distinct_relatedexaminer_ids'):
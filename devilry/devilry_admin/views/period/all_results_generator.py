@@ -10,13 +10,53 @@ from devilry.devilry_report.abstract_generator import AbstractExcelReportGenerat
 from devilry.apps.core.models import RelatedStudent, Assignment, Period
 
 
+class StudentResultsRow(object):
+    """
+    The results of a student on all the assignments in the period. Each of the lists
+    has a value for each assignment, in the order of
+    :meth:`.AllResultsExcelReportGenerator.get_assignments`.
+    """
+    def __init__(self, student_name):
+        #: The short name of the student.
+        self.student_name = student_name
+
+        #: The status of the student on the assignment, e.g.: ``Waiting for feedback``,
+        #: or ``None`` if the student has a result on the assignment.
+        self.status_list = []
+
+        #: The points of the student on the assignment.
+        self.points_list = []
+
+        #: The grade of the student on the assignment.
+        self.grade_list = []
+
+        #: ``True`` if the student passed the assignment.
+        self.is_passing_grade_list = []
+
+    def add_assignment_status(self, status):
+        self.status_list.append(status)
+        self.points_list.append(None)
+        self.grade_list.append(None)
+        self.is_passing_grade_list.append(None)
+
+    def add_assignment_result(self, points, grade, is_passing_grade):
+        self.status_list.append(None)
+        self.points_list.append(points)
+        self.grade_list.append(grade)
+        self.is_passing_grade_list.append(is_passing_grade)
+
+
 class AllResultsExcelReportGenerator(AbstractExcelReportGenerator):
     """
     Generates a downloadable Excel spreadsheet of all current student results.
+
+    The results are collected once, into a :class:`.StudentResultsRow` for each student,
+    and all the worksheets are written from these rows.
     """
     def __init__(self, *args, **kwargs):
         super(AllResultsExcelReportGenerator, self).__init__(*args, **kwargs)
         self.period = Period.objects.get(id=self.generator_options['period_id'])
+        self.__assignments = None
 
     @property
     def generator_options(self):
@@ -29,28 +69,16 @@ class AllResultsExcelReportGenerator(AbstractExcelReportGenerator):
     def get_output_filename_prefix(self):
         return '{}'.format(self.period.short_name)
 
-    def get_object_iterable(self):
-        related_student_queryset = RelatedStudent.objects \
-            .filter(period=self.period)
-        related_student_ids = [relatedstudent.id for relatedstudent in related_student_queryset]
-        result_collector = PeriodAllResultsCollector(period=self.period, related_student_ids=related_student_ids)
-        collected_results = [related_student_results for related_student_results in result_collector.results.values()]
-        return collected_results
-
-    def __get_all_assignments_for_period(self):
+    def get_assignments(self):
         """
-        Fetch all assignments for the period.
+        Get all assignments for the period ordered by first deadline. Only queried once.
         """
-        return Assignment.objects.prefetch_point_to_grade_map()\
-            .filter(parentnode_id=self.period.id)
-
-    def add_worksheet_headers(self, worksheet):
-        worksheet.write(0, 0, pgettext('devilry report semesters student results', 'Student'), self.header_cell_format)
-
-        column_count = 1
-        for assignment in self.__get_all_assignments_for_period().order_by('first_deadline'):
-            worksheet.write(0, column_count, assignment.long_name, self.header_cell_format)
-            column_count += 1
+        if self.__assignments is None:
+            self.__assignments = list(
+                Assignment.objects.prefetch_point_to_grade_map()
+                .filter(parentnode_id=self.period.id)
+                .order_by('first_deadline'))
+        return self.__assignments
 
     def __get_student_status(self, related_student_result, assignment):
         if not related_student_result.student_is_registered_on_assignment(assignment.id):
@@ -63,17 +91,50 @@ class AllResultsExcelReportGenerator(AbstractExcelReportGenerator):
             return pgettext('devilry report semesters assignment status', 'Waiting for feedback')
         return None
 
+    def __make_student_results_row(self, related_student_result):
+        row = StudentResultsRow(student_name=related_student_result.relatedstudent.user.get_short_name())
+        for assignment in self.get_assignments():
+            status = self.__get_student_status(related_student_result=related_student_result, assignment=assignment)
+            if status:
+                row.add_assignment_status(status=status)
+            else:
+                points = related_student_result.get_result_for_assignment(assignment.id)
+                row.add_assignment_result(
+                    points=points,
+                    grade='{}'.format(assignment.points_to_grade(points=points)),
+                    is_passing_grade=assignment.points_is_passing_grade(points=points))
+        return row
+
+    def get_object_iterable(self):
+        """
+        Collect the results for all students with
+        :class:`~devilry.devilry_admin.views.period.overview_all_results_collector.PeriodAllResultsCollector`,
+        and convert them to :class:`.StudentResultsRow` objects.
+        """
+        related_student_ids = list(RelatedStudent.objects
+                                   .filter(period=self.period)
+                                   .values_list('id', flat=True))
+        result_collector = PeriodAllResultsCollector(period=self.period, related_student_ids=related_student_ids)
+        return [self.__make_student_results_row(related_student_result=related_student_result)
+                for related_student_result in result_collector.results.values()]
+
+    def add_worksheet_headers(self, worksheet):
+        worksheet.write(0, 0, pgettext('devilry report semesters student results', 'Student'), self.header_cell_format)
+
+        column_count = 1
+        for assignment in self.get_assignments():
+            worksheet.write(0, column_count, assignment.long_name, self.header_cell_format)
+            column_count += 1
+
     def __write_data_to_grades_worksheet(self, worksheet, row, column, obj):
         """
         Write data to "Grades"-worksheet.
         """
-        for assignment in self.__get_all_assignments_for_period().order_by('first_deadline'):
-            result = self.__get_student_status(related_student_result=obj, assignment=assignment)
-            if result:
-                worksheet.write(row, column, result)
+        for status, grade in zip(obj.status_list, obj.grade_list):
+            if status:
+                worksheet.write(row, column, status)
             else:
-                points = obj.get_result_for_assignment(assignment.id)
-                worksheet.write(row, column, '{}'.format(assignment.points_to_grade(points=points)))
+                worksheet.write(row, column, grade)
             column += 1
 
     def __write_data_to_points_worksheet(self, worksheet, row, column, obj):
@@ -82,12 +143,10 @@ class AllResultsExcelReportGenerator(AbstractExcelReportGenerator):
 
         Writes empty- or `int`-value.
         """
-        for assignment in self.__get_all_assignments_for_period().order_by('first_deadline'):
-            result = self.__get_student_status(related_student_result=obj, assignment=assignment)
-            if result:
+        for status, points in zip(obj.status_list, obj.points_list):
+            if status:
                 worksheet.write(row, column, '')
             else:
-                points = obj.get_result_for_assignment(assignment.id)
                 worksheet.write_number(row, column, points)
             column += 1
 
@@ -97,19 +156,17 @@ class AllResultsExcelReportGenerator(AbstractExcelReportGenerator):
 
         Writes empty- or `boolean`-value.
         """
-        for assignment in self.__get_all_assignments_for_period().order_by('first_deadline'):
-            result = self.__get_student_status(related_student_result=obj, assignment=assignment)
-            if result:
+        for status, is_passing_grade in zip(obj.status_list, obj.is_passing_grade_list):
+            if status:
                 worksheet.write(row, column, '')
             else:
-                points = obj.get_result_for_assignment(assignment.id)
-                worksheet.write_boolean(row, column, assignment.points_is_passing_grade(points=points))
+                worksheet.write_boolean(row, column, is_passing_grade)
             column += 1
 
     def write_data_to_worksheet(self, worksheet_tuple, row, column, obj):
         worksheet_type = worksheet_tuple[0]
         worksheet = worksheet_tuple[1]
-        worksheet.write(row, column, obj.relatedstudent.user.get_short_name())
+        worksheet.write(row, column, obj.student_name)
         column = 1
 
         if worksheet_type == 'grades':
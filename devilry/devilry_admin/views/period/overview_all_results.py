@@ -11,6 +11,7 @@ from django_cradmin.viewhelpers.listbuilderview import FilterListMixin
 
 from devilry.apps.core import models as core_models
 from devilry.devilry_admin.cradminextensions.listfilter import listfilter_relateduser
+from devilry.devilry_admin.views.period import overview_all_results_cache
 from devilry.devilry_admin.views.period import overview_all_results_collector
 from devilry.devilry_cradmin.devilry_tablebuilder import base_new
 from devilry.devilry_report.models import DevilryReport
@@ -170,7 +171,7 @@ class RelatedStudentsAllResultsOverview(FilterListMixin, listbuilderview.View):
         student_ids = [relatedstudent.id for relatedstudent in self.get_listbuilder_list_value_iterable(context)]
         return ListAsTable(
             assignments=period.assignments.prefetch_point_to_grade_map().all().order_by('first_deadline'),
-            collector=self.get_results_collector_class()(period=period, related_student_ids=student_ids),
+            collector=self.get_results_collector(period=period, related_student_ids=student_ids),
             is_paginated=True,
             page_obj=context['page_obj']
         )
@@ -194,6 +195,28 @@ class RelatedStudentsAllResultsOverview(FilterListMixin, listbuilderview.View):
         """
         return overview_all_results_collector.PeriodAllResultsCollector
 
+    def get_results_collector(self, period, related_student_ids):
+        """
+        Get the results collector with the results for the students.
+
+        If caching of period results is enabled (the ``DEVILRY_ADMIN_PERIOD_ALL_RESULTS_CACHE_TIMEOUT``
+        setting), the results are sliced from the cached snapshot of the results for all
+        students on the period.
+
+        Args:
+            period: The period.
+            related_student_ids (list): IDs of the students to get results for.
+
+        Returns:
+            (:class:`~.devilry.devilry_admin.view.period.overview_all_results_collector.PeriodAllResultsCollector`):
+                The collector.
+        """
+        if overview_all_results_cache.is_enabled():
+            return overview_all_results_cache\
+                .get_period_results_snapshot(period=period, collector_class=self.get_results_collector_class())\
+                .get_subset(related_student_ids=related_student_ids)
+        return self.get_results_collector_class()(period=period, related_student_ids=related_student_ids)
+
     def get_filterlist_url(self, filters_string):
         return self.request.cradmin_app.reverse_appurl(
             'filter',
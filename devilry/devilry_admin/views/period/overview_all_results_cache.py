@@ -0,0 +1,207 @@
+"""
+Cached snapshot of the results for all students on a period.
+
+The snapshot is a :class:`~devilry.devilry_admin.views.period.overview_all_results_collector.PeriodAllResultsCollector`
+with the results for all the students on the period, stored in the Django cache framework.
+Views get the results for the students they show with
+:meth:`~devilry.devilry_admin.views.period.overview_all_results_collector.PeriodAllResultsCollector.get_subset`,
+which only slices the matrixes of the snapshot.
+
+The snapshot is invalidated by a version counter for each period that is bumped
+when a ``FeedbackSet``, ``GroupComment``, ``Candidate``, ``AssignmentGroup``, ``Assignment`` or
+``RelatedStudent`` is saved or deleted (the ``AssignmentGroupCachedData`` is rebuilt by the database
+triggers when these are changed). Code that changes these with ``QuerySet.update()``, ``bulk_create()`` or
+raw SQL does not send signals, so the version is also bumped for the periods of the groups rebuilt by
+:func:`devilry.devilry_dbcache.deferred_rebuild.flush_deferred_dbcache_rebuild`. Bulk changes made
+without :func:`devilry.devilry_dbcache.deferred_rebuild.defer_dbcache_rebuild` should call
+:func:`.bump_period_results_version`.
+
+Caching is disabled unless the ``DEVILRY_ADMIN_PERIOD_ALL_RESULTS_CACHE_TIMEOUT`` setting is set.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from devilry.apps.core import models as core_models
+from devilry.devilry_admin.views.period.overview_all_results_collector import PeriodAllResultsCollector
+from devilry.devilry_dbcache.deferred_rebuild import deferred_dbcache_rebuild_flushed
+
+
+def get_cache_timeout():
+    """
+    Get the ``DEVILRY_ADMIN_PERIOD_ALL_RESULTS_CACHE_TIMEOUT`` setting.
+
+    Returns:
+        (int or None): Number of seconds, or ``None`` if caching is disabled.
+    """
+    return getattr(settings, 'DEVILRY_ADMIN_PERIOD_ALL_RESULTS_CACHE_TIMEOUT', None)
+
+
+def is_enabled():
+    """
+    Returns ``True`` if caching of period results snapshots is enabled.
+    """
+    return bool(get_cache_timeout())
+
+
+def _get_version_cache_key(period_id):
+    return 'devilry_admin.period_all_results.{}.version'.format(period_id)
+
+
+def _get_snapshot_cache_key(period_id, version):
+    return 'devilry_admin.period_all_results.{}.{}.snapshot'.format(period_id, version)
+
+
+def _make_initial_version():
+    # Not starting at 1 avoids reusing the key of an old snapshot if
+    # the version is evicted from the cache before the snapshot.
+    return int(time.time() * 1000)
+
+
+def get_period_results_version(period_id):
+    """
+    Get the current results version for a period.
+    """
+    cache_key = _get_version_cache_key(period_id)
+    version = cache.get(cache_key)
+    if version is None:
+        cache.add(cache_key, _make_initial_version(), timeout=None)
+        version = cache.get(cache_key)
+    return version
+
+
+def _bump_version(period_id):
+    cache_key = _get_version_cache_key(period_id)
+    try:
+        cache.incr(cache_key)
+    except ValueError:
+        cache.set(cache_key, _make_initial_version(), timeout=None)
+
+
+def bump_period_results_version(period_id):
+    """
+    Bump the results version for a period. This invalidates the cached snapshot for the period.
+
+    The version is bumped right away, and again when the current transaction
+    is committed. The second bump discards snapshots that other requests
+    have built from the data before the transaction was committed.
+
+    Does nothing if caching is disabled.
+
+    Args:
+        period_id: The ID of a :class:`~devilry.apps.core.models.Period`.
+    """
+    if not is_enabled() or period_id is None:
+        return
+    _bump_version(period_id)
+    transaction.on_commit(lambda: _bump_version(period_id))
+
+
+def bump_period_results_version_for_group(group_id):
+    """
+    Bump the results version for the period of an AssignmentGroup.
+
+    See :func:`.bump_period_results_version`.
+
+    Args:
+        group_id: The ID of a :class:`~devilry.apps.core.models.AssignmentGroup`.
+    """
+    if not is_enabled():
+        return
+    period_id = core_models.AssignmentGroup.objects\
+        .filter(id=group_id)\
+        .values_list('parentnode__parentnode_id', flat=True)\
+        .first()
+    bump_period_results_version(period_id=period_id)
+
+
+def get_period_results_snapshot(period, collector_class=PeriodAllResultsCollector):
+    """
+    Get the snapshot of the results for all students on the period.
+
+    The snapshot is collected and stored in the cache if it is not cached, or if the
+    results version of the period has been bumped. Since the status of the
+    results depends on if deadlines have expired, the snapshot is not cached
+    longer than until the next deadline expires.
+
+    Args:
+        period: A :class:`~devilry.apps.core.models.Period`.
+        collector_class: The collector class to collect the results with.
+
+    Returns:
+        (PeriodAllResultsCollector): A ``collector_class`` object with results for all the students on the period.
+    """
+    cache_key = _get_snapshot_cache_key(period_id=period.id,
+                                        version=get_period_results_version(period_id=period.id))
+    collector = cache.get(cache_key)
+    if collector is None:
+        related_student_ids = list(
+            core_models.RelatedStudent.objects.filter(period=period).values_list('id', flat=True))
+        collector = collector_class(period=period, related_student_ids=related_student_ids)
+        timeout = get_cache_timeout()
+        if collector.next_deadline_datetime is not None:
+            seconds_until_next_deadline = (collector.next_deadline_datetime - timezone.now()).total_seconds()
+            timeout = min(timeout, int(seconds_until_next_deadline))
+        if timeout > 0:
+            cache.set(cache_key, collector, timeout=timeout)
+    return collector
+
+
+@receiver([post_save, post_delete], sender='devilry_group.FeedbackSet')
+def _bump_on_feedbackset_change(sender, instance, **kwargs):
+    bump_period_results_version_for_group(group_id=instance.group_id)
+
+
+@receiver([post_save, post_delete], sender='devilry_group.GroupComment')
+def _bump_on_groupcomment_change(sender, instance, **kwargs):
+    if not is_enabled():
+        return
+    period_id = core_models.AssignmentGroup.objects\
+        .filter(feedbackset__id=instance.feedback_set_id)\
+        .values_list('parentnode__parentnode_id', flat=True)\
+        .first()
+    bump_period_results_version(period_id=period_id)
+
+
+@receiver([post_save, post_delete], sender='core.Candidate')
+def _bump_on_candidate_change(sender, instance, **kwargs):
+    bump_period_results_version_for_group(group_id=instance.assignment_group_id)
+
+
+@receiver([post_save, post_delete], sender='core.AssignmentGroup')
+def _bump_on_assignmentgroup_change(sender, instance, **kwargs):
+    if not is_enabled():
+        return
+    period_id = core_models.Assignment.objects\
+        .filter(id=instance.parentnode_id)\
+        .values_list('parentnode_id', flat=True)\
+        .first()
+    bump_period_results_version(period_id=period_id)
+
+
+@receiver([post_save, post_delete], sender='core.Assignment')
+def _bump_on_assignment_change(sender, instance, **kwargs):
+    bump_period_results_version(period_id=instance.parentnode_id)
+
+
+@receiver([post_save, post_delete], sender='core.RelatedStudent')
+def _bump_on_relatedstudent_change(sender, instance, **kwargs):
+    bump_period_results_version(period_id=instance.period_id)
+
+
+@receiver(deferred_dbcache_rebuild_flushed)
+def _bump_on_deferred_dbcache_rebuild_flushed(sender, group_ids, **kwargs):
+    if not is_enabled():
+        return
+    period_ids = core_models.AssignmentGroup.objects\
+        .filter(id__in=group_ids)\
+        .values_list('parentnode__parentnode_id', flat=True)\
+        .distinct()
+    for period_id in period_ids:
+        bump_period_results_version(period_id=period_id)
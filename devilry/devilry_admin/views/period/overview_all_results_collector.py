@@ -1,8 +1,7 @@
-
-
+import copy
 from collections import OrderedDict
 
-from django.db import models
+import numpy
 from django.utils import timezone
 
 from devilry.apps.core import models as core_models
@@ -11,14 +10,35 @@ from devilry.apps.core import models as core_models
 class RelatedStudentResults(object):
     """
     Class encapsulates grading results for a RelatedStudent.
+
+    This is a thin view of a row in the results matrix of a :class:`.PeriodAllResultsCollector`.
     """
-    def __init__(self, relatedstudent, cached_data_dict):
+    def __init__(self, relatedstudent, collector, row_index):
         #: The RelatedStudent
         self.relatedstudent = relatedstudent
 
-        #: Dict of cached_data for each assignment, with Assignment.id as key and
-        #: cached_data as the value.
-        self.cached_data_dict = cached_data_dict
+        #: The :class:`.PeriodAllResultsCollector` with the results.
+        self.collector = collector
+
+        #: The row in the matrixes of the :obj:`~.RelatedStudentResults.collector`.
+        self.row_index = row_index
+
+    @property
+    def cached_data_dict(self):
+        """
+        Dict of cached_data for each assignment, with Assignment.id as key and
+        cached_data as the value.
+
+        The cached_data is not needed to get the results, so it is fetched the first time this
+        is used (with a single query for all the students in the collector).
+        """
+        return self.collector.get_cached_data_dict(relatedstudent_id=self.relatedstudent.id)
+
+    def __get_status(self, assignment_id):
+        column_index = self.collector.assignment_column_indexes.get(assignment_id)
+        if column_index is None:
+            return 0
+        return self.collector.status_matrix[self.row_index, column_index]
 
     def student_is_registered_on_assignment(self, assignment_id):
         """
@@ -30,11 +50,7 @@ class RelatedStudentResults(object):
         Returns:
             (bool): True if student is registered on assignment, else False.
         """
-        try:
-            self.cached_data_dict[assignment_id]
-        except KeyError:
-            return False
-        return True
+        return bool(self.__get_status(assignment_id) & PeriodAllResultsCollector.STATUS_REGISTERED)
 
     def is_waiting_for_feedback(self, assignment_id):
         """
@@ -53,10 +69,7 @@ class RelatedStudentResults(object):
             raise ValueError('You are checking if the student is waiting for feedback when the student is not '
                              'registered on the assignment. Maybe you should call '
                              'student_is_registered_on_assignment(assignment_id=) first?')
-        cached_data = self.cached_data_dict[assignment_id]
-        if cached_data.last_published_feedbackset_is_last_feedbackset:
-            return False
-        return True
+        return not self.__get_status(assignment_id) & PeriodAllResultsCollector.STATUS_PUBLISHED
 
     def no_deliveries_hard_deadline(self, assignment):
         """
@@ -81,9 +94,8 @@ class RelatedStudentResults(object):
             raise ValueError('You are checking if the student is waiting for deliveries when the student is not '
                              'registered on the assignment. Maybe you should call '
                              'student_is_registered_on_assignment(assignment_id=) first?')
-        cached_data = self.cached_data_dict[assignment.id]
         if self.is_waiting_for_feedback(assignment_id=assignment.id):
-            if cached_data.public_student_comment_count == 0 and cached_data.public_student_file_upload_count == 0:
+            if not self.__get_status(assignment.id) & PeriodAllResultsCollector.STATUS_HAS_STUDENT_DELIVERIES:
                 return True
         return False
 
@@ -105,12 +117,10 @@ class RelatedStudentResults(object):
             raise ValueError('You are checking if the student is waiting for deliveries when the student is not '
                              'registered on the assignment. Maybe you should call '
                              'student_is_registered_on_assignment(assignment_id=) first?')
-        cached_data = self.cached_data_dict[assignment_id]
-        if cached_data.last_published_feedbackset_is_last_feedbackset:
-            return False
-        if cached_data.last_feedbackset_deadline_datetime < timezone.now():
+        status = self.__get_status(assignment_id)
+        if status & PeriodAllResultsCollector.STATUS_PUBLISHED:
             return False
-        return True
+        return bool(status & PeriodAllResultsCollector.STATUS_DEADLINE_NOT_EXPIRED)
 
     def get_result_for_assignment(self, assignment_id):
         """
@@ -130,10 +140,8 @@ class RelatedStudentResults(object):
         """
         if not self.student_is_registered_on_assignment(assignment_id=assignment_id):
             return None
-        cached_data = self.cached_data_dict[assignment_id]
-        if not cached_data.last_published_feedbackset_is_last_feedbackset:
-            return 0
-        return cached_data.last_published_feedbackset.grading_points
+        column_index = self.collector.assignment_column_indexes[assignment_id]
+        return int(self.collector.points_matrix[self.row_index, column_index])
 
     def get_total_result(self):
         """
@@ -143,11 +151,7 @@ class RelatedStudentResults(object):
         Returns:
             (int): total number of grading points.
         """
-        total = 0
-        for cached_data in list(self.cached_data_dict.values()):
-            if cached_data.last_published_feedbackset_is_last_feedbackset:
-                total += cached_data.last_published_feedbackset.grading_points
-        return total
+        return int(self.collector.get_total_results_array()[self.row_index])
 
     def get_cached_data_list(self):
         """
@@ -171,11 +175,12 @@ class RelatedStudentResults(object):
 
     def __serialize_assignment_results(self):
         assignment_result_list = []
-        for assignment_id in list(self.cached_data_dict.keys()):
-            assignment_result_list.append({
-                'id': assignment_id,
-                'result': self.get_result_for_assignment(assignment_id=assignment_id)
-            })
+        for assignment_id in self.collector.assignment_column_indexes.keys():
+            if self.student_is_registered_on_assignment(assignment_id=assignment_id):
+                assignment_result_list.append({
+                    'id': assignment_id,
+                    'result': self.get_result_for_assignment(assignment_id=assignment_id)
+                })
         return assignment_result_list
 
     def serialize(self):
@@ -207,6 +212,11 @@ class PeriodAllResultsCollector(object):
     Collects information about RelatedStudents and builds a structure containing
     the information needed.
 
+    The results are stored in matrixes (numpy arrays) with a row for each student and a
+    column for each assignment, filled from a single ``values_list`` query. The
+    :class:`.RelatedStudentResults` objects in :attr:`~.PeriodAllResultsCollector.results` are
+    thin views of the rows in the matrixes.
+
     Attributes:
         period (:class:`~.devilry.apps.core.models.Period`): The ``period`` to collect results for.
 
@@ -216,6 +226,23 @@ class PeriodAllResultsCollector(object):
         results (dict): Dictionary with :attr:`~.devilry.apps.core.RelatedStudent.id` as keys and an instance of
         :class:`~.RelatedStudentResults` as value for each key.
     """
+
+    #: Flag in :attr:`~.PeriodAllResultsCollector.status_matrix` set if the
+    #: student is registered on the assignment.
+    STATUS_REGISTERED = 1
+
+    #: Flag in :attr:`~.PeriodAllResultsCollector.status_matrix` set if the
+    #: last feedbackset is published.
+    STATUS_PUBLISHED = 2
+
+    #: Flag in :attr:`~.PeriodAllResultsCollector.status_matrix` set if the
+    #: deadline of the last feedbackset has not expired.
+    STATUS_DEADLINE_NOT_EXPIRED = 4
+
+    #: Flag in :attr:`~.PeriodAllResultsCollector.status_matrix` set if the
+    #: student has any public comments or file uploads on the assignment.
+    STATUS_HAS_STUDENT_DELIVERIES = 8
+
     def __init__(self, period, related_student_ids):
         #: The period the result info gathering is for.
         self.period = period
@@ -225,7 +252,29 @@ class PeriodAllResultsCollector(object):
 
         #: A dictionary with results for all RelatedStudents, where the key is the RelatedStudent.id
         #: and the value is an instance of RelatedStudentResults.
-        self.results = {}
+        self.results = OrderedDict()
+
+        #: Assignment.id to column index in the matrixes.
+        self.assignment_column_indexes = OrderedDict()
+
+        #: Matrix with the ``STATUS_*`` flags for each student (row) and assignment (column).
+        self.status_matrix = None
+
+        #: Matrix with the points for each student (row) and assignment (column). The points
+        #: are ``0`` if the student is not registered on the assignment, or the last feedbackset
+        #: is not published.
+        self.points_matrix = None
+
+        #: The ``passing_grade_min_points`` for each assignment (column).
+        self.passing_grade_min_points_array = None
+
+        #: The earliest deadline that has not expired when the results was collected, or ``None``.
+        #: The :obj:`~.PeriodAllResultsCollector.STATUS_DEADLINE_NOT_EXPIRED` flags are
+        #: only valid until this deadline.
+        self.next_deadline_datetime = None
+
+        self.__total_results_array = None
+        self.__cached_data_dicts = None
 
         self.__initialize_results()
 
@@ -257,40 +306,168 @@ class PeriodAllResultsCollector(object):
         relatedstudent_queryset = core_models.RelatedStudent.objects\
             .filter(period=self.period)\
             .filter(id__in=self.related_student_ids)\
-            .select_related('period', 'period__parentnode', 'user')\
-            .prefetch_related(
-                models.Prefetch(
-                    'candidate_set',
-                    queryset=self.__get_candidate_queryset()))
+            .select_related('period', 'period__parentnode', 'user')
         return relatedstudent_queryset
 
-    def __get_cached_data_dict_for_candidates(self, candidates_list):
+    def __get_result_values_list(self):
+        """
+        Get the values needed to fill the matrixes for all the candidates of the students.
         """
-        Get a dictionary of cached_data ordered by the Assignments id.
+        return core_models.Candidate.objects\
+            .filter(relatedstudent__period=self.period,
+                    relatedstudent_id__in=self.related_student_ids)\
+            .order_by('id')\
+            .values_list(
+                'relatedstudent_id',
+                'assignment_group__parentnode_id',
+                'assignment_group__parentnode__passing_grade_min_points',
+                'assignment_group__cached_data__last_feedbackset_id',
+                'assignment_group__cached_data__last_published_feedbackset_id',
+                'assignment_group__cached_data__last_published_feedbackset__grading_points',
+                'assignment_group__cached_data__last_feedbackset__deadline_datetime',
+                'assignment_group__cached_data__public_student_comment_count',
+                'assignment_group__cached_data__public_student_file_upload_count')
+
+    def __initialize_results(self):
+        """
+        Build results dictionary and the matrixes.
+        """
+        row_indexes = {}
+        for row_index, relatedstudent in enumerate(self.__get_relatedstudents()):
+            row_indexes[relatedstudent.id] = row_index
+            self.results[relatedstudent.id] = RelatedStudentResults(
+                relatedstudent=relatedstudent,
+                collector=self,
+                row_index=row_index)
+
+        result_values_list = list(self.__get_result_values_list()) if self.results else []
+        passing_grade_min_points_list = []
+        for values in result_values_list:
+            assignment_id = values[1]
+            if assignment_id not in self.assignment_column_indexes:
+                self.assignment_column_indexes[assignment_id] = len(self.assignment_column_indexes)
+                passing_grade_min_points_list.append(values[2])
+
+        shape = (len(self.results), len(self.assignment_column_indexes))
+        self.status_matrix = numpy.zeros(shape, dtype=numpy.uint8)
+        self.points_matrix = numpy.zeros(shape, dtype=numpy.int64)
+        self.passing_grade_min_points_array = numpy.array(passing_grade_min_points_list, dtype=numpy.int64)
+        now = timezone.now()
+        for (relatedstudent_id, assignment_id, passing_grade_min_points, last_feedbackset_id,
+             last_published_feedbackset_id, grading_points, deadline_datetime,
+             public_student_comment_count, public_student_file_upload_count) in result_values_list:
+            row_index = row_indexes[relatedstudent_id]
+            column_index = self.assignment_column_indexes[assignment_id]
+            status = self.STATUS_REGISTERED
+            points = 0
+            if last_published_feedbackset_id == last_feedbackset_id:
+                status |= self.STATUS_PUBLISHED
+                points = grading_points or 0
+            if deadline_datetime is not None and deadline_datetime >= now:
+                status |= self.STATUS_DEADLINE_NOT_EXPIRED
+                if self.next_deadline_datetime is None or deadline_datetime < self.next_deadline_datetime:
+                    self.next_deadline_datetime = deadline_datetime
+            if public_student_comment_count or public_student_file_upload_count:
+                status |= self.STATUS_HAS_STUDENT_DELIVERIES
+            self.status_matrix[row_index, column_index] = status
+            self.points_matrix[row_index, column_index] = points
+
+    def get_subset(self, related_student_ids):
+        """
+        Get a collector with the results for a subset of the students in this collector.
+
+        The matrixes are sliced, so this does not perform any database queries. IDs
+        of students not in this collector are ignored.
 
         Args:
-            candidates_list: list of candidates.
+            related_student_ids (list): List of :attr:`~.devilry.apps.core.RelatedStudent.id`s. The
+                :attr:`~.PeriodAllResultsCollector.results` of the subset is in the same order.
+
+        Returns:
+            (PeriodAllResultsCollector): A collector with the results for the students.
+        """
+        subset = copy.copy(self)
+        subset.related_student_ids = []
+        subset.results = OrderedDict()
+        row_indexes = []
+        for related_student_id in related_student_ids:
+            related_student_results = self.results.get(related_student_id)
+            if related_student_results is None:
+                continue
+            subset.related_student_ids.append(related_student_id)
+            subset.results[related_student_id] = RelatedStudentResults(
+                relatedstudent=related_student_results.relatedstudent,
+                collector=subset,
+                row_index=len(row_indexes))
+            row_indexes.append(related_student_results.row_index)
+        row_indexes = numpy.array(row_indexes, dtype=numpy.intp)
+        subset.status_matrix = self.status_matrix[row_indexes]
+        subset.points_matrix = self.points_matrix[row_indexes]
+        subset.__total_results_array = None
+        subset.__cached_data_dicts = None
+        return subset
+
+    def get_cached_data_dict(self, relatedstudent_id):
+        """
+        Get a dictionary of cached_data ordered by the Assignments id for a student.
+
+        The cached_data for all the students is fetched with a single query
+        the first time this is used.
+
+        Args:
+            relatedstudent_id: The id of the RelatedStudent.
 
         Returns:
             (OrderedDict): ordered dict of cached_data
         """
-        cached_data_dict = OrderedDict()
-        for candidate in candidates_list:
-            cached_data = candidate.assignment_group.cached_data
-            cached_data_dict[cached_data.group.parentnode.id] = cached_data
-        return cached_data_dict
+        if self.__cached_data_dicts is None:
+            self.__cached_data_dicts = {relatedstudent_id: OrderedDict() for relatedstudent_id in self.results}
+            candidate_queryset = self.__get_candidate_queryset()\
+                .filter(relatedstudent__period=self.period,
+                        relatedstudent_id__in=self.related_student_ids)\
+                .order_by('id')
+            for candidate in candidate_queryset:
+                cached_data = candidate.assignment_group.cached_data
+                self.__cached_data_dicts[candidate.relatedstudent_id][cached_data.group.parentnode.id] = cached_data
+        return self.__cached_data_dicts[relatedstudent_id]
+
+    def get_total_results_array(self):
+        """
+        Get the total number of points for each student (row) as an array.
+        """
+        if self.__total_results_array is None:
+            self.__total_results_array = self.points_matrix.sum(axis=1)
+        return self.__total_results_array
 
-    def __initialize_results(self):
+    def get_passing_grade_matrix(self):
         """
-        Build results dictionary.
+        Get a boolean matrix that is ``True`` for each student (row) and assignment (column)
+        where the student has a published passing grade.
         """
-        for relatedstudent in self.__get_relatedstudents():
-            self.results[relatedstudent.id] = RelatedStudentResults(
-                relatedstudent=relatedstudent,
-                cached_data_dict=self.__get_cached_data_dict_for_candidates(
-                    list(relatedstudent.candidate_set.all())
-                )
-            )
+        published = (self.status_matrix & self.STATUS_PUBLISHED).astype(bool)
+        return published & (self.points_matrix >= self.passing_grade_min_points_array)
+
+    def get_passing_count_for_assignment(self, assignment_id):
+        """
+        Get the number of students with a published passing grade on the assignment.
+        """
+        column_index = self.assignment_column_indexes.get(assignment_id)
+        if column_index is None:
+            return 0
+        return int(self.get_passing_grade_matrix()[:, column_index].sum())
+
+    def iter_related_student_results_ordered_by_total_result(self, descending=True):
+        """
+        Get an iterator over the :obj:`~.RelatedStudentResults` ordered by
+        :meth:`.RelatedStudentResults.get_total_result`. Students with the
+        same total result keep their order.
+        """
+        total_results_array = self.get_total_results_array()
+        if descending:
+            total_results_array = -total_results_array
+        related_student_results_list = list(self.results.values())
+        for row_index in numpy.argsort(total_results_array, kind='mergesort'):
+            yield related_student_results_list[row_index]
 
     def has_students(self):
         """
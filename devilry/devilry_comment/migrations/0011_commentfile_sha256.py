@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+
+import devilry.devilry_comment.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devilry_comment', '0010_commentedithistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commentfile',
+            name='sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='commentfile',
+            name='file',
+            field=models.FileField(blank=True, db_index=True, default='', max_length=512, upload_to=devilry.devilry_comment.models.commentfile_directory_path),
+        ),
+    ]
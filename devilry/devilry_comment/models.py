@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
-
+import hashlib
 
 from django.conf import settings
 from django.core import files
-from django.db import models
-from django.db.models.signals import pre_delete
+from django.db import models, transaction
+from django.db.models.signals import pre_delete, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy, pgettext_lazy
@@ -91,7 +91,7 @@ class Comment(models.Model):
                                                  filesize=tempfile.file.size,
                                                  comment=self)
 
-        commentfile.file = files.File(tempfile.file, tempfile.filename)
+        commentfile.set_file(files.File(tempfile.file, tempfile.filename))
         commentfile.clean()
         commentfile.save()
 
@@ -204,6 +204,30 @@ def commentfile_directory_path(instance, filename):
     return '{}/file/{}'.format(comment_directory, instance.id)
 
 
+def commentfile_content_addressed_path(sha256):
+    """The path of a :obj:`.CommentFile.file` with the
+    ``DEVILRY_COMMENTFILE_CONTENT_ADDRESSED_STORAGE`` setting enabled.
+
+    Args:
+        sha256: The SHA-256 hex digest of the file content.
+    """
+    return 'devilry_comment/blobs/{}/{}/{}'.format(sha256[0:2], sha256[2:4], sha256)
+
+
+def compute_sha256(fileobject):
+    """Compute the SHA-256 hex digest of a django ``File``, reading it in chunks.
+
+    Args:
+        fileobject: A :class:`django.core.files.File`.
+    """
+    sha256 = hashlib.sha256()
+    for chunk in fileobject.chunks():
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
 class CommentFile(models.Model):
     """
     Main class for a file uploaded to a :class:`Comment`
@@ -216,8 +240,16 @@ class CommentFile(models.Model):
     #: comment must first be created with this field set to ``''`` to get an ID
     #: for :meth:`.commentfile_directory_path`, then updated with
     #: a file set to something.
+    #:
+    #: Multiple CommentFiles can share the same file (copies, and
+    #: content addressed files - see :meth:`.set_file`). The file is
+    #: deleted when the last CommentFile referencing it is deleted.
     file = models.FileField(upload_to=commentfile_directory_path, max_length=512,
-                            null=False, blank=True, default='')
+                            null=False, blank=True, default='', db_index=True)
+
+    #: The SHA-256 hex digest of the content of :obj:`~.CommentFile.file`.
+    #: Empty string if the file was not added with :meth:`.set_file`.
+    sha256 = models.CharField(max_length=64, null=False, blank=True, default='')
 
     #: The name of the file - this is the name of the file that was uploaded.
     filename = models.CharField(max_length=MAX_FILENAME_LENGTH)
@@ -251,9 +283,53 @@ class CommentFile(models.Model):
     def __str__(self):
         return '{} - {}'.format(self.comment.user, self.filename)
 
+    def set_file(self, fileobject):
+        """
+        Set :obj:`~.CommentFile.file`, and compute :obj:`~.CommentFile.sha256`.
+        Does not save the CommentFile.
+
+        If the ``DEVILRY_COMMENTFILE_CONTENT_ADDRESSED_STORAGE`` setting is ``True``,
+        the file is stored at :func:`.commentfile_content_addressed_path`, and an
+        already stored file with the same content is reused instead of storing
+        the content again. The stored file may be deleted by another transaction
+        before this CommentFile is saved, so :meth:`.save` stores the content
+        again if the file no longer exists. ``fileobject`` must therefore be
+        kept open until the CommentFile is saved.
+
+        Args:
+            fileobject: A :class:`django.core.files.File`.
+        """
+        self.sha256 = compute_sha256(fileobject)
+        if getattr(settings, 'DEVILRY_COMMENTFILE_CONTENT_ADDRESSED_STORAGE', False):
+            storage = self.file.storage
+            path = commentfile_content_addressed_path(self.sha256)
+            if not storage.exists(path):
+                path = storage.save(path, fileobject)
+            self.file = path
+            self._content_addressed_fileobject = fileobject
+        else:
+            self.file = fileobject
+
+    def save(self, *args, **kwargs):
+        super(CommentFile, self).save(*args, **kwargs)
+        fileobject = getattr(self, '_content_addressed_fileobject', None)
+        if fileobject is not None:
+            self._content_addressed_fileobject = None
+            storage = self.file.storage
+            if not storage.exists(self.file.name):
+                # The last CommentFile referencing the stored file was deleted
+                # after set_file(), so we store the content again.
+                path = storage.save(self.file.name, fileobject)
+                if path != self.file.name:
+                    # Another CommentFile stored the same content concurrently.
+                    storage.delete(path)
+
     def copy_into_comment(self, target):
         """
-        Copy CommentFile to ``target`` comment
+        Copy CommentFile to ``target`` comment.
+
+        The copy references the same stored file as this CommentFile, so
+        the file content is not copied.
 
         Args:
             target: :class:`~devilry_comment.Comment`
@@ -264,7 +340,8 @@ class CommentFile(models.Model):
             filename=self.filename,
             filesize=self.filesize,
             mimetype=self.mimetype,
-            file=self.file,
+            file=self.file.name,
+            sha256=self.sha256,
             processing_started_datetime=self.processing_started_datetime,
             processing_completed_datetime=self.processing_completed_datetime,
             processing_successful=self.processing_successful,
@@ -352,11 +429,30 @@ class CommentFileImage(models.Model):
     thumbnail_height = models.PositiveIntegerField()
 
 
-@receiver(pre_delete, sender=CommentFile)
-def on_post_delete_commentfile(sender, instance, **kwargs):
+def _delete_unreferenced_commentfile_file(storage, name, using):
+    if not CommentFile.objects.using(using).filter(file=name).exists():
+        storage.delete(name)
+
+
+@receiver(post_delete, sender=CommentFile)
+def on_post_delete_commentfile(sender, instance, using, **kwargs):
+    # This is post_delete to make it work with bulk deletes of
+    # CommentFiles sharing the same file - the file is deleted when
+    # no CommentFiles referencing it remain.
     commentfile = instance
-    if commentfile.file:
-        commentfile.file.delete()
+    if not commentfile.file:
+        return
+    storage = commentfile.file.storage
+    name = commentfile.file.name
+    if commentfile.sha256 and name == commentfile_content_addressed_path(commentfile.sha256):
+        # Content addressed files can be reused by CommentFiles saved in other
+        # transactions, so we wait until the delete is committed, and check
+        # for references again before deleting the file.
+        transaction.on_commit(
+            lambda: _delete_unreferenced_commentfile_file(storage=storage, name=name, using=using),
+            using=using)
+    else:
+        _delete_unreferenced_commentfile_file(storage=storage, name=name, using=using)
 
 
 @receiver(pre_delete, sender=CommentFileImage)
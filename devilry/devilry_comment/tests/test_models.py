@@ -1,8 +1,10 @@
+import hashlib
 import os
 import shutil
 
 from django import test
 from django.core.files.base import ContentFile
+from django.db import transaction
 from model_mommy import mommy
 
 from devilry.devilry_comment.models import CommentFile, Comment
@@ -76,6 +78,129 @@ class TestCommentFileModel(AbstractTestCase):
         CommentFile.objects.all().delete()
         self.assertFalse(os.path.exists(filepath))
 
+    def test_delete_does_not_remove_file_referenced_by_copy(self):
+        testcommentfile = mommy.make('devilry_comment.CommentFile')
+        testcommentfile.file.save('testfile.txt', ContentFile('test'))
+        filepath = testcommentfile.file.path
+        testcommentfile.copy_into_comment(target=mommy.make('devilry_comment.Comment'))
+        testcommentfile.delete()
+        self.assertTrue(os.path.exists(filepath))
+        CommentFile.objects.get().delete()
+        self.assertFalse(os.path.exists(filepath))
+
+    def test_bulk_delete_removes_file_referenced_by_copy(self):
+        testcommentfile = mommy.make('devilry_comment.CommentFile')
+        testcommentfile.file.save('testfile.txt', ContentFile('test'))
+        filepath = testcommentfile.file.path
+        testcommentfile.copy_into_comment(target=mommy.make('devilry_comment.Comment'))
+        CommentFile.objects.all().delete()
+        self.assertFalse(os.path.exists(filepath))
+
+    def test_copy_into_comment_shares_file(self):
+        testcommentfile = mommy.make('devilry_comment.CommentFile')
+        testcommentfile.set_file(ContentFile(b'test', name='testfile.txt'))
+        testcommentfile.save()
+        targetcomment = mommy.make('devilry_comment.Comment')
+        testcommentfile.copy_into_comment(target=targetcomment)
+        commentfilecopy = CommentFile.objects.get(comment=targetcomment)
+        self.assertEqual(commentfilecopy.file.name, testcommentfile.file.name)
+        self.assertEqual(commentfilecopy.sha256, testcommentfile.sha256)
+
+    def test_set_file_sha256(self):
+        testcommentfile = mommy.make('devilry_comment.CommentFile')
+        testcommentfile.set_file(ContentFile(b'test', name='testfile.txt'))
+        testcommentfile.save()
+        self.assertEqual(testcommentfile.sha256, hashlib.sha256(b'test').hexdigest())
+        self.assertEqual(testcommentfile.file.name, 'devilry_comment/{}/file/{}'.format(
+            testcommentfile.comment_id, testcommentfile.id))
+
+    def test_set_file_content_addressed(self):
+        sha256 = hashlib.sha256(b'test').hexdigest()
+        with self.settings(DEVILRY_COMMENTFILE_CONTENT_ADDRESSED_STORAGE=True):
+            testcommentfile = mommy.make('devilry_comment.CommentFile')
+            testcommentfile.set_file(ContentFile(b'test', name='testfile.txt'))
+            testcommentfile.save()
+        self.assertEqual(testcommentfile.file.name,
+                         'devilry_comment/blobs/{}/{}/{}'.format(sha256[0:2], sha256[2:4], sha256))
+        testcommentfile.file.open('rb')
+        self.assertEqual(testcommentfile.file.read(), b'test')
+        testcommentfile.file.close()
+
+    def test_set_file_content_addressed_deduplicates(self):
+        with self.settings(DEVILRY_COMMENTFILE_CONTENT_ADDRESSED_STORAGE=True):
+            testcommentfile1 = mommy.make('devilry_comment.CommentFile')
+            testcommentfile1.set_file(ContentFile(b'test', name='testfile1.txt'))
+            testcommentfile1.save()
+            testcommentfile2 = mommy.make('devilry_comment.CommentFile')
+            testcommentfile2.set_file(ContentFile(b'test', name='testfile2.txt'))
+            testcommentfile2.save()
+            testcommentfile3 = mommy.make('devilry_comment.CommentFile')
+            testcommentfile3.set_file(ContentFile(b'other', name='testfile3.txt'))
+            testcommentfile3.save()
+        self.assertEqual(testcommentfile1.file.name, testcommentfile2.file.name)
+        self.assertNotEqual(testcommentfile1.file.name, testcommentfile3.file.name)
+
+    def test_set_file_content_addressed_stores_deleted_file_again_on_save(self):
+        with self.settings(DEVILRY_COMMENTFILE_CONTENT_ADDRESSED_STORAGE=True):
+            testcommentfile = mommy.make('devilry_comment.CommentFile')
+            testcommentfile.set_file(ContentFile(b'test', name='testfile.txt'))
+            os.remove(testcommentfile.file.path)
+            testcommentfile.save()
+        testcommentfile.file.open('rb')
+        self.assertEqual(testcommentfile.file.read(), b'test')
+        testcommentfile.file.close()
+
+
+class TestCommentFileContentAddressedDelete(test.TransactionTestCase):
+    def tearDown(self):
+        # Ignores errors if the path is not created.
+        shutil.rmtree('devilry_testfiles/filestore/', ignore_errors=True)
+
+    def __make_commentfile(self, content=b'test'):
+        with self.settings(DEVILRY_COMMENTFILE_CONTENT_ADDRESSED_STORAGE=True):
+            testcommentfile = mommy.make('devilry_comment.CommentFile')
+            testcommentfile.set_file(ContentFile(content, name='testfile.txt'))
+            testcommentfile.save()
+        return testcommentfile
+
+    def test_file_deleted_with_last_reference(self):
+        testcommentfile1 = self.__make_commentfile()
+        testcommentfile2 = self.__make_commentfile()
+        filepath = testcommentfile1.file.path
+        testcommentfile1.delete()
+        self.assertTrue(os.path.exists(filepath))
+        testcommentfile2.delete()
+        self.assertFalse(os.path.exists(filepath))
+
+    def test_file_not_deleted_before_commit(self):
+        testcommentfile = self.__make_commentfile()
+        filepath = testcommentfile.file.path
+        with transaction.atomic():
+            testcommentfile.delete()
+            self.assertTrue(os.path.exists(filepath))
+        self.assertFalse(os.path.exists(filepath))
+
+    def test_file_not_deleted_on_rollback(self):
+        testcommentfile = self.__make_commentfile()
+        filepath = testcommentfile.file.path
+        try:
+            with transaction.atomic():
+                testcommentfile.delete()
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertTrue(os.path.exists(filepath))
+        self.assertTrue(CommentFile.objects.filter(id=testcommentfile.id).exists())
+
+    def test_file_not_deleted_if_referenced_on_commit(self):
+        testcommentfile1 = self.__make_commentfile()
+        filepath = testcommentfile1.file.path
+        with transaction.atomic():
+            testcommentfile1.delete()
+            testcommentfile2 = self.__make_commentfile()
+        self.assertEqual(testcommentfile2.file.path, filepath)
+        self.assertTrue(os.path.exists(filepath))
+
 
 class TestCommentFileImageModel(AbstractTestCase):
     def test_empty_image_field_is_bool_false(self):
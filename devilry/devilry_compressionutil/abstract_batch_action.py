@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 
 
+import json
 import os
+import zipfile
+
+from django.conf import settings
 from ievv_opensource.ievv_batchframework import batchregistry
 
 
@@ -12,6 +16,17 @@ class AbstractBaseBatchAction(batchregistry.Action):
     #: Must be set in subclass.
     backend_id = ''
 
+    def __init__(self, **kwargs):
+        super(AbstractBaseBatchAction, self).__init__(**kwargs)
+        self.previous_archive_path = None
+        self.previous_archive_entries = {}
+
+        #: Number of files copied from the previous archive by :meth:`.add_file`.
+        self.copied_file_count = 0
+
+        #: Number of files compressed by :meth:`.add_file`.
+        self.compressed_file_count = 0
+
     def get_backend(self, zipfile_path, archive_name):
         """
         Get and instance of the backend to use.
@@ -31,10 +46,142 @@ class AbstractBaseBatchAction(batchregistry.Action):
             readmode=False
         )
 
+    def get_archive_entry_comment(self, comment_file):
+        """
+        Get the comment for the archive entry for ``comment_file``.
+
+        Identifies the ``CommentFile`` the entry was created from, so
+        that :meth:`.add_file` can copy the entry from the previous archive.
+
+        Args:
+            comment_file: A `CommentFile`.
+
+        Returns:
+            str: The entry comment.
+        """
+        return 'devilry-commentfile:{}:{}'.format(comment_file.id, comment_file.filesize)
+
+    def use_previous_archive(self, compressed_archive_meta):
+        """
+        Make :meth:`.add_file` copy entries from the archive for ``compressed_archive_meta``
+        instead of compressing the files again.
+
+        An entry is copied if it has the same path in the archive, and was created
+        from the same ``CommentFile`` (see :meth:`.get_archive_entry_comment`). All other
+        files (typically files added after the previous archive was created) are
+        compressed as normal. Files that is no longer part of the archive are not copied.
+
+        Does nothing if the ``DEVILRY_COMPRESSED_ARCHIVES_INCREMENTAL`` setting is ``False``,
+        if ``compressed_archive_meta`` is ``None``, if the archive is created with another
+        backend, or if the archive can not be read (e.g.: if it is deleted).
+
+        Args:
+            compressed_archive_meta: A :class:`devilry.devilry_compressionutil.models.CompressedArchiveMeta`
+                or ``None``.
+
+        Returns:
+            bool: ``True`` if the previous archive is used.
+        """
+        self.previous_archive_path = None
+        self.previous_archive_entries = {}
+        if not getattr(settings, 'DEVILRY_COMPRESSED_ARCHIVES_INCREMENTAL', True):
+            return False
+        if compressed_archive_meta is None or compressed_archive_meta.backend_id != self.backend_id:
+            return False
+        return self.use_previous_archive_path(archive_path=compressed_archive_meta.archive_path)
+
+    def use_previous_archive_path(self, archive_path):
+        """
+        Same as :meth:`.use_previous_archive`, but takes the path to the archive, and
+        does not check the ``DEVILRY_COMPRESSED_ARCHIVES_INCREMENTAL`` setting.
+
+        Args:
+            archive_path: Path to the previous archive, or ``None``.
+
+        Returns:
+            bool: ``True`` if the previous archive is used.
+        """
+        self.previous_archive_path = None
+        self.previous_archive_entries = {}
+        if archive_path is None:
+            return False
+        try:
+            with zipfile.ZipFile(archive_path, 'r') as previous_archive:
+                self.previous_archive_entries = {
+                    zipinfo.filename: zipinfo
+                    for zipinfo in previous_archive.infolist()
+                    if zipinfo.comment
+                }
+        except (OSError, zipfile.BadZipFile):
+            return False
+        self.previous_archive_path = archive_path
+        return True
+
+    def get_batchoperation_id(self):
+        """
+        Get the ID of the ``BatchOperation`` the action is running in.
+
+        The batchframework does not forward the ID of the ``BatchOperation`` to
+        the actions, so unless the ``batchoperation_id`` kwarg is provided, we use the
+        latest running ``BatchOperation`` started by ``started_by`` for ``context_object``.
+        The lookup is cached for the lifetime of the action.
+
+        Returns:
+            The ID of the ``BatchOperation``, or ``None`` if the action does not run
+            in a ``BatchOperation`` (synchronous mode).
+        """
+        if not hasattr(self, '_batchoperation_id'):
+            self._batchoperation_id = self.kwargs.get('batchoperation_id')
+            context_object = self.kwargs.get('context_object')
+            if self._batchoperation_id is None and context_object is not None:
+                from django.contrib.contenttypes.models import ContentType
+                from ievv_opensource.ievv_batchframework.models import BatchOperation
+                self._batchoperation_id = BatchOperation.objects\
+                    .filter(status=BatchOperation.STATUS_RUNNING,
+                            started_by=self.kwargs.get('started_by'),
+                            context_content_type=ContentType.objects.get_for_model(context_object),
+                            context_object_id=context_object.id)\
+                    .order_by('-started_running_datetime', '-id')\
+                    .values_list('id', flat=True)\
+                    .first()
+        return self._batchoperation_id
+
+    def report_progress(self, completed_chunk_count, total_chunk_count):
+        """
+        Report progress to the ``BatchOperation`` the action is running in
+        (see :meth:`.get_batchoperation_id`).
+
+        Stores ``completed_chunk_count`` and ``total_chunk_count`` in the
+        ``output_data`` of the ``BatchOperation``. The batchframework overwrites
+        the ``output_data`` when the operation is finished, so this is only
+        available while the ``BatchOperation`` is running.
+
+        Does nothing if the action does not run in a ``BatchOperation``
+        (synchronous mode).
+
+        Args:
+            completed_chunk_count (int): Number of completed chunks.
+            total_chunk_count (int): Total number of chunks.
+        """
+        batchoperation_id = self.get_batchoperation_id()
+        if batchoperation_id is None:
+            return
+        from ievv_opensource.ievv_batchframework.models import BatchOperation
+        BatchOperation.objects.filter(id=batchoperation_id).update(
+            output_data_json=json.dumps({
+                'completed_chunk_count': completed_chunk_count,
+                'total_chunk_count': total_chunk_count
+            }))
+
     def add_file(self, zipfile_backend, sub_path, comment_file, is_duplicate=False):
         """
         Add file to ZIP archive.
 
+        If the file is in the previous archive (see :meth:`.use_previous_archive`),
+        the already compressed entry is copied from the previous archive. If copying
+        fails (e.g.: if the previous archive has been deleted after we started using it),
+        we stop using the previous archive, and compress the file as normal.
+
         Args:
             zipfile_backend: A subclass of ``PythonZipFileBackend``.
             sub_path: The path to write to inside the archive.
@@ -44,10 +191,28 @@ class AbstractBaseBatchAction(batchregistry.Action):
         file_name = comment_file.filename
         if is_duplicate:
             file_name = comment_file.get_filename_as_unique_string()
+        path = os.path.join(sub_path, file_name)
+        entry_comment = self.get_archive_entry_comment(comment_file=comment_file)
 
+        previous_zipinfo = self.previous_archive_entries.get(path)
+        if previous_zipinfo is not None and previous_zipinfo.comment.decode('utf-8') == entry_comment:
+            try:
+                zipfile_backend.copy_entry_from_archive(
+                    source_archive_path=self.previous_archive_path,
+                    source_zipinfo=previous_zipinfo,
+                    path=path)
+            except (NotImplementedError, OSError, zipfile.BadZipFile):
+                self.previous_archive_path = None
+                self.previous_archive_entries = {}
+            else:
+                self.copied_file_count += 1
+                return
         zipfile_backend.add_file(
-            os.path.join(sub_path, file_name),
-            comment_file.file.file)
+            path,
+            comment_file.file.file,
+            mimetype=comment_file.mimetype,
+            entry_comment=entry_comment)
+        self.compressed_file_count += 1
 
     def execute(self):
         raise NotImplementedError()
\ No newline at end of file
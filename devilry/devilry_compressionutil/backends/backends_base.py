@@ -1,5 +1,9 @@
 # Python imports
+import io
+import mimetypes
 import os
+import struct
+import time
 import zipfile
 import tarfile
 import shutil
@@ -7,6 +11,140 @@ import shutil
 # Django imports
 from django.conf import settings
 
+#: Mimetypes for files that are already compressed. Deflating these again
+#: costs a lot of CPU time and saves (close to) nothing, so they are stored
+#: without compression (``ZIP_STORED``) by :class:`.PythonZipFileBackend`.
+ALREADY_COMPRESSED_MIMETYPES = {
+    'application/zip',
+    'application/x-zip-compressed',
+    'application/gzip',
+    'application/x-gzip',
+    'application/x-bzip2',
+    'application/x-xz',
+    'application/x-7z-compressed',
+    'application/x-rar-compressed',
+    'application/vnd.rar',
+    'application/java-archive',
+    'application/pdf',
+    'application/epub+zip',
+    'image/jpeg',
+    'image/png',
+    'image/gif',
+    'image/webp',
+    'audio/mpeg',
+    'audio/mp4',
+    'audio/aac',
+    'audio/ogg',
+}
+
+#: Mimetype prefixes for files that are already compressed. Most video formats,
+#: and the Office Open XML and OpenDocument formats (which are ZIP archives).
+ALREADY_COMPRESSED_MIMETYPE_PREFIXES = (
+    'video/',
+    'application/vnd.openxmlformats-officedocument.',
+    'application/vnd.oasis.opendocument.',
+)
+
+
+def is_already_compressed_mimetype(mimetype):
+    """
+    Check if files with the given mimetype is already compressed.
+
+    Args:
+        mimetype (str): A mimetype. Can be ``None`` or empty.
+
+    Returns:
+        bool: ``True`` if the mimetype is in :obj:`.ALREADY_COMPRESSED_MIMETYPES`
+        or starts with one of :obj:`.ALREADY_COMPRESSED_MIMETYPE_PREFIXES`.
+    """
+    if not mimetype:
+        return False
+    mimetype = mimetype.split(';')[0].strip().lower()
+    return mimetype in ALREADY_COMPRESSED_MIMETYPES or mimetype.startswith(ALREADY_COMPRESSED_MIMETYPE_PREFIXES)
+
+
+def make_zipinfo(path, mimetype=None, file_size=None):
+    """
+    Make a :class:`zipfile.ZipInfo` for a file we are going to stream into a ZIP archive.
+
+    Files with an already compressed mimetype (see :func:`.is_already_compressed_mimetype`)
+    are stored, and all other files are deflated. If ``mimetype`` is not provided, we
+    guess it from ``path``.
+
+    Args:
+        path (str): Path to the file inside the archive.
+        mimetype (str): The mimetype of the file. Optional.
+        file_size (int): The size of the file. Optional, but should be provided if known
+            since the ZIP64 extensions is only used for large files when the size is known
+            up front.
+
+    Returns:
+        zipfile.ZipInfo: The zipinfo object.
+    """
+    if not mimetype:
+        mimetype = mimetypes.guess_type(path)[0]
+    zipinfo = zipfile.ZipInfo(filename=path, date_time=time.localtime(time.time())[:6])
+    zipinfo.external_attr = 0o600 << 16
+    if is_already_compressed_mimetype(mimetype):
+        zipinfo.compress_type = zipfile.ZIP_STORED
+    else:
+        zipinfo.compress_type = zipfile.ZIP_DEFLATED
+    if file_size is not None:
+        zipinfo.file_size = file_size
+    return zipinfo
+
+
+#: The local file header in front of each entry in a ZIP archive. See section
+#: 4.3.7 in the ZIP file format specification (APPNOTE.TXT).
+LOCAL_FILE_HEADER_STRUCT = struct.Struct('<4s2B4HL2L2H')
+
+#: The signature of :obj:`.LOCAL_FILE_HEADER_STRUCT`.
+LOCAL_FILE_HEADER_SIGNATURE = b'PK\x03\x04'
+
+#: The attributes of :class:`zipfile.ZipFile` that :meth:`.PythonZipFileBackend.copy_entry_from_archive`
+#: needs. Some of these are not part of the public API of the ``zipfile`` module.
+ZIPFILE_ATTRIBUTES_REQUIRED_TO_COPY_ENTRIES = ('fp', 'start_dir', 'filelist', 'NameToInfo',
+                                               '_writecheck', '_didModify')
+
+
+def iterate_filelike_chunks(filelike_obj, chunk_size):
+    """
+    Read ``filelike_obj`` in chunks of ``chunk_size``.
+
+    Text (``str``) chunks are encoded as UTF-8, so file objects opened in text
+    mode (and :class:`io.StringIO`) can be used.
+
+    Args:
+        filelike_obj: An object with method ``read()``.
+        chunk_size (int): Max number of bytes/characters in each chunk.
+
+    Yields:
+        bytes: Chunks of bytes.
+    """
+    while True:
+        chunk = filelike_obj.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        yield chunk
+
+
+def get_filelike_size(filelike_obj):
+    """
+    Get the size of ``filelike_obj`` without reading it if possible.
+
+    Returns:
+        int: The size, or ``None`` if it can not be determined.
+    """
+    size = getattr(filelike_obj, 'size', None)
+    if isinstance(size, int):
+        return size
+    try:
+        return os.fstat(filelike_obj.fileno()).st_size
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+
 
 class BaseArchiveBackend(object):
     """
@@ -98,19 +236,37 @@ class BaseArchiveBackend(object):
             raise ValueError('Archive does not exist at {}'.format(self.archive_path))
         return os.stat(self.archive_path).st_size
 
-    def add_file(self, path, filelike_obj):
+    def add_file(self, path, filelike_obj, mimetype=None):
         """
         Add file to archive.
 
         Args:
             path (str): Path to the file inside the archive.
             filelike_obj: An object which implements function ``read()``.
+            mimetype (str): The mimetype of the file. Optional. Backends may use
+                this to choose how the file is compressed.
 
         Raises:
             NotImplementedError: If not implemented by subclass.
         """
         raise NotImplementedError()
 
+    def copy_entry_from_archive(self, source_archive_path, source_zipinfo, path):
+        """
+        Copy an already compressed entry from another archive.
+
+        Args:
+            source_archive_path (str): Path to the archive to copy from.
+            source_zipinfo: The entry to copy.
+            path (str): Path to the entry inside this archive.
+
+        Raises:
+            NotImplementedError: If not implemented by subclass, or not supported.
+            OSError: If the source archive can not be read.
+            zipfile.BadZipFile: If the entry in the source archive is corrupt.
+        """
+        raise NotImplementedError()
+
     def read_archive(self):
         """
         Should return a object of the underlying compression tool in readmode.
@@ -153,6 +309,10 @@ class PythonZipFileBackend(BaseArchiveBackend):
 
     This class should be subclassed by backend-specific classes(backends for Heroku, S3, etc).
     """
+
+    #: Number of bytes read from the source file and written to the archive at a time.
+    chunk_size = 1024 * 1024
+
     def __init__(self, **kwargs):
         super(PythonZipFileBackend, self).__init__(**kwargs)
         self.__add_path_extension()
@@ -168,23 +328,116 @@ class PythonZipFileBackend(BaseArchiveBackend):
             self.archive_name += '.zip'
             self.archive_path += '.zip'
 
-    def add_file(self, path, filelike_obj):
+    def __open_archive_for_writing(self):
+        if self.readmode is True:
+            raise ValueError('readmode must be False to add files.')
+        if self.archive is None or self.__closed:
+            self.__closed = False
+            self.archive = zipfile.ZipFile(self.archive_path, 'a', zipfile.ZIP_DEFLATED, allowZip64=True)
+        return self.archive
+
+    def add_file(self, path, filelike_obj, mimetype=None, entry_comment=''):
         """
         Add files to archive.
 
+        The file is streamed into the archive in chunks of
+        :obj:`~.PythonZipFileBackend.chunk_size` bytes, so the memory usage does
+        not depend on the size of the file. Already compressed files (see
+        :func:`.is_already_compressed_mimetype`) are stored without compression.
+
         Args:
             path (str): Path to the file inside the Zip-archive.
             filelike_obj: An object with method ``read()``
+            mimetype (str): The mimetype of the file. Optional - guessed from
+                ``path`` if not provided.
+            entry_comment (str): Comment for the entry in the archive. Used to
+                identify where the entry came from when the archive is used by
+                :meth:`.copy_entry_from_archive`.
 
         Raises:
             ValueError: If ``readmode`` is set to ``True``, must be ``False`` to add files.
         """
-        if self.readmode is True:
-            raise ValueError('readmode must be False to add files.')
-        if self.archive is None or self.__closed:
-            self.__closed = False
-            self.archive = zipfile.ZipFile(self.archive_path, 'a', zipfile.ZIP_DEFLATED, allowZip64=True)
-        self.archive.writestr(path, filelike_obj.read())
+        archive = self.__open_archive_for_writing()
+        file_size = get_filelike_size(filelike_obj)
+        zipinfo = make_zipinfo(path=path, mimetype=mimetype, file_size=file_size)
+        zipinfo.comment = entry_comment.encode('utf-8')
+        with archive.open(zipinfo, 'w', force_zip64=file_size is None) as zipentry:
+            for chunk in iterate_filelike_chunks(filelike_obj, self.chunk_size):
+                zipentry.write(chunk)
+
+    def __can_copy_entries(self, archive):
+        return (all(hasattr(archive, attribute) for attribute in ZIPFILE_ATTRIBUTES_REQUIRED_TO_COPY_ENTRIES) and
+                hasattr(zipfile.ZipInfo, 'FileHeader'))
+
+    def copy_entry_from_archive(self, source_archive_path, source_zipinfo, path):
+        """
+        Copy an entry from another ZIP archive into this archive without
+        decompressing and compressing it again.
+
+        The compressed bytes are copied in chunks of
+        :obj:`~.PythonZipFileBackend.chunk_size` bytes.
+
+        This writes directly to the underlying file of the ``ZipFile``, and uses
+        attributes that are not part of the public API of the ``zipfile`` module
+        (see :obj:`.ZIPFILE_ATTRIBUTES_REQUIRED_TO_COPY_ENTRIES`). If they are missing
+        in the running Python version, we raise ``NotImplementedError``, and callers
+        should add the file with :meth:`.add_file` instead.
+
+        Args:
+            source_archive_path (str): Path to the ZIP archive to copy from.
+            source_zipinfo (zipfile.ZipInfo): The entry to copy, from
+                ``zipfile.ZipFile(source_archive_path).infolist()``.
+            path (str): Path to the entry inside this archive.
+
+        Raises:
+            ValueError: If ``readmode`` is set to ``True``, must be ``False`` to add files.
+            NotImplementedError: If the ``zipfile`` module does not support copying entries.
+            OSError: If the source archive can not be read (e.g.: if it has been deleted).
+            zipfile.BadZipFile: If the entry in the source archive is corrupt.
+        """
+        archive = self.__open_archive_for_writing()
+        if not self.__can_copy_entries(archive):
+            raise NotImplementedError('The zipfile module does not support copying entries between archives.')
+        zipinfo = zipfile.ZipInfo(filename=path, date_time=source_zipinfo.date_time)
+        zipinfo.compress_type = source_zipinfo.compress_type
+        zipinfo.external_attr = source_zipinfo.external_attr
+        zipinfo.comment = source_zipinfo.comment
+        zipinfo.CRC = source_zipinfo.CRC
+        zipinfo.compress_size = source_zipinfo.compress_size
+        zipinfo.file_size = source_zipinfo.file_size
+
+        with open(source_archive_path, 'rb') as source_archive_file:
+            # The compressed data starts after the local file header, and the local file header
+            # may have a different extra field than the central directory entry.
+            source_archive_file.seek(source_zipinfo.header_offset)
+            header_bytes = source_archive_file.read(LOCAL_FILE_HEADER_STRUCT.size)
+            if len(header_bytes) != LOCAL_FILE_HEADER_STRUCT.size:
+                raise zipfile.BadZipFile('Truncated file header: {}'.format(source_zipinfo.filename))
+            local_file_header = LOCAL_FILE_HEADER_STRUCT.unpack(header_bytes)
+            signature, filename_length, extra_field_length = (
+                local_file_header[0], local_file_header[10], local_file_header[11])
+            if signature != LOCAL_FILE_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile('Bad magic number for file header: {}'.format(source_zipinfo.filename))
+            source_archive_file.seek(filename_length + extra_field_length, os.SEEK_CUR)
+
+            # This is what ZipFile.write() does for entries written in a single go. start_dir
+            # is only moved when the entry is complete, so if copying fails, the next entry
+            # (or the central directory) overwrites the partially copied entry.
+            archive.fp.seek(archive.start_dir)
+            zipinfo.header_offset = archive.fp.tell()
+            archive._writecheck(zipinfo)
+            archive._didModify = True
+            archive.fp.write(zipinfo.FileHeader())
+            remaining_bytes = zipinfo.compress_size
+            while remaining_bytes > 0:
+                chunk = source_archive_file.read(min(self.chunk_size, remaining_bytes))
+                if not chunk:
+                    raise zipfile.BadZipFile('Truncated entry: {}'.format(source_zipinfo.filename))
+                archive.fp.write(chunk)
+                remaining_bytes -= len(chunk)
+            archive.filelist.append(zipinfo)
+            archive.NameToInfo[zipinfo.filename] = zipinfo
+            archive.start_dir = archive.fp.tell()
 
     def read_archive(self):
         """
@@ -247,7 +500,7 @@ class PythonTarFileBackend(BaseArchiveBackend):
         if self.__compression not in PythonTarFileBackend.compression_formats:
             raise ValueError('Unsupported compression format: {}'.format(self.__compression))
 
-    def add_file(self, path, filelike_obj):
+    def add_file(self, path, filelike_obj, mimetype=None):
         """
         Writes a file to the archive on the given ``path``.
 
@@ -257,6 +510,7 @@ class PythonTarFileBackend(BaseArchiveBackend):
         Args:
             path: Path to file inside the archive.
             filelike_obj: An object that behaves like a File(read, write..).
+            mimetype (str): Not used by this backend.
 
         """
         self.__check_compression_support()
@@ -1,17 +1,56 @@
 # -*- coding: utf-8 -*-
 
 
+import multiprocessing
 import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+from django import db
+from django.conf import settings
 from django.template import defaultfilters
 
 from devilry.devilry_compressionutil.batchjob_mixins import feedbackset_mixin
 
 
+def _compress_assignment_group_chunk(action_class, assignment_id, user_id, group_ids,
+                                     backend_class, chunk_archive_path, previous_archive_path):
+    """
+    Compress the files for a chunk of groups into a separate archive.
+
+    Runs in a worker process started by :meth:`.AssignmentBatchMixin.add_assignment_groups`.
+
+    Returns:
+        tuple: ``(compressed_file_count, copied_file_count)``.
+    """
+    from django.contrib.auth import get_user_model
+    from devilry.apps.core.models import Assignment
+
+    try:
+        action = action_class()
+        action.use_previous_archive_path(archive_path=previous_archive_path)
+        assignment = Assignment.objects.get(id=assignment_id)
+        user = get_user_model().objects.get(id=user_id)
+        chunk_backend = backend_class(archive_path=chunk_archive_path, readmode=False)
+        action.add_assignment_group_chunk(zipfile_backend=chunk_backend, assignment=assignment,
+                                          user=user, group_ids=group_ids)
+        if chunk_backend.archive is not None:
+            chunk_backend.close()
+        return action.compressed_file_count, action.copied_file_count
+    finally:
+        db.connections.close_all()
+
+
 class AssignmentBatchMixin(feedbackset_mixin.FeedbackSetBatchMixin):
     """
     Mixin for adding FeedbackSet files to zipfile for all AssignmentGroups in the Assignment the user has access to.
 
+    The groups are added in chunks of ``DEVILRY_COMPRESSED_ARCHIVES_GROUPS_PER_CHUNK`` groups, and
+    the progress is reported with ``report_progress()`` for each chunk. If the
+    ``DEVILRY_COMPRESSED_ARCHIVES_WORKER_PROCESSES`` setting is more than ``1``, the chunks are compressed
+    into separate archives in a pool of worker processes, and merged into the final archive
+    without compressing the files again.
+
     Must be included in class together with
     :class:`devilry.devilry_compressionutil.batchjob_mixins.feedbackset_mixin.FeedbackSetBatchMixin`.
     """
@@ -31,13 +70,113 @@ class AssignmentBatchMixin(feedbackset_mixin.FeedbackSetBatchMixin):
         """
         raise NotImplementedError()
 
+    def get_worker_process_count(self):
+        """
+        Get the number of worker processes to compress the chunks with.
+
+        Defaults to the ``DEVILRY_COMPRESSED_ARCHIVES_WORKER_PROCESSES`` setting.
+        """
+        return getattr(settings, 'DEVILRY_COMPRESSED_ARCHIVES_WORKER_PROCESSES', 1)
+
+    def get_groups_per_chunk(self):
+        """
+        Get the number of groups in each chunk.
+
+        Defaults to the ``DEVILRY_COMPRESSED_ARCHIVES_GROUPS_PER_CHUNK`` setting.
+        """
+        return getattr(settings, 'DEVILRY_COMPRESSED_ARCHIVES_GROUPS_PER_CHUNK', 20)
+
+    def add_assignment_group(self, zipfile_backend, group):
+        group_path = '{}'.format(group.get_short_displayname())
+        for feedback_set in group.feedbackset_set.all():
+            feedback_set_path = 'deadline-{}'.format(defaultfilters.date(feedback_set.current_deadline(), 'b.j.Y-H:i'))
+            self.zipfile_add_feedbackset(
+                zipfile_backend=zipfile_backend,
+                feedback_set=feedback_set,
+                sub_path=os.path.join(group_path, feedback_set_path)
+            )
+
+    def add_assignment_group_chunk(self, zipfile_backend, assignment, user, group_ids):
+        groups = self.get_assignment_group_queryset(assignment=assignment, user=user)\
+            .filter(id__in=group_ids)\
+            .order_by('id')
+        for group in groups:
+            self.add_assignment_group(zipfile_backend=zipfile_backend, group=group)
+
+    def __split_into_chunks(self, group_ids):
+        groups_per_chunk = self.get_groups_per_chunk()
+        return [group_ids[index:index + groups_per_chunk]
+                for index in range(0, len(group_ids), groups_per_chunk)]
+
+    def __merge_chunk_archive(self, zipfile_backend, chunk_archive_path):
+        if not os.path.exists(chunk_archive_path):
+            # No files in any of the groups in the chunk.
+            return
+        with zipfile.ZipFile(chunk_archive_path, 'r') as chunk_archive:
+            for zipinfo in chunk_archive.infolist():
+                try:
+                    zipfile_backend.copy_entry_from_archive(
+                        source_archive_path=chunk_archive_path,
+                        source_zipinfo=zipinfo,
+                        path=zipinfo.filename)
+                except NotImplementedError:
+                    # Decompress and compress the entry again.
+                    with chunk_archive.open(zipinfo) as entry_file:
+                        zipfile_backend.add_file(zipinfo.filename, entry_file,
+                                                 entry_comment=zipinfo.comment.decode('utf-8'))
+
+    def __add_assignment_groups_in_worker_processes(self, user, zipfile_backend, assignment, chunks):
+        chunk_archive_paths = [
+            '{}.chunk-{}.zip'.format(zipfile_backend.archive_path, chunk_index)
+            for chunk_index in range(len(chunks))]
+
+        # The worker processes are forked, and must not share the database connections
+        # of this process.
+        db.connections.close_all()
+        try:
+            with ProcessPoolExecutor(max_workers=self.get_worker_process_count(),
+                                     mp_context=multiprocessing.get_context('fork')) as executor:
+                futures = [
+                    executor.submit(_compress_assignment_group_chunk,
+                                    action_class=self.__class__,
+                                    assignment_id=assignment.id,
+                                    user_id=user.id,
+                                    group_ids=group_ids,
+                                    backend_class=zipfile_backend.__class__,
+                                    chunk_archive_path=chunk_archive_path,
+                                    previous_archive_path=self.previous_archive_path)
+                    for group_ids, chunk_archive_path in zip(chunks, chunk_archive_paths)]
+                for completed_chunk_count, future in enumerate(as_completed(futures), start=1):
+                    compressed_file_count, copied_file_count = future.result()
+                    self.compressed_file_count += compressed_file_count
+                    self.copied_file_count += copied_file_count
+                    self.report_progress(completed_chunk_count=completed_chunk_count,
+                                         total_chunk_count=len(chunks))
+
+            # Merge in the same order as the chunks to get the same archive as when
+            # compressing in a single process.
+            for chunk_archive_path in chunk_archive_paths:
+                self.__merge_chunk_archive(zipfile_backend=zipfile_backend,
+                                           chunk_archive_path=chunk_archive_path)
+        finally:
+            for chunk_archive_path in chunk_archive_paths:
+                if os.path.exists(chunk_archive_path):
+                    os.remove(chunk_archive_path)
+
     def add_assignment_groups(self, user, zipfile_backend, assignment):
-        for group in self.get_assignment_group_queryset(assignment=assignment, user=user):
-            group_path = '{}'.format(group.get_short_displayname())
-            for feedback_set in group.feedbackset_set.all():
-                feedback_set_path = 'deadline-{}'.format(defaultfilters.date(feedback_set.current_deadline(), 'b.j.Y-H:i'))
-                self.zipfile_add_feedbackset(
-                    zipfile_backend=zipfile_backend,
-                    feedback_set=feedback_set,
-                    sub_path=os.path.join(group_path, feedback_set_path)
-                )
+        group_ids = list(
+            self.get_assignment_group_queryset(assignment=assignment, user=user)
+            .order_by('id')
+            .values_list('id', flat=True))
+        chunks = self.__split_into_chunks(group_ids)
+        # We can not close the database connection before forking the worker processes
+        # within a transaction, so we only use worker processes outside of transactions.
+        if self.get_worker_process_count() > 1 and len(chunks) > 1 and not db.connection.in_atomic_block:
+            self.__add_assignment_groups_in_worker_processes(
+                user=user, zipfile_backend=zipfile_backend, assignment=assignment, chunks=chunks)
+        else:
+            for completed_chunk_count, chunk_group_ids in enumerate(chunks, start=1):
+                self.add_assignment_group_chunk(zipfile_backend=zipfile_backend, assignment=assignment,
+                                                user=user, group_ids=chunk_group_ids)
+                self.report_progress(completed_chunk_count=completed_chunk_count,
+                                     total_chunk_count=len(chunks))
@@ -61,6 +61,28 @@ class CompressedArchiveMetaQueryset(models.QuerySet):
         archive_meta.save()
         return archive_meta
 
+    def get_latest_archive_meta(self, instance, user, user_role=''):
+        """
+        Get the latest meta entry for an archive created by ``user`` for ``instance``,
+        including entries marked for deletion (their archives are deleted later).
+
+        Used to create a new archive incrementally from the previous archive.
+
+        Args:
+            instance: Instance the archive is for.
+            user: The user that created the archive.
+            user_role: The role the user created the archive with.
+
+        Returns:
+            CompressedArchiveMeta: The latest meta entry, or ``None``.
+        """
+        return self.filter(
+            content_type=ContentType.objects.get_for_model(model=instance),
+            content_object_id=instance.id,
+            created_by=user,
+            created_by_role=user_role
+        ).order_by('-created_datetime').first()
+
     def __delete_compressed_archive(self, **timedelta_kwargs):
         """
         Expects timedelta kwars (days, seconds, microseconds, etc..)
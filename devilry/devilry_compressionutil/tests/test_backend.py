@@ -2,16 +2,20 @@
 import io
 import os
 import shutil
+import zipfile
 
 # Django imports
 from unittest import skip
 
+import mock
+
 from django.test import TestCase
 from django.conf import settings
 
 # Devilry imports
 from devilry.devilry_compressionutil import backend_registry
 from devilry.devilry_compressionutil.backends import backend_mock
+from devilry.devilry_compressionutil.backends import backends_base
 from devilry.devilry_compressionutil.backends.backends_base import PythonTarFileBackend
 
 # Dummy text for compression tests
@@ -209,6 +213,87 @@ class TestZipBackend(TestCase):
             for item in backend.archive.namelist():
                 self.assertTrue(item in nesting_levels)
 
+    def __make_backend(self, archive_path):
+        mockregistry = backend_registry.MockableRegistry.make_mockregistry(
+            backend_mock.MockDevilryZipBackend
+        )
+        backend_class = mockregistry.get('default')
+        return backend_class(archive_path=archive_path, readmode=False)
+
+    def test_add_file_compressed_mimetype_is_stored(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            backend = self.__make_backend(archive_path='testfile1')
+            backend.add_file('testfile.mp4', io.BytesIO(lorem_ipsum.encode('utf-8')), mimetype='video/mp4')
+            backend.add_file('testfile.txt', io.BytesIO(lorem_ipsum.encode('utf-8')), mimetype='text/plain')
+            backend.close()
+            backend.readmode = True
+            archive = backend.read_archive()
+            self.assertEqual(archive.getinfo('testfile.mp4').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(archive.getinfo('testfile.txt').compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(archive.read('testfile.mp4'), lorem_ipsum.encode('utf-8'))
+
+    def test_add_file_compressed_mimetype_guessed_from_path(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            backend = self.__make_backend(archive_path='testfile1')
+            backend.add_file('testfile.zip', io.BytesIO(b'testcontent'))
+            backend.add_file('testfile.pdf', io.BytesIO(b'testcontent'))
+            backend.add_file('testfile.java', io.BytesIO(b'testcontent'))
+            backend.close()
+            backend.readmode = True
+            archive = backend.read_archive()
+            self.assertEqual(archive.getinfo('testfile.zip').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(archive.getinfo('testfile.pdf').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(archive.getinfo('testfile.java').compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_add_file_is_read_in_chunks(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            backend = self.__make_backend(archive_path='testfile1')
+            backend.chunk_size = 100
+            testfile = mock.Mock(wraps=io.BytesIO(lorem_ipsum.encode('utf-8') * 10))
+            testfile.size = len(lorem_ipsum) * 10
+            backend.add_file('testfile.txt', testfile)
+            backend.close()
+            for call in testfile.read.call_args_list:
+                self.assertEqual(call, mock.call(100))
+            backend.readmode = True
+            archive = backend.read_archive()
+            self.assertEqual(archive.read('testfile.txt'), lorem_ipsum.encode('utf-8') * 10)
+
+    def test_add_file_from_disk(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            backend = self.__make_backend(archive_path='testfile1')
+            sourcefile_path = os.path.join(self.backend_path, 'source.txt')
+            with open(sourcefile_path, 'wb') as sourcefile:
+                sourcefile.write(b'testcontent')
+            with open(sourcefile_path, 'rb') as sourcefile:
+                backend.add_file('testfile.txt', sourcefile)
+            backend.close()
+            backend.readmode = True
+            archive = backend.read_archive()
+            self.assertEqual(archive.getinfo('testfile.txt').file_size, len(b'testcontent'))
+            self.assertEqual(archive.read('testfile.txt'), b'testcontent')
+
+
+class TestIsAlreadyCompressedMimetype(TestCase):
+    def test_none(self):
+        self.assertFalse(backends_base.is_already_compressed_mimetype(None))
+
+    def test_text(self):
+        self.assertFalse(backends_base.is_already_compressed_mimetype('text/plain'))
+
+    def test_exact_match(self):
+        self.assertTrue(backends_base.is_already_compressed_mimetype('application/zip'))
+        self.assertTrue(backends_base.is_already_compressed_mimetype('image/jpeg'))
+        self.assertTrue(backends_base.is_already_compressed_mimetype('application/pdf'))
+
+    def test_prefix_match(self):
+        self.assertTrue(backends_base.is_already_compressed_mimetype('video/mp4'))
+        self.assertTrue(backends_base.is_already_compressed_mimetype(
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document'))
+
+    def test_parameters_and_case_ignored(self):
+        self.assertTrue(backends_base.is_already_compressed_mimetype('Application/ZIP; charset=binary'))
+
 
 @skip('Skip tarfile tests until tarfile is complete(possible goal 3.1)')
 class TestTarFileBackend(TestCase):
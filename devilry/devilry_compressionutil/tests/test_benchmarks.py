@@ -0,0 +1,84 @@
+import os
+import shutil
+import time
+import tracemalloc
+import unittest
+import zipfile
+
+from django import test
+
+from devilry.devilry_compressionutil.backends import backend_mock
+
+
+class MeasureExecution(object):
+    """
+    Measures the duration, peak memory usage (traced python allocations)
+    and throughput of the code within the context.
+    """
+    def __init__(self, label, byte_count):
+        self.label = label
+        self.byte_count = byte_count
+        self.start_time = None
+
+    def __enter__(self):
+        tracemalloc.start()
+        self.start_time = time.time()
+
+    def __exit__(self, ttype, value, traceback):
+        duration = time.time() - self.start_time
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print()
+        print('{}: {:.2f}s, {:.1f}MB/s, peak memory {:.1f}MB'.format(
+            self.label,
+            duration,
+            self.byte_count / duration / 1024 / 1024,
+            peak_memory / 1024.0 / 1024))
+        print()
+
+
+@unittest.skip('Bechmark - should just be enabled when debugging performance')
+class TestBenchMarkZipBackend(test.TestCase):
+    #: Size of the file added to the archive in the benchmarks.
+    filesize = 500 * 1024 * 1024
+
+    def setUp(self):
+        self.backend_path = os.path.join('devilry_testfiles', 'devilry_compressed_archives', '')
+        os.makedirs(self.backend_path, exist_ok=True)
+        self.sourcefile_path = os.path.join(self.backend_path, 'benchmark_sourcefile')
+        with open(self.sourcefile_path, 'wb') as sourcefile:
+            # Half random (incompressible), half repeated (compressible) data.
+            chunk = os.urandom(512 * 1024) + b'a' * 512 * 1024
+            for x in range(self.filesize // len(chunk)):
+                sourcefile.write(chunk)
+
+    def tearDown(self):
+        shutil.rmtree(self.backend_path, ignore_errors=False)
+
+    def __make_backend(self, archive_path):
+        return backend_mock.MockDevilryZipBackend(archive_path=archive_path, readmode=False)
+
+    def test_writestr_read_whole_file(self):
+        # The old implementation of PythonZipFileBackend.add_file() - for comparison.
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            archive_path = os.path.join(self.backend_path, 'writestr.zip')
+            with MeasureExecution('writestr(path, file.read())', self.filesize):
+                with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                    with open(self.sourcefile_path, 'rb') as sourcefile:
+                        archive.writestr('testfile.bin', sourcefile.read())
+
+    def test_streaming_deflated(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            backend = self.__make_backend('streaming_deflated')
+            with MeasureExecution('PythonZipFileBackend.add_file() - deflated', self.filesize):
+                with open(self.sourcefile_path, 'rb') as sourcefile:
+                    backend.add_file('testfile.bin', sourcefile, mimetype='application/octet-stream')
+                backend.close()
+
+    def test_streaming_stored(self):
+        with self.settings(DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY=self.backend_path):
+            backend = self.__make_backend('streaming_stored')
+            with MeasureExecution('PythonZipFileBackend.add_file() - stored (video/mp4)', self.filesize):
+                with open(self.sourcefile_path, 'rb') as sourcefile:
+                    backend.add_file('testfile.mp4', sourcefile, mimetype='video/mp4')
+                backend.close()
@@ -1,5 +1,12 @@
+import hashlib
+
 # Devilry/cradmin imports
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils import translation
+from django.utils.safestring import mark_safe
+from django_cradmin.renderable import AbstractRenderable
 from django_cradmin.viewhelpers import listbuilder
 
 from devilry.apps.core.group_user_lookup import GroupUserLookup
@@ -19,13 +26,22 @@ class TimeLineListBuilderList(listbuilder.base.List):
             if not feedbackset.is_merge_type \
                and feedbackset.feedbackset_type != FeedbackSet.FEEDBACKSET_TYPE_FIRST_ATTEMPT:
                 attempt_num += 1
-            listbuilder_list.append(
-                FeedbackSetTimelineListBuilderList.from_built_timeline(
-                    built_timeline=feedbackset_event['feedbackset_events'],
-                    feedbackset=feedbackset_event['feedbackset'],
-                    attempt_num=attempt_num,
-                    **kwargs)
-            )
+            if CachedFeedbackSetTimeline.can_be_cached(feedbackset=feedbackset, group=kwargs['group']):
+                listbuilder_list.append(
+                    CachedFeedbackSetTimeline(
+                        built_timeline=feedbackset_event['feedbackset_events'],
+                        feedbackset=feedbackset,
+                        attempt_num=attempt_num,
+                        **kwargs)
+                )
+            else:
+                listbuilder_list.append(
+                    FeedbackSetTimelineListBuilderList.from_built_timeline(
+                        built_timeline=feedbackset_event['feedbackset_events'],
+                        feedbackset=feedbackset,
+                        attempt_num=attempt_num,
+                        **kwargs)
+                )
         return listbuilder_list
 
     def get_extra_css_classes_list(self):
@@ -143,6 +159,113 @@ class FeedbackSetTimelineListBuilderList(listbuilder.base.List):
         return css_classes_list
 
 
+def get_feedbackset_timeline_cache_timeout():
+    return getattr(settings, 'DEVILRY_GROUP_FEEDBACKFEED_TIMELINE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+class CachedFeedbackSetTimeline(AbstractRenderable):
+    """
+    Renders the same as :class:`.FeedbackSetTimelineListBuilderList`, but the HTML
+    is cached for ``DEVILRY_GROUP_FEEDBACKFEED_TIMELINE_CACHE_TIMEOUT`` seconds.
+
+    Only used for FeedbackSets that are closed (see :meth:`.can_be_cached`).
+    The cache key is a hash of everything the rendered HTML depends on, built from
+    the data already fetched for the timeline, so changes to comments,
+    files, deadlines and grading give a new key instead of having to invalidate
+    the cache. Changes to the names of users are not a part of the key, and
+    are not shown until the cache times out.
+    """
+    def __init__(self, built_timeline, feedbackset, attempt_num, **kwargs):
+        self.built_timeline = built_timeline
+        self.feedbackset = feedbackset
+        self.attempt_num = attempt_num
+        self.kwargs = kwargs
+        super(CachedFeedbackSetTimeline, self).__init__()
+
+    @classmethod
+    def can_be_cached(cls, feedbackset, group):
+        """
+        Only FeedbackSets that are merged, or graded and not the last FeedbackSet in the group
+        are cached. The header of the last FeedbackSet has buttons that depend on the
+        state of the group, and the status of ungraded FeedbackSets changes when their
+        deadline expires.
+        """
+        if not get_feedbackset_timeline_cache_timeout():
+            return False
+        if feedbackset.id == group.cached_data.last_feedbackset_id:
+            return False
+        return feedbackset.is_merge_type or feedbackset.grading_published_datetime is not None
+
+    def __get_comment_cache_key_data(self, group_comment):
+        return [
+            group_comment.id,
+            group_comment.user_id,
+            group_comment.user_role,
+            group_comment.text,
+            group_comment.v2_id,
+            group_comment.visibility,
+            group_comment.part_of_grading,
+            group_comment.published_datetime,
+            getattr(group_comment, 'last_edithistory_datetime', None),
+            [(commentfile.id, commentfile.filename)
+             for commentfile in group_comment.commentfile_set.all()],
+        ]
+
+    def __get_event_cache_key_data(self, event_dict):
+        event_type = event_dict['type']
+        if event_type == 'comment':
+            return [event_type, self.__get_comment_cache_key_data(group_comment=event_dict['obj'])]
+        elif event_type == 'deadline_expired':
+            return [event_type, event_dict['deadline_datetime']]
+        elif event_type == 'grade':
+            return [event_type, event_dict['grade_points']]
+        elif event_type == 'deadline_moved':
+            deadline_history = event_dict['obj']
+            return [event_type, deadline_history.id, deadline_history.changed_by_id, event_dict['is_last']]
+        elif event_type == 'grading_updated':
+            grading_updated = event_dict['obj']
+            return [event_type, grading_updated.id, grading_updated.updated_by_id,
+                    event_dict['next_grading_points']]
+        return [event_type, event_dict['ordering_datetime']]
+
+    def get_cache_key(self):
+        feedbackset = self.feedbackset
+        assignment = self.kwargs['assignment']
+        point_to_grade_map = getattr(assignment, 'prefetched_point_to_grade_map', None)
+        cache_key_data = [
+            self.kwargs['group'].id,
+            self.kwargs['devilryrole'],
+            self.kwargs['requestuser'].id,
+            translation.get_language(),
+            timezone.get_current_timezone_name(),
+            self.attempt_num,
+            [feedbackset.id, feedbackset.feedbackset_type, feedbackset.ignored,
+             feedbackset.created_datetime, feedbackset.deadline_datetime,
+             feedbackset.grading_published_datetime, feedbackset.grading_published_by_id,
+             feedbackset.grading_points],
+            [assignment.id, assignment.first_deadline, assignment.anonymizationmode,
+             assignment.uses_custom_candidate_ids, assignment.points_to_grade_mapper,
+             assignment.max_points, assignment.passing_grade_min_points,
+             point_to_grade_map.version if point_to_grade_map else None],
+            [self.__get_event_cache_key_data(event_dict=event_dict) for event_dict in self.built_timeline],
+        ]
+        cache_key_hash = hashlib.sha1(repr(cache_key_data).encode('utf-8')).hexdigest()
+        return 'devilry_group.feedbackfeed_timeline.feedbackset.{}.{}'.format(feedbackset.id, cache_key_hash)
+
+    def render(self, request=None, **kwargs):
+        cache_key = self.get_cache_key()
+        html = cache.get(cache_key)
+        if html is None:
+            feedbackset_listbuilder_list = FeedbackSetTimelineListBuilderList.from_built_timeline(
+                built_timeline=self.built_timeline,
+                feedbackset=self.feedbackset,
+                attempt_num=self.attempt_num,
+                **self.kwargs)
+            html = feedbackset_listbuilder_list.render(request=request, **kwargs)
+            cache.set(cache_key, html, timeout=get_feedbackset_timeline_cache_timeout())
+        return mark_safe(html)
+
+
 class FeedbackSetContentList(listbuilder.base.List):
     """
     Simply adds a css wrapper-class for all events that belong to a feedbackset.
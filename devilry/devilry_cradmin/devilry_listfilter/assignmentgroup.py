@@ -225,6 +225,13 @@ class OrderByAnonymousUsesCustomCandidateIds(AbstractOrderBy):
 
 
 class StatusRadioFilter(abstractradio.AbstractRadioFilter):
+    """
+    Radio filter for the status of the groups, with the number of groups
+    for each status in the labels.
+
+    The ``view`` must have a ``get_status_counts()`` method that returns the number of groups
+    for each status (see :meth:`devilry.apps.core.models.AssignmentGroupQuerySet.get_status_counts`).
+    """
     def __init__(self, **kwargs):
         self.view = kwargs.pop('view', None)
         super(StatusRadioFilter, self).__init__(**kwargs)
@@ -252,27 +259,28 @@ class StatusRadioFilter(abstractradio.AbstractRadioFilter):
             count=self.__count_html(count=count, has_count_cssclass=has_count_cssclass)))
 
     def get_choices(self):
+        status_counts = self.view.get_status_counts()
         return [
             ('',
              self.__make_label(
                  label=pgettext('group status', 'all students'),
-                 count=self.view.get_filtered_all_students_count()
+                 count=status_counts['all']
              )),
             ('waiting-for-feedback',
              self.__make_label(
                  label=pgettext('group status', 'waiting for feedback'),
-                 count=self.view.get_filtered_waiting_for_feedback_count(),
+                 count=status_counts['waiting-for-feedback'],
                  has_count_cssclass='label-warning'
              )),
             ('waiting-for-deliveries',
              self.__make_label(
                  label=pgettext('group status', 'waiting for deliveries'),
-                 count=self.view.get_filtered_waiting_for_deliveries_count()
+                 count=status_counts['waiting-for-deliveries']
              )),
             ('corrected',
              self.__make_label(
                  label=pgettext('group status', 'corrected'),
-                 count=self.view.get_filtered_corrected_count()
+                 count=status_counts['corrected']
              )),
         ]
 
@@ -1,15 +1,38 @@
 # Ignore line length in this file
 # flake8: noqa: E501
 import logging
+
+from django.conf import settings
 from ievv_opensource.ievv_customsql import customsql_registry
 
-from devilry.apps.core.models import Period
-from devilry.devilry_dbcache.models import AssignmentGroupCachedData
+from devilry.devilry_dbcache.shadow_rebuild import AssignmentGroupCachedDataShadowRebuild
 
 log = logging.getLogger(__name__)
 
 
 class AssignmentGroupDbCacheCustomSql(customsql_registry.AbstractCustomSql):
+    """
+    Sets up the triggers that maintain
+    :class:`devilry.devilry_dbcache.models.AssignmentGroupCachedData`.
+
+    The cached data can be maintained in two different modes:
+
+    - :obj:`~.AssignmentGroupDbCacheCustomSql.MAINTENANCE_MODE_ROW`: Row level triggers
+      that rebuild all the cached data for a group each time a row changes.
+    - :obj:`~.AssignmentGroupDbCacheCustomSql.MAINTENANCE_MODE_STATEMENT`: Statement level
+      triggers with transition tables. Inserts are applied as deltas to the counters
+      and datetimes, and other changes rebuild each affected group once per statement.
+      This is a lot faster for bulk operations, and requires PostgreSQL 10 or newer.
+
+    The mode defaults to the ``DEVILRY_DBCACHE_MAINTENANCE_MODE`` setting, and can
+    be overridden with the ``maintenance_mode`` keyword argument.
+    """
+
+    #: Maintain the cached data with row level triggers.
+    MAINTENANCE_MODE_ROW = 'row'
+
+    #: Maintain the cached data with statement level triggers.
+    MAINTENANCE_MODE_STATEMENT = 'statement'
 
     _initialize_sqlfiles = [
         'general_purpose_functions.sql',
@@ -24,12 +47,39 @@ class AssignmentGroupDbCacheCustomSql(customsql_registry.AbstractCustomSql):
         'commentfile/triggers.sql',
         'examiner/triggers.sql',
         'candidate/triggers.sql',
+        'assignment_group_cached_data/deferred_rebuild.sql',
         'assignment_group_cached_data/rebuild.sql',
         'assignment/triggers.sql'
     ]
 
+    _statement_level_sqlfiles = [
+        'assignment_group/statement_level_triggers.sql',
+        'feedbackset/statement_level_triggers.sql',
+        'groupcomment/statement_level_triggers.sql',
+        'imageannotationcomment/statement_level_triggers.sql',
+        'commentfile/statement_level_triggers.sql',
+        'examiner/statement_level_triggers.sql',
+        'candidate/statement_level_triggers.sql',
+    ]
+
+    _shadow_rebuild_sqlfiles = [
+        'assignment_group_cached_data/shadow_rebuild.sql',
+    ]
+
+    def __init__(self, *args, **kwargs):
+        self.maintenance_mode = kwargs.pop('maintenance_mode', None) or getattr(
+            settings, 'DEVILRY_DBCACHE_MAINTENANCE_MODE', self.MAINTENANCE_MODE_ROW)
+        if self.maintenance_mode not in (self.MAINTENANCE_MODE_ROW, self.MAINTENANCE_MODE_STATEMENT):
+            raise ValueError('Invalid maintenance_mode: {!r}'.format(self.maintenance_mode))
+        super(AssignmentGroupDbCacheCustomSql, self).__init__(*args, **kwargs)
+
     def initialize(self):
         self.execute_sql_from_files(self._initialize_sqlfiles)
+        self.execute_sql_from_files(self._shadow_rebuild_sqlfiles)
+        if self.maintenance_mode == self.MAINTENANCE_MODE_STATEMENT:
+            self.execute_sql_from_files(self._statement_level_sqlfiles)
+        else:
+            self.execute_sql_from_files(['assignment_group_cached_data/drop_statement_level_triggers.sql'])
 
     def recreate_data(self):
         from devilry.apps.core.models import AssignmentGroup, Candidate, Examiner
@@ -45,18 +95,29 @@ class AssignmentGroupDbCacheCustomSql(customsql_registry.AbstractCustomSql):
         log.info("Examiner count: %s" % Examiner.objects.count())
         log.info("Candidate count: %s" % Candidate.objects.count())
 
-        AssignmentGroupCachedData.objects.all().delete()
-        for period in Period.objects.order_by('-start_time').iterator():
-            self.execute_sql("""
-                SELECT devilry__rebuild_assignmentgroupcacheddata_for_period({period_id});
-            """.format(period_id=period.id))
+        # Rebuild via a shadow table so that the cached data is available while we rebuild.
+        # Use the devilry_dbcache_rebuild management command to rebuild in parallel.
+        AssignmentGroupCachedDataShadowRebuild(
+            split_by=AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_PERIOD).run(resume=False)
 
     def clear(self):
-        drop_statements = self.make_drop_statements_from_sql_files(self._initialize_sqlfiles)
+        drop_statements = self.make_drop_statements_from_sql_files(
+            self._initialize_sqlfiles + self._statement_level_sqlfiles)
         self.execute_sql_multiple(reversed(drop_statements))
         self._delete_generated_objects()
 
     def _delete_generated_objects(self):
         self.execute_sql("""
             DELETE FROM devilry_dbcache_assignmentgroupcacheddata;
+            DROP TABLE IF EXISTS devilry__dbcache_deferred_group;
+            DROP TRIGGER IF EXISTS devilry__on_assignmentgroupcacheddata_change_during_shadow_rebuild_trigger
+                ON devilry_dbcache_assignmentgroupcacheddata;
+            DROP FUNCTION IF EXISTS devilry__on_assignmentgroupcacheddata_change_during_shadow_rebuild();
+            DROP FUNCTION IF EXISTS devilry__shadow_rebuild_assignmentgroupcacheddata_start(text, integer);
+            DROP FUNCTION IF EXISTS devilry__shadow_rebuild_assignmentgroupcacheddata_chunk(integer);
+            DROP FUNCTION IF EXISTS devilry__shadow_rebuild_assignmentgroupcacheddata_swap();
+            DROP FUNCTION IF EXISTS devilry__shadow_rebuild_assignmentgroupcacheddata_finish();
+            DROP TABLE IF EXISTS devilry__dbcache_shadow_assignmentgroupcacheddata;
+            DROP TABLE IF EXISTS devilry__dbcache_shadow_rebuild_chunk;
+            DROP TABLE IF EXISTS devilry__dbcache_shadow_dirty_group;
         """)
@@ -0,0 +1,40 @@
+-- Statement level version of devilry_dbcache_on_assignmentgroup_insert_trigger.
+--
+-- Creates the first FeedbackSet for all the inserted groups in a single
+-- INSERT, so that the FeedbackSet statement level triggers only fire once
+-- for a bulk insert of AssignmentGroups.
+DROP TRIGGER IF EXISTS devilry_dbcache_on_assignmentgroup_insert_trigger
+    ON core_assignmentgroup;
+
+CREATE OR REPLACE FUNCTION devilry__on_assignmentgroup_after_insert_statement() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO devilry_group_feedbackset (
+        group_id,
+        created_datetime,
+        deadline_datetime,
+        feedbackset_type,
+        gradeform_data_json,
+        ignored,
+        ignored_reason)
+    SELECT
+        new_assignmentgroups.id,
+        now(),
+        core_assignment.first_deadline,
+        'first_attempt',
+        '',
+        FALSE,
+        ''
+    FROM new_assignmentgroups
+    INNER JOIN core_assignment
+        ON core_assignment.id = new_assignmentgroups.parentnode_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_assignmentgroup_after_insert_statement_trigger
+    ON core_assignmentgroup;
+CREATE TRIGGER devilry__on_assignmentgroup_after_insert_statement_trigger
+    AFTER INSERT ON core_assignmentgroup
+    REFERENCING NEW TABLE AS new_assignmentgroups
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_assignmentgroup_after_insert_statement();
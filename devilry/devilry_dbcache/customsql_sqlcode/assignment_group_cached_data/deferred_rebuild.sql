@@ -0,0 +1,68 @@
+-- Deferred AssignmentGroupCachedData rebuilds.
+--
+-- When the devilry.dbcache_defer_rebuild setting is 'on' (set with
+-- set_config(..., true), so it only lasts for the current transaction),
+-- devilry__rebuild_assignmentgroupcacheddata() and
+-- devilry__rebuild_assignmentgroupcacheddata_for_groups() only record the
+-- group IDs in the devilry__dbcache_deferred_group queue table. The queue is
+-- processed by devilry__flush_deferred_assignmentgroupcacheddata(), which
+-- rebuilds each dirty group once.
+--
+-- The queue table is UNLOGGED because it only contains data for transactions
+-- that are in progress.
+CREATE UNLOGGED TABLE IF NOT EXISTS devilry__dbcache_deferred_group (
+    transaction_id bigint NOT NULL,
+    group_id integer NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS devilry__dbcache_deferred_group_transaction_id_idx
+    ON devilry__dbcache_deferred_group (transaction_id);
+
+
+CREATE OR REPLACE FUNCTION devilry__dbcache_rebuild_is_deferred()
+RETURNS boolean AS $$
+BEGIN
+    RETURN COALESCE(current_setting('devilry.dbcache_defer_rebuild', true), '') = 'on';
+END
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION devilry__dbcache_defer_rebuild(
+    param_group_ids integer[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO devilry__dbcache_deferred_group (
+        transaction_id,
+        group_id)
+    SELECT
+        txid_current(),
+        group_id
+    FROM unnest(param_group_ids) AS group_id
+    WHERE group_id IS NOT NULL;
+END
+$$ LANGUAGE plpgsql;
+
+
+-- Rebuild all the groups in the deferred rebuild queue for the current
+-- transaction, and empty the queue. Returns the number of rebuilt groups.
+CREATE OR REPLACE FUNCTION devilry__flush_deferred_assignmentgroupcacheddata()
+RETURNS integer AS $$
+DECLARE
+    var_group_ids integer[];
+BEGIN
+    WITH deferred_groups AS (
+        DELETE FROM devilry__dbcache_deferred_group
+        WHERE transaction_id = txid_current()
+        RETURNING group_id
+    )
+    SELECT array_agg(DISTINCT group_id)
+    FROM deferred_groups
+    INTO var_group_ids;
+
+    IF var_group_ids IS NULL THEN
+        RETURN 0;
+    END IF;
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups_immediately(var_group_ids);
+    RETURN array_length(var_group_ids, 1);
+END
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,41 @@
+-- Drop all the triggers created by the statement level
+-- AssignmentGroupCachedData maintenance mode. Used when
+-- switching back to row level maintenance.
+DROP TRIGGER IF EXISTS devilry__on_assignmentgroup_after_insert_statement_trigger
+    ON core_assignmentgroup;
+DROP TRIGGER IF EXISTS devilry__on_feedbackset_after_insert_statement_trigger
+    ON devilry_group_feedbackset;
+DROP TRIGGER IF EXISTS devilry__on_feedbackset_after_update_statement_trigger
+    ON devilry_group_feedbackset;
+DROP TRIGGER IF EXISTS devilry__on_feedbackset_after_delete_statement_trigger
+    ON devilry_group_feedbackset;
+DROP TRIGGER IF EXISTS devilry__on_groupcomment_after_insert_statement_trigger
+    ON devilry_group_groupcomment;
+DROP TRIGGER IF EXISTS devilry__on_groupcomment_after_update_statement_trigger
+    ON devilry_group_groupcomment;
+DROP TRIGGER IF EXISTS devilry__on_groupcomment_after_delete_statement_trigger
+    ON devilry_group_groupcomment;
+DROP TRIGGER IF EXISTS devilry__on_imageannotationcomment_after_insert_statement_trigger
+    ON devilry_group_imageannotationcomment;
+DROP TRIGGER IF EXISTS devilry__on_imageannotationcomment_after_update_statement_trigger
+    ON devilry_group_imageannotationcomment;
+DROP TRIGGER IF EXISTS devilry__on_imageannotationcomment_after_delete_statement_trigger
+    ON devilry_group_imageannotationcomment;
+DROP TRIGGER IF EXISTS devilry__on_commentfile_after_insert_statement_trigger
+    ON devilry_comment_commentfile;
+DROP TRIGGER IF EXISTS devilry__on_commentfile_after_update_statement_trigger
+    ON devilry_comment_commentfile;
+DROP TRIGGER IF EXISTS devilry__on_commentfile_after_delete_statement_trigger
+    ON devilry_comment_commentfile;
+DROP TRIGGER IF EXISTS devilry__on_examiner_after_insert_statement_trigger
+    ON core_assignmentgroup_examiners;
+DROP TRIGGER IF EXISTS devilry__on_examiner_after_update_statement_trigger
+    ON core_assignmentgroup_examiners;
+DROP TRIGGER IF EXISTS devilry__on_examiner_after_delete_statement_trigger
+    ON core_assignmentgroup_examiners;
+DROP TRIGGER IF EXISTS devilry__on_candidate_after_insert_statement_trigger
+    ON core_candidate;
+DROP TRIGGER IF EXISTS devilry__on_candidate_after_update_statement_trigger
+    ON core_candidate;
+DROP TRIGGER IF EXISTS devilry__on_candidate_after_delete_statement_trigger
+    ON core_candidate;
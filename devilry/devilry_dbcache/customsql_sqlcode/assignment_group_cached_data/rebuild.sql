@@ -1,340 +1,25 @@
 -- set log_error_verbosity=TERSE;
 
 
--- Takes the ID of an AssignmentGroup, and returns a
--- RECORD with all the attributes for the AssignmentGroupCachedData
--- model.
---
--- The RECORD is made using a SELECT query with sub-selects for each
--- attribute. So this is a bit expensive, but not overly so.
-CREATE OR REPLACE FUNCTION devilry__collect_groupcachedata(
-    param_group_id integer)
-RETURNS RECORD AS $$
-DECLARE
-    var_groupcachedata RECORD;
-BEGIN
-    SELECT
-        (
-            SELECT id
-            FROM devilry_group_feedbackset AS first_feedbackset
-            WHERE group_id = param_group_id
-            ORDER BY deadline_datetime ASC NULLS FIRST
-            LIMIT 1
-        ) AS first_feedbackset_id,
-        (
-            SELECT id
-            FROM devilry_group_feedbackset AS last_feedbackset
-            WHERE group_id = param_group_id and (
-              last_feedbackset.feedbackset_type = 'first_attempt' OR
-              last_feedbackset.feedbackset_type = 'new_attempt' OR
-              last_feedbackset.feedbackset_type = 're_edit'
-            )
-            ORDER BY deadline_datetime DESC NULLS LAST
-            LIMIT 1
-        ) AS last_feedbackset_id,
-        (
-            SELECT id
-            FROM devilry_group_feedbackset AS last_published_feedbackset
-            WHERE
-                group_id = param_group_id
-                AND
-                grading_published_datetime IS NOT NULL
-                AND (
-                  last_published_feedbackset.feedbackset_type = 'first_attempt' OR
-                  last_published_feedbackset.feedbackset_type = 'new_attempt' OR
-                  last_published_feedbackset.feedbackset_type = 're_edit'
-                )
-            ORDER BY deadline_datetime DESC NULLS LAST
-            LIMIT 1
-        ) AS last_published_feedbackset_id,
-        (
-            SELECT COUNT(id)
-            FROM devilry_group_feedbackset
-            WHERE
-                group_id = param_group_id
-                AND
-                feedbackset_type not like 'merge_%'
-                AND
-                feedbackset_type = 'new_attempt'
-        ) AS new_attempt_count,
-        (
-            SELECT COUNT(devilry_group_groupcomment.comment_ptr_id)
-            FROM devilry_group_groupcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_groupcomment.visibility = 'visible-to-everyone'
-        ) AS public_total_comment_count,
-        (
-            SELECT COUNT(devilry_group_groupcomment.comment_ptr_id)
-            FROM devilry_group_groupcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_groupcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.text != ''
-                AND
-                devilry_comment_comment.user_role = 'student'
-        ) AS public_student_comment_count,
-        (
-            SELECT COUNT(devilry_group_groupcomment.comment_ptr_id)
-            FROM devilry_group_groupcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_groupcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'examiner'
-        ) AS public_examiner_comment_count,
-        (
-            SELECT COUNT(devilry_group_groupcomment.comment_ptr_id)
-            FROM devilry_group_groupcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_groupcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'admin'
-        ) AS public_admin_comment_count,
-        (
-            SELECT COUNT(devilry_group_imageannotationcomment.comment_ptr_id)
-            FROM devilry_group_imageannotationcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
-        ) AS public_total_imageannotationcomment_count,
-        (
-            SELECT COUNT(devilry_group_imageannotationcomment.comment_ptr_id)
-            FROM devilry_group_imageannotationcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'student'
-        ) AS public_student_imageannotationcomment_count,
-        (
-            SELECT COUNT(devilry_group_imageannotationcomment.comment_ptr_id)
-            FROM devilry_group_imageannotationcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'examiner'
-        ) AS public_examiner_imageannotationcomment_count,
-        (
-            SELECT COUNT(devilry_group_imageannotationcomment.comment_ptr_id)
-            FROM devilry_group_imageannotationcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'admin'
-        ) AS public_admin_imageannotationcomment_count,
-        (
-            SELECT COUNT(devilry_comment_commentfile.id)
-            FROM devilry_comment_commentfile
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_comment_commentfile.comment_id
-            INNER JOIN devilry_group_groupcomment
-                ON devilry_group_groupcomment.comment_ptr_id = devilry_comment_comment.id
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_groupcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'student'
-        ) AS public_student_file_upload_count,
-        (
-            SELECT devilry_comment_comment.published_datetime
-            FROM devilry_group_groupcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_groupcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'student'
-            ORDER BY devilry_comment_comment.published_datetime DESC NULLS LAST
-            LIMIT 1
-        ) AS last_public_groupcomment_by_student_datetime,
-        (
-            SELECT devilry_comment_comment.published_datetime
-            FROM devilry_group_imageannotationcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'student'
-            ORDER BY devilry_comment_comment.published_datetime DESC NULLS LAST
-            LIMIT 1
-        ) AS last_public_imageannotationcomment_by_student_datetime,
-        (
-            SELECT devilry_comment_comment.published_datetime
-            FROM devilry_group_groupcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_groupcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'examiner'
-            ORDER BY devilry_comment_comment.published_datetime DESC NULLS LAST
-            LIMIT 1
-        ) AS last_public_groupcomment_by_examiner_datetime,
-        (
-            SELECT devilry_comment_comment.published_datetime
-            FROM devilry_group_imageannotationcomment
-            INNER JOIN devilry_group_feedbackset
-                ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
-            INNER JOIN devilry_comment_comment
-                ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
-            WHERE
-                devilry_group_feedbackset.group_id = param_group_id
-                AND
-                devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
-                AND
-                devilry_comment_comment.user_role = 'examiner'
-            ORDER BY devilry_comment_comment.published_datetime DESC NULLS LAST
-            LIMIT 1
-        ) AS last_public_imageannotationcomment_by_examiner_datetime,
-        (
-            SELECT COUNT(id)
-            FROM core_assignmentgroup_examiners
-            WHERE
-                assignmentgroup_id = param_group_id
-        ) AS examiner_count,
-        (
-            SELECT COUNT(id)
-            FROM core_candidate
-            WHERE
-                assignment_group_id = param_group_id
-        ) AS candidate_count
-
-    FROM core_assignmentgroup AS assignmentgroup
-    WHERE id = param_group_id
-    INTO var_groupcachedata;
-
-    RETURN var_groupcachedata;
-END
-$$ LANGUAGE plpgsql;
+-- The single group version of the collect function has been replaced
+-- by devilry__collect_groupcachedata_for_groups(), so that the aggregation
+-- SQL is only written once.
+DROP FUNCTION IF EXISTS devilry__collect_groupcachedata(integer);
 
 
+-- Rebuild AssignmentGroupCachedData for a single AssignmentGroup.
+--
+-- Uses the set based devilry__rebuild_assignmentgroupcacheddata_for_groups_immediately()
+-- with a single group ID.
 CREATE OR REPLACE FUNCTION devilry__rebuild_assignmentgroupcacheddata(
     param_group_id integer)
 RETURNS VOID AS $$
-DECLARE
-    var_groupcachedata RECORD;
-    var_last_public_comment_by_student_datetime timestamp with time zone;
-    var_last_public_comment_by_examiner_datetime timestamp with time zone;
-
 BEGIN
-    IF EXISTS (SELECT 1 FROM core_assignmentgroup WHERE id = param_group_id AND internal_is_being_deleted = true) THEN
+    IF devilry__dbcache_rebuild_is_deferred() THEN
+        PERFORM devilry__dbcache_defer_rebuild(ARRAY[param_group_id]);
         RETURN;
     END IF;
-
-    var_groupcachedata = devilry__collect_groupcachedata(param_group_id);
-    var_last_public_comment_by_student_datetime = devilry__largest_datetime(
-        var_groupcachedata.last_public_groupcomment_by_student_datetime,
-        var_groupcachedata.last_public_imageannotationcomment_by_student_datetime
-    );
-    var_last_public_comment_by_examiner_datetime = devilry__largest_datetime(
-        var_groupcachedata.last_public_groupcomment_by_examiner_datetime,
-        var_groupcachedata.last_public_imageannotationcomment_by_examiner_datetime
-    );
-    IF EXISTS (SELECT 1 FROM core_assignmentgroup WHERE id = param_group_id) THEN
-        INSERT INTO devilry_dbcache_assignmentgroupcacheddata (
-            group_id,
-            first_feedbackset_id,
-            last_feedbackset_id,
-            last_published_feedbackset_id,
-            new_attempt_count,
-            public_total_comment_count,
-            public_student_comment_count,
-            public_examiner_comment_count,
-            public_admin_comment_count,
-            public_student_file_upload_count,
-            last_public_comment_by_student_datetime,
-            last_public_comment_by_examiner_datetime,
-            examiner_count,
-            candidate_count)
-        VALUES (
-            param_group_id,
-            var_groupcachedata.first_feedbackset_id,
-            var_groupcachedata.last_feedbackset_id,
-            var_groupcachedata.last_published_feedbackset_id,
-            var_groupcachedata.new_attempt_count,
-            var_groupcachedata.public_total_comment_count + var_groupcachedata.public_total_imageannotationcomment_count,
-            var_groupcachedata.public_student_comment_count + var_groupcachedata.public_student_imageannotationcomment_count,
-            var_groupcachedata.public_examiner_comment_count + var_groupcachedata.public_examiner_imageannotationcomment_count,
-            var_groupcachedata.public_admin_comment_count + var_groupcachedata.public_admin_imageannotationcomment_count,
-            var_groupcachedata.public_student_file_upload_count,
-            var_last_public_comment_by_student_datetime,
-            var_last_public_comment_by_examiner_datetime,
-            var_groupcachedata.examiner_count,
-            var_groupcachedata.candidate_count
-        )
-        ON CONFLICT(group_id)
-        DO UPDATE SET
-            first_feedbackset_id = var_groupcachedata.first_feedbackset_id,
-            last_feedbackset_id = var_groupcachedata.last_feedbackset_id,
-            last_published_feedbackset_id = var_groupcachedata.last_published_feedbackset_id,
-            new_attempt_count = var_groupcachedata.new_attempt_count,
-            public_total_comment_count = var_groupcachedata.public_total_comment_count + var_groupcachedata.public_total_imageannotationcomment_count,
-            public_student_comment_count = var_groupcachedata.public_student_comment_count + var_groupcachedata.public_student_imageannotationcomment_count,
-            public_examiner_comment_count = var_groupcachedata.public_examiner_comment_count + var_groupcachedata.public_examiner_imageannotationcomment_count,
-            public_admin_comment_count = var_groupcachedata.public_admin_comment_count + var_groupcachedata.public_admin_imageannotationcomment_count,
-            public_student_file_upload_count = var_groupcachedata.public_student_file_upload_count,
-            last_public_comment_by_student_datetime = var_last_public_comment_by_student_datetime,
-            last_public_comment_by_examiner_datetime = var_last_public_comment_by_examiner_datetime,
-            examiner_count = var_groupcachedata.examiner_count,
-            candidate_count = var_groupcachedata.candidate_count;
-    END IF;
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups_immediately(ARRAY[param_group_id]);
 END
 $$ LANGUAGE plpgsql;
 
@@ -363,3 +48,379 @@ BEGIN
     RAISE NOTICE 'Rebuilding data cache for Period#% finished.', param_period_id;
 END
 $$ LANGUAGE plpgsql;
+
+
+-- Collect the AssignmentGroupCachedData attributes for an array of AssignmentGroup IDs.
+--
+-- Returns one row for each distinct group, with the same columns as the
+-- devilry_dbcache_assignmentgroupcacheddata table (except for the id).
+-- Groups that are being deleted are ignored.
+CREATE OR REPLACE FUNCTION devilry__collect_groupcachedata_for_groups(
+    param_group_ids integer[])
+RETURNS TABLE (
+    group_id integer,
+    first_feedbackset_id integer,
+    last_feedbackset_id integer,
+    last_published_feedbackset_id integer,
+    new_attempt_count bigint,
+    public_total_comment_count bigint,
+    public_student_comment_count bigint,
+    public_examiner_comment_count bigint,
+    public_admin_comment_count bigint,
+    public_student_file_upload_count bigint,
+    last_public_comment_by_student_datetime timestamp with time zone,
+    last_public_comment_by_examiner_datetime timestamp with time zone,
+    examiner_count bigint,
+    candidate_count bigint
+) AS $$
+    WITH groupcachedata AS (
+        SELECT
+            assignmentgroup.id AS group_id,
+            (
+                SELECT id
+                FROM devilry_group_feedbackset AS first_feedbackset
+                WHERE group_id = assignmentgroup.id
+                ORDER BY deadline_datetime ASC NULLS FIRST
+                LIMIT 1
+            ) AS first_feedbackset_id,
+            (
+                SELECT id
+                FROM devilry_group_feedbackset AS last_feedbackset
+                WHERE group_id = assignmentgroup.id and (
+                  last_feedbackset.feedbackset_type = 'first_attempt' OR
+                  last_feedbackset.feedbackset_type = 'new_attempt' OR
+                  last_feedbackset.feedbackset_type = 're_edit'
+                )
+                ORDER BY deadline_datetime DESC NULLS LAST
+                LIMIT 1
+            ) AS last_feedbackset_id,
+            (
+                SELECT id
+                FROM devilry_group_feedbackset AS last_published_feedbackset
+                WHERE
+                    group_id = assignmentgroup.id
+                    AND
+                    grading_published_datetime IS NOT NULL
+                    AND (
+                      last_published_feedbackset.feedbackset_type = 'first_attempt' OR
+                      last_published_feedbackset.feedbackset_type = 'new_attempt' OR
+                      last_published_feedbackset.feedbackset_type = 're_edit'
+                    )
+                ORDER BY deadline_datetime DESC NULLS LAST
+                LIMIT 1
+            ) AS last_published_feedbackset_id,
+            (
+                SELECT COUNT(id)
+                FROM devilry_group_feedbackset
+                WHERE
+                    group_id = assignmentgroup.id
+                    AND
+                    feedbackset_type not like 'merge_%'
+                    AND
+                    feedbackset_type = 'new_attempt'
+            ) AS new_attempt_count,
+            (
+                SELECT COUNT(devilry_group_groupcomment.comment_ptr_id)
+                FROM devilry_group_groupcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_groupcomment.visibility = 'visible-to-everyone'
+            ) AS public_total_comment_count,
+            (
+                SELECT COUNT(devilry_group_groupcomment.comment_ptr_id)
+                FROM devilry_group_groupcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_groupcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.text != ''
+                    AND
+                    devilry_comment_comment.user_role = 'student'
+            ) AS public_student_comment_count,
+            (
+                SELECT COUNT(devilry_group_groupcomment.comment_ptr_id)
+                FROM devilry_group_groupcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_groupcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'examiner'
+            ) AS public_examiner_comment_count,
+            (
+                SELECT COUNT(devilry_group_groupcomment.comment_ptr_id)
+                FROM devilry_group_groupcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_groupcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'admin'
+            ) AS public_admin_comment_count,
+            (
+                SELECT COUNT(devilry_group_imageannotationcomment.comment_ptr_id)
+                FROM devilry_group_imageannotationcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
+            ) AS public_total_imageannotationcomment_count,
+            (
+                SELECT COUNT(devilry_group_imageannotationcomment.comment_ptr_id)
+                FROM devilry_group_imageannotationcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'student'
+            ) AS public_student_imageannotationcomment_count,
+            (
+                SELECT COUNT(devilry_group_imageannotationcomment.comment_ptr_id)
+                FROM devilry_group_imageannotationcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'examiner'
+            ) AS public_examiner_imageannotationcomment_count,
+            (
+                SELECT COUNT(devilry_group_imageannotationcomment.comment_ptr_id)
+                FROM devilry_group_imageannotationcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'admin'
+            ) AS public_admin_imageannotationcomment_count,
+            (
+                SELECT COUNT(devilry_comment_commentfile.id)
+                FROM devilry_comment_commentfile
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_comment_commentfile.comment_id
+                INNER JOIN devilry_group_groupcomment
+                    ON devilry_group_groupcomment.comment_ptr_id = devilry_comment_comment.id
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_groupcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'student'
+            ) AS public_student_file_upload_count,
+            (
+                SELECT devilry_comment_comment.published_datetime
+                FROM devilry_group_groupcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_groupcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'student'
+                ORDER BY devilry_comment_comment.published_datetime DESC NULLS LAST
+                LIMIT 1
+            ) AS last_public_groupcomment_by_student_datetime,
+            (
+                SELECT devilry_comment_comment.published_datetime
+                FROM devilry_group_imageannotationcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'student'
+                ORDER BY devilry_comment_comment.published_datetime DESC NULLS LAST
+                LIMIT 1
+            ) AS last_public_imageannotationcomment_by_student_datetime,
+            (
+                SELECT devilry_comment_comment.published_datetime
+                FROM devilry_group_groupcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_groupcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_groupcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'examiner'
+                ORDER BY devilry_comment_comment.published_datetime DESC NULLS LAST
+                LIMIT 1
+            ) AS last_public_groupcomment_by_examiner_datetime,
+            (
+                SELECT devilry_comment_comment.published_datetime
+                FROM devilry_group_imageannotationcomment
+                INNER JOIN devilry_group_feedbackset
+                    ON devilry_group_feedbackset.id = devilry_group_imageannotationcomment.feedback_set_id
+                INNER JOIN devilry_comment_comment
+                    ON devilry_comment_comment.id = devilry_group_imageannotationcomment.comment_ptr_id
+                WHERE
+                    devilry_group_feedbackset.group_id = assignmentgroup.id
+                    AND
+                    devilry_group_imageannotationcomment.visibility = 'visible-to-everyone'
+                    AND
+                    devilry_comment_comment.user_role = 'examiner'
+                ORDER BY devilry_comment_comment.published_datetime DESC NULLS LAST
+                LIMIT 1
+            ) AS last_public_imageannotationcomment_by_examiner_datetime,
+            (
+                SELECT COUNT(id)
+                FROM core_assignmentgroup_examiners
+                WHERE
+                    assignmentgroup_id = assignmentgroup.id
+            ) AS examiner_count,
+            (
+                SELECT COUNT(id)
+                FROM core_candidate
+                WHERE
+                    assignment_group_id = assignmentgroup.id
+            ) AS candidate_count
+        FROM core_assignmentgroup AS assignmentgroup
+        WHERE
+            assignmentgroup.id = ANY(param_group_ids)
+            AND
+            assignmentgroup.internal_is_being_deleted IS NOT TRUE
+    )
+    SELECT
+        groupcachedata.group_id,
+        groupcachedata.first_feedbackset_id,
+        groupcachedata.last_feedbackset_id,
+        groupcachedata.last_published_feedbackset_id,
+        groupcachedata.new_attempt_count,
+        groupcachedata.public_total_comment_count + groupcachedata.public_total_imageannotationcomment_count,
+        groupcachedata.public_student_comment_count + groupcachedata.public_student_imageannotationcomment_count,
+        groupcachedata.public_examiner_comment_count + groupcachedata.public_examiner_imageannotationcomment_count,
+        groupcachedata.public_admin_comment_count + groupcachedata.public_admin_imageannotationcomment_count,
+        groupcachedata.public_student_file_upload_count,
+        devilry__largest_datetime(
+            groupcachedata.last_public_groupcomment_by_student_datetime,
+            groupcachedata.last_public_imageannotationcomment_by_student_datetime),
+        devilry__largest_datetime(
+            groupcachedata.last_public_groupcomment_by_examiner_datetime,
+            groupcachedata.last_public_imageannotationcomment_by_examiner_datetime),
+        groupcachedata.examiner_count,
+        groupcachedata.candidate_count
+    FROM groupcachedata;
+$$ LANGUAGE sql;
+
+
+-- Rebuild AssignmentGroupCachedData for an array of AssignmentGroup IDs.
+--
+-- This is the set based version of devilry__rebuild_assignmentgroupcacheddata().
+-- All the groups are rebuilt with a single INSERT ... SELECT, and each distinct
+-- group is only rebuilt once, no matter how many times it occurs in the array.
+--
+-- Ignores the devilry.dbcache_defer_rebuild setting. Use
+-- devilry__rebuild_assignmentgroupcacheddata_for_groups() unless you
+-- really want to rebuild right away.
+CREATE OR REPLACE FUNCTION devilry__rebuild_assignmentgroupcacheddata_for_groups_immediately(
+    param_group_ids integer[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO devilry_dbcache_assignmentgroupcacheddata (
+        group_id,
+        first_feedbackset_id,
+        last_feedbackset_id,
+        last_published_feedbackset_id,
+        new_attempt_count,
+        public_total_comment_count,
+        public_student_comment_count,
+        public_examiner_comment_count,
+        public_admin_comment_count,
+        public_student_file_upload_count,
+        last_public_comment_by_student_datetime,
+        last_public_comment_by_examiner_datetime,
+        examiner_count,
+        candidate_count)
+    SELECT
+        groupcachedata.group_id,
+        groupcachedata.first_feedbackset_id,
+        groupcachedata.last_feedbackset_id,
+        groupcachedata.last_published_feedbackset_id,
+        groupcachedata.new_attempt_count,
+        groupcachedata.public_total_comment_count,
+        groupcachedata.public_student_comment_count,
+        groupcachedata.public_examiner_comment_count,
+        groupcachedata.public_admin_comment_count,
+        groupcachedata.public_student_file_upload_count,
+        groupcachedata.last_public_comment_by_student_datetime,
+        groupcachedata.last_public_comment_by_examiner_datetime,
+        groupcachedata.examiner_count,
+        groupcachedata.candidate_count
+    FROM devilry__collect_groupcachedata_for_groups(param_group_ids) AS groupcachedata
+    ON CONFLICT(group_id)
+    DO UPDATE SET
+        first_feedbackset_id = EXCLUDED.first_feedbackset_id,
+        last_feedbackset_id = EXCLUDED.last_feedbackset_id,
+        last_published_feedbackset_id = EXCLUDED.last_published_feedbackset_id,
+        new_attempt_count = EXCLUDED.new_attempt_count,
+        public_total_comment_count = EXCLUDED.public_total_comment_count,
+        public_student_comment_count = EXCLUDED.public_student_comment_count,
+        public_examiner_comment_count = EXCLUDED.public_examiner_comment_count,
+        public_admin_comment_count = EXCLUDED.public_admin_comment_count,
+        public_student_file_upload_count = EXCLUDED.public_student_file_upload_count,
+        last_public_comment_by_student_datetime = EXCLUDED.last_public_comment_by_student_datetime,
+        last_public_comment_by_examiner_datetime = EXCLUDED.last_public_comment_by_examiner_datetime,
+        examiner_count = EXCLUDED.examiner_count,
+        candidate_count = EXCLUDED.candidate_count;
+END
+$$ LANGUAGE plpgsql;
+
+
+-- Rebuild AssignmentGroupCachedData for an array of AssignmentGroup IDs.
+--
+-- If rebuilds are deferred (see devilry__dbcache_rebuild_is_deferred()), the
+-- IDs are just added to the deferred rebuild queue.
+CREATE OR REPLACE FUNCTION devilry__rebuild_assignmentgroupcacheddata_for_groups(
+    param_group_ids integer[])
+RETURNS void AS $$
+BEGIN
+    IF devilry__dbcache_rebuild_is_deferred() THEN
+        PERFORM devilry__dbcache_defer_rebuild(param_group_ids);
+        RETURN;
+    END IF;
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups_immediately(param_group_ids);
+END
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,270 @@
+-- Rebuild of all the AssignmentGroupCachedData via a shadow table.
+--
+-- Used by devilry.devilry_dbcache.shadow_rebuild. The rebuild is split into
+-- chunks (one period or a range of group IDs per chunk), and each chunk is
+-- rebuilt into devilry__dbcache_shadow_assignmentgroupcacheddata in its own
+-- transaction. Completed chunks are marked in devilry__dbcache_shadow_rebuild_chunk,
+-- so an interrupted rebuild can be resumed.
+--
+-- While the rebuild is in progress, a trigger on the live table records the IDs of
+-- groups with changes in devilry__dbcache_shadow_dirty_group. These groups may have
+-- stale data in the shadow table, so they are rebuilt when the shadow table
+-- is swapped in.
+CREATE TABLE IF NOT EXISTS devilry__dbcache_shadow_assignmentgroupcacheddata (
+    group_id integer PRIMARY KEY,
+    first_feedbackset_id integer,
+    last_feedbackset_id integer,
+    last_published_feedbackset_id integer,
+    new_attempt_count integer NOT NULL,
+    public_total_comment_count integer NOT NULL,
+    public_student_comment_count integer NOT NULL,
+    public_examiner_comment_count integer NOT NULL,
+    public_admin_comment_count integer NOT NULL,
+    public_student_file_upload_count integer NOT NULL,
+    last_public_comment_by_student_datetime timestamp with time zone,
+    last_public_comment_by_examiner_datetime timestamp with time zone,
+    examiner_count integer NOT NULL,
+    candidate_count integer NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS devilry__dbcache_shadow_rebuild_chunk (
+    id serial PRIMARY KEY,
+    split_by varchar(20) NOT NULL,
+    range_start integer NOT NULL,
+    range_end integer NOT NULL,
+    group_count integer,
+    completed_datetime timestamp with time zone
+);
+
+CREATE TABLE IF NOT EXISTS devilry__dbcache_shadow_dirty_group (
+    group_id integer PRIMARY KEY
+);
+
+
+CREATE OR REPLACE FUNCTION devilry__on_assignmentgroupcacheddata_change_during_shadow_rebuild() RETURNS TRIGGER AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM devilry__dbcache_shadow_rebuild_chunk) THEN
+        INSERT INTO devilry__dbcache_shadow_dirty_group (group_id)
+        VALUES (NEW.group_id)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+
+-- Start a shadow rebuild. Adds the chunks, and the trigger that tracks
+-- changes to the live table.
+--
+-- param_split_by is 'period' or 'groupid'. param_chunk_size is only used
+-- for 'groupid'.
+CREATE OR REPLACE FUNCTION devilry__shadow_rebuild_assignmentgroupcacheddata_start(
+    param_split_by text,
+    param_chunk_size integer)
+RETURNS integer AS $$
+DECLARE
+    var_min_group_id integer;
+    var_max_group_id integer;
+BEGIN
+    DELETE FROM devilry__dbcache_shadow_rebuild_chunk;
+    DELETE FROM devilry__dbcache_shadow_dirty_group;
+    TRUNCATE devilry__dbcache_shadow_assignmentgroupcacheddata;
+
+    DROP TRIGGER IF EXISTS devilry__on_assignmentgroupcacheddata_change_during_shadow_rebuild_trigger
+        ON devilry_dbcache_assignmentgroupcacheddata;
+    CREATE TRIGGER devilry__on_assignmentgroupcacheddata_change_during_shadow_rebuild_trigger
+        AFTER INSERT OR UPDATE ON devilry_dbcache_assignmentgroupcacheddata
+        FOR EACH ROW
+            EXECUTE PROCEDURE devilry__on_assignmentgroupcacheddata_change_during_shadow_rebuild();
+
+    IF param_split_by = 'period' THEN
+        INSERT INTO devilry__dbcache_shadow_rebuild_chunk (split_by, range_start, range_end)
+        SELECT 'period', id, id
+        FROM core_period
+        ORDER BY start_time DESC;
+    ELSIF param_split_by = 'groupid' THEN
+        SELECT MIN(id), MAX(id)
+        FROM core_assignmentgroup
+        INTO var_min_group_id, var_max_group_id;
+        IF var_min_group_id IS NOT NULL THEN
+            INSERT INTO devilry__dbcache_shadow_rebuild_chunk (split_by, range_start, range_end)
+            SELECT 'groupid', range_start, range_start + param_chunk_size
+            FROM generate_series(var_min_group_id, var_max_group_id, param_chunk_size) AS range_start
+            ORDER BY range_start DESC;
+        END IF;
+    ELSE
+        RAISE EXCEPTION 'Invalid param_split_by: %', param_split_by;
+    END IF;
+
+    RETURN (SELECT COUNT(*) FROM devilry__dbcache_shadow_rebuild_chunk);
+END
+$$ LANGUAGE plpgsql;
+
+
+-- Rebuild a single chunk into the shadow table, and mark the chunk as completed.
+-- Returns the number of groups in the chunk.
+CREATE OR REPLACE FUNCTION devilry__shadow_rebuild_assignmentgroupcacheddata_chunk(
+    param_chunk_id integer)
+RETURNS integer AS $$
+DECLARE
+    var_chunk devilry__dbcache_shadow_rebuild_chunk;
+    var_group_ids integer[];
+BEGIN
+    SELECT *
+    FROM devilry__dbcache_shadow_rebuild_chunk
+    WHERE id = param_chunk_id
+    INTO var_chunk;
+
+    IF var_chunk.split_by = 'period' THEN
+        var_group_ids = ARRAY(
+            SELECT core_assignmentgroup.id
+            FROM core_assignmentgroup
+            INNER JOIN core_assignment
+                ON core_assignment.id = core_assignmentgroup.parentnode_id
+            WHERE
+                core_assignment.parentnode_id = var_chunk.range_start
+        );
+    ELSE
+        var_group_ids = ARRAY(
+            SELECT id
+            FROM core_assignmentgroup
+            WHERE
+                id >= var_chunk.range_start
+                AND
+                id < var_chunk.range_end
+        );
+    END IF;
+
+    INSERT INTO devilry__dbcache_shadow_assignmentgroupcacheddata
+    SELECT *
+    FROM devilry__collect_groupcachedata_for_groups(var_group_ids)
+    ON CONFLICT(group_id)
+    DO UPDATE SET
+        first_feedbackset_id = EXCLUDED.first_feedbackset_id,
+        last_feedbackset_id = EXCLUDED.last_feedbackset_id,
+        last_published_feedbackset_id = EXCLUDED.last_published_feedbackset_id,
+        new_attempt_count = EXCLUDED.new_attempt_count,
+        public_total_comment_count = EXCLUDED.public_total_comment_count,
+        public_student_comment_count = EXCLUDED.public_student_comment_count,
+        public_examiner_comment_count = EXCLUDED.public_examiner_comment_count,
+        public_admin_comment_count = EXCLUDED.public_admin_comment_count,
+        public_student_file_upload_count = EXCLUDED.public_student_file_upload_count,
+        last_public_comment_by_student_datetime = EXCLUDED.last_public_comment_by_student_datetime,
+        last_public_comment_by_examiner_datetime = EXCLUDED.last_public_comment_by_examiner_datetime,
+        examiner_count = EXCLUDED.examiner_count,
+        candidate_count = EXCLUDED.candidate_count;
+
+    UPDATE devilry__dbcache_shadow_rebuild_chunk
+    SET
+        group_count = COALESCE(array_length(var_group_ids, 1), 0),
+        completed_datetime = now()
+    WHERE id = param_chunk_id;
+
+    RETURN COALESCE(array_length(var_group_ids, 1), 0);
+END
+$$ LANGUAGE plpgsql;
+
+
+-- Swap the shadow table into devilry_dbcache_assignmentgroupcacheddata.
+--
+-- The shadow data is merged into the live table in a single transaction, so the live
+-- table is never empty. We do not swap the tables with RENAME, because that would
+-- break the foreign keys, indexes and the id sequence owned by the Django managed table.
+-- Groups that changed during the rebuild are rebuilt from scratch after the merge.
+--
+-- Must be called in a transaction. Returns the number of groups that was merged.
+CREATE OR REPLACE FUNCTION devilry__shadow_rebuild_assignmentgroupcacheddata_swap()
+RETURNS integer AS $$
+DECLARE
+    var_merged_count integer;
+BEGIN
+    IF EXISTS (SELECT 1 FROM devilry__dbcache_shadow_rebuild_chunk WHERE completed_datetime IS NULL) THEN
+        RAISE EXCEPTION 'Can not swap in the shadow AssignmentGroupCachedData table - not all chunks are completed.';
+    END IF;
+
+    -- Block concurrent writes to the cached data until we commit. Reads are still allowed.
+    LOCK TABLE devilry_dbcache_assignmentgroupcacheddata IN EXCLUSIVE MODE;
+
+    -- Stop tracking changes.
+    DELETE FROM devilry__dbcache_shadow_rebuild_chunk;
+
+    INSERT INTO devilry_dbcache_assignmentgroupcacheddata (
+        group_id,
+        first_feedbackset_id,
+        last_feedbackset_id,
+        last_published_feedbackset_id,
+        new_attempt_count,
+        public_total_comment_count,
+        public_student_comment_count,
+        public_examiner_comment_count,
+        public_admin_comment_count,
+        public_student_file_upload_count,
+        last_public_comment_by_student_datetime,
+        last_public_comment_by_examiner_datetime,
+        examiner_count,
+        candidate_count)
+    SELECT
+        shadow.group_id,
+        shadow.first_feedbackset_id,
+        shadow.last_feedbackset_id,
+        shadow.last_published_feedbackset_id,
+        shadow.new_attempt_count,
+        shadow.public_total_comment_count,
+        shadow.public_student_comment_count,
+        shadow.public_examiner_comment_count,
+        shadow.public_admin_comment_count,
+        shadow.public_student_file_upload_count,
+        shadow.last_public_comment_by_student_datetime,
+        shadow.last_public_comment_by_examiner_datetime,
+        shadow.examiner_count,
+        shadow.candidate_count
+    FROM devilry__dbcache_shadow_assignmentgroupcacheddata AS shadow
+    WHERE
+        NOT EXISTS (
+            SELECT 1
+            FROM devilry__dbcache_shadow_dirty_group
+            WHERE group_id = shadow.group_id
+        )
+        AND
+        EXISTS (
+            SELECT 1
+            FROM core_assignmentgroup
+            WHERE id = shadow.group_id
+        )
+    ON CONFLICT(group_id)
+    DO UPDATE SET
+        first_feedbackset_id = EXCLUDED.first_feedbackset_id,
+        last_feedbackset_id = EXCLUDED.last_feedbackset_id,
+        last_published_feedbackset_id = EXCLUDED.last_published_feedbackset_id,
+        new_attempt_count = EXCLUDED.new_attempt_count,
+        public_total_comment_count = EXCLUDED.public_total_comment_count,
+        public_student_comment_count = EXCLUDED.public_student_comment_count,
+        public_examiner_comment_count = EXCLUDED.public_examiner_comment_count,
+        public_admin_comment_count = EXCLUDED.public_admin_comment_count,
+        public_student_file_upload_count = EXCLUDED.public_student_file_upload_count,
+        last_public_comment_by_student_datetime = EXCLUDED.last_public_comment_by_student_datetime,
+        last_public_comment_by_examiner_datetime = EXCLUDED.last_public_comment_by_examiner_datetime,
+        examiner_count = EXCLUDED.examiner_count,
+        candidate_count = EXCLUDED.candidate_count;
+    GET DIAGNOSTICS var_merged_count = ROW_COUNT;
+
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups_immediately(
+        ARRAY(SELECT group_id FROM devilry__dbcache_shadow_dirty_group));
+
+    DELETE FROM devilry__dbcache_shadow_dirty_group;
+    TRUNCATE devilry__dbcache_shadow_assignmentgroupcacheddata;
+    RETURN var_merged_count;
+END
+$$ LANGUAGE plpgsql;
+
+
+-- Remove the change tracking trigger. Run this in a separate transaction after
+-- devilry__shadow_rebuild_assignmentgroupcacheddata_swap() to avoid holding
+-- an ACCESS EXCLUSIVE lock on the live table while swapping.
+CREATE OR REPLACE FUNCTION devilry__shadow_rebuild_assignmentgroupcacheddata_finish()
+RETURNS void AS $$
+BEGIN
+    DROP TRIGGER IF EXISTS devilry__on_assignmentgroupcacheddata_change_during_shadow_rebuild_trigger
+        ON devilry_dbcache_assignmentgroupcacheddata;
+END
+$$ LANGUAGE plpgsql;
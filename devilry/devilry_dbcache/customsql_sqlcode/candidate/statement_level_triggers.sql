@@ -0,0 +1,99 @@
+-- Statement level replacements for the row level Candidate
+-- AssignmentGroupCachedData triggers.
+--
+-- Inserts and deletes are applied as deltas to candidate_count.
+-- Updates that move candidates between groups rebuild each
+-- affected group once per statement.
+DROP TRIGGER IF EXISTS devilry__on_candidate_after_insert_or_update
+    ON core_candidate;
+DROP TRIGGER IF EXISTS devilry__on_candidate_after_delete
+    ON core_candidate;
+
+
+CREATE OR REPLACE FUNCTION devilry__on_candidate_after_insert_statement() RETURNS TRIGGER AS $$
+BEGIN
+    WITH candidate_deltas AS (
+        SELECT
+            assignment_group_id AS group_id,
+            COUNT(*) AS candidate_count
+        FROM new_candidates
+        GROUP BY assignment_group_id
+    )
+    UPDATE devilry_dbcache_assignmentgroupcacheddata AS cached_data
+    SET
+        candidate_count = cached_data.candidate_count + candidate_deltas.candidate_count
+    FROM candidate_deltas
+    WHERE cached_data.group_id = candidate_deltas.group_id;
+
+    -- Groups without cached data can not be updated with deltas.
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT assignment_group_id
+            FROM new_candidates
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM devilry_dbcache_assignmentgroupcacheddata
+                WHERE group_id = new_candidates.assignment_group_id
+            )
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_candidate_after_insert_statement_trigger
+    ON core_candidate;
+CREATE TRIGGER devilry__on_candidate_after_insert_statement_trigger
+    AFTER INSERT ON core_candidate
+    REFERENCING NEW TABLE AS new_candidates
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_candidate_after_insert_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_candidate_after_update_statement() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT unnest(ARRAY[new_candidates.assignment_group_id, old_candidates.assignment_group_id])
+            FROM new_candidates
+            INNER JOIN old_candidates
+                ON old_candidates.id = new_candidates.id
+            WHERE new_candidates.assignment_group_id != old_candidates.assignment_group_id
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_candidate_after_update_statement_trigger
+    ON core_candidate;
+CREATE TRIGGER devilry__on_candidate_after_update_statement_trigger
+    AFTER UPDATE ON core_candidate
+    REFERENCING OLD TABLE AS old_candidates NEW TABLE AS new_candidates
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_candidate_after_update_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_candidate_after_delete_statement() RETURNS TRIGGER AS $$
+BEGIN
+    WITH candidate_deltas AS (
+        SELECT
+            assignment_group_id AS group_id,
+            COUNT(*) AS candidate_count
+        FROM old_candidates
+        GROUP BY assignment_group_id
+    )
+    UPDATE devilry_dbcache_assignmentgroupcacheddata AS cached_data
+    SET
+        candidate_count = GREATEST(cached_data.candidate_count - candidate_deltas.candidate_count, 0)
+    FROM candidate_deltas
+    WHERE cached_data.group_id = candidate_deltas.group_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_candidate_after_delete_statement_trigger
+    ON core_candidate;
+CREATE TRIGGER devilry__on_candidate_after_delete_statement_trigger
+    AFTER DELETE ON core_candidate
+    REFERENCING OLD TABLE AS old_candidates
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_candidate_after_delete_statement();
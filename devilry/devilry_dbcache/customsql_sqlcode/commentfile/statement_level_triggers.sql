@@ -0,0 +1,114 @@
+-- Statement level replacements for the row level CommentFile
+-- AssignmentGroupCachedData triggers.
+--
+-- Inserts are applied as a delta to public_student_file_upload_count.
+-- Updates and deletes rebuild each affected group once per statement.
+DROP TRIGGER IF EXISTS devilry__on_commentfile_after_insert_or_update_trigger
+    ON devilry_comment_commentfile;
+DROP TRIGGER IF EXISTS devilry__on_commentfile_after_delete
+    ON devilry_comment_commentfile;
+
+
+CREATE OR REPLACE FUNCTION devilry__on_commentfile_after_insert_statement() RETURNS TRIGGER AS $$
+BEGIN
+    WITH commentfile_deltas AS (
+        SELECT
+            devilry_group_feedbackset.group_id AS group_id,
+            COUNT(*) AS public_student_file_upload_count
+        FROM new_commentfiles
+        INNER JOIN devilry_comment_comment
+            ON devilry_comment_comment.id = new_commentfiles.comment_id
+        INNER JOIN devilry_group_groupcomment
+            ON devilry_group_groupcomment.comment_ptr_id = devilry_comment_comment.id
+        INNER JOIN devilry_group_feedbackset
+            ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+        WHERE
+            devilry_group_groupcomment.visibility = 'visible-to-everyone'
+            AND
+            devilry_comment_comment.user_role = 'student'
+        GROUP BY devilry_group_feedbackset.group_id
+    )
+    UPDATE devilry_dbcache_assignmentgroupcacheddata AS cached_data
+    SET
+        public_student_file_upload_count = cached_data.public_student_file_upload_count + commentfile_deltas.public_student_file_upload_count
+    FROM commentfile_deltas
+    WHERE cached_data.group_id = commentfile_deltas.group_id;
+
+    -- Groups without cached data can not be updated with deltas.
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT devilry_group_feedbackset.group_id
+            FROM new_commentfiles
+            INNER JOIN devilry_group_groupcomment
+                ON devilry_group_groupcomment.comment_ptr_id = new_commentfiles.comment_id
+            INNER JOIN devilry_group_feedbackset
+                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM devilry_dbcache_assignmentgroupcacheddata
+                WHERE group_id = devilry_group_feedbackset.group_id
+            )
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_commentfile_after_insert_statement_trigger
+    ON devilry_comment_commentfile;
+CREATE TRIGGER devilry__on_commentfile_after_insert_statement_trigger
+    AFTER INSERT ON devilry_comment_commentfile
+    REFERENCING NEW TABLE AS new_commentfiles
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_commentfile_after_insert_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_commentfile_after_update_statement() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT devilry_group_feedbackset.group_id
+            FROM devilry_group_groupcomment
+            INNER JOIN devilry_group_feedbackset
+                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+            WHERE devilry_group_groupcomment.comment_ptr_id IN (
+                SELECT comment_id FROM new_commentfiles
+                UNION
+                SELECT comment_id FROM old_commentfiles
+            )
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_commentfile_after_update_statement_trigger
+    ON devilry_comment_commentfile;
+CREATE TRIGGER devilry__on_commentfile_after_update_statement_trigger
+    AFTER UPDATE ON devilry_comment_commentfile
+    REFERENCING OLD TABLE AS old_commentfiles NEW TABLE AS new_commentfiles
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_commentfile_after_update_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_commentfile_after_delete_statement() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT devilry_group_feedbackset.group_id
+            FROM devilry_group_groupcomment
+            INNER JOIN devilry_group_feedbackset
+                ON devilry_group_feedbackset.id = devilry_group_groupcomment.feedback_set_id
+            WHERE devilry_group_groupcomment.comment_ptr_id IN (
+                SELECT comment_id FROM old_commentfiles
+            )
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_commentfile_after_delete_statement_trigger
+    ON devilry_comment_commentfile;
+CREATE TRIGGER devilry__on_commentfile_after_delete_statement_trigger
+    AFTER DELETE ON devilry_comment_commentfile
+    REFERENCING OLD TABLE AS old_commentfiles
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_commentfile_after_delete_statement();
@@ -0,0 +1,99 @@
+-- Statement level replacements for the row level Examiner
+-- AssignmentGroupCachedData triggers.
+--
+-- Inserts and deletes are applied as deltas to examiner_count.
+-- Updates that move examiners between groups rebuild each
+-- affected group once per statement.
+DROP TRIGGER IF EXISTS devilry__on_examiner_after_insert_or_update
+    ON core_assignmentgroup_examiners;
+DROP TRIGGER IF EXISTS devilry__on_examiner_after_delete
+    ON core_assignmentgroup_examiners;
+
+
+CREATE OR REPLACE FUNCTION devilry__on_examiner_after_insert_statement() RETURNS TRIGGER AS $$
+BEGIN
+    WITH examiner_deltas AS (
+        SELECT
+            assignmentgroup_id AS group_id,
+            COUNT(*) AS examiner_count
+        FROM new_examiners
+        GROUP BY assignmentgroup_id
+    )
+    UPDATE devilry_dbcache_assignmentgroupcacheddata AS cached_data
+    SET
+        examiner_count = cached_data.examiner_count + examiner_deltas.examiner_count
+    FROM examiner_deltas
+    WHERE cached_data.group_id = examiner_deltas.group_id;
+
+    -- Groups without cached data can not be updated with deltas.
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT assignmentgroup_id
+            FROM new_examiners
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM devilry_dbcache_assignmentgroupcacheddata
+                WHERE group_id = new_examiners.assignmentgroup_id
+            )
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_examiner_after_insert_statement_trigger
+    ON core_assignmentgroup_examiners;
+CREATE TRIGGER devilry__on_examiner_after_insert_statement_trigger
+    AFTER INSERT ON core_assignmentgroup_examiners
+    REFERENCING NEW TABLE AS new_examiners
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_examiner_after_insert_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_examiner_after_update_statement() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT unnest(ARRAY[new_examiners.assignmentgroup_id, old_examiners.assignmentgroup_id])
+            FROM new_examiners
+            INNER JOIN old_examiners
+                ON old_examiners.id = new_examiners.id
+            WHERE new_examiners.assignmentgroup_id != old_examiners.assignmentgroup_id
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_examiner_after_update_statement_trigger
+    ON core_assignmentgroup_examiners;
+CREATE TRIGGER devilry__on_examiner_after_update_statement_trigger
+    AFTER UPDATE ON core_assignmentgroup_examiners
+    REFERENCING OLD TABLE AS old_examiners NEW TABLE AS new_examiners
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_examiner_after_update_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_examiner_after_delete_statement() RETURNS TRIGGER AS $$
+BEGIN
+    WITH examiner_deltas AS (
+        SELECT
+            assignmentgroup_id AS group_id,
+            COUNT(*) AS examiner_count
+        FROM old_examiners
+        GROUP BY assignmentgroup_id
+    )
+    UPDATE devilry_dbcache_assignmentgroupcacheddata AS cached_data
+    SET
+        examiner_count = GREATEST(cached_data.examiner_count - examiner_deltas.examiner_count, 0)
+    FROM examiner_deltas
+    WHERE cached_data.group_id = examiner_deltas.group_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_examiner_after_delete_statement_trigger
+    ON core_assignmentgroup_examiners;
+CREATE TRIGGER devilry__on_examiner_after_delete_statement_trigger
+    AFTER DELETE ON core_assignmentgroup_examiners
+    REFERENCING OLD TABLE AS old_examiners
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_examiner_after_delete_statement();
@@ -0,0 +1,66 @@
+-- Statement level replacements for the row level FeedbackSet
+-- AssignmentGroupCachedData triggers.
+--
+-- first_feedbackset, last_feedbackset and last_published_feedbackset depend on
+-- the ordering of all the FeedbackSets in the group, so we can not maintain them
+-- with deltas. Instead we rebuild each affected group once per statement
+-- instead of once per row.
+DROP TRIGGER IF EXISTS devilry__on_feedbackset_after_insert_or_update_trigger
+    ON devilry_group_feedbackset;
+DROP TRIGGER IF EXISTS devilry__on_feedbackset_after_delete
+    ON devilry_group_feedbackset;
+
+
+CREATE OR REPLACE FUNCTION devilry__on_feedbackset_after_insert_statement() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(SELECT group_id FROM new_feedbacksets));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_feedbackset_after_insert_statement_trigger
+    ON devilry_group_feedbackset;
+CREATE TRIGGER devilry__on_feedbackset_after_insert_statement_trigger
+    AFTER INSERT ON devilry_group_feedbackset
+    REFERENCING NEW TABLE AS new_feedbacksets
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_feedbackset_after_insert_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_feedbackset_after_update_statement() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT group_id FROM new_feedbacksets
+            UNION
+            SELECT group_id FROM old_feedbacksets
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_feedbackset_after_update_statement_trigger
+    ON devilry_group_feedbackset;
+CREATE TRIGGER devilry__on_feedbackset_after_update_statement_trigger
+    AFTER UPDATE ON devilry_group_feedbackset
+    REFERENCING OLD TABLE AS old_feedbacksets NEW TABLE AS new_feedbacksets
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_feedbackset_after_update_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_feedbackset_after_delete_statement() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(SELECT group_id FROM old_feedbacksets));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_feedbackset_after_delete_statement_trigger
+    ON devilry_group_feedbackset;
+CREATE TRIGGER devilry__on_feedbackset_after_delete_statement_trigger
+    AFTER DELETE ON devilry_group_feedbackset
+    REFERENCING OLD TABLE AS old_feedbacksets
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_feedbackset_after_delete_statement();
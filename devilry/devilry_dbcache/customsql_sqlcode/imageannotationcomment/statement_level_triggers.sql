@@ -0,0 +1,131 @@
+-- Statement level replacements for the row level ImageAnnotationComment
+-- AssignmentGroupCachedData triggers.
+--
+-- Inserts are applied as deltas to the comment counters and the
+-- last comment datetimes. Updates and deletes can not be applied
+-- as deltas (a comment may change visibility, and we can not know
+-- the previous last comment datetime), so we rebuild each affected
+-- group once per statement.
+DROP TRIGGER IF EXISTS devilry__on_imageannotationcomment_after_insert_or_update_trigger
+    ON devilry_group_imageannotationcomment;
+DROP TRIGGER IF EXISTS devilry__on_imageannotationcomment_after_delete
+    ON devilry_group_imageannotationcomment;
+
+
+CREATE OR REPLACE FUNCTION devilry__on_imageannotationcomment_after_insert_statement() RETURNS TRIGGER AS $$
+BEGIN
+    WITH imageannotationcomment_deltas AS (
+        SELECT
+            devilry_group_feedbackset.group_id AS group_id,
+            COUNT(*) AS public_total_comment_count,
+            COUNT(*) FILTER (
+                WHERE devilry_comment_comment.user_role = 'student'
+            ) AS public_student_comment_count,
+            COUNT(*) FILTER (
+                WHERE devilry_comment_comment.user_role = 'examiner'
+            ) AS public_examiner_comment_count,
+            COUNT(*) FILTER (
+                WHERE devilry_comment_comment.user_role = 'admin'
+            ) AS public_admin_comment_count,
+            MAX(devilry_comment_comment.published_datetime) FILTER (
+                WHERE devilry_comment_comment.user_role = 'student'
+            ) AS last_public_comment_by_student_datetime,
+            MAX(devilry_comment_comment.published_datetime) FILTER (
+                WHERE devilry_comment_comment.user_role = 'examiner'
+            ) AS last_public_comment_by_examiner_datetime
+        FROM new_imageannotationcomments
+        INNER JOIN devilry_group_feedbackset
+            ON devilry_group_feedbackset.id = new_imageannotationcomments.feedback_set_id
+        INNER JOIN devilry_comment_comment
+            ON devilry_comment_comment.id = new_imageannotationcomments.comment_ptr_id
+        WHERE
+            new_imageannotationcomments.visibility = 'visible-to-everyone'
+        GROUP BY devilry_group_feedbackset.group_id
+    )
+    UPDATE devilry_dbcache_assignmentgroupcacheddata AS cached_data
+    SET
+        public_total_comment_count = cached_data.public_total_comment_count + imageannotationcomment_deltas.public_total_comment_count,
+        public_student_comment_count = cached_data.public_student_comment_count + imageannotationcomment_deltas.public_student_comment_count,
+        public_examiner_comment_count = cached_data.public_examiner_comment_count + imageannotationcomment_deltas.public_examiner_comment_count,
+        public_admin_comment_count = cached_data.public_admin_comment_count + imageannotationcomment_deltas.public_admin_comment_count,
+        last_public_comment_by_student_datetime = devilry__largest_datetime(
+            cached_data.last_public_comment_by_student_datetime,
+            imageannotationcomment_deltas.last_public_comment_by_student_datetime),
+        last_public_comment_by_examiner_datetime = devilry__largest_datetime(
+            cached_data.last_public_comment_by_examiner_datetime,
+            imageannotationcomment_deltas.last_public_comment_by_examiner_datetime)
+    FROM imageannotationcomment_deltas
+    WHERE cached_data.group_id = imageannotationcomment_deltas.group_id;
+
+    -- Groups without cached data can not be updated with deltas.
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT devilry_group_feedbackset.group_id
+            FROM new_imageannotationcomments
+            INNER JOIN devilry_group_feedbackset
+                ON devilry_group_feedbackset.id = new_imageannotationcomments.feedback_set_id
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM devilry_dbcache_assignmentgroupcacheddata
+                WHERE group_id = devilry_group_feedbackset.group_id
+            )
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_imageannotationcomment_after_insert_statement_trigger
+    ON devilry_group_imageannotationcomment;
+CREATE TRIGGER devilry__on_imageannotationcomment_after_insert_statement_trigger
+    AFTER INSERT ON devilry_group_imageannotationcomment
+    REFERENCING NEW TABLE AS new_imageannotationcomments
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_imageannotationcomment_after_insert_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_imageannotationcomment_after_update_statement() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT devilry_group_feedbackset.group_id
+            FROM devilry_group_feedbackset
+            WHERE devilry_group_feedbackset.id IN (
+                SELECT feedback_set_id FROM new_imageannotationcomments
+                UNION
+                SELECT feedback_set_id FROM old_imageannotationcomments
+            )
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_imageannotationcomment_after_update_statement_trigger
+    ON devilry_group_imageannotationcomment;
+CREATE TRIGGER devilry__on_imageannotationcomment_after_update_statement_trigger
+    AFTER UPDATE ON devilry_group_imageannotationcomment
+    REFERENCING OLD TABLE AS old_imageannotationcomments NEW TABLE AS new_imageannotationcomments
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_imageannotationcomment_after_update_statement();
+
+
+CREATE OR REPLACE FUNCTION devilry__on_imageannotationcomment_after_delete_statement() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM devilry__rebuild_assignmentgroupcacheddata_for_groups(
+        ARRAY(
+            SELECT devilry_group_feedbackset.group_id
+            FROM devilry_group_feedbackset
+            WHERE devilry_group_feedbackset.id IN (
+                SELECT feedback_set_id FROM old_imageannotationcomments
+            )
+        ));
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS devilry__on_imageannotationcomment_after_delete_statement_trigger
+    ON devilry_group_imageannotationcomment;
+CREATE TRIGGER devilry__on_imageannotationcomment_after_delete_statement_trigger
+    AFTER DELETE ON devilry_group_imageannotationcomment
+    REFERENCING OLD TABLE AS old_imageannotationcomments
+    FOR EACH STATEMENT
+        EXECUTE PROCEDURE devilry__on_imageannotationcomment_after_delete_statement();
@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+from django.db import transaction
+from django.dispatch import Signal
+
+#: Sent by :func:`.flush_deferred_dbcache_rebuild` after the cached data for the
+#: groups has been rebuilt. ``group_ids`` is a list with the IDs of the rebuilt groups
+#: (including groups deleted within the transaction). Bulk operations deferring the
+#: rebuild do not send the ``post_save``/``post_delete`` signals for all the changed
+#: objects, so use this to react to changes to groups made by bulk operations.
+deferred_dbcache_rebuild_flushed = Signal(providing_args=['group_ids', 'using'])
+
+
+def _get_defer_rebuild_setting(cursor):
+    cursor.execute("SELECT current_setting('devilry.dbcache_defer_rebuild', true)")
+    return cursor.fetchone()[0]
+
+
+def _set_defer_rebuild_setting(cursor, value):
+    cursor.execute("SELECT set_config('devilry.dbcache_defer_rebuild', %s, true)", [value])
+
+
+def flush_deferred_dbcache_rebuild(using=DEFAULT_DB_ALIAS):
+    """
+    Rebuild the :class:`devilry.devilry_dbcache.models.AssignmentGroupCachedData`
+    for all groups that has been marked as dirty within the current transaction
+    while rebuilds was deferred.
+
+    Each dirty group is rebuilt exactly once, with a single set based query.
+    Sends the :obj:`.deferred_dbcache_rebuild_flushed` signal if any groups were rebuilt.
+
+    Args:
+        using: The database alias.
+
+    Returns:
+        int: The number of groups that was rebuilt.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT DISTINCT group_id FROM devilry__dbcache_deferred_group '
+                       'WHERE transaction_id = txid_current()')
+        group_ids = [row[0] for row in cursor.fetchall()]
+        if not group_ids:
+            return 0
+        cursor.execute('SELECT devilry__flush_deferred_assignmentgroupcacheddata()')
+        rebuilt_count = cursor.fetchone()[0]
+    deferred_dbcache_rebuild_flushed.send(sender=None, group_ids=group_ids, using=using)
+    return rebuilt_count
+
+
+@contextmanager
+def defer_dbcache_rebuild(using=DEFAULT_DB_ALIAS):
+    """
+    Context manager that defers rebuilding of
+    :class:`devilry.devilry_dbcache.models.AssignmentGroupCachedData`.
+
+    Within the context, the devilry_dbcache triggers only record the IDs of the
+    changed groups. When the context exits, all the recorded groups are
+    rebuilt once (see :func:`.flush_deferred_dbcache_rebuild`). Use this
+    for bulk operations that would otherwise rebuild the same groups
+    over and over.
+
+    The context runs in a transaction (``transaction.atomic``), and the cached
+    data is rebuilt before the transaction commits. This means that the cached
+    data is **stale within the context**, so do not use ``cached_data`` for
+    groups you change within the context. Call
+    :func:`.flush_deferred_dbcache_rebuild` if you need updated cached
+    data before the context exits.
+
+    Nesting is supported - only the outermost context flushes the queue.
+
+    Example::
+
+        with defer_dbcache_rebuild():
+            FeedbackSet.objects.filter(id__in=feedbackset_ids).update(deadline_datetime=deadline)
+            for feedbackset_id in feedbackset_ids:
+                GroupComment.objects.create(feedback_set_id=feedbackset_id, ...)
+
+    Args:
+        using: The database alias.
+    """
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            previous_value = _get_defer_rebuild_setting(cursor)
+            _set_defer_rebuild_setting(cursor, 'on')
+        yield
+
+        # If the block raises an exception, the transaction (or savepoint) is
+        # rolled back, and that also resets the setting and the queue.
+        if previous_value != 'on':
+            with connections[using].cursor() as cursor:
+                _set_defer_rebuild_setting(cursor, '')
+            flush_deferred_dbcache_rebuild(using=using)
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from devilry.devilry_dbcache.shadow_rebuild import AssignmentGroupCachedDataShadowRebuild
+
+
+class Command(BaseCommand):
+    """
+    Management script for rebuilding all AssignmentGroupCachedData
+    without emptying the cached data while rebuilding.
+    """
+    help = 'Rebuild all AssignmentGroupCachedData into a shadow table using one or more ' \
+           'worker connections, and swap it into the live table when all groups are rebuilt. ' \
+           'Resumes an interrupted rebuild unless --restart is used.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            dest='workers',
+            type=int,
+            default=1,
+            help='Number of worker database connections. Defaults to 1.')
+        parser.add_argument(
+            '--split-by',
+            dest='split_by',
+            choices=[AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_PERIOD,
+                     AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_GROUP_ID],
+            default=AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_GROUP_ID,
+            help='Split the rebuild into one chunk per period, or into chunks of '
+                 '--chunk-size group IDs. Defaults to "groupid". Ignored when resuming.')
+        parser.add_argument(
+            '--chunk-size',
+            dest='chunk_size',
+            type=int,
+            default=5000,
+            help='Number of group IDs in each chunk with "--split-by groupid". Defaults to 5000.')
+        parser.add_argument(
+            '--restart',
+            dest='restart',
+            action='store_true',
+            default=False,
+            help='Discard any interrupted rebuild and start over.')
+
+    def __write_progress(self, progress):
+        self.stdout.write('{}/{} chunks completed ({:.1f}%), {} groups rebuilt in {}s'.format(
+            progress.completed_chunk_count,
+            progress.total_chunk_count,
+            progress.percent_complete,
+            progress.group_count,
+            int((timezone.now() - self.start_time).total_seconds())))
+
+    def handle(self, *args, **options):
+        self.start_time = timezone.now()
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild(
+            split_by=options['split_by'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            progress_callback=self.__write_progress)
+
+        if not options['restart'] and shadow_rebuild.has_unfinished_rebuild():
+            completed_chunk_count, total_chunk_count = shadow_rebuild.get_chunk_counts()
+            self.stdout.write('Resuming interrupted rebuild ({}/{} chunks already completed).'.format(
+                completed_chunk_count, total_chunk_count))
+        else:
+            total_chunk_count = shadow_rebuild.start()
+            self.stdout.write('Starting rebuild with {} chunks.'.format(total_chunk_count))
+
+        shadow_rebuild.rebuild_chunks()
+        self.stdout.write('All chunks completed. Swapping in the rebuilt cached data ...')
+        merged_count = shadow_rebuild.swap()
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuild of {} groups completed in {}s.'.format(
+                merged_count, int((timezone.now() - self.start_time).total_seconds()))))
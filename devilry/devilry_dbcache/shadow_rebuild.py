@@ -0,0 +1,208 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+from django.db import transaction
+
+log = logging.getLogger(__name__)
+
+
+class ShadowRebuildProgress(object):
+    """
+    Progress for a :class:`.AssignmentGroupCachedDataShadowRebuild`.
+    Sent to the ``progress_callback``.
+    """
+    def __init__(self, completed_chunk_count, total_chunk_count, group_count):
+        #: Number of completed chunks (including chunks completed before a resume).
+        self.completed_chunk_count = completed_chunk_count
+
+        #: Total number of chunks.
+        self.total_chunk_count = total_chunk_count
+
+        #: Number of groups rebuilt in this run.
+        self.group_count = group_count
+
+    @property
+    def percent_complete(self):
+        if self.total_chunk_count == 0:
+            return 100.0
+        return self.completed_chunk_count / float(self.total_chunk_count) * 100
+
+
+class AssignmentGroupCachedDataShadowRebuild(object):
+    """
+    Rebuild all :class:`devilry.devilry_dbcache.models.AssignmentGroupCachedData`
+    into a shadow table, and swap the shadow table into the live table when
+    all groups are rebuilt.
+
+    The live table keeps its data (and is maintained by the triggers as normal)
+    during the rebuild. The rebuild is split into chunks, and each chunk
+    is rebuilt in its own transaction. Completed chunks are stored in the
+    database, so an interrupted rebuild can be resumed.
+
+    Chunks can be rebuilt in parallel with ``workers > 1``. Each worker
+    is a thread with its own database connection.
+
+    Example::
+
+        AssignmentGroupCachedDataShadowRebuild(
+            split_by=AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_GROUP_ID,
+            workers=4).run()
+    """
+
+    #: Use one chunk per :class:`devilry.apps.core.models.Period`.
+    SPLIT_BY_PERIOD = 'period'
+
+    #: Split the groups into chunks of ``chunk_size`` group IDs.
+    SPLIT_BY_GROUP_ID = 'groupid'
+
+    def __init__(self, split_by=SPLIT_BY_PERIOD, workers=1, chunk_size=5000,
+                 progress_callback=None, using=DEFAULT_DB_ALIAS):
+        """
+        Args:
+            split_by: :obj:`~.AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_PERIOD` or
+                :obj:`~.AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_GROUP_ID`.
+            workers: Number of worker connections. If this is ``1``, all
+                chunks are rebuilt using the current connection.
+            chunk_size: Number of group IDs in each chunk with
+                :obj:`~.AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_GROUP_ID`.
+            progress_callback: Called with a :class:`.ShadowRebuildProgress` each time
+                a chunk is completed.
+            using: The database alias.
+        """
+        if split_by not in (self.SPLIT_BY_PERIOD, self.SPLIT_BY_GROUP_ID):
+            raise ValueError('Invalid split_by: {!r}'.format(split_by))
+        if workers < 1:
+            raise ValueError('workers must be 1 or more.')
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be 1 or more.')
+        self.split_by = split_by
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.using = using
+
+    def __execute(self, sql, params=None):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            if cursor.description:
+                return cursor.fetchall()
+            return None
+
+    def get_chunk_counts(self):
+        """
+        Returns:
+            tuple: ``(completed_chunk_count, total_chunk_count)`` for the
+            current (possibly interrupted) rebuild.
+        """
+        rows = self.__execute("""
+            SELECT
+                COUNT(*) FILTER (WHERE completed_datetime IS NOT NULL),
+                COUNT(*)
+            FROM devilry__dbcache_shadow_rebuild_chunk
+        """)
+        return rows[0]
+
+    def has_unfinished_rebuild(self):
+        """
+        Returns ``True`` if there is an interrupted rebuild that can be resumed.
+        """
+        return self.get_chunk_counts()[1] > 0
+
+    def start(self):
+        """
+        Start a new rebuild. Discards any interrupted rebuild.
+
+        Returns:
+            int: The number of chunks.
+        """
+        with transaction.atomic(using=self.using):
+            return self.__execute(
+                'SELECT devilry__shadow_rebuild_assignmentgroupcacheddata_start(%s, %s)',
+                [self.split_by, self.chunk_size])[0][0]
+
+    def __get_incomplete_chunk_ids(self):
+        rows = self.__execute("""
+            SELECT id
+            FROM devilry__dbcache_shadow_rebuild_chunk
+            WHERE completed_datetime IS NULL
+            ORDER BY id
+        """)
+        return [row[0] for row in rows]
+
+    def _rebuild_chunk(self, chunk_id):
+        with transaction.atomic(using=self.using):
+            return self.__execute(
+                'SELECT devilry__shadow_rebuild_assignmentgroupcacheddata_chunk(%s)',
+                [chunk_id])[0][0]
+
+    def __rebuild_chunk_in_worker_thread(self, chunk_id):
+        try:
+            return self._rebuild_chunk(chunk_id)
+        finally:
+            # Django connections are thread local, so this only closes the
+            # connection of the worker thread.
+            connections[self.using].close()
+
+    def __report_progress(self, completed_chunk_count, total_chunk_count, group_count):
+        progress = ShadowRebuildProgress(completed_chunk_count=completed_chunk_count,
+                                         total_chunk_count=total_chunk_count,
+                                         group_count=group_count)
+        log.info('AssignmentGroupCachedData shadow rebuild: %s/%s chunks completed (%.1f%%), %s groups.',
+                 progress.completed_chunk_count, progress.total_chunk_count,
+                 progress.percent_complete, progress.group_count)
+        if self.progress_callback:
+            self.progress_callback(progress)
+
+    def rebuild_chunks(self):
+        """
+        Rebuild all chunks that is not completed.
+        """
+        completed_chunk_count, total_chunk_count = self.get_chunk_counts()
+        chunk_ids = self.__get_incomplete_chunk_ids()
+        group_count = 0
+        if self.workers == 1:
+            for chunk_id in chunk_ids:
+                group_count += self._rebuild_chunk(chunk_id)
+                completed_chunk_count += 1
+                self.__report_progress(completed_chunk_count, total_chunk_count, group_count)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self.__rebuild_chunk_in_worker_thread, chunk_id)
+                           for chunk_id in chunk_ids]
+                for future in as_completed(futures):
+                    group_count += future.result()
+                    completed_chunk_count += 1
+                    self.__report_progress(completed_chunk_count, total_chunk_count, group_count)
+        return group_count
+
+    def swap(self):
+        """
+        Swap the shadow table into the live table.
+
+        Returns:
+            int: The number of groups merged from the shadow table.
+        """
+        with transaction.atomic(using=self.using):
+            merged_count = self.__execute(
+                'SELECT devilry__shadow_rebuild_assignmentgroupcacheddata_swap()')[0][0]
+        with transaction.atomic(using=self.using):
+            self.__execute('SELECT devilry__shadow_rebuild_assignmentgroupcacheddata_finish()')
+        return merged_count
+
+    def run(self, resume=True):
+        """
+        Run the entire rebuild - start (or resume), rebuild all chunks, and swap.
+
+        Args:
+            resume: Resume an interrupted rebuild if there is one. If this
+                is ``False``, any interrupted rebuild is discarded.
+
+        Returns:
+            int: The number of groups merged from the shadow table.
+        """
+        if not (resume and self.has_unfinished_rebuild()):
+            self.start()
+        self.rebuild_chunks()
+        return self.swap()
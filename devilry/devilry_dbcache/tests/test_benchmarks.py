@@ -230,3 +230,55 @@ class TestBenchMarkAssignmentGroupCommentCountTrigger(test.TestCase):
         print("public_student_comment_count:", cached_data.public_student_comment_count)
         print("public_examiner_comment_count:", cached_data.public_examiner_comment_count)
         print("public_admin_comment_count:", cached_data.public_admin_comment_count)
+
+
+@unittest.skip('Bechmark - should just be enabled when debugging performance')
+class TestBenchMarkMaintenanceModeBulkInsert(test.TestCase):
+    def __bulk_create_commentfiles(self, label):
+        count = 500
+        group = mommy.make('core.AssignmentGroup')
+        comment = mommy.make(GroupComment,
+                             feedback_set=group.feedbackset_set.first(),
+                             user_role=GroupComment.USER_ROLE_STUDENT,
+                             visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE)
+        commentfiles = []
+        for x in range(count):
+            commentfiles.append(mommy.prepare(CommentFile, comment=comment, filesize=4))
+
+        with TimeExecution('{} ({})'.format(label, count)):
+            CommentFile.objects.bulk_create(commentfiles)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.public_student_file_upload_count, count)
+
+    def __bulk_create_groups(self, label):
+        count = 2000
+        assignment = mommy.make('core.Assignment')
+        groups = []
+        for x in range(count):
+            groups.append(mommy.prepare('core.AssignmentGroup', parentnode=assignment))
+
+        with TimeExecution('{} ({})'.format(label, count)):
+            AssignmentGroup.objects.bulk_create(groups)
+        self.assertEqual(
+            AssignmentGroupCachedData.objects.filter(group__parentnode=assignment).count(),
+            count)
+
+    def test_bulk_create_commentfiles_row_level(self):
+        AssignmentGroupDbCacheCustomSql(
+            maintenance_mode=AssignmentGroupDbCacheCustomSql.MAINTENANCE_MODE_ROW).initialize()
+        self.__bulk_create_commentfiles('bulk create commentfiles: row level triggers')
+
+    def test_bulk_create_commentfiles_statement_level(self):
+        AssignmentGroupDbCacheCustomSql(
+            maintenance_mode=AssignmentGroupDbCacheCustomSql.MAINTENANCE_MODE_STATEMENT).initialize()
+        self.__bulk_create_commentfiles('bulk create commentfiles: statement level triggers')
+
+    def test_bulk_create_groups_row_level(self):
+        AssignmentGroupDbCacheCustomSql(
+            maintenance_mode=AssignmentGroupDbCacheCustomSql.MAINTENANCE_MODE_ROW).initialize()
+        self.__bulk_create_groups('bulk create groups: row level triggers')
+
+    def test_bulk_create_groups_statement_level(self):
+        AssignmentGroupDbCacheCustomSql(
+            maintenance_mode=AssignmentGroupDbCacheCustomSql.MAINTENANCE_MODE_STATEMENT).initialize()
+        self.__bulk_create_groups('bulk create groups: statement level triggers')
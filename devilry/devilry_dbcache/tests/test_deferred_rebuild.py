@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django import test
+from django.db import connection
+from model_mommy import mommy
+
+from devilry.apps.core import devilry_core_mommy_factories as core_mommy
+from devilry.apps.core.mommy_recipes import ACTIVE_PERIOD_START
+from devilry.devilry_comment.models import Comment
+from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
+from devilry.devilry_dbcache.deferred_rebuild import defer_dbcache_rebuild, flush_deferred_dbcache_rebuild
+from devilry.devilry_group.models import GroupComment
+
+
+def _get_deferred_group_ids():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT group_id FROM devilry__dbcache_deferred_group')
+        return [row[0] for row in cursor.fetchall()]
+
+
+class TestDeferDbcacheRebuild(test.TestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+
+    def test_cached_data_not_updated_within_context(self):
+        group = mommy.make('core.AssignmentGroup')
+        with defer_dbcache_rebuild():
+            core_mommy.candidate(group=group)
+            group.cached_data.refresh_from_db()
+            self.assertEqual(group.cached_data.candidate_count, 0)
+
+    def test_cached_data_updated_on_exit(self):
+        group = mommy.make('core.AssignmentGroup')
+        with defer_dbcache_rebuild():
+            core_mommy.candidate(group=group)
+            core_mommy.candidate(group=group)
+            core_mommy.examiner(group=group)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 2)
+        self.assertEqual(group.cached_data.examiner_count, 1)
+        self.assertEqual(_get_deferred_group_ids(), [])
+
+    def test_each_group_recorded_for_each_change(self):
+        group = mommy.make('core.AssignmentGroup')
+        with defer_dbcache_rebuild():
+            core_mommy.candidate(group=group)
+            core_mommy.candidate(group=group)
+            self.assertEqual(_get_deferred_group_ids(), [group.id, group.id])
+
+    def test_explicit_flush(self):
+        group = mommy.make('core.AssignmentGroup')
+        othergroup = mommy.make('core.AssignmentGroup')
+        with defer_dbcache_rebuild():
+            core_mommy.candidate(group=group)
+            core_mommy.candidate(group=group)
+            core_mommy.candidate(group=othergroup)
+            self.assertEqual(flush_deferred_dbcache_rebuild(), 2)
+            group.cached_data.refresh_from_db()
+            self.assertEqual(group.cached_data.candidate_count, 2)
+            self.assertEqual(_get_deferred_group_ids(), [])
+
+    def test_flush_nothing_deferred(self):
+        self.assertEqual(flush_deferred_dbcache_rebuild(), 0)
+
+    def test_nested_only_outermost_flushes(self):
+        group = mommy.make('core.AssignmentGroup')
+        with defer_dbcache_rebuild():
+            with defer_dbcache_rebuild():
+                core_mommy.candidate(group=group)
+            group.cached_data.refresh_from_db()
+            self.assertEqual(group.cached_data.candidate_count, 0)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 1)
+
+    def test_not_deferred_after_exit(self):
+        group = mommy.make('core.AssignmentGroup')
+        with defer_dbcache_rebuild():
+            pass
+        core_mommy.candidate(group=group)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 1)
+
+    def test_comments_in_many_groups(self):
+        assignment = mommy.make('core.Assignment')
+        groups = mommy.make('core.AssignmentGroup', parentnode=assignment, _quantity=5)
+        with defer_dbcache_rebuild():
+            for group in groups:
+                mommy.make('devilry_group.GroupComment',
+                           feedback_set=group.feedbackset_set.first(),
+                           user_role=Comment.USER_ROLE_STUDENT,
+                           visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE,
+                           text='bla',
+                           _quantity=2)
+        for group in groups:
+            group.cached_data.refresh_from_db()
+            self.assertEqual(group.cached_data.public_student_comment_count, 2)
+
+
+class TestDeferDbcacheRebuildStatementLevel(test.TestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql(
+            maintenance_mode=AssignmentGroupDbCacheCustomSql.MAINTENANCE_MODE_STATEMENT).initialize()
+
+    def test_new_feedbackset(self):
+        assignment = mommy.make('core.Assignment', first_deadline=ACTIVE_PERIOD_START - timedelta(days=2))
+        group = mommy.make('core.AssignmentGroup', parentnode=assignment)
+        with defer_dbcache_rebuild():
+            feedbackset = mommy.make('devilry_group.FeedbackSet',
+                                     group=group,
+                                     deadline_datetime=ACTIVE_PERIOD_START)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.last_feedbackset, feedbackset)
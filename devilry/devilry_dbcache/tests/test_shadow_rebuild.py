@@ -0,0 +1,153 @@
+from django import test
+from django.core.management import call_command
+from django.utils.six import StringIO
+from model_mommy import mommy
+
+from devilry.apps.core import devilry_core_mommy_factories as core_mommy
+from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
+from devilry.devilry_dbcache.models import AssignmentGroupCachedData
+from devilry.devilry_dbcache.shadow_rebuild import AssignmentGroupCachedDataShadowRebuild
+
+
+def _break_cached_data():
+    AssignmentGroupCachedData.objects.update(candidate_count=1000)
+
+
+class TestShadowRebuild(test.TestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+
+    def test_invalid_split_by(self):
+        with self.assertRaises(ValueError):
+            AssignmentGroupCachedDataShadowRebuild(split_by='invalid')
+
+    def test_split_by_period(self):
+        group1 = mommy.make('core.AssignmentGroup')
+        group2 = mommy.make('core.AssignmentGroup')
+        core_mommy.candidate(group=group1)
+        _break_cached_data()
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild(
+            split_by=AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_PERIOD)
+        self.assertEqual(shadow_rebuild.start(), 2)
+        shadow_rebuild.rebuild_chunks()
+        self.assertEqual(shadow_rebuild.swap(), 2)
+        group1.cached_data.refresh_from_db()
+        group2.cached_data.refresh_from_db()
+        self.assertEqual(group1.cached_data.candidate_count, 1)
+        self.assertEqual(group2.cached_data.candidate_count, 0)
+
+    def test_split_by_group_id(self):
+        assignment = mommy.make('core.Assignment')
+        groups = mommy.make('core.AssignmentGroup', parentnode=assignment, _quantity=5)
+        _break_cached_data()
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild(
+            split_by=AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_GROUP_ID,
+            chunk_size=2)
+        self.assertEqual(shadow_rebuild.start(), 3)
+        self.assertEqual(shadow_rebuild.run(), 5)
+        for group in groups:
+            group.cached_data.refresh_from_db()
+            self.assertEqual(group.cached_data.candidate_count, 0)
+
+    def test_live_data_kept_until_swap(self):
+        group = mommy.make('core.AssignmentGroup')
+        _break_cached_data()
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild()
+        shadow_rebuild.start()
+        shadow_rebuild.rebuild_chunks()
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 1000)
+        shadow_rebuild.swap()
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 0)
+
+    def test_swap_incomplete_fails(self):
+        mommy.make('core.AssignmentGroup')
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild()
+        shadow_rebuild.start()
+        with self.assertRaisesMessage(Exception, 'not all chunks are completed'):
+            shadow_rebuild.swap()
+
+    def test_resume(self):
+        assignment = mommy.make('core.Assignment')
+        mommy.make('core.AssignmentGroup', parentnode=assignment, _quantity=4)
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild(
+            split_by=AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_GROUP_ID,
+            chunk_size=2)
+        shadow_rebuild.start()
+        self.assertTrue(shadow_rebuild.has_unfinished_rebuild())
+        self.assertEqual(shadow_rebuild.rebuild_chunks(), 4)
+        self.assertEqual(shadow_rebuild.get_chunk_counts(), (2, 2))
+        self.assertEqual(shadow_rebuild.rebuild_chunks(), 0)
+        shadow_rebuild.swap()
+        self.assertFalse(shadow_rebuild.has_unfinished_rebuild())
+
+    def test_group_changed_during_rebuild(self):
+        group = mommy.make('core.AssignmentGroup')
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild()
+        shadow_rebuild.start()
+        shadow_rebuild.rebuild_chunks()
+        core_mommy.candidate(group=group)
+        shadow_rebuild.swap()
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 1)
+
+    def test_group_created_during_rebuild(self):
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild()
+        mommy.make('core.AssignmentGroup')
+        shadow_rebuild.start()
+        shadow_rebuild.rebuild_chunks()
+        group = mommy.make('core.AssignmentGroup')
+        core_mommy.candidate(group=group)
+        shadow_rebuild.swap()
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 1)
+
+    def test_group_deleted_during_rebuild(self):
+        group = mommy.make('core.AssignmentGroup')
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild()
+        shadow_rebuild.start()
+        shadow_rebuild.rebuild_chunks()
+        group.delete()
+        self.assertEqual(shadow_rebuild.swap(), 0)
+        self.assertFalse(AssignmentGroupCachedData.objects.exists())
+
+    def test_progress_callback(self):
+        mommy.make('core.AssignmentGroup', _quantity=2)
+        progress_list = []
+        AssignmentGroupCachedDataShadowRebuild(
+            split_by=AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_PERIOD,
+            progress_callback=progress_list.append).run()
+        self.assertEqual([progress.completed_chunk_count for progress in progress_list], [1, 2])
+        self.assertEqual(progress_list[-1].percent_complete, 100)
+
+    def test_management_command_resumes(self):
+        group = mommy.make('core.AssignmentGroup')
+        _break_cached_data()
+        shadow_rebuild = AssignmentGroupCachedDataShadowRebuild()
+        shadow_rebuild.start()
+        stdout = StringIO()
+        call_command('devilry_dbcache_rebuild', stdout=stdout)
+        self.assertIn('Resuming interrupted rebuild', stdout.getvalue())
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 0)
+
+
+class TestShadowRebuildWorkers(test.TransactionTestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+
+    def test_multiple_workers(self):
+        assignment = mommy.make('core.Assignment')
+        groups = mommy.make('core.AssignmentGroup', parentnode=assignment, _quantity=10)
+        for group in groups:
+            core_mommy.candidate(group=group)
+        _break_cached_data()
+        merged_count = AssignmentGroupCachedDataShadowRebuild(
+            split_by=AssignmentGroupCachedDataShadowRebuild.SPLIT_BY_GROUP_ID,
+            chunk_size=3,
+            workers=3).run(resume=False)
+        self.assertEqual(merged_count, 10)
+        for group in groups:
+            group.cached_data.refresh_from_db()
+            self.assertEqual(group.cached_data.candidate_count, 1)
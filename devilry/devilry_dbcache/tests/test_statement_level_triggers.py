@@ -0,0 +1,163 @@
+from datetime import timedelta
+
+from django import test
+from model_mommy import mommy
+
+from devilry.apps.core import devilry_core_mommy_factories as core_mommy
+from devilry.apps.core.models import AssignmentGroup, Candidate
+from devilry.apps.core.mommy_recipes import ACTIVE_PERIOD_START
+from devilry.devilry_comment.models import Comment, CommentFile
+from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
+from devilry.devilry_dbcache.models import AssignmentGroupCachedData
+from devilry.devilry_group.models import GroupComment
+
+
+class TestStatementLevelTriggers(test.TestCase):
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql(
+            maintenance_mode=AssignmentGroupDbCacheCustomSql.MAINTENANCE_MODE_STATEMENT).initialize()
+
+    def test_invalid_maintenance_mode(self):
+        with self.assertRaises(ValueError):
+            AssignmentGroupDbCacheCustomSql(maintenance_mode='invalid')
+
+    def test_group_insert_creates_single_first_feedbackset(self):
+        group = mommy.make('core.AssignmentGroup')
+        self.assertEqual(group.feedbackset_set.count(), 1)
+        first_feedbackset = group.feedbackset_set.first()
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.first_feedbackset, first_feedbackset)
+        self.assertEqual(group.cached_data.last_feedbackset, first_feedbackset)
+
+    def test_bulk_create_groups(self):
+        assignment = mommy.make('core.Assignment')
+        AssignmentGroup.objects.bulk_create([
+            mommy.prepare('core.AssignmentGroup', parentnode=assignment)
+            for x in range(10)])
+        self.assertEqual(
+            AssignmentGroupCachedData.objects.filter(group__parentnode=assignment,
+                                                     first_feedbackset__isnull=False).count(),
+            10)
+
+    def test_last_feedbackset(self):
+        assignment = mommy.make('core.Assignment', first_deadline=ACTIVE_PERIOD_START - timedelta(days=2))
+        group = mommy.make('core.AssignmentGroup', parentnode=assignment)
+        last_feedbackset = mommy.make('devilry_group.FeedbackSet',
+                                      group=group,
+                                      deadline_datetime=ACTIVE_PERIOD_START)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.last_feedbackset, last_feedbackset)
+
+    def test_groupcomment_insert_deltas(self):
+        group = mommy.make('core.AssignmentGroup')
+        feedbackset = group.feedbackset_set.first()
+        mommy.make('devilry_group.GroupComment',
+                   feedback_set=feedbackset,
+                   user_role=Comment.USER_ROLE_STUDENT,
+                   visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE,
+                   published_datetime=ACTIVE_PERIOD_START,
+                   text='bla',
+                   _quantity=2)
+        last_comment = mommy.make('devilry_group.GroupComment',
+                                  feedback_set=feedbackset,
+                                  user_role=Comment.USER_ROLE_STUDENT,
+                                  visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE,
+                                  published_datetime=ACTIVE_PERIOD_START + timedelta(days=1),
+                                  text='bla')
+        mommy.make('devilry_group.GroupComment',
+                   feedback_set=feedbackset,
+                   user_role=Comment.USER_ROLE_EXAMINER,
+                   visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE)
+        mommy.make('devilry_group.GroupComment',
+                   feedback_set=feedbackset,
+                   user_role=Comment.USER_ROLE_STUDENT,
+                   visibility=GroupComment.VISIBILITY_PRIVATE)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.public_total_comment_count, 4)
+        self.assertEqual(group.cached_data.public_student_comment_count, 3)
+        self.assertEqual(group.cached_data.public_examiner_comment_count, 1)
+        self.assertEqual(group.cached_data.last_public_comment_by_student_datetime,
+                         last_comment.published_datetime)
+
+    def test_groupcomment_delete_rebuilds(self):
+        group = mommy.make('core.AssignmentGroup')
+        feedbackset = group.feedbackset_set.first()
+        mommy.make('devilry_group.GroupComment',
+                   feedback_set=feedbackset,
+                   user_role=Comment.USER_ROLE_STUDENT,
+                   visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE,
+                   published_datetime=ACTIVE_PERIOD_START)
+        last_comment = mommy.make('devilry_group.GroupComment',
+                                  feedback_set=feedbackset,
+                                  user_role=Comment.USER_ROLE_STUDENT,
+                                  visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE,
+                                  published_datetime=ACTIVE_PERIOD_START + timedelta(days=1))
+        last_comment.delete()
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.public_total_comment_count, 1)
+        self.assertEqual(group.cached_data.last_public_comment_by_student_datetime,
+                         ACTIVE_PERIOD_START)
+
+    def test_commentfile_bulk_create(self):
+        group = mommy.make('core.AssignmentGroup')
+        comment = mommy.make('devilry_group.GroupComment',
+                             feedback_set=group.feedbackset_set.first(),
+                             user_role=Comment.USER_ROLE_STUDENT,
+                             visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE)
+        CommentFile.objects.bulk_create([
+            mommy.prepare('devilry_comment.CommentFile', comment=comment, filesize=1)
+            for x in range(5)])
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.public_student_file_upload_count, 5)
+
+    def test_commentfile_delete(self):
+        group = mommy.make('core.AssignmentGroup')
+        comment = mommy.make('devilry_group.GroupComment',
+                             feedback_set=group.feedbackset_set.first(),
+                             user_role=Comment.USER_ROLE_STUDENT,
+                             visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE)
+        mommy.make('devilry_comment.CommentFile', comment=comment, _quantity=3)
+        CommentFile.objects.filter(comment=comment).first().delete()
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.public_student_file_upload_count, 2)
+
+    def test_candidate_count(self):
+        group = mommy.make('core.AssignmentGroup')
+        core_mommy.candidate(group=group)
+        candidate = core_mommy.candidate(group=group)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 2)
+        candidate.delete()
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 1)
+
+    def test_candidate_count_when_candidates_moved_in_bulk(self):
+        group1 = mommy.make('core.AssignmentGroup')
+        group2 = mommy.make('core.AssignmentGroup', parentnode=group1.parentnode)
+        core_mommy.candidate(group=group1)
+        core_mommy.candidate(group=group1)
+        core_mommy.candidate(group=group2)
+        Candidate.objects.filter(assignment_group=group1).update(assignment_group=group2)
+        group1.cached_data.refresh_from_db()
+        group2.cached_data.refresh_from_db()
+        self.assertEqual(group1.cached_data.candidate_count, 0)
+        self.assertEqual(group2.cached_data.candidate_count, 3)
+
+    def test_examiner_count(self):
+        group = mommy.make('core.AssignmentGroup')
+        core_mommy.examiner(group=group)
+        examiner = core_mommy.examiner(group=group)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.examiner_count, 2)
+        examiner.delete()
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.examiner_count, 1)
+
+    def test_switch_back_to_row_level(self):
+        AssignmentGroupDbCacheCustomSql(
+            maintenance_mode=AssignmentGroupDbCacheCustomSql.MAINTENANCE_MODE_ROW).initialize()
+        group = mommy.make('core.AssignmentGroup')
+        self.assertEqual(group.feedbackset_set.count(), 1)
+        core_mommy.candidate(group=group)
+        group.cached_data.refresh_from_db()
+        self.assertEqual(group.cached_data.candidate_count, 1)
@@ -20,6 +20,7 @@ from django_cradmin.widgets.datetimepicker import DateTimePickerWidget
 
 from devilry.apps.core import models as core_models
 from devilry.devilry_cradmin import devilry_acemarkdown
+from devilry.devilry_dbcache.deferred_rebuild import defer_dbcache_rebuild
 from devilry.devilry_deadlinemanagement.views import viewutils
 from devilry.devilry_group import models as group_models
 from devilry.utils import datetimeutils
@@ -346,17 +347,18 @@ class ManageDeadlineView(viewutils.DeadlineManagementMixin, formbase.FormView):
         feedback_set_ids = self.__get_last_feedbackset_ids_from_posted_group_ids(form)
         now_without_sec_and_micro = timezone.now().replace(microsecond=0)
         with transaction.atomic():
-            group_models.FeedbackSet.objects\
-                .filter(id__in=feedback_set_ids)\
-                .update(
-                    last_updated_by=self.request.user,
-                    deadline_datetime=deadline)
-            for feedback_set_id in feedback_set_ids:
-                self.__create_groupcomment(
-                    feedback_set_id=feedback_set_id,
-                    publishing_time=now_without_sec_and_micro,
-                    text=text
-                )
+            with defer_dbcache_rebuild():
+                group_models.FeedbackSet.objects\
+                    .filter(id__in=feedback_set_ids)\
+                    .update(
+                        last_updated_by=self.request.user,
+                        deadline_datetime=deadline)
+                for feedback_set_id in feedback_set_ids:
+                    self.__create_groupcomment(
+                        feedback_set_id=feedback_set_id,
+                        publishing_time=now_without_sec_and_micro,
+                        text=text
+                    )
             # deadline_email.bulk_send_deadline_moved_email(
             #     feedbackset_id_list=feedback_set_ids,
             #     domain_url_start=self.request.build_absolute_uri('/'))
@@ -378,18 +380,19 @@ class ManageDeadlineView(viewutils.DeadlineManagementMixin, formbase.FormView):
         now_without_sec_and_micro = timezone.now().replace(microsecond=0)
         with transaction.atomic():
             feedbackset_id_list = []
-            for group_id in assignment_group_ids:
-                feedbackset_id = self.__create_feedbackset(
-                    group_id=group_id,
-                    deadline=deadline,
-                    created_datetime=now_without_sec_and_micro
-                )
-                self.__create_groupcomment(
-                    feedback_set_id=feedbackset_id,
-                    publishing_time=now_without_sec_and_micro + timezone.timedelta(microseconds=1),
-                    text=text
-                )
-                feedbackset_id_list.append(feedbackset_id)
+            with defer_dbcache_rebuild():
+                for group_id in assignment_group_ids:
+                    feedbackset_id = self.__create_feedbackset(
+                        group_id=group_id,
+                        deadline=deadline,
+                        created_datetime=now_without_sec_and_micro
+                    )
+                    self.__create_groupcomment(
+                        feedback_set_id=feedbackset_id,
+                        publishing_time=now_without_sec_and_micro + timezone.timedelta(microseconds=1),
+                        text=text
+                    )
+                    feedbackset_id_list.append(feedbackset_id)
             # deadline_email.bulk_send_new_attempt_email(
             #     feedbackset_id_list=feedbackset_id_list,
             #     domain_url_start=self.request.build_absolute_uri('/'))
@@ -1,10 +1,25 @@
+from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
 
 
 class RQEmailBackend(BaseEmailBackend):
+    """
+    Email backend that sends the emails in RQ jobs using the
+    ``DEVILRY_LOWLEVEL_EMAIL_BACKEND``.
+
+    The emails are split into batches of ``DEVILRY_RQ_EMAIL_BACKEND_BATCH_SIZE``
+    emails, and each batch is sent by a single job over a single connection.
+    See :func:`devilry.devilry_email.rq_jobs.async_send_email_messages`.
+    """
+    def get_batch_size(self):
+        return getattr(settings, 'DEVILRY_RQ_EMAIL_BACKEND_BATCH_SIZE', 50)
 
     def send_messages(self, email_messages):
         from . import rq_jobs
-        for message in email_messages:
-            rq_jobs.async_send_email_message.delay(email_message=message, fail_silently=self.fail_silently)
+        email_messages = list(email_messages)
+        batch_size = self.get_batch_size()
+        for index in range(0, len(email_messages), batch_size):
+            rq_jobs.async_send_email_messages.delay(
+                email_messages=email_messages[index:index + batch_size],
+                fail_silently=self.fail_silently)
         return len(email_messages)
@@ -1,9 +1,153 @@
+import datetime
+import logging
+import time
+
+import django_rq
 from django.conf import settings
 from django.core import mail
 from django_rq import job
 
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter(object):
+    """
+    Limits the number of calls to :meth:`.wait` per second by sleeping.
+
+    The state is kept in the instance, so the limit only holds within
+    a single batch job. The default RQ worker forks a new work horse process
+    for each job, so the state of the module level instance is not kept
+    between jobs. Consecutive jobs, and jobs handled by other workers,
+    can send faster than the limit.
+    """
+    def __init__(self, max_per_second=None):
+        """
+        Args:
+            max_per_second: Max calls to :meth:`.wait` per second. ``None`` means no limit.
+        """
+        self.max_per_second = max_per_second
+        self.last_call_time = None
+
+    def wait(self):
+        if not self.max_per_second:
+            return
+        now = time.monotonic()
+        if self.last_call_time is not None:
+            wait_seconds = self.last_call_time + 1.0 / self.max_per_second - now
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
+                now += wait_seconds
+        self.last_call_time = now
+
+
+_rate_limiter = RateLimiter()
+
+
+def _send_email_messages(email_messages, fail_silently):
+    """
+    Send ``email_messages`` over a single connection.
+
+    Returns:
+        tuple: ``(failed_email_messages, last_exception)``.
+    """
+    _rate_limiter.max_per_second = getattr(settings, 'DEVILRY_RQ_EMAIL_BACKEND_MAX_MESSAGES_PER_SECOND', None)
+    connection = mail.get_connection(backend=settings.DEVILRY_LOWLEVEL_EMAIL_BACKEND, fail_silently=fail_silently)
+    failed_email_messages = []
+    last_exception = None
+    try:
+        connection.open()
+    except Exception as exception:
+        return list(email_messages), exception
+    try:
+        for email_message in email_messages:
+            _rate_limiter.wait()
+            try:
+                connection.send_messages([email_message])
+            except Exception as exception:
+                logger.warning('Failed to send email to %s: %s', ', '.join(email_message.recipients()), exception)
+                failed_email_messages.append(email_message)
+                last_exception = exception
+    finally:
+        connection.close()
+    return failed_email_messages, last_exception
+
+
+def _get_retry_delay_seconds(attempt):
+    """
+    Get the number of seconds to wait before retrying messages that failed on
+    attempt number ``attempt``. The delay is doubled for each attempt.
+    """
+    return getattr(settings, 'DEVILRY_RQ_EMAIL_BACKEND_RETRY_DELAY_SECONDS', 10) * 2 ** (attempt - 1)
+
+
+def _enqueue_retry(email_messages, fail_silently, attempt):
+    """
+    Enqueue a new :func:`.async_send_email_messages` job for ``email_messages``
+    after the delay from :func:`._get_retry_delay_seconds`.
+
+    RQ versions with ``Queue.enqueue_in`` schedule the job, so the worker is free
+    to handle other jobs until the delay has passed. Scheduled jobs are only
+    enqueued by workers started with the scheduler enabled (``rqworker --with-scheduler``),
+    so the retries are never run if no worker runs the scheduler. Older RQ versions
+    (like the pinned RQ 0.13) can not schedule jobs, so we wait in the current
+    job before enqueuing the retry.
+    """
+    delay_seconds = _get_retry_delay_seconds(attempt=attempt - 1)
+    queue = django_rq.get_queue(settings.DEVILRY_RQ_EMAIL_BACKEND_QUEUENAME)
+    if hasattr(queue, 'enqueue_in'):
+        queue.enqueue_in(datetime.timedelta(seconds=delay_seconds), async_send_email_messages,
+                         email_messages=email_messages,
+                         fail_silently=fail_silently,
+                         attempt=attempt)
+    else:
+        time.sleep(delay_seconds)
+        async_send_email_messages.delay(
+            email_messages=email_messages,
+            fail_silently=fail_silently,
+            attempt=attempt)
+
+
+@job(settings.DEVILRY_RQ_EMAIL_BACKEND_QUEUENAME)
+def async_send_email_messages(email_messages, fail_silently, attempt=1):
+    """
+    Send a batch of email messages over a single connection.
+
+    The messages that fail are retried in a new job until they have been
+    attempted ``DEVILRY_RQ_EMAIL_BACKEND_MAX_ATTEMPTS`` times. The retries
+    back off - see :func:`._enqueue_retry`. If they still fail,
+    the last error is raised (unless ``fail_silently`` is ``True``), so the job ends
+    up among the failed jobs in RQ.
+
+    Args:
+        email_messages: List of :class:`django.core.mail.EmailMessage` objects.
+        fail_silently: Passed on to the ``DEVILRY_LOWLEVEL_EMAIL_BACKEND``.
+        attempt: The attempt number for the messages in this batch.
+    """
+    failed_email_messages, last_exception = _send_email_messages(
+        email_messages=email_messages, fail_silently=fail_silently)
+    if not failed_email_messages:
+        return
+    max_attempts = getattr(settings, 'DEVILRY_RQ_EMAIL_BACKEND_MAX_ATTEMPTS', 3)
+    if attempt < max_attempts:
+        logger.info('Retrying %s of %s email messages (attempt %s of %s).',
+                    len(failed_email_messages), len(email_messages), attempt + 1, max_attempts)
+        _enqueue_retry(
+            email_messages=failed_email_messages,
+            fail_silently=fail_silently,
+            attempt=attempt + 1)
+    else:
+        logger.error('Giving up sending %s email messages after %s attempts. Last error: %s',
+                     len(failed_email_messages), attempt, last_exception)
+        if not fail_silently:
+            raise last_exception
+
 
 @job(settings.DEVILRY_RQ_EMAIL_BACKEND_QUEUENAME)
 def async_send_email_message(email_message, fail_silently):
-    connection = mail.get_connection(backend=settings.DEVILRY_LOWLEVEL_EMAIL_BACKEND, fail_silently=fail_silently)
-    connection.send_messages([email_message])
+    """
+    Send a single email message.
+
+    Deprecated - only kept to handle jobs queued before
+    :func:`.async_send_email_messages` was added.
+    """
+    async_send_email_messages(email_messages=[email_message], fail_silently=fail_silently)
@@ -0,0 +1,135 @@
+import datetime
+
+import mock
+from django import test
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+
+from devilry.devilry_email import rq_jobs
+from devilry.devilry_email.rq_backend import RQEmailBackend
+
+
+def _make_email_message(to):
+    return mail.EmailMessage(subject='Test', body='Test', from_email='from@example.com', to=[to])
+
+
+@test.override_settings(DEVILRY_RQ_EMAIL_BACKEND_BATCH_SIZE=2)
+class TestRQEmailBackend(test.TestCase):
+    def test_send_messages_batches(self):
+        email_messages = [_make_email_message('test{}@example.com'.format(index)) for index in range(5)]
+        with mock.patch('devilry.devilry_email.rq_jobs.async_send_email_messages') as mock_job:
+            self.assertEqual(RQEmailBackend().send_messages(email_messages), 5)
+        self.assertEqual(mock_job.delay.call_count, 3)
+        self.assertEqual(
+            [call[1]['email_messages'] for call in mock_job.delay.call_args_list],
+            [email_messages[0:2], email_messages[2:4], email_messages[4:5]])
+
+    def test_send_messages_empty(self):
+        with mock.patch('devilry.devilry_email.rq_jobs.async_send_email_messages') as mock_job:
+            self.assertEqual(RQEmailBackend().send_messages([]), 0)
+        self.assertEqual(mock_job.delay.call_count, 0)
+
+
+@test.override_settings(DEVILRY_LOWLEVEL_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                        DEVILRY_RQ_EMAIL_BACKEND_MAX_ATTEMPTS=2)
+class TestAsyncSendEmailMessages(test.TestCase):
+    def test_sends_all_messages_using_one_connection(self):
+        email_messages = [_make_email_message('test{}@example.com'.format(index)) for index in range(3)]
+        with mock.patch('devilry.devilry_email.rq_jobs.mail.get_connection',
+                        wraps=mail.get_connection) as mock_get_connection:
+            rq_jobs.async_send_email_messages(email_messages=email_messages, fail_silently=False)
+        self.assertEqual(mock_get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_message_retried_in_new_job(self):
+        email_messages = [_make_email_message('fail@example.com'), _make_email_message('ok@example.com')]
+
+        def mock_send_messages(connection, messages):
+            if messages[0].to == ['fail@example.com']:
+                raise Exception('Test error')
+            return LocmemEmailBackend.send_messages(connection, messages)
+
+        with mock.patch.object(LocmemEmailBackend, 'send_messages', mock_send_messages), \
+                mock.patch('devilry.devilry_email.rq_jobs._enqueue_retry') as mock_enqueue_retry:
+            rq_jobs.async_send_email_messages(email_messages=email_messages, fail_silently=False)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ok@example.com'])
+        mock_enqueue_retry.assert_called_once_with(email_messages=[email_messages[0]], fail_silently=False,
+                                                   attempt=2)
+
+    def test_failed_message_max_attempts(self):
+        def mock_send_messages(connection, messages):
+            raise Exception('Test error')
+
+        with mock.patch.object(LocmemEmailBackend, 'send_messages', mock_send_messages), \
+                mock.patch('devilry.devilry_email.rq_jobs._enqueue_retry') as mock_enqueue_retry:
+            with self.assertRaisesMessage(Exception, 'Test error'):
+                rq_jobs.async_send_email_messages(email_messages=[_make_email_message('fail@example.com')],
+                                                  fail_silently=False, attempt=2)
+        self.assertEqual(mock_enqueue_retry.call_count, 0)
+
+    def test_failed_message_max_attempts_fail_silently(self):
+        def mock_send_messages(connection, messages):
+            raise Exception('Test error')
+
+        with mock.patch.object(LocmemEmailBackend, 'send_messages', mock_send_messages), \
+                mock.patch('devilry.devilry_email.rq_jobs._enqueue_retry') as mock_enqueue_retry:
+            rq_jobs.async_send_email_messages(email_messages=[_make_email_message('fail@example.com')],
+                                              fail_silently=True, attempt=2)  # No exception
+        self.assertEqual(mock_enqueue_retry.call_count, 0)
+
+    def test_rate_limit(self):
+        email_messages = [_make_email_message('test{}@example.com'.format(index)) for index in range(3)]
+        with self.settings(DEVILRY_RQ_EMAIL_BACKEND_MAX_MESSAGES_PER_SECOND=1000), \
+                mock.patch('devilry.devilry_email.rq_jobs.time.sleep') as mock_sleep:
+            rq_jobs.async_send_email_messages(email_messages=email_messages, fail_silently=False)
+        self.assertEqual(len(mail.outbox), 3)
+        for call in mock_sleep.call_args_list:
+            self.assertLessEqual(call[0][0], 0.001)
+
+    def test_rate_limit_within_batch_job(self):
+        email_messages = [_make_email_message('test{}@example.com'.format(index)) for index in range(2)]
+        with self.settings(DEVILRY_RQ_EMAIL_BACKEND_MAX_MESSAGES_PER_SECOND=2), \
+                mock.patch.object(rq_jobs._rate_limiter, 'last_call_time', None), \
+                mock.patch('devilry.devilry_email.rq_jobs.time.monotonic', return_value=10.0), \
+                mock.patch('devilry.devilry_email.rq_jobs.time.sleep') as mock_sleep:
+            rq_jobs.async_send_email_messages(email_messages=email_messages, fail_silently=False)
+        mock_sleep.assert_called_once_with(0.5)
+
+
+@test.override_settings(DEVILRY_RQ_EMAIL_BACKEND_RETRY_DELAY_SECONDS=10)
+class TestEnqueueRetry(test.SimpleTestCase):
+    def test_enqueue_in(self):
+        email_messages = [_make_email_message('fail@example.com')]
+        mock_queue = mock.Mock(spec=['enqueue_in'])
+        with mock.patch('devilry.devilry_email.rq_jobs.django_rq.get_queue', return_value=mock_queue):
+            rq_jobs._enqueue_retry(email_messages=email_messages, fail_silently=False, attempt=3)
+        mock_queue.enqueue_in.assert_called_once_with(
+            datetime.timedelta(seconds=20), rq_jobs.async_send_email_messages,
+            email_messages=email_messages, fail_silently=False, attempt=3)
+
+    def test_no_enqueue_in_waits_before_enqueue(self):
+        email_messages = [_make_email_message('fail@example.com')]
+        with mock.patch('devilry.devilry_email.rq_jobs.django_rq.get_queue', return_value=mock.Mock(spec=[])), \
+                mock.patch('devilry.devilry_email.rq_jobs.time.sleep') as mock_sleep, \
+                mock.patch.object(rq_jobs.async_send_email_messages, 'delay') as mock_delay:
+            rq_jobs._enqueue_retry(email_messages=email_messages, fail_silently=False, attempt=2)
+        mock_sleep.assert_called_once_with(10)
+        mock_delay.assert_called_once_with(email_messages=email_messages, fail_silently=False, attempt=2)
+
+
+class TestRateLimiter(test.SimpleTestCase):
+    def test_no_limit(self):
+        rate_limiter = rq_jobs.RateLimiter(max_per_second=None)
+        with mock.patch('devilry.devilry_email.rq_jobs.time.sleep') as mock_sleep:
+            for index in range(10):
+                rate_limiter.wait()
+        self.assertEqual(mock_sleep.call_count, 0)
+
+    def test_waits_between_calls(self):
+        rate_limiter = rq_jobs.RateLimiter(max_per_second=2)
+        with mock.patch('devilry.devilry_email.rq_jobs.time.monotonic', return_value=10.0), \
+                mock.patch('devilry.devilry_email.rq_jobs.time.sleep') as mock_sleep:
+            rate_limiter.wait()
+            rate_limiter.wait()
+        mock_sleep.assert_called_once_with(0.5)
@@ -15,6 +15,7 @@ import django_rq
 from devilry.devilry_email.feedback_email import feedback_email
 from devilry.apps.core import models as core_models
 from devilry.devilry_cradmin.devilry_tablebuilder import base_new
+from devilry.devilry_dbcache.deferred_rebuild import defer_dbcache_rebuild
 from devilry.devilry_group.models import GroupComment
 
 
@@ -220,15 +221,18 @@ class SimpleGroupBulkFeedbackView(listbuilderview.View):
         now_without_microseconds = timezone.now().replace(microsecond=0)
         feedbackset_id_list = []
         with transaction.atomic():
-            for feedbackset, data in feedbackset_data_dict.items():
-                text = data['comment_text']
-                if len(text) > 0:
-                    self.__create_grading_groupcomment(feedbackset.id, now_without_microseconds, text)
-                feedbackset.grading_published_by = self.request.user
-                feedbackset.grading_published_datetime = now_without_microseconds + timezone.timedelta(microseconds=1)
-                feedbackset.grading_points = data['grading_points']
-                feedbackset.save(update_fields=['grading_published_by', 'grading_published_datetime', 'grading_points'])
-                feedbackset_id_list.append(feedbackset.id)
+            with defer_dbcache_rebuild():
+                for feedbackset, data in feedbackset_data_dict.items():
+                    text = data['comment_text']
+                    if len(text) > 0:
+                        self.__create_grading_groupcomment(feedbackset.id, now_without_microseconds, text)
+                    feedbackset.grading_published_by = self.request.user
+                    feedbackset.grading_published_datetime = \
+                        now_without_microseconds + timezone.timedelta(microseconds=1)
+                    feedbackset.grading_points = data['grading_points']
+                    feedbackset.save(update_fields=['grading_published_by', 'grading_published_datetime',
+                                                    'grading_points'])
+                    feedbackset_id_list.append(feedbackset.id)
             feedback_email.bulk_send_feedback_created_email(
                 assignment_id=self.assignment.id,
                 feedbackset_id_list=feedbackset_id_list,
@@ -141,38 +141,34 @@ class GroupListView(listbuilderview.FilterListMixin,
     def __get_total_groupcount(self):
         return self.__get_unfiltered_queryset_for_role().count()
 
+    def get_status_counts(self):
+        """
+        Get the number of groups for each status with all filters except the status
+        filter applied.
+
+        See :meth:`devilry.apps.core.models.AssignmentGroupQuerySet.get_status_counts`.
+        """
+        if not hasattr(self, '_status_counts'):
+            self._status_counts = self.get_filterlist()\
+                .filter(queryobject=self.__get_unfiltered_queryset_for_role(),
+                        exclude={'status'})\
+                .get_status_counts()
+        return self._status_counts
+
     def __get_excluding_filters_other_than_status_is_applied(self, total_groupcount):
-        return self.get_filterlist().filter(
-            queryobject=self.__get_unfiltered_queryset_for_role(),
-            exclude={'status'}
-        ).count() < total_groupcount
+        return self.get_filtered_all_students_count() < total_groupcount
 
     def get_filtered_all_students_count(self):
-        return self.get_filterlist()\
-            .filter(queryobject=self.__get_unfiltered_queryset_for_role(),
-                    exclude={'status'})\
-            .count()
+        return self.get_status_counts()['all']
 
     def get_filtered_waiting_for_feedback_count(self):
-        return self.get_filterlist()\
-            .filter(queryobject=self.__get_unfiltered_queryset_for_role(),
-                    exclude={'status'})\
-            .filter(annotated_is_waiting_for_feedback__gt=0)\
-            .count()
+        return self.get_status_counts()['waiting-for-feedback']
 
     def get_filtered_waiting_for_deliveries_count(self):
-        return self.get_filterlist()\
-            .filter(queryobject=self.__get_unfiltered_queryset_for_role(),
-                    exclude={'status'})\
-            .filter(annotated_is_waiting_for_deliveries__gt=0)\
-            .count()
+        return self.get_status_counts()['waiting-for-deliveries']
 
     def get_filtered_corrected_count(self):
-        return self.get_filterlist()\
-            .filter(queryobject=self.__get_unfiltered_queryset_for_role(),
-                    exclude={'status'})\
-            .filter(annotated_is_corrected__gt=0)\
-            .count()
+        return self.get_status_counts()['corrected']
 
     def __get_distinct_relatedexaminer_ids(self):
         if not hasattr(self, '_distinct_relatedexaminer_ids'):
@@ -0,0 +1,222 @@
+"""
+Set based copying of :class:`devilry.devilry_group.models.FeedbackSet`,
+:class:`devilry.devilry_group.models.GroupComment` and
+:class:`devilry.devilry_comment.models.CommentFile`.
+
+The rows are copied with ``INSERT ... SELECT`` statements. The IDs of the
+copies are allocated from the ID sequences up front, and the foreign keys
+are remapped in SQL by joining the source rows with the ``old_id -> new_id`` maps.
+This means that the number of queries does not depend on the number of rows copied.
+
+No signals are sent for the copies, and the devilry_dbcache triggers fire once per
+statement or row as usual. Use this within
+:func:`devilry.devilry_dbcache.deferred_rebuild.defer_dbcache_rebuild` to
+rebuild the cached data for the affected groups once.
+"""
+from django.db import connection
+from django.db.models import AutoField
+
+from devilry.devilry_comment.models import Comment
+from devilry.devilry_comment.models import CommentFile
+from devilry.devilry_group.models import FeedbackSet
+from devilry.devilry_group.models import GroupComment
+
+
+def _allocate_ids(cursor, model_class, count):
+    """
+    Allocate ``count`` IDs from the ID sequence of the table for ``model_class``.
+
+    Returns:
+        list: The IDs in ascending order.
+    """
+    if count == 0:
+        return []
+    cursor.execute(
+        'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+        [model_class._meta.db_table, model_class._meta.pk.column, count])
+    return sorted(row[0] for row in cursor.fetchall())
+
+
+def _make_id_map(cursor, model_class, source_ids):
+    """
+    Make a ``{source_id: new_id}`` dict with new IDs for ``source_ids``.
+
+    The new IDs are in the same order as the source IDs, so ordering by ID
+    gives the same order for the copies as for the source rows.
+    """
+    source_ids = sorted(source_ids)
+    return dict(zip(source_ids, _allocate_ids(cursor, model_class, len(source_ids))))
+
+
+def _copy_rows(cursor, model_class, remapped_columns, reset_columns=None):
+    """
+    Copy rows in the table for ``model_class`` with a single ``INSERT ... SELECT`` statement.
+
+    Only the local fields of ``model_class`` are copied, so multi-table inherited
+    models must be copied one table at a time.
+
+    Args:
+        cursor: A database cursor.
+        model_class: The model class of the rows to copy.
+        remapped_columns (dict): Maps column names to ``{old_id: new_id}`` dicts. Only the
+            rows where the value of all these columns are in the dicts are copied, and the
+            copies get the new IDs. An AutoField primary key not in this dict is
+            set from the ID sequence.
+        reset_columns (dict): Maps column names to the value of the column in the copies.
+            Defaults to copying the value from the source rows.
+    """
+    reset_columns = reset_columns or {}
+    quote_name = connection.ops.quote_name
+    params = {}
+    joins = []
+    remapped_aliases = {}
+    for index, (column, id_map) in enumerate(sorted(remapped_columns.items())):
+        alias = 'idmap{}'.format(index)
+        remapped_aliases[column] = alias
+        old_ids = list(id_map.keys())
+        params['{}_old_ids'.format(alias)] = old_ids
+        params['{}_new_ids'.format(alias)] = [id_map[old_id] for old_id in old_ids]
+        joins.append(
+            'INNER JOIN unnest(%({alias}_old_ids)s::integer[], %({alias}_new_ids)s::integer[]) '
+            'AS {alias}(old_id, new_id) ON {alias}.old_id = source.{column}'.format(
+                alias=alias, column=quote_name(column)))
+
+    columns = []
+    expressions = []
+    for field in model_class._meta.local_concrete_fields:
+        if field.column in remapped_aliases:
+            expression = '{}.new_id'.format(remapped_aliases[field.column])
+        elif field.column in reset_columns:
+            paramname = 'reset_{}'.format(field.column)
+            params[paramname] = field.get_db_prep_save(reset_columns[field.column], connection=connection)
+            expression = '%({})s'.format(paramname)
+        elif isinstance(field, AutoField):
+            continue
+        else:
+            expression = 'source.{}'.format(quote_name(field.column))
+        columns.append(quote_name(field.column))
+        expressions.append(expression)
+
+    sql = (
+        'INSERT INTO {table_name}\n'
+        '  ({columns})\n'
+        'SELECT {expressions}\n'
+        'FROM {table_name} AS source\n'
+        '{joins}'
+    ).format(
+        table_name=quote_name(model_class._meta.db_table),
+        columns=', '.join(columns),
+        expressions=', '.join(expressions),
+        joins='\n'.join(joins))
+    cursor.execute(sql, params)
+
+
+def _copy_feedbackset_into_existing_feedbackset(cursor, source_feedbackset_id, target_feedbackset_id):
+    """
+    Copy all fields except ``id`` and ``group`` from the source FeedbackSet
+    into the target FeedbackSet with a single ``UPDATE`` statement.
+    """
+    quote_name = connection.ops.quote_name
+    assignments = [
+        '{column} = source.{column}'.format(column=quote_name(field.column))
+        for field in FeedbackSet._meta.local_concrete_fields
+        if not field.primary_key and field.name != 'group']
+    sql = (
+        'UPDATE {table_name} AS target\n'
+        'SET {assignments}\n'
+        'FROM {table_name} AS source\n'
+        'WHERE target.id = %(target_feedbackset_id)s AND source.id = %(source_feedbackset_id)s'
+    ).format(
+        table_name=quote_name(FeedbackSet._meta.db_table),
+        assignments=', '.join(assignments))
+    cursor.execute(sql, {
+        'target_feedbackset_id': target_feedbackset_id,
+        'source_feedbackset_id': source_feedbackset_id,
+    })
+
+
+def copy_groupcomments_into_feedbacksets(feedbackset_id_map):
+    """
+    Copy all the GroupComments, and their CommentFiles, in a set of FeedbackSets
+    into other FeedbackSets.
+
+    The copies of the CommentFiles reference the same stored files as the
+    source CommentFiles, like :meth:`devilry.devilry_comment.models.CommentFile.copy_into_comment`.
+    The ``v2_id`` of the copies is cleared, and the edit history is not copied.
+
+    Args:
+        feedbackset_id_map (dict): Maps the ID of each source FeedbackSet
+            to the ID of the FeedbackSet to copy its comments into.
+
+    Returns:
+        dict: Maps the ID of each source GroupComment to the ID of its copy.
+    """
+    if not feedbackset_id_map:
+        return {}
+    with connection.cursor() as cursor:
+        comment_ids = GroupComment.objects\
+            .filter(feedback_set_id__in=list(feedbackset_id_map.keys()))\
+            .values_list('id', flat=True)
+        comment_id_map = _make_id_map(cursor, Comment, comment_ids)
+        if not comment_id_map:
+            return {}
+        _copy_rows(cursor, Comment,
+                   remapped_columns={'id': comment_id_map})
+        _copy_rows(cursor, GroupComment,
+                   remapped_columns={'comment_ptr_id': comment_id_map,
+                                     'feedback_set_id': feedbackset_id_map},
+                   reset_columns={'v2_id': ''})
+        _copy_rows(cursor, CommentFile,
+                   remapped_columns={'comment_id': comment_id_map},
+                   reset_columns={'v2_id': ''})
+    return comment_id_map
+
+
+def copy_feedbacksets_into_group(source_group_id, target_group_id):
+    """
+    Copy all the FeedbackSets in an AssignmentGroup, with their GroupComments
+    and CommentFiles, into another AssignmentGroup.
+
+    The first FeedbackSet of the source group is copied into the first FeedbackSet
+    of the target group (created when the target group was created), and the
+    rest of the FeedbackSets are copied into new FeedbackSets.
+
+    Args:
+        source_group_id: ID of the :class:`~devilry.apps.core.models.AssignmentGroup` to copy from.
+        target_group_id: ID of the :class:`~devilry.apps.core.models.AssignmentGroup` to copy into.
+
+    Returns:
+        dict: Maps the ID of each source FeedbackSet to the ID of its copy.
+    """
+    source_feedbackset_ids = list(
+        FeedbackSet.objects
+        .filter(group_id=source_group_id)
+        .order_by('deadline_datetime', 'id')
+        .values_list('id', flat=True))
+    if not source_feedbackset_ids:
+        return {}
+    target_first_feedbackset_id = FeedbackSet.objects\
+        .filter(group_id=target_group_id)\
+        .order_by('deadline_datetime', 'id')\
+        .values_list('id', flat=True)\
+        .first()
+
+    with connection.cursor() as cursor:
+        if target_first_feedbackset_id is None:
+            new_feedbackset_id_map = _make_id_map(cursor, FeedbackSet, source_feedbackset_ids)
+            feedbackset_id_map = dict(new_feedbackset_id_map)
+        else:
+            source_first_feedbackset_id = source_feedbackset_ids[0]
+            _copy_feedbackset_into_existing_feedbackset(
+                cursor,
+                source_feedbackset_id=source_first_feedbackset_id,
+                target_feedbackset_id=target_first_feedbackset_id)
+            new_feedbackset_id_map = _make_id_map(cursor, FeedbackSet, source_feedbackset_ids[1:])
+            feedbackset_id_map = dict(new_feedbackset_id_map)
+            feedbackset_id_map[source_first_feedbackset_id] = target_first_feedbackset_id
+        if new_feedbackset_id_map:
+            _copy_rows(cursor, FeedbackSet,
+                       remapped_columns={'id': new_feedbackset_id_map},
+                       reset_columns={'group_id': target_group_id})
+    copy_groupcomments_into_feedbacksets(feedbackset_id_map=feedbackset_id_map)
+    return feedbackset_id_map
@@ -1,10 +1,6 @@
 # -*- coding: utf-8 -*-
 
 
-import collections
-import datetime
-import functools
-
 from django.db import models
 
 from devilry.apps.core.models import AssignmentGroup
@@ -18,6 +14,9 @@ def get_feedbackfeed_builder_queryset(group, requestuser, devilryrole):
     :class:`~devilry.devilry_group.models.GroupComments` and :class:`~devilry.devilry_comment.models.CommentFiles`
     the requestuser har access to.
 
+    The comments, deadline history and grading updates are ordered by datetime, so the
+    timeline builder can merge them without sorting.
+
     Args:
         group (AssignmentGroup): The cradmin role.
         requestuser (User): The requestuser.
@@ -37,11 +36,13 @@ def get_feedbackfeed_builder_queryset(group, requestuser, devilryrole):
             'feedback_set',
             'feedback_set__created_by',
             'feedback_set__grading_published_by') \
+        .order_by('published_datetime', 'id') \
         .prefetch_related(
             models.Prefetch(
                 'commentfile_set',
                 queryset=commentfile_queryset))
-    feedbackset_deadline_history_queryset = group_models.FeedbackSetDeadlineHistory.objects.all()
+    feedbackset_deadline_history_queryset = group_models.FeedbackSetDeadlineHistory.objects\
+        .order_by('changed_datetime', 'id')
     if devilryrole == 'student':
         groupcomment_queryset = groupcomment_queryset\
             .filter(visibility=group_models.GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE)\
@@ -66,7 +67,7 @@ def get_feedbackfeed_builder_queryset(group, requestuser, devilryrole):
         .prefetch_related(
             models.Prefetch(
                 'grading_update_histories',
-                queryset=group_models.FeedbackSetGradingUpdateHistory.objects.all(),
+                queryset=group_models.FeedbackSetGradingUpdateHistory.objects.order_by('updated_datetime', 'id'),
                 to_attr='grading_updates'
             )
         )\
@@ -80,20 +81,3 @@ class FeedbackFeedBuilderBase(object):
         super(FeedbackFeedBuilderBase, self).__init__()
         self.assignment = assignment
         self.feedbacksets = list(feedbacksets)
-
-    def sort_dict(self, dictionary):
-        """
-        Sorts the timeline after all events are added.
-
-        Args:
-            dictionary (dict): Dictionary of item with datetime keys.
-        """
-        def compare_items(item_a, item_b):
-            datetime_a = item_a[0]
-            datetime_b = item_b[0]
-            if datetime_a is None:
-                datetime_a = datetime.datetime(1970, 1, 1)
-            if datetime_b is None:
-                datetime_b = datetime.datetime(1970, 1, 1)
-            return (datetime_a > datetime_b) - (datetime_a < datetime_b)
-        return collections.OrderedDict(sorted(list(dictionary.items()), key=functools.cmp_to_key(compare_items)))
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
 
+import operator
+
 # Devilry imports
 from devilry.devilry_comment.models import CommentFile
 from devilry.devilry_group.feedbackfeed_builder import builder_base
@@ -10,7 +12,7 @@ from devilry.devilry_group import models as group_models
 class FeedbackFeedSidebarBuilder(builder_base.FeedbackFeedBuilderBase):
     def __init__(self, **kwargs):
         super(FeedbackFeedSidebarBuilder, self).__init__(**kwargs)
-        self.feedbackset_dict = {}
+        self.feedbackset_list = []
 
     def __get_files_for_comment(self, comment):
         commentfiles = comment.commentfile_set.all()
@@ -20,19 +22,14 @@ class FeedbackFeedSidebarBuilder(builder_base.FeedbackFeedBuilderBase):
         return commentfilelist
 
     def build(self):
-        for feedbackset in self.feedbacksets:
-            self.feedbackset_dict[feedbackset.created_datetime] = {
-                'feedbackset_num': 0,
+        feedbacksets = sorted(self.feedbacksets, key=operator.attrgetter('created_datetime'))
+        self.feedbackset_list = [
+            {
+                'feedbackset_num': feedbackset_num,
                 'feedbackset': feedbackset
             }
-        self.feedbackset_dict = self.sort_dict(self.feedbackset_dict)
+            for feedbackset_num, feedbackset in enumerate(feedbacksets, start=1)
+        ]
 
     def get_as_list(self):
-        feedbackset_list = []
-        num = 1
-        for key_datetime in sorted(self.feedbackset_dict.keys()):
-            feedbacksets = self.feedbackset_dict[key_datetime]
-            feedbacksets['feedbackset_num'] = num
-            feedbackset_list.append(feedbacksets)
-            num += 1
-        return feedbackset_list
+        return self.feedbackset_list
@@ -1,12 +1,10 @@
 # -*- coding: utf-8 -*-
 
 
-import collections
-import datetime
+import heapq
+import operator
 
 # Django imports
-import functools
-
 from django.utils import timezone
 
 # Devilry/cradmin imports
@@ -15,55 +13,54 @@ from devilry.devilry_group.feedbackfeed_builder import builder_base
 
 
 class AbstractTimelineBuilder(object):
+    """
+    Base class for timeline builders.
+
+    The timeline is built by merging event iterators that are already ordered by
+    datetime with :func:`heapq.merge`. Each iterator yields ``(datetime, event_dict)``
+    tuples. Events with the same datetime are ordered by the order of the
+    iterators, and the order within each iterator.
+    """
     def build(self):
         raise NotImplementedError()
 
-    def _add_event_item_to_timeline(self, datetime_obj, event_dict):
+    def _make_event_item(self, datetime_obj, event_dict):
         """
-        General function for adding an event to the timeline.
+        Make an event item for the timeline.
         An event item is anything that occurs on the feedbackfeed that can
         be sorted; a comment, deadline created, deadline expired and grading.
 
         Args:
             datetime_obj: The datetime the event should be ordered by.
             event_dict: The event dictionary.
+
+        Returns:
+            tuple: ``(datetime_obj, event_dict)``.
         """
-        if datetime_obj is None:
-            return
-        if datetime_obj not in self.time_line:
-            self.time_line[datetime_obj] = []
         event_dict['ordering_datetime'] = datetime_obj
-        self.time_line[datetime_obj].append(event_dict)
+        return datetime_obj, event_dict
 
-    def get_as_list(self):
+    def _merge_event_iterators(self, *event_iterators):
         """
-        Get a flat list of event dictionaries.
+        Merge the ordered event iterators into a single ordered iterator of event dicts.
+
+        Args:
+            *event_iterators: Iterators yielding ``(datetime, event_dict)`` tuples ordered by datetime.
 
         Returns:
-             list: List of event-dictionaries.
+            iterator: Iterator of event dictionaries.
         """
-        timeline_list = []
-        for datetime_obj in sorted(self.time_line.keys()):
-            for event_dict in self.time_line[datetime_obj]:
-                timeline_list.append(event_dict)
-        return timeline_list
+        for datetime_obj, event_dict in heapq.merge(*event_iterators, key=operator.itemgetter(0)):
+            yield event_dict
 
-    def sort_dict(self, dictionary):
+    def get_as_list(self):
         """
-        Sorts the timeline after all events are added.
+        Get a flat list of event dictionaries.
 
-        Args:
-            dictionary (dict): Dictionary of item with datetime keys.
+        Returns:
+             list: List of event-dictionaries.
         """
-        def compare_items(item_a, item_b):
-            datetime_a = item_a[0]
-            datetime_b = item_b[0]
-            if datetime_a is None:
-                datetime_a = datetime.datetime(1970, 1, 1)
-            if datetime_b is None:
-                datetime_b = datetime.datetime(1970, 1, 1)
-            return (datetime_a > datetime_b) - (datetime_a < datetime_b)
-        return collections.OrderedDict(sorted(list(dictionary.items()), key=functools.cmp_to_key(compare_items)))
+        return self.time_line
 
 
 class FeedbackFeedTimelineBuilder(AbstractTimelineBuilder, builder_base.FeedbackFeedBuilderBase):
@@ -80,15 +77,13 @@ class FeedbackFeedTimelineBuilder(AbstractTimelineBuilder, builder_base.Feedback
             feedbacksets: Fetched feedbacksets, comments and files.
         """
         super(FeedbackFeedTimelineBuilder, self). __init__(**kwargs)
-        self.time_line = {}
+        self.time_line = []
 
     def get_as_list_flat(self):
         timeline_list = []
-        for datetime_obj in sorted(self.time_line.keys()):
-            for event_dict in self.time_line[datetime_obj]:
-                timeline_list.append(event_dict)
-                for feedbackset_event_dict in event_dict['feedbackset_events']:
-                    timeline_list.append(feedbackset_event_dict)
+        for event_dict in self.time_line:
+            timeline_list.append(event_dict)
+            timeline_list.extend(event_dict['feedbackset_events'])
         return timeline_list
 
     def __should_skip_feedback_set(self, feedback_set):
@@ -135,36 +130,52 @@ class FeedbackFeedTimelineBuilder(AbstractTimelineBuilder, builder_base.Feedback
             return feedback_set.created_datetime
         return feedback_set.deadline_datetime
 
-    def build(self):
-        for feedback_set in self.feedbacksets:
-            if self.__should_skip_feedback_set(feedback_set=feedback_set):
-                continue
+    def iter_feedbackset_events(self):
+        """
+        Iterate over the event dicts for each FeedbackSet ordered by
+        :meth:`.__get_order_feedback_set_by_deadline_datetime`. FeedbackSets with the
+        same ordering datetime keep the order of ``feedbacksets``.
+
+        Yields:
+            dict: Event dict with the ``feedbackset`` and a list of ``feedbackset_events``.
+        """
+        feedback_sets = [feedback_set for feedback_set in self.feedbacksets
+                         if not self.__should_skip_feedback_set(feedback_set=feedback_set)]
+        feedback_sets.sort(key=self.__get_order_feedback_set_by_deadline_datetime)
+        for feedback_set in feedback_sets:
             feedback_set_event = FeedbackSetEventTimeLine(
                 feedback_set=feedback_set,
                 assignment=self.assignment)
-            feedback_set_event.build()
-            self._add_event_item_to_timeline(
+            datetime_obj, event_dict = self._make_event_item(
                 datetime_obj=self.__get_order_feedback_set_by_deadline_datetime(feedback_set=feedback_set),
                 event_dict={
                     'feedbackset': feedback_set,
-                    'feedbackset_events': feedback_set_event.get_as_list()
+                    'feedbackset_events': list(feedback_set_event.iter_events())
                 }
             )
-        self.time_line = self.sort_dict(self.time_line)
+            yield event_dict
+
+    def build(self):
+        self.time_line = list(self.iter_feedbackset_events())
 
 
 class FeedbackSetEventTimeLine(AbstractTimelineBuilder):
     """
+    Builds the events for a single FeedbackSet.
+
+    The comments, deadline history and grading updates must be prefetched ordered
+    by datetime, as done by
+    :func:`devilry.devilry_group.feedbackfeed_builder.builder_base.get_feedbackfeed_builder_queryset`.
     """
     def __init__(self, feedback_set, assignment):
         super(FeedbackSetEventTimeLine, self).__init__()
         self.feedback_set = feedback_set
         self.assignment = assignment
-        self.time_line = {}
+        self.time_line = []
 
-    def __add_deadline_expired_if_needed(self):
+    def __iter_deadline_expired_event(self):
         """
-        Adds a deadline_expired event type to the timeline.
+        Yields a deadline_expired event type if the deadline has expired.
         The expired deadline is the :func:`devilry.devilry_group.models.FeedbackSet.current_deadline` of
         ``feedbackset``.
         """
@@ -172,7 +183,7 @@ class FeedbackSetEventTimeLine(AbstractTimelineBuilder):
         if current_deadline is None:
             return
         if current_deadline <= timezone.now():
-            self._add_event_item_to_timeline(
+            yield self._make_event_item(
                     datetime_obj=current_deadline,
                     event_dict={
                         "type": "deadline_expired",
@@ -180,15 +191,17 @@ class FeedbackSetEventTimeLine(AbstractTimelineBuilder):
                         "feedbackset": self.feedback_set
                     })
 
-    def __add_grade_to_timeline_if_published(self):
+    def __iter_grade_event(self):
         """
-        Add a grade event when the :obj:`devilry.devilry_group.models.FeedbackSet.grading_published_datetime` is set for
-        ``feedbackset``.
+        Yields a grade event when the :obj:`devilry.devilry_group.models.FeedbackSet.grading_published_datetime` is
+        set for ``feedbackset``.
         """
+        if self.feedback_set.grading_published_datetime is None:
+            return
         grade_points = self.feedback_set.grading_points
         if len(self.feedback_set.grading_updates) > 0:
             grade_points = self.feedback_set.grading_updates[0].old_grading_points
-        self._add_event_item_to_timeline(
+        yield self._make_event_item(
             datetime_obj=self.feedback_set.grading_published_datetime,
             event_dict={
                 'type': 'grade',
@@ -198,57 +211,45 @@ class FeedbackSetEventTimeLine(AbstractTimelineBuilder):
             }
         )
 
-    def __add_comment_to_timeline(self, group_comment):
+    def __iter_comment_events(self):
         """
-        Adds a :class:`devilry.devilry_group.models.GroupComment` to the timeline.
-
-        Args:
-            group_comment: The comment to add.
-        """
-        event_dict = {
-            "type": "comment",
-            "obj": group_comment,
-            "related_deadline": self.feedback_set.current_deadline(assignment=self.assignment),
-        }
-        self._add_event_item_to_timeline(
-            datetime_obj=group_comment.published_datetime,
-            event_dict=event_dict
-        )
-
-    def __add_comments_to_timeline(self):
-        """
-        Iterates through the comments for ``feedbackset`` and adds them to the time-line.
+        Iterates through the comments for ``feedbackset`` ordered by ``published_datetime``.
         """
+        related_deadline = self.feedback_set.current_deadline(assignment=self.assignment)
         for group_comment in self.feedback_set.groupcomment_set.all():
-            self.__add_comment_to_timeline(group_comment=group_comment)
+            yield self._make_event_item(
+                datetime_obj=group_comment.published_datetime,
+                event_dict={
+                    "type": "comment",
+                    "obj": group_comment,
+                    "related_deadline": related_deadline,
+                }
+            )
 
-    def __add_deadline_moved_event(self):
+    def __iter_deadline_moved_events(self):
         """
         Iterates through the log entries for changes in the :obj:`~.devilry.devilry_group.models.FeedbackSet`s
-        deadline_datetime and adds them to the time-line.
+        deadline_datetime ordered by ``changed_datetime``.
         """
-        deadline_history_queryset = self.feedback_set.feedbacksetdeadlinehistory_set \
-            .order_by('-changed_datetime')
-        last_deadline_history = None
-        if deadline_history_queryset.count() > 0:
-            last_deadline_history = deadline_history_queryset[0]
-        for deadline_history in deadline_history_queryset:
-            is_last = False
-            if deadline_history.changed_datetime == last_deadline_history.changed_datetime:
-                is_last = True
-            self._add_event_item_to_timeline(
+        deadline_histories = self.feedback_set.feedbacksetdeadlinehistory_set.all()
+        if not deadline_histories:
+            return
+        last_changed_datetime = deadline_histories[len(deadline_histories) - 1].changed_datetime
+        for deadline_history in deadline_histories:
+            yield self._make_event_item(
                 datetime_obj=deadline_history.changed_datetime,
                 event_dict={
                     'type': 'deadline_moved',
-                    'is_last': is_last,
+                    'is_last': deadline_history.changed_datetime == last_changed_datetime,
                     'obj': deadline_history,
                     'feedbackset': self.feedback_set
                 }
             )
 
-    def __add_grading_updated_event(self):
+    def __iter_grading_updated_events(self):
         """
-        Add event for updated grading on a :class:`~.devilry.devilry_group.models.FeedbackSet`.
+        Iterates through the updated gradings on a :class:`~.devilry.devilry_group.models.FeedbackSet`
+        ordered by ``updated_datetime``.
         """
         grading_updates_length = len(self.feedback_set.grading_updates)
         for index, grading_updated in enumerate(self.feedback_set.grading_updates):
@@ -256,7 +257,7 @@ class FeedbackSetEventTimeLine(AbstractTimelineBuilder):
                 next_grading_points = self.feedback_set.grading_points
             else:
                 next_grading_points = self.feedback_set.grading_updates[index+1].old_grading_points
-            self._add_event_item_to_timeline(
+            yield self._make_event_item(
                 datetime_obj=grading_updated.updated_datetime,
                 event_dict={
                     'type': 'grading_updated',
@@ -266,10 +267,19 @@ class FeedbackSetEventTimeLine(AbstractTimelineBuilder):
                 }
             )
 
+    def iter_events(self):
+        """
+        Iterate over all the events for the FeedbackSet ordered by datetime.
+
+        Yields:
+            dict: Event dictionaries.
+        """
+        return self._merge_event_iterators(
+            self.__iter_deadline_moved_events(),
+            self.__iter_deadline_expired_event(),
+            self.__iter_grade_event(),
+            self.__iter_comment_events(),
+            self.__iter_grading_updated_events())
+
     def build(self):
-        self.__add_deadline_moved_event()
-        self.__add_deadline_expired_if_needed()
-        self.__add_grade_to_timeline_if_published()
-        self.__add_comments_to_timeline()
-        self.__add_grading_updated_event()
-        self.time_line = self.sort_dict(self.time_line)
+        self.time_line = list(self.iter_events())
@@ -211,6 +211,7 @@ class AbstractGroupComment(comment_models.Comment):
             published_datetime=self.published_datetime,
             user_role=self.user_role,
             comment_type=self.comment_type,
+            visibility=self.visibility,
         )
         commentcopy.save()
         for commentfile in self.commentfile_set.all():
@@ -574,6 +575,9 @@ class FeedbackSet(models.Model):
         Copy this feedbackset into ``target`` or create a new feedbackset,
         and set group foreign key to ``group``
 
+        The comments and their files are copied with
+        :func:`devilry.devilry_group.bulk_copy.copy_groupcomments_into_feedbacksets`.
+
         Args:
             group: :class:`~core.AssignmentGroup`
             target: :class:`~devilry_group.FeedbackSet`
@@ -601,10 +605,11 @@ class FeedbackSet(models.Model):
         else:
             for key, value in feedbackset_kwargs.items():
                 setattr(target, key, value)
-        target.save()
-
-        for comment in self.groupcomment_set.all():
-            comment.copy_comment_into_feedbackset(target)
+        from devilry.devilry_dbcache.deferred_rebuild import defer_dbcache_rebuild
+        from devilry.devilry_group.bulk_copy import copy_groupcomments_into_feedbacksets
+        with defer_dbcache_rebuild():
+            target.save()
+            copy_groupcomments_into_feedbacksets(feedbackset_id_map={self.id: target.id})
 
         return target
 
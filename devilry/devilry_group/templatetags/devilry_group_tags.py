@@ -97,7 +97,7 @@ def devilry_group_comment_published(comment):
 
 @register.filter("devilry_group_markdown")
 def devilry_group_markdown(value):
-    return parse_markdown.markdown_full(value)
+    return parse_markdown.markdown_full_cached(value)
 
 
 @register.inclusion_tag("devilry_group/template_tags/devilry_group_comment_user_is_none.django.html")
@@ -0,0 +1,131 @@
+import time
+import unittest
+
+from django import test
+from django.core.cache import cache
+from django_cradmin import cradmin_testhelpers
+from model_mommy import mommy
+
+from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
+from devilry.devilry_group import devilry_group_mommy_factories as group_mommy
+from devilry.devilry_group.views.student import feedbackfeed_student
+from devilry.devilry_markup import parse_markdown
+
+
+class MeasureExecution(object):
+    """
+    Measures the duration of the code within the context.
+    """
+    def __init__(self, label):
+        self.label = label
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = time.time()
+
+    def __exit__(self, ttype, value, traceback):
+        duration = time.time() - self.start_time
+        print()
+        print('{}: {:.3f}s'.format(self.label, duration))
+        print()
+
+
+def make_comment_texts(comment_count):
+    """
+    Make ``comment_count`` comment texts with the kind of markdown (code blocks, lists, ...)
+    that makes the feedbackfeed slow to render.
+    """
+    return [
+        'Comment {index}\n\n'
+        'Some **bold** text, a [link](http://example.com) and a list:\n\n'
+        '- One\n'
+        '- Two\n\n'
+        '```python\n'
+        'def add(a, b):\n'
+        '    return a + b + {index}\n'
+        '```\n'.format(index=index)
+        for index in range(comment_count)]
+
+
+@unittest.skip('Bechmark - should just be enabled when debugging performance')
+class TestBenchMarkFeedbackfeedMarkdown(test.TestCase):
+    #: Number of comments in the simulated feedbackfeed.
+    comment_count = 500
+
+    def setUp(self):
+        cache.clear()
+        self.comment_texts = make_comment_texts(self.comment_count)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_new_markdown_instance_for_each_comment(self):
+        with MeasureExecution('New Markdown instance for each of {} comments'.format(self.comment_count)):
+            for text in self.comment_texts:
+                parse_markdown._make_markdown_instance().convert(text)
+
+    def test_pooled_markdown_instance(self):
+        with MeasureExecution('Pooled Markdown instance for {} comments'.format(self.comment_count)):
+            for text in self.comment_texts:
+                parse_markdown.markdown_full(text)
+
+    def test_cached_html(self):
+        for text in self.comment_texts:
+            parse_markdown.markdown_full_cached(text)
+        with MeasureExecution('Cached HTML for {} comments'.format(self.comment_count)):
+            for text in self.comment_texts:
+                parse_markdown.markdown_full_cached(text)
+
+
+@unittest.skip('Bechmark - should just be enabled when debugging performance')
+class TestBenchMarkFeedbackfeedView(test.TestCase, cradmin_testhelpers.TestCaseMixin):
+    """
+    Benchmark rendering the student feedbackfeed for a group with many comments
+    with a cold cache (markdown and closed attempts rendered from scratch) and
+    with a warm cache.
+    """
+    viewclass = feedbackfeed_student.StudentFeedbackFeedView
+
+    #: Number of attempts (FeedbackSets) in the group. All except the last is closed.
+    feedbackset_count = 5
+
+    #: Number of comments in each attempt.
+    comments_per_feedbackset = 100
+
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+        cache.clear()
+        self.testgroup = mommy.make('core.AssignmentGroup')
+        self.candidate = mommy.make('core.Candidate', assignment_group=self.testgroup)
+        feedbacksets = [group_mommy.feedbackset_first_attempt_published(group=self.testgroup)]
+        for index in range(self.feedbackset_count - 2):
+            feedbacksets.append(group_mommy.feedbackset_new_attempt_published(group=self.testgroup))
+        feedbacksets.append(group_mommy.feedbackset_new_attempt_unpublished(group=self.testgroup))
+        comment_texts = make_comment_texts(self.comments_per_feedbackset)
+        for feedbackset in feedbacksets:
+            for text in comment_texts:
+                mommy.make('devilry_group.GroupComment',
+                           text=text,
+                           user=self.candidate.relatedstudent.user,
+                           user_role='student',
+                           feedback_set=feedbackset)
+
+    def tearDown(self):
+        cache.clear()
+
+    def __render_feedbackfeed(self):
+        mockresponse = self.mock_getrequest(cradmin_role=self.testgroup,
+                                            requestuser=self.candidate.relatedstudent.user)
+        mockresponse.response.render()
+        self.assertEqual(mockresponse.response.status_code, 200)
+
+    def test_cold_cache(self):
+        with MeasureExecution('Feedbackfeed with {} attempts with {} comments - cold cache'.format(
+                self.feedbackset_count, self.comments_per_feedbackset)):
+            self.__render_feedbackfeed()
+
+    def test_warm_cache(self):
+        self.__render_feedbackfeed()
+        with MeasureExecution('Feedbackfeed with {} attempts with {} comments - warm cache'.format(
+                self.feedbackset_count, self.comments_per_feedbackset)):
+            self.__render_feedbackfeed()
@@ -54,7 +54,7 @@ class TestBulkFileDownloadBase(AbstractTestCase):
 
         testclass = BulkDownloadTestClass()
         response = testclass.get(None)
-        zipfileobject = ZipFile(BytesIO(response.content))
+        zipfileobject = ZipFile(BytesIO(b''.join(response.streaming_content)))
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1/attempt1/testfile1.txt')
         self.assertEqual(filecontents, b"test")
 
@@ -83,7 +83,7 @@ class TestBulkFileDownloadBase(AbstractTestCase):
 
         testclass = BulkDownloadTestClass()
         response = testclass.get(None)
-        zipfileobject = ZipFile(BytesIO(response.content))
+        zipfileobject = ZipFile(BytesIO(b''.join(response.streaming_content)))
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1.testuser2/attempt1/testfile1.txt')
         self.assertEqual(filecontents, b"test")
 
@@ -119,7 +119,7 @@ class TestBulkFileDownloadBase(AbstractTestCase):
 
         testclass = BulkDownloadTestClass()
         response = testclass.get(None)
-        zipfileobject = ZipFile(BytesIO(response.content))
+        zipfileobject = ZipFile(BytesIO(b''.join(response.streaming_content)))
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1/attempt1/testfile1.txt')
         self.assertEqual(filecontents, b"test")
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1/attempt2/testfile2.txt')
@@ -154,7 +154,7 @@ class TestBulkFileDownloadBase(AbstractTestCase):
 
         testclass = BulkDownloadTestClass()
         response = testclass.get(None)
-        zipfileobject = ZipFile(BytesIO(response.content))
+        zipfileobject = ZipFile(BytesIO(b''.join(response.streaming_content)))
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1/attempt1/testfile1.txt')
         self.assertEqual(filecontents, b"test")
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1/attempt1/testfile1-1.txt')
@@ -186,7 +186,7 @@ class TestBulkFileDownloadBase(AbstractTestCase):
 
         testclass = BulkDownloadTestClass()
         response = testclass.get(None)
-        zipfileobject = ZipFile(BytesIO(response.content))
+        zipfileobject = ZipFile(BytesIO(b''.join(response.streaming_content)))
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1/attempt1/testfile1.txt')
         self.assertEqual(filecontents, b"test2")
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1/attempt1/testfile1-1.txt')
@@ -214,7 +214,7 @@ class TestBulkFileDownloadBase(AbstractTestCase):
 
         testclass = BulkDownloadTestClass()
         response = testclass.get(None)
-        zipfileobject = ZipFile(BytesIO(response.content))
+        zipfileobject = ZipFile(BytesIO(b''.join(response.streaming_content)))
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1/attempt1/from_examiner/testfile1.txt')
         self.assertEqual(filecontents, b"test")
 
@@ -240,7 +240,7 @@ class TestBulkFileDownloadBase(AbstractTestCase):
 
         testclass = BulkDownloadTestClass()
         response = testclass.get(None)
-        zipfileobject = ZipFile(BytesIO(response.content))
+        zipfileobject = ZipFile(BytesIO(b''.join(response.streaming_content)))
         filecontents = zipfileobject.read(
             'test2100.spring2015.oblig1.testuser1/attempt1/not_part_of_delivery/testfile1.txt')
         self.assertEqual(filecontents, b"test")
@@ -283,7 +283,7 @@ class TestBulkFileDownloadBase(AbstractTestCase):
 
         testclass = BulkDownloadTestClass()
         response = testclass.get(None)
-        zipfileobject = ZipFile(BytesIO(response.content))
+        zipfileobject = ZipFile(BytesIO(b''.join(response.streaming_content)))
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser1/attempt1/testfile1.txt')
         self.assertEqual(filecontents, b"test")
         filecontents = zipfileobject.read('test2100.spring2015.oblig1.testuser2/attempt1/testfile2.txt')
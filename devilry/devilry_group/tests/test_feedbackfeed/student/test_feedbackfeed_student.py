@@ -2,6 +2,7 @@ import mock
 from django.conf import settings
 from django.contrib import messages
 from django.core import mail
+from django.core.cache import cache
 from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.http import Http404
@@ -13,6 +14,7 @@ from model_mommy import mommy
 from devilry.apps.core import models as core_models
 from devilry.devilry_comment import models as comment_models
 from devilry.devilry_compressionutil.models import CompressedArchiveMeta
+from devilry.devilry_cradmin.devilry_listbuilder import feedbackfeed_timeline
 from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
 from devilry.devilry_group import devilry_group_mommy_factories as group_mommy
 from devilry.devilry_group import models as group_models
@@ -755,6 +757,71 @@ class TestFeedbackfeedStudent(TestCase, test_feedbackfeed_common.TestFeedbackFee
         self.assertNotIn(b'Give new attempt', mockresponse.response.content)
 
 
+class TestFeedbackfeedTimelineCacheStudent(TestCase, cradmin_testhelpers.TestCaseMixin):
+    viewclass = feedbackfeed_student.StudentFeedbackFeedView
+
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def __make_group_with_two_attempts(self):
+        testgroup = mommy.make('core.AssignmentGroup')
+        candidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        first_feedbackset = group_mommy.feedbackset_first_attempt_published(group=testgroup)
+        group_mommy.feedbackset_new_attempt_unpublished(group=testgroup)
+        comment = mommy.make('devilry_group.GroupComment',
+                             text='First attempt comment',
+                             user=candidate.relatedstudent.user,
+                             user_role='student',
+                             feedback_set=first_feedbackset)
+        return testgroup, candidate, comment
+
+    def __count_feedbackset_timeline_builds(self, testgroup, candidate):
+        with mock.patch.object(feedbackfeed_timeline.FeedbackSetTimelineListBuilderList, 'from_built_timeline',
+                               wraps=feedbackfeed_timeline.FeedbackSetTimelineListBuilderList.from_built_timeline) \
+                as mock_from_built_timeline:
+            mockresponse = self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
+                                                              requestuser=candidate.relatedstudent.user)
+        return mockresponse, mock_from_built_timeline.call_count
+
+    def test_closed_feedbackset_is_cached(self):
+        testgroup, candidate, comment = self.__make_group_with_two_attempts()
+        mockresponse, build_count = self.__count_feedbackset_timeline_builds(testgroup, candidate)
+        self.assertEqual(2, build_count)
+        mockresponse, build_count = self.__count_feedbackset_timeline_builds(testgroup, candidate)
+        self.assertEqual(1, build_count)
+        self.assertEqual(2, mockresponse.selector.count('.devilry-group-feedbackfeed-feed__feedbackset-wrapper'))
+        self.assertEqual('First attempt comment',
+                         mockresponse.selector.one('.devilry-group-comment-text').alltext_normalized)
+
+    @override_settings(DEVILRY_GROUP_FEEDBACKFEED_TIMELINE_CACHE_TIMEOUT=None)
+    def test_closed_feedbackset_cache_disabled(self):
+        testgroup, candidate, comment = self.__make_group_with_two_attempts()
+        self.__count_feedbackset_timeline_builds(testgroup, candidate)
+        mockresponse, build_count = self.__count_feedbackset_timeline_builds(testgroup, candidate)
+        self.assertEqual(2, build_count)
+
+    def test_closed_feedbackset_edited_comment_not_cached(self):
+        testgroup, candidate, comment = self.__make_group_with_two_attempts()
+        self.__count_feedbackset_timeline_builds(testgroup, candidate)
+        comment.text = 'Edited comment'
+        comment.save()
+        mockresponse, build_count = self.__count_feedbackset_timeline_builds(testgroup, candidate)
+        self.assertEqual(2, build_count)
+        self.assertEqual('Edited comment',
+                         mockresponse.selector.one('.devilry-group-comment-text').alltext_normalized)
+
+    def test_closed_feedbackset_cached_for_each_user(self):
+        testgroup, candidate, comment = self.__make_group_with_two_attempts()
+        other_candidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        self.__count_feedbackset_timeline_builds(testgroup, candidate)
+        mockresponse, build_count = self.__count_feedbackset_timeline_builds(testgroup, other_candidate)
+        self.assertEqual(2, build_count)
+
+
 class TestFeedbackfeedGradeMappingStudent(TestCase, cradmin_testhelpers.TestCaseMixin):
     viewclass = feedbackfeed_student.StudentFeedbackFeedView
 
@@ -1335,6 +1402,118 @@ class TestFeedbackPublishingStudent(TestCase, cradmin_testhelpers.TestCaseMixin)
         self.assertTrue(mockresponse.selector.exists('.devilry-group-feedbackfeed-comment'))
         self.assertEqual(2, group_models.FeedbackSet.objects.count())
 
+    def test_get_etag(self):
+        testgroup = mommy.make('core.AssignmentGroup')
+        candidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        group_mommy.feedbackset_first_attempt_unpublished(group=testgroup)
+        mockresponse = self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
+                                                          requestuser=candidate.relatedstudent.user,
+                                                          requestkwargs={'CSRF_COOKIE': 'a' * 64})
+        self.assertTrue(mockresponse.response.has_header('ETag'))
+        self.assertIn('private', mockresponse.response['Cache-Control'])
+
+    @override_settings(DEVILRY_GROUP_FEEDBACKFEED_CONDITIONAL_GET=False)
+    def test_get_etag_disabled(self):
+        testgroup = mommy.make('core.AssignmentGroup')
+        candidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        group_mommy.feedbackset_first_attempt_unpublished(group=testgroup)
+        mockresponse = self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
+                                                          requestuser=candidate.relatedstudent.user,
+                                                          requestkwargs={'CSRF_COOKIE': 'a' * 64})
+        self.assertFalse(mockresponse.response.has_header('ETag'))
+
+    def test_get_not_modified(self):
+        testgroup = mommy.make('core.AssignmentGroup')
+        candidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        testfeedbackset = group_mommy.feedbackset_first_attempt_unpublished(group=testgroup)
+        mommy.make('devilry_group.GroupComment',
+                   user=candidate.relatedstudent.user,
+                   user_role='student',
+                   feedback_set=testfeedbackset)
+        mockresponse = self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
+                                                          requestuser=candidate.relatedstudent.user,
+                                                          requestkwargs={'CSRF_COOKIE': 'a' * 64})
+        mockresponse = self.mock_getrequest(
+            cradmin_role=testgroup,
+            requestuser=candidate.relatedstudent.user,
+            requestkwargs={'CSRF_COOKIE': 'a' * 64,
+                           'HTTP_IF_NONE_MATCH': mockresponse.response['ETag']})
+        self.assertEqual(304, mockresponse.response.status_code)
+
+    def test_get_modified_by_new_comment(self):
+        testgroup = mommy.make('core.AssignmentGroup')
+        candidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        testfeedbackset = group_mommy.feedbackset_first_attempt_unpublished(group=testgroup)
+        mockresponse = self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
+                                                          requestuser=candidate.relatedstudent.user,
+                                                          requestkwargs={'CSRF_COOKIE': 'a' * 64})
+        mommy.make('devilry_group.GroupComment',
+                   user=candidate.relatedstudent.user,
+                   user_role='student',
+                   visibility=group_models.GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE,
+                   feedback_set=testfeedbackset)
+        mockresponse = self.mock_http200_getrequest_htmls(
+            cradmin_role=testgroup,
+            requestuser=candidate.relatedstudent.user,
+            requestkwargs={'CSRF_COOKIE': 'a' * 64,
+                           'HTTP_IF_NONE_MATCH': mockresponse.response['ETag']})
+        self.assertTrue(mockresponse.selector.exists('.devilry-group-feedbackfeed-comment'))
+
+    def test_get_modified_by_edited_comment(self):
+        testgroup = mommy.make('core.AssignmentGroup')
+        candidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        testfeedbackset = group_mommy.feedbackset_first_attempt_unpublished(group=testgroup)
+        comment = mommy.make('devilry_group.GroupComment',
+                             text='Old text',
+                             user=candidate.relatedstudent.user,
+                             user_role='student',
+                             feedback_set=testfeedbackset)
+        mockresponse = self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
+                                                          requestuser=candidate.relatedstudent.user,
+                                                          requestkwargs={'CSRF_COOKIE': 'a' * 64})
+        comment.text = 'New text'
+        comment.save()
+        mockresponse = self.mock_http200_getrequest_htmls(
+            cradmin_role=testgroup,
+            requestuser=candidate.relatedstudent.user,
+            requestkwargs={'CSRF_COOKIE': 'a' * 64,
+                           'HTTP_IF_NONE_MATCH': mockresponse.response['ETag']})
+        self.assertIn('New text', mockresponse.selector.one('.devilry-group-feedbackfeed-comment').alltext_normalized)
+
+    def test_get_modified_by_replaced_examiner(self):
+        testgroup = mommy.make('core.AssignmentGroup')
+        candidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        examiner = mommy.make('core.Examiner', assignmentgroup=testgroup)
+        group_mommy.feedbackset_first_attempt_unpublished(group=testgroup)
+        mockresponse = self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
+                                                          requestuser=candidate.relatedstudent.user,
+                                                          requestkwargs={'CSRF_COOKIE': 'a' * 64})
+        examiner.relatedexaminer = mommy.make('core.RelatedExaminer')
+        examiner.save()
+        mockresponse2 = self.mock_http200_getrequest_htmls(
+            cradmin_role=testgroup,
+            requestuser=candidate.relatedstudent.user,
+            requestkwargs={'CSRF_COOKIE': 'a' * 64,
+                           'HTTP_IF_NONE_MATCH': mockresponse.response['ETag']})
+        self.assertNotEqual(mockresponse.response['ETag'], mockresponse2.response['ETag'])
+
+    def test_get_modified_by_replaced_candidate(self):
+        testgroup = mommy.make('core.AssignmentGroup')
+        candidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        othercandidate = mommy.make('core.Candidate', assignment_group=testgroup)
+        group_mommy.feedbackset_first_attempt_unpublished(group=testgroup)
+        mockresponse = self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
+                                                          requestuser=candidate.relatedstudent.user,
+                                                          requestkwargs={'CSRF_COOKIE': 'a' * 64})
+        othercandidate.relatedstudent = mommy.make('core.RelatedStudent')
+        othercandidate.save()
+        mockresponse2 = self.mock_http200_getrequest_htmls(
+            cradmin_role=testgroup,
+            requestuser=candidate.relatedstudent.user,
+            requestkwargs={'CSRF_COOKIE': 'a' * 64,
+                           'HTTP_IF_NONE_MATCH': mockresponse.response['ETag']})
+        self.assertNotEqual(mockresponse.response['ETag'], mockresponse2.response['ETag'])
+
     def test_get_num_queries(self):
         testgroup = mommy.make('core.AssignmentGroup')
         mommy.make('core.Candidate', assignment_group=testgroup, _quantity=50)
@@ -1354,7 +1533,7 @@ class TestFeedbackPublishingStudent(TestCase, cradmin_testhelpers.TestCaseMixin)
                    _quantity=20)
         mock_cradmininstance = mock.MagicMock()
         mock_cradmininstance.get_devilryrole_for_requestuser.return_value = 'student'
-        with self.assertNumQueries(19):
+        with self.assertNumQueries(20):
             self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
                                                requestuser=candidate.relatedstudent.user,
                                                cradmin_instance=mock_cradmininstance)
@@ -1389,7 +1568,7 @@ class TestFeedbackPublishingStudent(TestCase, cradmin_testhelpers.TestCaseMixin)
                    filename='test2.py',
                    comment=comment2,
                    _quantity=20)
-        with self.assertNumQueries(19):
+        with self.assertNumQueries(20):
             self.mock_http200_getrequest_htmls(cradmin_role=testgroup,
                                                requestuser=candidate.relatedstudent.user)
         self.assertEqual(1, group_models.FeedbackSet.objects.count())
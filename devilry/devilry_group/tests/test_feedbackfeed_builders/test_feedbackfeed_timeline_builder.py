@@ -3,6 +3,8 @@ from django.test import TestCase
 from django.conf import settings
 
 # Third party imports
+from datetime import timedelta
+
 from django.utils import timezone
 from model_mommy import mommy
 
@@ -35,6 +37,70 @@ class TimelineBuilderTestMixin:
         timeline_list = timeline_builder.get_as_list()
         return timeline_list
 
+    def test_events_ordered_by_datetime(self):
+        testuser = mommy.make(settings.AUTH_USER_MODEL)
+        now = timezone.now()
+        testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_end')
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        testfeedbackset = group_mommy.feedbackset_first_attempt_unpublished(
+            group=testgroup, deadline_datetime=now + timedelta(days=10))
+        last_comment = mommy.make('devilry_group.GroupComment',
+                                  feedback_set=testfeedbackset,
+                                  visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE,
+                                  published_datetime=now - timedelta(days=1))
+        first_comment = mommy.make('devilry_group.GroupComment',
+                                   feedback_set=testfeedbackset,
+                                   visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE,
+                                   published_datetime=now - timedelta(days=3))
+        deadline_history = mommy.make('devilry_group.FeedbackSetDeadlineHistory',
+                                      feedback_set=testfeedbackset,
+                                      changed_datetime=now - timedelta(days=2))
+        timeline_list = self.__build_timeline(group=testgroup, user=testuser, assignment=testassignment)
+        feedbackset_events = timeline_list[0]['feedbackset_events']
+        self.assertEqual([first_comment, deadline_history, last_comment],
+                         [event_dict['obj'] for event_dict in feedbackset_events
+                          if event_dict['type'] in ('comment', 'deadline_moved')])
+        self.assertEqual([event_dict['ordering_datetime'] for event_dict in feedbackset_events],
+                         sorted(event_dict['ordering_datetime'] for event_dict in feedbackset_events))
+
+    def test_feedbacksets_ordered_by_deadline_datetime(self):
+        testuser = mommy.make(settings.AUTH_USER_MODEL)
+        now = timezone.now()
+        testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_end')
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        first_feedbackset = group_mommy.feedbackset_first_attempt_published(
+            group=testgroup, deadline_datetime=now - timedelta(days=10))
+        last_feedbackset = group_mommy.feedbackset_new_attempt_unpublished(
+            group=testgroup, deadline_datetime=now + timedelta(days=10))
+        timeline_list = self.__build_timeline(group=testgroup, user=testuser, assignment=testassignment)
+        self.assertEqual([first_feedbackset, last_feedbackset],
+                         [event_dict['feedbackset'] for event_dict in timeline_list])
+
+    def test_build_num_queries(self):
+        testuser = mommy.make(settings.AUTH_USER_MODEL)
+        testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_end')
+        testgroup = mommy.make('core.AssignmentGroup', parentnode=testassignment)
+        for feedbackset in [group_mommy.feedbackset_first_attempt_published(group=testgroup),
+                            group_mommy.feedbackset_new_attempt_published(group=testgroup),
+                            group_mommy.feedbackset_new_attempt_unpublished(group=testgroup)]:
+            mommy.make('devilry_group.FeedbackSetDeadlineHistory', feedback_set=feedbackset, _quantity=2)
+            mommy.make('devilry_group.FeedbackSetGradingUpdateHistory', feedback_set=feedbackset)
+            mommy.make('devilry_group.GroupComment', feedback_set=feedbackset,
+                       visibility=GroupComment.VISIBILITY_VISIBLE_TO_EVERYONE, _quantity=3)
+        feedbackset_queryset = builder_base.get_feedbackfeed_builder_queryset(
+            group=testgroup,
+            requestuser=testuser,
+            devilryrole=self.devilryrole
+        )
+        timeline_builder = FeedbackFeedTimelineBuilder(
+            assignment=testassignment,
+            feedbacksets=feedbackset_queryset,
+            group=testgroup
+        )
+        with self.assertNumQueries(0):
+            timeline_builder.build()
+        self.assertEqual(3, len(timeline_builder.get_as_list()))
+
     def test_one_feedbackset_unpublished_event(self):
         testuser = mommy.make(settings.AUTH_USER_MODEL)
         testassignment = mommy.make_recipe('devilry.apps.core.assignment_activeperiod_end')
@@ -1,4 +1,9 @@
+import mock
+from django.core.cache import cache
 from django.test import TestCase
+from django.test import override_settings
+
+from devilry.devilry_group.templatetags.devilry_group_tags import devilry_group_markdown
 from devilry.devilry_group.templatetags.devilry_group_tags import devilry_truncatefileextension
 from devilry.devilry_group.templatetags.devilry_group_tags import devilry_verbosenumber
 
@@ -61,3 +66,39 @@ class TestDevilryGroupTemplateTags(TestCase):
         self.assertEqual('25.', devilry_verbosenumber('', 25))
         self.assertEqual('733.', devilry_verbosenumber('', 733))
         self.assertEqual('628353.', devilry_verbosenumber('', 628353))
+
+
+class TestDevilryGroupMarkdown(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_renders_markdown(self):
+        self.assertEqual('<p><strong>Hello</strong></p>', devilry_group_markdown('**Hello**'))
+
+    def test_escapes_html(self):
+        self.assertNotIn('<script>', devilry_group_markdown('<script>alert("x")</script>'))
+
+    def test_multiple_renders_do_not_share_state(self):
+        devilry_group_markdown('```python\nprint("a")\n```')
+        self.assertEqual('<p>Hello</p>', devilry_group_markdown('Hello'))
+
+    def test_cached(self):
+        devilry_group_markdown('**Hello**')
+        with mock.patch('devilry.devilry_markup.parse_markdown.markdown_full') as mock_markdown_full:
+            self.assertEqual('<p><strong>Hello</strong></p>', devilry_group_markdown('**Hello**'))
+        mock_markdown_full.assert_not_called()
+
+    def test_changed_text_not_cached(self):
+        devilry_group_markdown('**Hello**')
+        self.assertEqual('<p><strong>Hello world</strong></p>', devilry_group_markdown('**Hello world**'))
+
+    @override_settings(DEVILRY_MARKDOWN_CACHE_TIMEOUT=None)
+    def test_cache_disabled(self):
+        devilry_group_markdown('**Hello**')
+        with mock.patch('devilry.devilry_markup.parse_markdown.markdown_full',
+                        return_value='mocked') as mock_markdown_full:
+            self.assertEqual('mocked', devilry_group_markdown('**Hello**'))
+        mock_markdown_full.assert_called_once_with('**Hello**')
@@ -1,21 +1,29 @@
 # -*- coding: utf-8 -*-
 
 
+import hashlib
 import json
 from xml.sax.saxutils import quoteattr
 
 from crispy_forms import layout
 from django import forms
+from django.conf import settings
 from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
 from django.http import HttpResponseRedirect
+from django.middleware.csrf import get_token
 from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.utils.translation import ugettext_lazy as _, ugettext_lazy
 from django_cradmin.apps.cradmin_temporaryfileuploadstore.models import TemporaryFileCollection
 from django_cradmin.viewhelpers import create
 
+import devilry
 from devilry.apps.core.models import Assignment
 from devilry.devilry_comment import models as comment_models
 from devilry.devilry_cradmin import devilry_acemarkdown
@@ -123,7 +131,126 @@ class FeedbackFeedBaseView(create.CreateView):
 
     def get(self, request, *args, **kwargs):
         self.form_disabled_message = self.__should_disable_comment_form(request=request)
-        return super(FeedbackFeedBaseView, self).get(request=request, *args, **kwargs)
+        etag = None
+        # Pages with messages are only shown once, so they must not be cached.
+        if self.conditional_get_is_enabled() and len(messages.get_messages(request)) == 0:
+            etag = quote_etag(self.get_conditional_get_etag())
+            not_modified_response = get_conditional_response(request, etag=etag)
+            if not_modified_response is not None:
+                return self.__add_conditional_get_headers(response=not_modified_response, etag=etag)
+        response = super(FeedbackFeedBaseView, self).get(request=request, *args, **kwargs)
+        if etag:
+            self.__add_conditional_get_headers(response=response, etag=etag)
+        return response
+
+    def __add_conditional_get_headers(self, response, etag):
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def conditional_get_is_enabled(self):
+        """
+        Should we answer GET requests with ``304 Not Modified`` when the
+        feedbackfeed has not changed since the client got it?
+
+        Defaults to the ``DEVILRY_GROUP_FEEDBACKFEED_CONDITIONAL_GET`` setting.
+        """
+        return getattr(settings, 'DEVILRY_GROUP_FEEDBACKFEED_CONDITIONAL_GET', True)
+
+    def get_conditional_get_etag_data(self):
+        """
+        Get the data the ETag for the feedbackfeed is created from.
+
+        Everything that changes what the feedbackfeed shows must be included, but it
+        must be cheap to get since the purpose is to avoid building the timeline and
+        the sidebar. The ``AssignmentGroupCachedData`` for the group does not cover
+        private comments, edited and deleted comments, changed deadlines or which
+        students and examiners are in the group, so we add the IDs of the candidates
+        and examiners, and a query with the FeedbackSets of the group with aggregated
+        data about their comments. The aggregates are correlated subqueries
+        to avoid joining the comments with their files and edit history. The
+        ``devilry__on_comment_text_update`` trigger adds a ``CommentEditHistory``
+        each time a comment is changed.
+
+        Subclasses can extend this if they show more data.
+
+        Returns:
+            list: Data that can be converted to a string with ``repr()``.
+        """
+        group = self.assignment_group
+        assignment = group.parentnode
+        cached_data = group.cached_data
+        now = timezone.now()
+        groupcomments = group_models.GroupComment.objects.all()
+        commentfiles = comment_models.CommentFile.objects.all()
+        commentedithistories = comment_models.CommentEditHistory.objects.all()
+        feedbacksets = group_models.FeedbackSet.objects\
+            .filter(group_id=group.id)\
+            .annotate(
+                comment_count=self.__get_feedbackset_aggregate_subquery(
+                    groupcomments, 'feedback_set_id', Count('pk')),
+                last_comment_id=self.__get_feedbackset_aggregate_subquery(
+                    groupcomments, 'feedback_set_id', Max('pk')),
+                last_comment_edit_id=self.__get_feedbackset_aggregate_subquery(
+                    commentedithistories, 'comment__groupcomment__feedback_set_id', Max('id')),
+                commentfile_count=self.__get_feedbackset_aggregate_subquery(
+                    commentfiles, 'comment__groupcomment__feedback_set_id', Count('id')),
+                last_commentfile_id=self.__get_feedbackset_aggregate_subquery(
+                    commentfiles, 'comment__groupcomment__feedback_set_id', Max('id')))\
+            .order_by('id')\
+            .values_list('id', 'feedbackset_type', 'ignored', 'deadline_datetime',
+                         'grading_published_datetime', 'grading_points',
+                         'comment_count', 'last_comment_id', 'last_comment_edit_id',
+                         'commentfile_count', 'last_commentfile_id')
+        relatedstudent_ids = group.candidates\
+            .order_by('relatedstudent_id')\
+            .values_list('relatedstudent_id', flat=True)
+        relatedexaminer_ids = group.examiners\
+            .order_by('relatedexaminer_id')\
+            .values_list('relatedexaminer_id', flat=True)
+        return [
+            devilry.__version__,
+            self.__class__.__name__,
+            self.get_devilryrole(),
+            self.request.user.id,
+            translation.get_language(),
+            self.__get_csrf_cookie_hash(),
+            str(self.__get_form_disabled_message()),
+            [assignment.id, assignment.long_name, assignment.anonymizationmode,
+             assignment.deadline_handling, assignment.points_to_grade_mapper,
+             assignment.passing_grade_min_points, assignment.max_points,
+             assignment.students_can_see_points, assignment.students_can_create_groups_now],
+            [cached_data.last_feedbackset_id, cached_data.last_published_feedbackset_id,
+             cached_data.candidate_count, cached_data.examiner_count],
+            list(relatedstudent_ids),
+            list(relatedexaminer_ids),
+            [list(feedbackset) + [feedbackset[3] < now] for feedbackset in feedbacksets],
+        ]
+
+    def __get_feedbackset_aggregate_subquery(self, queryset, feedbackset_id_field, aggregate):
+        # A subquery with ``aggregate`` of the rows in ``queryset`` for the FeedbackSet
+        # in the outer query. Gives ``None`` if there are no rows.
+        queryset = queryset\
+            .filter(**{feedbackset_id_field: OuterRef('id')})\
+            .order_by()\
+            .values(feedbackset_id_field)\
+            .annotate(aggregate_value=aggregate)\
+            .values('aggregate_value')
+        return Subquery(queryset, output_field=IntegerField())
+
+    def __get_csrf_cookie_hash(self):
+        # The page includes forms with the CSRF token. get_token() returns a new masked token each
+        # time it is called, so we use the CSRF cookie that the tokens are created from.
+        get_token(self.request)
+        csrf_cookie = self.request.META.get('CSRF_COOKIE', '')
+        return hashlib.sha1(csrf_cookie.encode('utf-8')).hexdigest()
+
+    def get_conditional_get_etag(self):
+        """
+        Get the ETag for the feedbackfeed - a hash of :meth:`.get_conditional_get_etag_data`.
+        """
+        etag_data = self.get_conditional_get_etag_data()
+        return hashlib.sha1(repr(etag_data).encode('utf-8')).hexdigest()
 
     @property
     def assignment_group(self):
@@ -36,6 +36,9 @@ class AbstractBatchCompressionAPIView(View):
             If the BatchOperation is running::
                 '{"status": "running"}'
 
+            If the BatchOperation is running, and the action reports progress::
+                '{"status": "running", "completed_chunk_count": 3, "total_chunk_count": 10}'
+
             If the BatchOperation is finished(CompressedArchiveMeta exists)::
                 '{"status": "finished", "download_link": "some download link"}'
 
@@ -256,7 +259,12 @@ class AbstractBatchCompressionAPIView(View):
 
         if batchoperation.status == BatchOperation.STATUS_UNPROCESSED:
             return {'status': 'not-started'}
-        return {'status': 'running'}
+        status_dict = {'status': 'running'}
+        progress = batchoperation.output_data
+        if isinstance(progress, dict) and 'total_chunk_count' in progress:
+            status_dict['completed_chunk_count'] = progress['completed_chunk_count']
+            status_dict['total_chunk_count'] = progress['total_chunk_count']
+        return status_dict
 
     def get_response_status(self, content_object_id):
         """
@@ -12,6 +12,7 @@ from django.views import generic
 
 # Devilry/cradmin imports
 from django_cradmin import crapp
+from devilry.devilry_compressionutil.backends import backends_base
 from devilry.devilry_group import models as group_models
 from devilry.devilry_comment.models import CommentFile
 from devilry.devilry_group.models import GroupComment, ImageAnnotationComment
@@ -43,6 +44,9 @@ class ZipBuffer(object):
 
 
 class BulkFileDownloadBaseView(generic.View):
+    #: Number of bytes read from each file and written to the archive at a time.
+    chunk_size = 1024 * 1024
+
     def get_queryset(self, request):
         raise NotImplementedError("get_queryset() must be implemented by subclass!")
 
@@ -199,16 +203,30 @@ class BulkFileDownloadBaseView(generic.View):
     def generate_zipped_stream(self, queryset):
         """
         Build a zip-archive with structure defined by get_filestructure() in memory using ZipBuffer, and yield chunks
-        for streaming to response
+        for streaming to response.
+
+        Each file is read and compressed in chunks of :obj:`~.BulkFileDownloadBaseView.chunk_size`
+        bytes, so we never hold more than a chunk of any file in memory.
 
         Args:
             queryset(QuerySet): The queryset to use.
         """
         sink = ZipBuffer()
-        archive = zipfile.ZipFile(sink, "w")
+        archive = zipfile.ZipFile(sink, "w", allowZip64=True)
         files = self.get_filestructure(queryset)
         for archivename, commentfile in files.items():
-            archive.writestr(archivename, commentfile.file.read())
+            zipinfo = backends_base.make_zipinfo(path=archivename,
+                                                 mimetype=commentfile.mimetype,
+                                                 file_size=commentfile.filesize)
+            commentfile.file.open('rb')
+            try:
+                with archive.open(zipinfo, 'w') as zipentry:
+                    for filechunk in backends_base.iterate_filelike_chunks(commentfile.file, self.chunk_size):
+                        zipentry.write(filechunk)
+                        for chunk in sink.get_and_clear():
+                            yield chunk
+            finally:
+                commentfile.file.close()
             for chunk in sink.get_and_clear():
                 yield chunk
 
@@ -219,18 +237,19 @@ class BulkFileDownloadBaseView(generic.View):
 
     def get(self, request):
         """
-        Generate a HttpResponse with a zipped collection of files.
+        Generate a StreamingHttpResponse with a zipped collection of files.
 
         Args:
             request (HttpRequest): request for the view.
 
         Returns:
-            HttpResponse: created response.
+            StreamingHttpResponse: created response.
         """
         queryset = self.get_queryset(request)
         if not queryset.exists():
             return http.Http404()  # TODO: fitting errmsg
-        response = http.HttpResponse(self.generate_zipped_stream(queryset), content_type="application/zip")
+        response = http.StreamingHttpResponse(self.generate_zipped_stream(queryset),
+                                              content_type="application/zip")
         response['Content-Disposition'] = "attachment; filename={}".format(self.get_zipfilename(request))
         return response
 
@@ -5,22 +5,42 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
 
+from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
 from devilry.devilry_import_v2database import modelimporters
 
 
 class TimeExecution(object):
-    def __init__(self, label, command):
+    def __init__(self, label, command, count_objects=None):
+        """
+        Args:
+            label: Label to print with the duration.
+            command: The management command to write output to.
+            count_objects: Optional callable that returns the number of objects
+                in the database. If this is provided, we print the number of objects
+                created within the context, and the number of objects created per second.
+        """
         self.start_time = None
+        self.start_object_count = None
         self.label = label
         self.command = command
+        self.count_objects = count_objects
 
     def __enter__(self):
+        if self.count_objects:
+            self.start_object_count = self.count_objects()
         self.start_time = timezone.now()
 
     def __exit__(self, ttype, value, traceback):
         end_time = timezone.now()
-        duration_minutes = (end_time - self.start_time).total_seconds() / 60.0
-        self.command.stdout.write('{}: {}min'.format(self.label, duration_minutes))
+        duration_seconds = (end_time - self.start_time).total_seconds()
+        duration_minutes = duration_seconds / 60.0
+        if self.count_objects and ttype is None:
+            created_object_count = self.count_objects() - self.start_object_count
+            objects_per_second = created_object_count / duration_seconds if duration_seconds else 0
+            self.command.stdout.write('{}: {}min ({} objects, {:.1f} objects/second)'.format(
+                self.label, duration_minutes, created_object_count, objects_per_second))
+        else:
+            self.command.stdout.write('{}: {}min'.format(self.label, duration_minutes))
         self.command.stdout.write('')
 
 
@@ -50,6 +70,15 @@ class Command(BaseCommand):
             dest='fake', action='store_true',
             default=False,
             help='Print a summary of the import, but do not import anything.')
+        parser.add_argument(
+            '--disable-dbcache-triggers',
+            dest='disable_dbcache_triggers', action='store_true',
+            default=False,
+            help='Remove the devilry_dbcache triggers while importing, and rebuild '
+                 'the cached data for all groups once when the import is finished. '
+                 'This is a lot faster for large databases. Use the '
+                 'DEVILRY_V2_DATABASE_PARSER_PROCESSES setting to parse the dump '
+                 'files in multiple processes.')
 
     def __abort_if_input_directory_does_not_exist(self):
         if self.fake:
@@ -66,6 +95,7 @@ class Command(BaseCommand):
         self.fake = options['fake']
         self.start_at_importer_classname = options['start_at_importer_classname']
         self.stop_at_importer_classname = options['stop_at_importer_classname']
+        self.disable_dbcache_triggers = options['disable_dbcache_triggers'] and not self.fake
         v2_media_root = getattr(settings, 'DEVILRY_V2_MEDIA_ROOT', None)
         if not v2_media_root:
             self.stderr.write('WARNING: settings.DEVILRY_V2_MEDIA_ROOT is not set,'
@@ -77,7 +107,10 @@ class Command(BaseCommand):
 
         self.__abort_if_input_directory_does_not_exist()
         self.__verify_empty_database()
-        self.__run()
+        if self.disable_dbcache_triggers:
+            self.__run_without_dbcache_triggers()
+        else:
+            self.__run()
 
     def __get_all_importer_classes(self):
         return [
@@ -131,6 +164,26 @@ class Command(BaseCommand):
                 self.stdout.write('{} objects already exists in the database. Aborting.'.format(
                     importer.prettyformat_model_name()))
 
+    def __get_count_objects_function(self, importer):
+        model_class = importer.get_model_class()
+        if self.fake or not model_class:
+            return None
+        return model_class.objects.count
+
+    def __run_without_dbcache_triggers(self):
+        customsql = AssignmentGroupDbCacheCustomSql()
+        self.stdout.write('Removing the devilry_dbcache triggers.')
+        customsql.clear()
+        try:
+            self.__run()
+        finally:
+            # Rebuild even if an importer fails, so that the database is not
+            # left without the triggers.
+            self.stdout.write('Recreating the devilry_dbcache triggers and rebuilding the cached data.')
+            with TimeExecution('devilry_dbcache rebuild', self):
+                customsql.initialize()
+                customsql.recreate_data()
+
     def __run(self):
         importer_classes = self.__get_importer_classes()
         for index, importer in enumerate(self.__iterate_importers(), start=1):
@@ -139,7 +192,8 @@ class Command(BaseCommand):
                 index=index,
                 count=len(importer_classes),
                 model=importer.prettyformat_model_name()))
-            with TimeExecution(importer.prettyformat_model_name(), self):
+            with TimeExecution(importer.prettyformat_model_name(), self,
+                               count_objects=self.__get_count_objects_function(importer)):
                 with transaction.atomic():
                     try:
                         importer.import_models(fake=self.fake)
@@ -4,40 +4,51 @@ from django.contrib.auth import get_user_model
 
 from devilry.apps.core.models import Examiner, RelatedExaminer, Candidate, RelatedStudent, AssignmentGroup
 from devilry.devilry_import_v2database import modelimporter
+from devilry.devilry_import_v2database.modelimporters.modelimporter_utils import BulkCreator
 
 
 class ImporterMixin(object):
+    """
+    Looks up users, groups and related users from dicts that are loaded
+    with a single query the first time they are needed, so that
+    the importers do not need any queries for each imported object.
+    """
     def get_related_user_model_class(self):
         raise NotImplementedError()
 
-    def _get_user_from_id(self, user_id):
-        try:
-            user = get_user_model().objects.get(id=user_id)
-        except get_user_model().DoesNotExist():
+    def _validate_user_id(self, user_id):
+        if not hasattr(self, '_user_ids'):
+            self._user_ids = set(get_user_model().objects.values_list('id', flat=True))
+        if user_id not in self._user_ids:
             raise modelimporter.ModelImporterException(
                 'User with id {} does not exist.'.format(user_id))
-        return user
 
-    def _get_assignment_group_from_id(self, assignment_group_id):
+    def _get_period_id_from_assignment_group_id(self, assignment_group_id):
+        if not hasattr(self, '_period_id_by_assignment_group_id'):
+            self._period_id_by_assignment_group_id = dict(
+                AssignmentGroup.objects.values_list('id', 'parentnode__parentnode_id'))
         try:
-            assignment_group = AssignmentGroup.objects.get(id=assignment_group_id)
-        except AssignmentGroup.DoesNotExist():
+            return self._period_id_by_assignment_group_id[assignment_group_id]
+        except KeyError:
             raise modelimporter.ModelImporterException(
                 'AssignmentGroup with id {} does not exist.'.format(assignment_group_id))
-        return assignment_group
-
-    def _get_related_user(self, period, user):
-        related_user_class = self.get_related_user_model_class()
-        try:
-            related_user = related_user_class.objects.get(period=period, user=user)
-        except related_user_class.DoesNotExist:
-            return None
-        return related_user
 
-    def _create_related_user(self, user, period, **kwargs):
+    def _get_or_create_related_user_id(self, period_id, user_id):
+        if not hasattr(self, '_related_user_id_by_period_id_and_user_id'):
+            self._related_user_id_by_period_id_and_user_id = {
+                (period_id, user_id): related_user_id
+                for related_user_id, period_id, user_id in self.get_related_user_model_class().objects
+                .values_list('id', 'period_id', 'user_id')}
+        key = (period_id, user_id)
+        if key not in self._related_user_id_by_period_id_and_user_id:
+            related_user = self._create_related_user(user_id=user_id, period_id=period_id)
+            self._related_user_id_by_period_id_and_user_id[key] = related_user.id
+        return self._related_user_id_by_period_id_and_user_id[key]
+
+    def _create_related_user(self, user_id, period_id, **kwargs):
         related_user = self.get_related_user_model_class()(
-            user=user,
-            period=period,
+            user_id=user_id,
+            period_id=period_id,
             active=False,
             **kwargs
         )
@@ -63,31 +74,27 @@ class ExaminerImporter(ImporterMixin, modelimporter.ModelImporter):
                 'pk'
             ]
         )
-        user = self._get_user_from_id(user_id=object_dict['fields']['user'])
-        assignment_group = self._get_assignment_group_from_id(
-            assignment_group_id=object_dict['fields']['assignmentgroup'])
-        related_examiner = self._get_related_user(period=assignment_group.parentnode.parentnode, user=user)
-        if not related_examiner:
-            examiner.relatedexaminer = self._create_related_user(
-                user=user,
-                period=assignment_group.parentnode.parentnode
-            )
-        else:
-            examiner.relatedexaminer = related_examiner
-        examiner.assignmentgroup = assignment_group
+        user_id = object_dict['fields']['user']
+        self._validate_user_id(user_id=user_id)
+        assignment_group_id = object_dict['fields']['assignmentgroup']
+        period_id = self._get_period_id_from_assignment_group_id(assignment_group_id=assignment_group_id)
+        examiner.relatedexaminer_id = self._get_or_create_related_user_id(period_id=period_id, user_id=user_id)
+        examiner.assignmentgroup_id = assignment_group_id
         if self.should_clean():
             examiner.full_clean()
-        examiner.save()
         self.log_create(model_object=examiner, data=object_dict)
+        return examiner
 
     def import_models(self, fake=False):
         directory_parser = self.v2examiner_directoryparser
         directory_parser.set_max_id_for_models_with_auto_generated_sequence_numbers(model_class=self.get_model_class())
-        for object_dict in directory_parser.iterate_object_dicts():
-            if fake:
-                print(('Would import: {}'.format(pprint.pformat(object_dict))))
-            else:
-                self._create_examiner_from_object_dict(object_dict=object_dict)
+        with BulkCreator(model_class=self.get_model_class()) as examiner_bulk_creator:
+            for object_dict in directory_parser.iterate_object_dicts():
+                if fake:
+                    print(('Would import: {}'.format(pprint.pformat(object_dict))))
+                else:
+                    examiner = self._create_examiner_from_object_dict(object_dict=object_dict)
+                    examiner_bulk_creator.add(examiner)
 
 
 class CandidateImporter(ImporterMixin, modelimporter.ModelImporter):
@@ -107,28 +114,24 @@ class CandidateImporter(ImporterMixin, modelimporter.ModelImporter):
                 'candidate_id'
             ]
         )
-        user = self._get_user_from_id(user_id=object_dict['fields']['student'])
-        assignment_group = self._get_assignment_group_from_id(
-            assignment_group_id=object_dict['fields']['assignment_group'])
-        related_student = self._get_related_user(period=assignment_group.parentnode.parentnode, user=user)
-        if not related_student:
-            candidate.relatedstudent = self._create_related_user(
-                user=user,
-                period=assignment_group.parentnode.parentnode
-            )
-        else:
-            candidate.relatedstudent = related_student
-        candidate.assignment_group = assignment_group
+        user_id = object_dict['fields']['student']
+        self._validate_user_id(user_id=user_id)
+        assignment_group_id = object_dict['fields']['assignment_group']
+        period_id = self._get_period_id_from_assignment_group_id(assignment_group_id=assignment_group_id)
+        candidate.relatedstudent_id = self._get_or_create_related_user_id(period_id=period_id, user_id=user_id)
+        candidate.assignment_group_id = assignment_group_id
         if self.should_clean():
             candidate.full_clean()
-        candidate.save()
         self.log_create(model_object=candidate, data=object_dict)
+        return candidate
 
     def import_models(self, fake=False):
         directory_parser = self.v2candidate_directoryparser
         directory_parser.set_max_id_for_models_with_auto_generated_sequence_numbers(model_class=self.get_model_class())
-        for object_dict in directory_parser.iterate_object_dicts():
-            if fake:
-                print(('Would import: {}'.format(pprint.pformat(object_dict))))
-            else:
-                self._create_candidate_from_object_dict(object_dict=object_dict)
+        with BulkCreator(model_class=self.get_model_class()) as candidate_bulk_creator:
+            for object_dict in directory_parser.iterate_object_dicts():
+                if fake:
+                    print(('Would import: {}'.format(pprint.pformat(object_dict))))
+                else:
+                    candidate = self._create_candidate_from_object_dict(object_dict=object_dict)
+                    candidate_bulk_creator.add(candidate)
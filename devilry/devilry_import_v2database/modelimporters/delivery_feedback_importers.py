@@ -80,13 +80,11 @@ class DeliveryImporter(ImporterMixin, modelimporter.ModelImporter):
             return False
         return True
 
-    def _get_user_from_candidate_id(self, candidate_id):
-        try:
-            candidate = Candidate.objects.get(id=candidate_id)
-        except Candidate.DoesNotExist:
-            return None
-        else:
-            return candidate.relatedstudent.user
+    def _get_user_id_from_candidate_id(self, candidate_id):
+        if not hasattr(self, '_user_id_by_candidate_id'):
+            self._user_id_by_candidate_id = dict(
+                Candidate.objects.values_list('id', 'relatedstudent__user_id'))
+        return self._user_id_by_candidate_id.get(candidate_id)
 
     def _create_group_comment_from_object_dict(self, object_dict):
         group_comment = self.get_model_class()()
@@ -101,7 +99,7 @@ class DeliveryImporter(ImporterMixin, modelimporter.ModelImporter):
             ]
         )
         feedback_set_id = object_dict['fields']['deadline']
-        group_comment.user = self._get_user_from_candidate_id(object_dict['fields']['delivered_by'])
+        group_comment.user_id = self._get_user_id_from_candidate_id(object_dict['fields']['delivered_by'])
         group_comment.feedback_set_id = feedback_set_id
         group_comment.text = 'Delivery'
         group_comment.comment_type = GroupComment.COMMENT_TYPE_GROUPCOMMENT
@@ -258,7 +256,7 @@ class CommentFileContentImporter(ImporterMixin, modelimporter.ModelImporter):
             raise CommentFileFileDoesNotExist(filepath, comment_file)
         comment_file.filesize = os.stat(filepath).st_size
         fp = open(filepath, 'rb')
-        comment_file.file = files.File(fp, comment_file.filename)
+        comment_file.set_file(files.File(fp, comment_file.filename))
         if self.should_clean():
             comment_file.full_clean()
         try:
@@ -8,6 +8,7 @@ from django.utils.dateparse import parse_datetime
 from model_mommy import mommy
 
 from devilry.apps.core.models import Candidate, RelatedStudent
+from devilry.devilry_import_v2database.modelimporter import ModelImporterException
 from devilry.devilry_import_v2database.modelimporters.candidate_examiner_importer import CandidateImporter
 from .importer_testcase_mixin import ImporterTestCaseMixin
 
@@ -137,3 +138,35 @@ class TestCandidateImporter(ImporterTestCaseMixin, test.TestCase):
         candidate_with_auto_id = mommy.make('core.Candidate')
         self.assertEqual(candidate_with_auto_id.pk, self._create_model_meta()['max_id']+1)
         self.assertEqual(candidate_with_auto_id.id, self._create_model_meta()['max_id']+1)
+
+    def test_importer_assignment_group_does_not_exist(self):
+        test_user = mommy.make(settings.AUTH_USER_MODEL)
+        test_group = mommy.make('core.AssignmentGroup')
+        candidate_dict = self._create_candidate_dict(assignment_group=test_group, user=test_user)
+        candidate_dict['fields']['assignment_group'] = test_group.id + 1
+        self.create_v2dump(model_name='core.candidate', data=candidate_dict)
+        candidate_importer = CandidateImporter(input_root=self.temp_root_dir)
+        with self.assertRaises(ModelImporterException):
+            candidate_importer.import_models()
+
+    def test_importer_user_does_not_exist(self):
+        test_user = mommy.make(settings.AUTH_USER_MODEL)
+        test_group = mommy.make('core.AssignmentGroup')
+        candidate_dict = self._create_candidate_dict(assignment_group=test_group, user=test_user)
+        candidate_dict['fields']['student'] = test_user.id + 1
+        self.create_v2dump(model_name='core.candidate', data=candidate_dict)
+        candidate_importer = CandidateImporter(input_root=self.temp_root_dir)
+        with self.assertRaises(ModelImporterException):
+            candidate_importer.import_models()
+
+    @test.override_settings(DEVILRY_V2_DATABASE_PARSER_PROCESSES=2)
+    def test_importer_parser_processes(self):
+        test_user = mommy.make(settings.AUTH_USER_MODEL)
+        test_group = mommy.make('core.AssignmentGroup')
+        self.create_v2dump(model_name='core.candidate',
+                           data=self._create_candidate_dict(assignment_group=test_group, user=test_user))
+        candidate_importer = CandidateImporter(input_root=self.temp_root_dir)
+        candidate_importer.import_models()
+        candidate = Candidate.objects.get(id=156)
+        self.assertEqual(candidate.assignment_group, test_group)
+        self.assertEqual(candidate.relatedstudent.user, test_user)
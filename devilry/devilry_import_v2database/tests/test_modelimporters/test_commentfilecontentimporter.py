@@ -1,3 +1,4 @@
+import hashlib
 import os
 import shutil
 import tempfile
@@ -67,6 +68,21 @@ class TestCommentFileContentImporter(ImporterTestCaseMixin, test.TestCase):
             self.assertEqual(comment_file.file.read(), b'import os')
             self.assertEqual(comment_file.filesize, 9)
 
+    def test_filemeta_filecontent_sha256(self):
+        with self.settings(DEVILRY_V2_DELIVERY_FILE_ROOT=self.v2_delivery_root_temp_dir):
+            delivery_comment = mommy.make('devilry_group.GroupComment')
+            v2_file = open(os.path.join(self.v2_delivery_root_temp_dir, 'test.py'), 'wb')
+            v2_file.write(b'import os')
+            v2_file.close()
+            self.create_v2dump(
+                model_name='core.filemeta',
+                data=self._create_filemeta_dict(delivery_comment, 'test.py')
+            )
+            FileMetaImporter(input_root=self.temp_root_dir).import_models()
+            CommentFileContentImporter(input_root=self.temp_root_dir).import_models()
+            comment_file = CommentFile.objects.first()
+            self.assertEqual(comment_file.sha256, hashlib.sha256(b'import os').hexdigest())
+
     def _create_staticfeedback_dict(self, files):
         return {
             'pk': 1,
@@ -1,11 +1,19 @@
 import json
+import multiprocessing
 import os
 
+from django.conf import settings
 from django.db import connection
 
 from devilry.devilry_import_v2database.modelimporters import modelimporter_utils
 
 
+def _load_json_file(filepath):
+    with open(filepath, 'rb') as fileobject:
+        filecontent = fileobject.read()
+        return json.loads(filecontent.decode('utf-8'))
+
+
 class V2DumpDirectoryParser(object):
     def __init__(self, input_root):
         self.input_root = input_root
@@ -67,9 +75,7 @@ class V2DumpDirectoryParser(object):
 
     def get_object_dict_by_filename(self, filename):
         filepath = os.path.join(self.input_directory, filename)
-        with open(filepath, 'rb') as fileobject:
-            filecontent = fileobject.read()
-            return json.loads(filecontent.decode('utf-8'))
+        return _load_json_file(filepath)
 
     def get_filename_from_id(self, id):
         return '{}.json'.format(id)
@@ -78,9 +84,48 @@ class V2DumpDirectoryParser(object):
         filename = self.get_filename_from_id(id)
         return self.get_object_dict_by_filename(filename)
 
+    def get_parser_process_count(self):
+        """
+        Get the number of processes to parse the JSON files with.
+
+        Defaults to the ``DEVILRY_V2_DATABASE_PARSER_PROCESSES`` setting.
+        """
+        return getattr(settings, 'DEVILRY_V2_DATABASE_PARSER_PROCESSES', 1)
+
+    def get_parser_chunksize(self):
+        """
+        Get the number of files each parser process parses at a time.
+
+        Defaults to the ``DEVILRY_V2_DATABASE_PARSER_CHUNKSIZE`` setting.
+        """
+        return getattr(settings, 'DEVILRY_V2_DATABASE_PARSER_CHUNKSIZE', 200)
+
+    def __iterate_filepaths(self):
+        for filename in os.listdir(self.input_directory):
+            if filename.endswith('.json'):
+                yield os.path.join(self.input_directory, filename)
+
     def iterate_object_dicts(self):
+        """
+        Iterate over the object dicts for all the JSON files in :attr:`.input_directory`.
+
+        If :meth:`.get_parser_process_count` is more than ``1``, the files are
+        read and parsed in a pool of worker processes. The object dicts are
+        yielded in the same order as when parsing in a single process.
+        """
+        process_count = self.get_parser_process_count()
         with modelimporter_utils.ProgressDots() as progressdots:
-            for filename in os.listdir(self.input_directory):
-                if filename.endswith('.json'):
-                    yield self.get_object_dict_by_filename(filename)
-                progressdots.increment_progress()
+            if process_count > 1:
+                pool = multiprocessing.Pool(processes=process_count)
+                try:
+                    for object_dict in pool.imap(_load_json_file, self.__iterate_filepaths(),
+                                                 chunksize=self.get_parser_chunksize()):
+                        yield object_dict
+                        progressdots.increment_progress()
+                finally:
+                    pool.terminate()
+                    pool.join()
+            else:
+                for filepath in self.__iterate_filepaths():
+                    yield _load_json_file(filepath)
+                    progressdots.increment_progress()
@@ -1,8 +1,18 @@
+import hashlib
+import threading
+
 import markdown
+from django.conf import settings
+from django.core.cache import cache
 
+#: Each thread reuses a single ``markdown.Markdown`` object. Building
+#: the object (and loading the extensions) is a lot more expensive than
+#: converting a short text.
+_markdown_instances = threading.local()
 
-def markdown_full(inputMarkdown):
-    md = markdown.Markdown(
+
+def _make_markdown_instance():
+    return markdown.Markdown(
         output_format='xhtml5',
         safe_mode="escape",
         extensions=[
@@ -14,4 +24,47 @@ def markdown_full(inputMarkdown):
             'def_list', # Support definition lists
             'tables', # Support tables
         ])
-    return md.convert(inputMarkdown)
+
+
+def _get_markdown_instance():
+    md = getattr(_markdown_instances, 'markdown_full', None)
+    if md is None:
+        md = _make_markdown_instance()
+        _markdown_instances.markdown_full = md
+    return md
+
+
+def markdown_full(inputMarkdown):
+    md = _get_markdown_instance()
+    try:
+        return md.convert(inputMarkdown)
+    finally:
+        md.reset()
+
+
+def get_markdown_cache_timeout():
+    return getattr(settings, 'DEVILRY_MARKDOWN_CACHE_TIMEOUT', 60 * 60 * 24 * 7)
+
+
+def _get_markdown_full_cache_key(inputMarkdown):
+    texthash = hashlib.sha256(inputMarkdown.encode('utf-8')).hexdigest()
+    return 'devilry_markup.markdown_full.{}'.format(texthash)
+
+
+def markdown_full_cached(inputMarkdown):
+    """
+    Same as :func:`.markdown_full`, but the HTML is cached with a hash of
+    ``inputMarkdown`` as key. Since the key changes when the text changes,
+    the cache never has to be invalidated.
+
+    The HTML is cached for ``DEVILRY_MARKDOWN_CACHE_TIMEOUT`` seconds.
+    """
+    timeout = get_markdown_cache_timeout()
+    if not timeout or not inputMarkdown:
+        return markdown_full(inputMarkdown)
+    cache_key = _get_markdown_full_cache_key(inputMarkdown)
+    html = cache.get(cache_key)
+    if html is None:
+        html = markdown_full(inputMarkdown)
+        cache.set(cache_key, html, timeout=timeout)
+    return html
@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
 
+import logging
 import traceback
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core import mail
 from django.db import models, transaction
 from django.template.loader import render_to_string
 from django.utils import timezone
@@ -17,7 +19,9 @@ from django_cradmin.apps.cradmin_email import emailutils
 from ievv_opensource.utils import choices_with_meta
 
 from devilry.devilry_email.utils import activate_translation_for_user
-from devilry.utils.devilry_email import send_message
+from devilry.utils.devilry_email import send_message, make_email_message
+
+logger = logging.getLogger(__name__)
 
 
 class MessageReceiverQuerySet(models.QuerySet):
@@ -144,23 +148,56 @@ class Message(models.Model):
     #: Store data needed to create :class:`.MessageReceiver`-objects.
     #:
     #: Each subclass defines how the dataformat of this field should be.
-    #: Override :obj:`.Message.prepare_message_receivers` to create message receivers
+    #: Override :obj:`.Message.prepare_message_receiver_batches` to create message receivers
     #: from this field.
     virtual_message_receivers = JSONField(
         null=False, blank=True, default=dict)
 
     def prepare_message_receivers(self, subject_generator, template_name, template_context):
         """
+        Prepare :class:`.MessageReceiver` objects. By _prepare_, we mean to make
+        the MessageReceiver objects, but not save them to the database.
+
+        Returns all the MessageReceiver objects from
+        :meth:`.prepare_message_receiver_batches` as a list.
+
+        Subclasses should override :meth:`.prepare_message_receiver_batches`
+        instead of this method - :meth:`.create_message_receivers` does not use
+        this method.
+        """
+        message_receivers = []
+        for message_receiver_batch in self.prepare_message_receiver_batches(
+                subject_generator=subject_generator,
+                template_name=template_name,
+                template_context=template_context):
+            message_receivers.extend(message_receiver_batch)
+        return message_receivers
+
+    def prepare_message_receiver_batches(self, subject_generator, template_name, template_context,
+                                         batch_size=None):
+        """
         Prepare :class:`.MessageReceiver` objects for :meth:`.create_message_receivers`.
         By _prepare_, we mean to make the MessageReceiver objects, but not save
         them to the database.
 
-        Saving is handled with a bulk create in :meth:`.create_message_receivers`.
+        Saving is handled with a bulk create of each batch in :meth:`.create_message_receivers`.
+
+        The subject and content is only rendered once for each language
+        (see :meth:`.MessageReceiverQuerySet.create_receiver`), so the
+        ``template_context`` must be the same for all receivers.
+
+        Override this in subclasses to create message receivers in other ways.
 
-        Must return a list of :class:`.MessageReceiver` objects, or a
-        generator that yields lists of :class:`.MessageReceiver` objects.
+        Args:
+            batch_size: Max number of MessageReceiver objects in each batch. Defaults to
+                the ``DEVILRY_MESSAGE_RECEIVER_BATCH_SIZE`` setting.
+
+        Returns:
+            A generator that yields lists of :class:`.MessageReceiver` objects.
         """
+        batch_size = batch_size or getattr(settings, 'DEVILRY_MESSAGE_RECEIVER_BATCH_SIZE', 500)
         user_queryset = get_user_model().objects.filter(id__in=self.virtual_message_receivers['user_ids'])
+        render_cache = {}
         message_receivers = []
         for user in user_queryset.iterator():
             message_receiver = MessageReceiver.objects.create_receiver(
@@ -169,12 +206,17 @@ class Message(models.Model):
                 message_type=self.message_type[0],
                 subject_generator=subject_generator,
                 template_name=template_name,
-                template_context=template_context
+                template_context=template_context,
+                render_cache=render_cache
             )
             message_receivers.append(
                 message_receiver
             )
-        return message_receivers
+            if len(message_receivers) >= batch_size:
+                yield message_receivers
+                message_receivers = []
+        if message_receivers:
+            yield message_receivers
 
     def validate_virtual_message_receivers(self):
         """
@@ -196,11 +238,12 @@ class Message(models.Model):
 
     def create_message_receivers(self, **kwargs):
         """
-        Creates message receivers from list returned from
-        :meth:`.BaseMessage.prepare_message_receivers`
+        Creates message receivers from the batches yielded by
+        :meth:`.BaseMessage.prepare_message_receiver_batches`. Each batch
+        is saved with a bulk create, so all the receivers are never in memory at once.
         """
-        message_receivers = self.prepare_message_receivers(**kwargs)
-        MessageReceiver.objects.bulk_create(message_receivers)
+        for message_receiver_batch in self.prepare_message_receiver_batches(**kwargs):
+            MessageReceiver.objects.bulk_create(message_receiver_batch)
 
     def prepare_and_send(self, subject_generator, template_name, template_context):
         """
@@ -232,8 +275,7 @@ class Message(models.Model):
                 self.status = self.STATUS_CHOICES.SENDING.value
                 self.save()
 
-                for message_receiver in self.messagereceiver_set.select_related('user').all():
-                    message_receiver.send()
+                MessageReceiver.objects.filter(message=self).send_in_batches()
 
                 # Set status to 'sent'.
                 self.status = self.STATUS_CHOICES.SENT.value
@@ -272,7 +314,8 @@ class Message(models.Model):
 
 
 class MessageReceiverQuerySet(models.QuerySet):
-    def create_receiver(self, user, message, message_type, subject_generator, template_name, template_context):
+    def create_receiver(self, user, message, message_type, subject_generator, template_name, template_context,
+                        render_cache=None):
         """
         Create a message receiver and generate the email content and subject
         according to the preferred language of the user and return the `MessageReceiver`-instance. This method
@@ -286,6 +329,10 @@ class MessageReceiverQuerySet(models.QuerySet):
                 :class:`devilry.devilry_message.utils.subject_generator.SubjectTextGenerator`
             template_name: Template to render content with (a path).
             template_context: Context data for template.
+            render_cache: An optional dict. The subject, and the content as HTML and
+                plain text is cached in this dict for each ``(template_name, language)``,
+                so passing the same dict when creating many receivers with the
+                same ``template_context`` only renders once for each language.
 
         Returns:
             :class:`.MessageRecveiver`: Unsaved instance.
@@ -293,13 +340,23 @@ class MessageReceiverQuerySet(models.QuerySet):
         """
         current_language = translation.get_language()
         activate_translation_for_user(user=user)
+        cache_key = (template_name, translation.get_language())
+        if render_cache is not None and cache_key in render_cache:
+            subject, message_content_html, message_content_plain = render_cache[cache_key]
+        else:
+            subject = subject_generator.get_subject_text()
+            message_content_html = render_to_string(template_name, template_context)
+            message_content_plain = emailutils.convert_html_to_plaintext(message_content_html).strip()
+            if render_cache is not None:
+                render_cache[cache_key] = (subject, message_content_html, message_content_plain)
         message_receiver = MessageReceiver(
             user=user,
             message=message,
             message_type=message_type,
-            subject=subject_generator.get_subject_text()
+            subject=subject,
+            message_content_html=message_content_html,
+            message_content_plain=message_content_plain
         )
-        message_receiver.message_content_html = render_to_string(template_name, template_context)
         message_receiver.full_clean()
         translation.activate(current_language)
         return message_receiver
@@ -311,6 +368,70 @@ class MessageReceiverQuerySet(models.QuerySet):
         """
         return self.filter(created_datetime__lt=datetime_obj)
 
+    def prefetch_notification_emails(self):
+        """
+        Select the user, and prefetch the :class:`devilry.devilry_account.models.UserEmail`s
+        used for notifications for the user as ``user.notification_useremails``.
+        """
+        from devilry.devilry_account.models import UserEmail
+        return self.select_related('user').prefetch_related(
+            models.Prefetch('user__useremail_set',
+                            queryset=UserEmail.objects.filter(use_for_notifications=True).order_by('id'),
+                            to_attr='notification_useremails'))
+
+    def send_in_batches(self, batch_size=None):
+        """
+        Send all the :class:`.MessageReceiver`s in the queryset.
+
+        Works just like :meth:`.MessageReceiver.send` for each receiver, but
+        the notification emails for all the receivers are prefetched, each batch
+        of ``batch_size`` emails is sent using a single email backend connection,
+        and the status of all the successfully sent receivers is updated with a
+        single query. If the connection for a batch can not be opened, the error
+        is registered for all the receivers in the batch, and we continue with
+        the next batch.
+
+        Args:
+            batch_size: Number of emails sent with each connection. Defaults to the
+                ``DEVILRY_MESSAGE_SEND_BATCH_SIZE`` setting.
+        """
+        batch_size = batch_size or getattr(settings, 'DEVILRY_MESSAGE_SEND_BATCH_SIZE', 100)
+        message_receivers = list(self.prefetch_notification_emails().order_by('id'))
+        for index in range(0, len(message_receivers), batch_size):
+            self.__send_batch(message_receivers[index:index + batch_size])
+
+    def __send_batch(self, message_receivers):
+        sent_ids = []
+        connection = None
+        try:
+            if settings.DEVILRY_SEND_EMAIL_TO_USERS:
+                connection = mail.get_connection(fail_silently=False)
+                try:
+                    connection.open()
+                except Exception as exception:
+                    # None of the receivers in the batch can be sent without a connection.
+                    for message_receiver in message_receivers:
+                        message_receiver.add_send_error(exception=exception)
+                        message_receiver.save()
+                    return
+            for message_receiver in message_receivers:
+                try:
+                    if connection is not None:
+                        message_receiver._send_email_using_connection(connection=connection)
+                except Exception as exception:
+                    message_receiver.add_send_error(exception=exception)
+                    message_receiver.save()
+                else:
+                    sent_ids.append(message_receiver.id)
+        finally:
+            if connection is not None:
+                connection.close()
+        if sent_ids:
+            MessageReceiver.objects.filter(id__in=sent_ids).update(
+                sent_datetime=timezone.now(),
+                status=MessageReceiver.STATUS_CHOICES.SENT.value,
+                sending_success_count=models.F('sending_success_count') + 1)
+
 
 class MessageReceiver(models.Model):
     """
@@ -437,10 +558,60 @@ class MessageReceiver(models.Model):
         """
         send_message(self.subject, self.message_content_html, *[self.user], is_html=True)
 
+    def _send_email_using_connection(self, connection):
+        """
+        Sends the email using an open email backend ``connection``. Used by
+        :meth:`.MessageReceiverQuerySet.send_in_batches`, and requires the
+        notification emails of the user to be prefetched with
+        :meth:`.MessageReceiverQuerySet.prefetch_notification_emails`.
+
+        DO NOT call this method directly.
+        """
+        emails = [useremail.email for useremail in self.user.notification_useremails]
+        if not emails:
+            logger.error('User {0} has no email address.'.format(self.user.shortname))
+            return
+        email_message = make_email_message(
+            subject=self.subject,
+            message=self.message_content_html,
+            emails=emails,
+            is_html=True,
+            connection=connection)
+        connection.send_messages([email_message])
+
+    def add_send_error(self, exception):
+        """
+        Register a failed attempt to send the message. Must be called
+        in the ``except``-block handling the ``exception``. Does not save the receiver.
+        """
+        self.sending_failed_count += 1
+
+        if self.sending_failed_count > settings.DEVILRY_MESSAGE_RESEND_LIMIT:
+            self.status = self.STATUS_CHOICES.ERROR.value
+        else:
+            self.status = self.STATUS_CHOICES.FAILED.value
+
+        if 'errors' in self.status_data:
+            self.status_data['errors'].append({
+                'error_message': str(exception),
+                'timestamp': timezone.now().isoformat(),
+                'exception_traceback': traceback.format_exc()
+            })
+        else:
+            self.status_data = {
+                'errors': [{
+                    'error_message': str(exception),
+                    'timestamp': timezone.now().isoformat(),
+                    'exception_traceback': traceback.format_exc()
+                }]
+            }
+
     def send(self):
         """
         Simply sends a message to this receiver. This method can also be
         used to resend an email.
+
+        Use :meth:`.MessageReceiverQuerySet.send_in_batches` to send to many receivers.
         """
         try:
             self._send_email()
@@ -449,27 +620,7 @@ class MessageReceiver(models.Model):
             self.sending_success_count += 1
             self.save()
         except Exception as exception:
-            self.sending_failed_count += 1
-
-            if self.sending_failed_count > settings.DEVILRY_MESSAGE_RESEND_LIMIT:
-                self.status = self.STATUS_CHOICES.ERROR.value
-            else:
-                self.status = self.STATUS_CHOICES.FAILED.value
-
-            if 'errors' in self.status_data:
-                self.status_data['errors'].append({
-                    'error_message': str(exception),
-                    'timestamp': timezone.now().isoformat(),
-                    'exception_traceback': traceback.format_exc()
-                })
-            else:
-                self.status_data = {
-                    'errors': [{
-                        'error_message': str(exception),
-                        'timestamp': timezone.now().isoformat(),
-                        'exception_traceback': traceback.format_exc()
-                    }]
-                }
+            self.add_send_error(exception=exception)
             self.save()
 
     def clean_message_content_fields(self):
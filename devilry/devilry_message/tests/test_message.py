@@ -2,6 +2,7 @@ import mock
 from django import test
 from django.conf import settings
 from django.core import mail
+from django.template.loader import render_to_string
 
 from model_mommy import mommy
 
@@ -65,6 +66,50 @@ class TestMessage(test.TestCase):
         self.assertIn(user2, receiver_user_list)
         self.assertIn(user3, receiver_user_list)
 
+    def test_prepare_message_receivers_renders_once_per_language(self):
+        user1 = mommy.make(settings.AUTH_USER_MODEL, languagecode='en')
+        user2 = mommy.make(settings.AUTH_USER_MODEL, languagecode='en')
+        user3 = mommy.make(settings.AUTH_USER_MODEL, languagecode='nb')
+        message = mommy.make('devilry_message.Message',
+                             virtual_message_receivers={'user_ids': [user1.id, user2.id, user3.id]},
+                             message_type=['email'])
+        with mock.patch('devilry.devilry_message.models.base.render_to_string',
+                        wraps=render_to_string) as mock_render_to_string:
+            message_receivers = message.prepare_message_receivers(
+                subject_generator=test_utils.SubjectTextTestGenerator(),
+                template_name='devilry_message/for_test.django.html',
+                template_context={})
+        self.assertEqual(mock_render_to_string.call_count, 2)
+        self.assertEqual(len(message_receivers), 3)
+        for message_receiver in message_receivers:
+            self.assertEqual(message_receiver.subject, 'Test subject')
+            self.assertEqual(message_receiver.message_content_html, '<p>For testing</p>')
+            self.assertEqual(message_receiver.message_content_plain, 'For testing')
+
+    def test_prepare_message_receiver_batches(self):
+        users = mommy.make(settings.AUTH_USER_MODEL, _quantity=5)
+        message = mommy.make('devilry_message.Message',
+                             virtual_message_receivers={'user_ids': [user.id for user in users]},
+                             message_type=['email'])
+        message_receiver_batches = list(message.prepare_message_receiver_batches(
+            subject_generator=test_utils.SubjectTextTestGenerator(),
+            template_name='devilry_message/for_test.django.html',
+            template_context={},
+            batch_size=2))
+        self.assertEqual([len(batch) for batch in message_receiver_batches], [2, 2, 1])
+
+    def test_create_message_receivers_in_batches(self):
+        users = mommy.make(settings.AUTH_USER_MODEL, _quantity=5)
+        message = mommy.make('devilry_message.Message',
+                             virtual_message_receivers={'user_ids': [user.id for user in users]},
+                             message_type=['email'])
+        with self.settings(DEVILRY_MESSAGE_RECEIVER_BATCH_SIZE=2):
+            message.create_message_receivers(
+                subject_generator=test_utils.SubjectTextTestGenerator(),
+                template_name='devilry_message/for_test.django.html',
+                template_context={})
+        self.assertEqual(MessageReceiver.objects.filter(message=message).count(), 5)
+
     def test_prepare_and_send_message_not_draft(self):
         user = self.__make_email_for_user(mommy.make(settings.AUTH_USER_MODEL), 'testuser@example.com').user
         message_preparing = mommy.make('devilry_message.Message',
@@ -120,6 +165,71 @@ class TestMessage(test.TestCase):
         self.assertTrue(MessageReceiver.objects.filter(user=user2).exists())
         self.assertEqual(len(mail.outbox), 2)
 
+    def test_prepare_and_send_uses_one_connection_per_batch(self):
+        user_ids = []
+        for i in range(1, 6):
+            user = self.__make_email_for_user(
+                mommy.make(settings.AUTH_USER_MODEL),
+                'testuser{}@example.com'.format(i)
+            ).user
+            user_ids.append(user.id)
+        message = mommy.make('devilry_message.Message',
+                             virtual_message_receivers={'user_ids': user_ids},
+                             message_type=['email'])
+        with self.settings(DEVILRY_MESSAGE_SEND_BATCH_SIZE=2):
+            with mock.patch('devilry.devilry_message.models.base.mail.get_connection',
+                            wraps=mail.get_connection) as mock_get_connection:
+                message.prepare_and_send(
+                    subject_generator=test_utils.SubjectTextTestGenerator(),
+                    template_name='devilry_message/for_test.django.html',
+                    template_context={})
+        self.assertEqual(mock_get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(MessageReceiver.objects.filter(status='sent', sending_success_count=1).count(), 5)
+        self.assertEqual(MessageReceiver.objects.filter(sent_datetime__isnull=True).count(), 0)
+
+    def test_prepare_and_send_send_error_for_single_receiver(self):
+        user1 = self.__make_email_for_user(mommy.make(settings.AUTH_USER_MODEL), 'testuser1@example.com').user
+        user2 = self.__make_email_for_user(mommy.make(settings.AUTH_USER_MODEL), 'testuser2@example.com').user
+        message = mommy.make('devilry_message.Message',
+                             virtual_message_receivers={'user_ids': [user1.id, user2.id]},
+                             message_type=['email'])
+        original_send_messages = mail.get_connection().__class__.send_messages
+
+        def mock_send_messages(connection, email_messages):
+            if 'testuser1@example.com' in email_messages[0].to:
+                raise Exception('Test error')
+            return original_send_messages(connection, email_messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', mock_send_messages):
+            message.prepare_and_send(
+                subject_generator=test_utils.SubjectTextTestGenerator(),
+                template_name='devilry_message/for_test.django.html',
+                template_context={})
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'sent')
+        self.assertEqual(len(mail.outbox), 1)
+        failed_receiver = MessageReceiver.objects.get(user=user1)
+        self.assertEqual(failed_receiver.status, 'failed')
+        self.assertEqual(failed_receiver.sending_failed_count, 1)
+        self.assertEqual(failed_receiver.status_data['errors'][0]['error_message'], 'Test error')
+        self.assertEqual(MessageReceiver.objects.get(user=user2).status, 'sent')
+
+    def test_prepare_and_send_only_notification_emails(self):
+        user = self.__make_email_for_user(mommy.make(settings.AUTH_USER_MODEL), 'testuser@example.com').user
+        mommy.make('devilry_account.UserEmail', user=user, email='other@example.com',
+                   use_for_notifications=False)
+        message = mommy.make('devilry_message.Message',
+                             virtual_message_receivers={'user_ids': [user.id]},
+                             message_type=['email'])
+        message.prepare_and_send(
+            subject_generator=test_utils.SubjectTextTestGenerator(),
+            template_name='devilry_message/for_test.django.html',
+            template_context={})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['testuser@example.com'])
+        self.assertTrue(mail.outbox[0].subject.startswith('[Devilry] '))
+
     def test_prepare_and_send_create_message_receivers_raises_error(self):
         user = self.__make_email_for_user(mommy.make(settings.AUTH_USER_MODEL), 'testuser@example.com').user
         message = mommy.make('devilry_message.Message',
@@ -171,7 +281,7 @@ class TestMessage(test.TestCase):
         message = mommy.make('devilry_message.Message',
                              virtual_message_receivers={'user_ids': user_ids},
                              message_type=['email'])
-        with self.assertNumQueries(44):
+        with self.assertNumQueries(28):
             message.prepare_and_send(
                 subject_generator=test_utils.SubjectTextTestGenerator(),
                 template_name='devilry_message/for_test.django.html',
@@ -161,6 +161,30 @@ class TestMessage(test.TestCase):
         self.assertEqual(message_receiver.status, 'sent')
         self.assertEqual(message_receiver.sending_success_count, 3)
 
+    def test_send_in_batches_connection_open_error(self):
+        user = self.__make_email_for_user(mommy.make(settings.AUTH_USER_MODEL), 'testuser@example.com').user
+        failing_receiver = self.__make_simple_message_receiver(user=user)
+        sent_receiver = self.__make_simple_message_receiver(user=user)
+        get_connection = mail.get_connection
+        connections = []
+
+        def mock_get_connection(**kwargs):
+            connection = get_connection(**kwargs)
+            if not connections:
+                connection.open = mock.Mock(side_effect=IOError('Test connection error'))
+            connections.append(connection)
+            return connection
+        with mock.patch('devilry.devilry_message.models.base.mail.get_connection', mock_get_connection):
+            MessageReceiver.objects.filter(id__in=[failing_receiver.id, sent_receiver.id])\
+                .send_in_batches(batch_size=1)
+        failing_receiver.refresh_from_db()
+        sent_receiver.refresh_from_db()
+        self.assertEqual(failing_receiver.status, MessageReceiver.STATUS_CHOICES.FAILED.value)
+        self.assertEqual(failing_receiver.sending_failed_count, 1)
+        self.assertEqual(failing_receiver.status_data['errors'][0]['error_message'], 'Test connection error')
+        self.assertEqual(sent_receiver.status, MessageReceiver.STATUS_CHOICES.SENT.value)
+        self.assertEqual(len(mail.outbox), 1)
+
     def test_filter_old_receivers_single_sanity(self):
         created_datetime = timezone.now() - timezone.timedelta(days=10)
         delete_created_before_datetime = timezone.now() - timezone.timedelta(days=5)
@@ -7,9 +7,14 @@ class AbstractReportGenerator(object):
     Abstract generator class that generators must inherit from. Provides an interface for
     generators used by :class:`devilry.devilry_report.models.DevilryReport`.
     """
-    def __init__(self, devilry_report):
+    def __init__(self, devilry_report, streaming=False):
         self.devilry_report = devilry_report
 
+        #: If this is ``True``, :meth:`.generate` writes to a temporary file, and the
+        #: generator should avoid keeping the entire report in memory.
+        #: See the ``DEVILRY_REPORT_STREAMING`` setting.
+        self.streaming = streaming
+
     @classmethod
     def get_generator_type(cls):
         """
@@ -73,6 +78,15 @@ class AbstractReportGenerator(object):
         """
         return []
 
+    def get_object_list(self):
+        """
+        Get the "objects" from :meth:`.get_object_iterable` as a list.
+
+        Generators that write the objects more than once (e.g.: to multiple worksheets) should
+        use this once, and write from the list, so the objects are only computed once.
+        """
+        return list(self.get_object_iterable())
+
 
 class AbstractExcelReportGenerator(AbstractReportGenerator):
     """
@@ -151,19 +165,32 @@ class AbstractExcelReportGenerator(AbstractReportGenerator):
         datetime_object = datetime_object.replace(tzinfo=None)
         return datetime_object
 
+    def get_workbook_options(self):
+        """
+        Get the options for the xlsxwriter Workbook.
+
+        In streaming mode, the ``constant_memory`` option is used, so each row is
+        written to a temporary file as soon as a new row is started. This requires the
+        rows of each worksheet to be written in order, like :meth:`.write` does.
+        """
+        if self.streaming:
+            return {'constant_memory': True}
+        return {'in_memory': True}
+
     def initialize_workbook(self, file_like_object):
-        self.workbook = xlsxwriter.Workbook(file_like_object, {'in_memory': True})
+        self.workbook = xlsxwriter.Workbook(file_like_object, self.get_workbook_options())
         self.header_cell_format = self.make_header_format()
         self.date_cell_format = self.make_date_cell_format()
         self.datetime_cell_format = self.make_datetime_cell_format()
 
     def write(self, file_like_object):
         self.initialize_workbook(file_like_object=file_like_object)
+        object_list = self.get_object_list()
         row = 1
         column = 0
         for worksheet in self.get_work_sheets():
             self.add_worksheet_headers(worksheet=worksheet[1])
-            for obj in self.get_object_iterable():
+            for obj in object_list:
                 self.write_data_to_worksheet(
                     worksheet_tuple=worksheet,
                     row=row,
@@ -48,7 +48,8 @@ class DevilryReportAdmin(admin.ModelAdmin):
         'generator_type',
         'get_generator_options_pretty',
         'output_filename',
-        'content_type'
+        'content_type',
+        'result_file'
     ]
 
     def get_status_data_pretty(self, obj):
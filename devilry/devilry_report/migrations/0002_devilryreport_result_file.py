@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+
+import devilry.devilry_report.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devilry_report', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='devilryreport',
+            name='result_file',
+            field=models.FileField(blank=True, default='', max_length=512, upload_to=devilry.devilry_report.models.devilry_report_result_file_path),
+        ),
+    ]
@@ -2,12 +2,16 @@
 
 
 import logging
+import tempfile
 import traceback
 from io import BytesIO
 
 from django.conf import settings
+from django.core import files
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from django.contrib.postgres.fields import JSONField
 from django.utils import timezone
 
@@ -19,6 +23,16 @@ from devilry.devilry_report import generator_registry
 logger = logging.getLogger(__name__)
 
 
+def devilry_report_result_file_path(instance, filename):
+    """The ``upload_to`` function for :obj:`.DevilryReport.result_file`.
+
+    Args:
+        instance: The :class:`.DevilryReport` instance.
+        filename: The :obj:`~.DevilryReport.output_filename`.
+    """
+    return 'devilry_report/{}/{}'.format(instance.id, filename)
+
+
 class DevilryReport(models.Model):
     """
     A model representing a report of various data, e.g complete user report.
@@ -27,7 +41,8 @@ class DevilryReport(models.Model):
     updated status while generating a report. Of course, the a report can also be generated synchronously,
     but usually the report generators will perform time-consuming tasks.
 
-    Report data is stored as binary data, and is always generated for a specific user.
+    Report data is stored as binary data, or in a file if the ``DEVILRY_REPORT_STREAMING``
+    setting is ``True``, and is always generated for a specific user.
     """
 
     #: The user(`AUTH_USER_MODEL`) that generated the report.
@@ -110,8 +125,15 @@ class DevilryReport(models.Model):
     )
 
     #: The complete report stored as binary data.
+    #: Not used if the report is generated in streaming mode (see :obj:`~.DevilryReport.result_file`).
     result = models.BinaryField()
 
+    #: The complete report stored in a file. Only used if the report is generated
+    #: with the ``DEVILRY_REPORT_STREAMING`` setting set to ``True``.
+    result_file = models.FileField(
+        upload_to=devilry_report_result_file_path, max_length=512,
+        null=False, blank=True, default='')
+
     def __str__(self):
         return '#{}-{}-{}'.format(
             self.id, self.generator_type, self.status)
@@ -150,8 +172,12 @@ class DevilryReport(models.Model):
         self.full_clean()
         self.save()
 
-        generator = self.generator(devilry_report=self)
-        file_like_obj = BytesIO()
+        streaming = getattr(settings, 'DEVILRY_REPORT_STREAMING', False)
+        generator = self.generator(devilry_report=self, streaming=streaming)
+        if streaming:
+            file_like_obj = tempfile.TemporaryFile()
+        else:
+            file_like_obj = BytesIO()
         try:
             generator.generate(file_like_object=file_like_obj)
         except Exception as exception:
@@ -162,7 +188,6 @@ class DevilryReport(models.Model):
             }
             logger.exception('Failed to generate DevilryReport#{}'.format(self.id))
         else:
-            self.result = file_like_obj.getvalue()
             self.finished_datetime = timezone.now()
             self.content_type = generator.get_content_type()
             self.output_filename = '{}-{}.{}'.format(
@@ -170,6 +195,41 @@ class DevilryReport(models.Model):
                 self.finished_datetime.strftime('%d%m%Y-%H%M%S'),
                 generator.get_output_file_extension()
             )
+            if streaming:
+                file_like_obj.seek(0)
+                self.result_file.save(self.output_filename, files.File(file_like_obj), save=False)
+            else:
+                self.result = file_like_obj.getvalue()
             self.status = self.STATUS_CHOICES.SUCCESS.value
+        finally:
+            file_like_obj.close()
         self.full_clean()
         self.save()
+
+    def open_result(self):
+        """
+        Open the generated report for reading.
+
+        Returns:
+            A file-like object with the report. Reads from :obj:`~.DevilryReport.result_file`
+            if the report was generated in streaming mode.
+        """
+        if self.result_file:
+            self.result_file.open('rb')
+            return self.result_file
+        return BytesIO(self.result)
+
+    def get_result_size(self):
+        """
+        Get the size of the generated report in bytes.
+        """
+        if self.result_file:
+            return self.result_file.size
+        return len(self.result)
+
+
+@receiver(pre_delete, sender=DevilryReport)
+def on_pre_delete_devilryreport(sender, instance, **kwargs):
+    devilry_report = instance
+    if devilry_report.result_file:
+        devilry_report.result_file.delete(save=False)
@@ -112,3 +112,22 @@ class TestAllResultsDownload(test.TestCase, cradmin_testhelpers.TestCaseMixin):
                         'report': report.id
                     }})
             self.assertEqual(mockresponse.response.content, b'Test content')
+
+    def test_get_download_generated_report_streaming(self):
+        reportuser = mommy.make(settings.AUTH_USER_MODEL)
+        with mock.patch.object(DevilryReport, 'generator', TestGenerator):
+            report = mommy.make('devilry_report.DevilryReport',
+                                generated_by_user=reportuser,
+                                generator_type='test-generator')
+            with self.settings(DEVILRY_REPORT_STREAMING=True):
+                report.generate()
+            mockresponse = self.mock_getrequest(
+                requestuser=reportuser,
+                requestkwargs={
+                    'data': {
+                        'report': report.id
+                    }})
+            self.assertTrue(mockresponse.response.streaming)
+            self.assertEqual(b''.join(mockresponse.response.streaming_content), b'Test content')
+            self.assertEqual(mockresponse.response['Content-Length'], str(len(b'Test content')))
+            report.delete()
@@ -2,6 +2,8 @@
 
 
 import io
+import os
+import shutil
 
 import mock
 from django import test
@@ -92,3 +94,52 @@ class TestDevilryReport(test.TestCase):
             buffer = io.BytesIO()
             buffer.write(devilry_report.result)
             self.assertEqual(buffer.getvalue(), b'Test content')
+
+
+class StreamingGenerator(Generator):
+    def generate(self, file_like_object):
+        file_like_object.write('Test content streaming={}'.format(self.streaming).encode('utf-8'))
+
+
+class TestDevilryReportStreaming(test.TestCase):
+    def tearDown(self):
+        # Ignores errors if the path is not created.
+        shutil.rmtree('devilry_testfiles/filestore/', ignore_errors=True)
+
+    def __generate(self):
+        with mock.patch.object(DevilryReport, 'generator', StreamingGenerator):
+            devilry_report = mommy.make('devilry_report.DevilryReport',
+                                        generator_type=StreamingGenerator.get_generator_type())
+            with self.settings(DEVILRY_REPORT_STREAMING=True):
+                devilry_report.generate()
+            devilry_report.refresh_from_db()
+            return devilry_report
+
+    def test_generate_stores_result_file(self):
+        devilry_report = self.__generate()
+        self.assertEqual(devilry_report.status, DevilryReport.STATUS_CHOICES.SUCCESS.value)
+        self.assertEqual(bytes(devilry_report.result), b'')
+        self.assertEqual(devilry_report.result_file.name,
+                         'devilry_report/{}/{}'.format(devilry_report.id, devilry_report.output_filename))
+        result_file = devilry_report.open_result()
+        try:
+            self.assertEqual(result_file.read(), b'Test content streaming=True')
+        finally:
+            result_file.close()
+        self.assertEqual(devilry_report.get_result_size(), len(b'Test content streaming=True'))
+
+    def test_generate_not_streaming(self):
+        with mock.patch.object(DevilryReport, 'generator', StreamingGenerator):
+            devilry_report = mommy.make('devilry_report.DevilryReport',
+                                        generator_type=StreamingGenerator.get_generator_type())
+            devilry_report.generate()
+            devilry_report.refresh_from_db()
+        self.assertFalse(devilry_report.result_file)
+        self.assertEqual(devilry_report.open_result().read(), b'Test content streaming=False')
+
+    def test_delete_removes_result_file(self):
+        devilry_report = self.__generate()
+        filepath = devilry_report.result_file.path
+        self.assertTrue(os.path.exists(filepath))
+        devilry_report.delete()
+        self.assertFalse(os.path.exists(filepath))
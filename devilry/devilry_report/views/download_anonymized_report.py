@@ -1,16 +1,16 @@
 # -*- coding: utf-8 -*-
 
 
-import io
 import json
 
-from django.http import Http404, HttpResponse
+from django.http import Http404
 from django.views import generic
 from django import forms
 import django_rq
 
 from devilry.devilry_report.models import DevilryReport
 from devilry.devilry_report.rq_task import generate_report
+from devilry.devilry_report.views.download_report import make_report_download_response
 
 
 class ReportForm(forms.Form):
@@ -72,13 +72,7 @@ class DownloadAnonymizedReportView(generic.FormView):
 
         if self.devilry_report.status == DevilryReport.STATUS_CHOICES.SUCCESS.value:
             # Return a download reponse if the report is finished.
-            buffer = io.BytesIO()
-            buffer.write(self.devilry_report.result)
-            response = HttpResponse(
-                buffer.getvalue(), content_type=self.devilry_report.content_type)
-            response['Content-Disposition'] = 'attachment; filename={}'.format(self.devilry_report.output_filename)
-            response['Content-Length'] = len(buffer.getvalue())
-            return response
+            return make_report_download_response(devilry_report=self.devilry_report)
         return super(DownloadAnonymizedReportView, self).get(*args, **kwargs)
 
     def get_context_data(self, **kwargs):
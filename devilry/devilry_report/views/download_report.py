@@ -4,7 +4,7 @@
 import io
 import json
 
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, FileResponse
 from django.views import generic
 from django import forms
 import django_rq
@@ -13,6 +13,26 @@ from devilry.devilry_report.models import DevilryReport
 from devilry.devilry_report.rq_task import generate_report
 
 
+def make_report_download_response(devilry_report):
+    """
+    Make a download response for a successfully generated
+    :class:`~.devilry.devilry_report.models.DevilryReport`.
+
+    Reports generated in streaming mode are streamed from the
+    :obj:`~.devilry.devilry_report.models.DevilryReport.result_file` in chunks.
+    """
+    if devilry_report.result_file:
+        response = FileResponse(devilry_report.open_result(), content_type=devilry_report.content_type)
+    else:
+        buffer = io.BytesIO()
+        buffer.write(devilry_report.result)
+        response = HttpResponse(
+            buffer.getvalue(), content_type=devilry_report.content_type)
+    response['Content-Disposition'] = 'attachment; filename={}'.format(devilry_report.output_filename)
+    response['Content-Length'] = devilry_report.get_result_size()
+    return response
+
+
 class ReportForm(forms.Form):
     report_options = forms.CharField(required=True)
 
@@ -72,13 +92,7 @@ class DownloadReportView(generic.FormView):
 
         if self.devilry_report.status == DevilryReport.STATUS_CHOICES.SUCCESS.value:
             # Return a download reponse if the report is finished.
-            buffer = io.BytesIO()
-            buffer.write(self.devilry_report.result)
-            response = HttpResponse(
-                buffer.getvalue(), content_type=self.devilry_report.content_type)
-            response['Content-Disposition'] = 'attachment; filename={}'.format(self.devilry_report.output_filename)
-            response['Content-Length'] = len(buffer.getvalue())
-            return response
+            return make_report_download_response(devilry_report=self.devilry_report)
         return super(DownloadReportView, self).get(*args, **kwargs)
 
     def get_context_data(self, **kwargs):
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status, serializers
+from rest_framework.views import APIView
+
+from devilry.apps.core import models as coremodels
+from devilry.devilry_group.models import FeedbackSet
+from devilry.devilry_statistics.api.assignment.api_utils import AssignmentApiViewPreMixin, AccessPermission
+
+
+class AssignmentExaminerStatisticsSerializer(serializers.Serializer):
+    assignment_id = serializers.IntegerField(required=True)
+
+
+class AssignmentExaminerStatisticsApi(AssignmentApiViewPreMixin, APIView):
+    """
+    API for getting the statistics for all examiners on an assignment.
+
+    Returns the same data as
+    :class:`~devilry.devilry_statistics.api.assignment.examiner_details.ExaminerDetailsApi`,
+    :class:`~devilry.devilry_statistics.api.assignment.examiner_average_grading_points.ExaminerAverageGradingPointsApi`
+    and :class:`~devilry.devilry_statistics.api.assignment.examiner_group_results.ExaminerGroupResultApi`
+    for each examiner, from a single query grouped by examiner.
+
+    The result is cached until grading is published on the assignment, or for at most
+    ``DEVILRY_STATISTICS_ASSIGNMENT_EXAMINER_STATISTICS_CACHE_TIMEOUT`` seconds.
+    """
+    permission_classes = [IsAuthenticated, AccessPermission]
+
+    def get_queryset(self, assignment):
+        return coremodels.Examiner.objects \
+            .filter(assignmentgroup__parentnode_id=assignment.id)
+
+    def get_result(self, queryset, assignment):
+        now = timezone.now()
+        is_corrected = models.Q(
+            assignmentgroup__cached_data__last_feedbackset=models.F(
+                'assignmentgroup__cached_data__last_published_feedbackset'))
+        is_published = models.Q(assignmentgroup__cached_data__last_published_feedbackset__isnull=False)
+        is_not_published = models.Q(
+            assignmentgroup__cached_data__last_feedbackset__grading_published_datetime__isnull=True)
+        grading_points = 'assignmentgroup__cached_data__last_published_feedbackset__grading_points'
+        return queryset \
+            .values('relatedexaminer_id',
+                    'relatedexaminer__user__fullname',
+                    'relatedexaminer__user__shortname') \
+            .annotate(
+                total_group_count=models.Count('assignmentgroup_id'),
+                groups_corrected_count=models.Count(models.Case(
+                    models.When(is_corrected, then=1)
+                )),
+                groups_with_passing_grade_count=models.Count(models.Case(
+                    models.When(
+                        is_published & is_corrected & models.Q(**{
+                            '{}__gte'.format(grading_points): assignment.passing_grade_min_points}),
+                        then=1)
+                )),
+                groups_with_failing_grade_count=models.Count(models.Case(
+                    models.When(
+                        is_published & is_corrected & models.Q(**{
+                            '{}__lt'.format(grading_points): assignment.passing_grade_min_points}),
+                        then=1)
+                )),
+                groups_waiting_for_feedback_count=models.Count(models.Case(
+                    models.When(
+                        is_not_published & models.Q(
+                            assignmentgroup__cached_data__last_feedbackset__deadline_datetime__lt=now),
+                        then=1)
+                )),
+                groups_waiting_for_deadline_to_expire_count=models.Count(models.Case(
+                    models.When(
+                        is_not_published & models.Q(
+                            assignmentgroup__cached_data__last_feedbackset__deadline_datetime__gt=now),
+                        then=1)
+                )),
+                groups_not_corrected_count=models.Count(models.Case(
+                    models.When(is_not_published, then=1)
+                )),
+                points_average=models.Avg(grading_points),
+                points_highest=models.Max(grading_points),
+                points_lowest=models.Min(grading_points)
+            ) \
+            .order_by('relatedexaminer_id')
+
+    def get_percentage(self, p, total):
+        if p == 0 or total == 0:
+            return 0
+        return 100 * (float(p) / float(total))
+
+    def serialize_examiner_result(self, examiner_result):
+        total_group_count = examiner_result['total_group_count']
+        points_average = '{0:.2f}'.format(examiner_result['points_average'] or 0)
+        return {
+            'relatedexaminer_id': examiner_result['relatedexaminer_id'],
+            'user_name': (examiner_result['relatedexaminer__user__fullname'] or
+                          examiner_result['relatedexaminer__user__shortname']),
+
+            # Details
+            'total_group_count': total_group_count,
+            'groups_corrected_count': examiner_result['groups_corrected_count'],
+            'groups_with_passing_grade_count': examiner_result['groups_with_passing_grade_count'],
+            'groups_with_failing_grade_count': examiner_result['groups_with_failing_grade_count'],
+            'groups_waiting_for_deliveries_count': examiner_result['groups_waiting_for_deadline_to_expire_count'],
+            'groups_waiting_for_feedback_count': examiner_result['groups_waiting_for_feedback_count'],
+            'groups_waiting_for_deadline_to_expire_count':
+                examiner_result['groups_waiting_for_deadline_to_expire_count'],
+            'points_average': points_average,
+            'points_highest': '{0:.2f}'.format(examiner_result['points_highest'] or 0),
+            'points_lowest': '{0:.2f}'.format(examiner_result['points_lowest'] or 0),
+
+            # Average grading points
+            'average_grading_points_given': points_average,
+
+            # Group results (percentages)
+            'groups_passed': '{0:.2f}'.format(self.get_percentage(
+                p=examiner_result['groups_with_passing_grade_count'], total=total_group_count)),
+            'groups_failed': '{0:.2f}'.format(self.get_percentage(
+                p=examiner_result['groups_with_failing_grade_count'], total=total_group_count)),
+            'groups_not_corrected': '{0:.2f}'.format(self.get_percentage(
+                p=examiner_result['groups_not_corrected_count'], total=total_group_count)),
+        }
+
+    def get_cache_timeout(self):
+        return getattr(settings, 'DEVILRY_STATISTICS_ASSIGNMENT_EXAMINER_STATISTICS_CACHE_TIMEOUT', 300)
+
+    def get_cache_key(self, assignment):
+        """
+        Get the cache key for the assignment. The key includes the last time grading
+        was published on the assignment, so publishing grading invalidates the cache.
+        """
+        last_grading_published_datetime = FeedbackSet.objects\
+            .filter(group__parentnode_id=assignment.id)\
+            .aggregate(last_grading_published_datetime=models.Max('grading_published_datetime'))\
+            .get('last_grading_published_datetime')
+        if last_grading_published_datetime is None:
+            last_grading_published = 'none'
+        else:
+            last_grading_published = last_grading_published_datetime.isoformat()
+        return 'devilry_statistics.assignment_examiner_statistics.{}.{}'.format(
+            assignment.id, last_grading_published)
+
+    def __get_examiners_data(self, assignment):
+        queryset = self.get_queryset(assignment=assignment)
+        return [self.serialize_examiner_result(examiner_result)
+                for examiner_result in self.get_result(queryset=queryset, assignment=assignment)]
+
+    def get_data(self, serializer):
+        assignment = self.get_assignment(assignment_id=serializer.validated_data['assignment_id'])
+        cache_timeout = self.get_cache_timeout()
+        if not cache_timeout:
+            return {'examiners': self.__get_examiners_data(assignment=assignment)}
+        cache_key = self.get_cache_key(assignment=assignment)
+        data = cache.get(cache_key)
+        if data is None:
+            data = {'examiners': self.__get_examiners_data(assignment=assignment)}
+            cache.set(cache_key, data, timeout=cache_timeout)
+        return data
+
+    def get(self, *args, **kwargs):
+        serializer = AssignmentExaminerStatisticsSerializer(data=kwargs)
+        if serializer.is_valid():
+            data = self.get_data(serializer=serializer)
+            return Response(data=data, status=status.HTTP_200_OK)
+        return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -22,22 +22,15 @@ export default class ExaminerAverageGradingPointsWidget extends AbstractWidget {
 
   requestData () {
     const assignment_id = this.config.assignment_id
-    const relatedexaminer_ids = this.config.relatedexaminer_ids
-    let promises = []
-    for (let relatedexaminer_id of relatedexaminer_ids) {
-      let request = new HttpRequest(`/devilry_statistics/assignment/examiner-average-points/${assignment_id}/${relatedexaminer_id}`)
-      promises.push(request.get())
-    }
-
-    Promise.all(promises)
-      .then((promiseData) => {
+    let request = new HttpRequest(`/devilry_statistics/assignment/examiner-statistics/${assignment_id}`)
+    request.get()
+      .then((response) => {
         let labels = []
         let data = []
-        Object.entries(promiseData).forEach(([key, response]) => {
-          let responseData = JSON.parse(response.body)
-          labels.push(responseData.user_name)
-          data.push(responseData.average_grading_points_given)
-        })
+        for (let examinerStatistics of JSON.parse(response.body).examiners) {
+          labels.push(examinerStatistics.user_name)
+          data.push(examinerStatistics.average_grading_points_given)
+        }
         this.isLoading = false
         this.render(labels, data)
       })
@@ -29,20 +29,13 @@ export default class ExaminerDetailsWidget extends AbstractWidget {
 
   requestData () {
     const assignment_id = this.config.assignment_id
-    const relatedexaminer_ids = this.config.relatedexaminer_ids
-    let promises = []
-    for (let relatedexaminer_id of relatedexaminer_ids) {
-      let request = new HttpRequest(`/devilry_statistics/assignment/examiner-details/${assignment_id}/${relatedexaminer_id}`)
-      promises.push(request.get())
-    }
-
-    Promise.all(promises)
-      .then((promiseData) => {
+    let request = new HttpRequest(`/devilry_statistics/assignment/examiner-statistics/${assignment_id}`)
+    request.get()
+      .then((response) => {
         this.element.innerHTML = ''
-        Object.entries(promiseData).forEach(([key, response]) => {
-          let responseData = JSON.parse(response.body)
-          this._addExaminerDetail(responseData)
-        })
+        for (let examinerDetails of JSON.parse(response.body).examiners) {
+          this._addExaminerDetail(examinerDetails)
+        }
         this.isLoading = false
       })
       .catch((error) => {
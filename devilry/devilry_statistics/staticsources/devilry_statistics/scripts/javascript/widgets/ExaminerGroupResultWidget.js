@@ -22,26 +22,19 @@ export default class ExaminerGroupResultWidget extends AbstractWidget {
 
   requestData () {
     const assignment_id = this.config.assignment_id
-    const relatedexaminer_ids = this.config.relatedexaminer_ids
-    let promises = []
-    for (let relatedexaminer_id of relatedexaminer_ids) {
-      let request = new HttpRequest(`/devilry_statistics/assignment/examiner-group-results/${assignment_id}/${relatedexaminer_id}`)
-      promises.push(request.get())
-    }
-
-    Promise.all(promises)
-      .then((promiseData) => {
+    let request = new HttpRequest(`/devilry_statistics/assignment/examiner-statistics/${assignment_id}`)
+    request.get()
+      .then((response) => {
         let usernames = []
         let passed = []
         let failed = []
         let notCorrected = []
-        Object.entries(promiseData).forEach(([key, response]) => {
-          let responseData = JSON.parse(response.body)
-          usernames.push(responseData.user_name)
-          passed.push(responseData.groups_passed)
-          failed.push(responseData.groups_failed)
-          notCorrected.push(responseData.groups_not_corrected)
-        })
+        for (let examinerStatistics of JSON.parse(response.body).examiners) {
+          usernames.push(examinerStatistics.user_name)
+          passed.push(examinerStatistics.groups_passed)
+          failed.push(examinerStatistics.groups_failed)
+          notCorrected.push(examinerStatistics.groups_not_corrected)
+        }
         this.isLoading = false
         this.render(usernames, passed, failed, notCorrected)
       })
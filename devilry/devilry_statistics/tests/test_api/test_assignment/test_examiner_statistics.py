@@ -0,0 +1,166 @@
+from datetime import timedelta
+
+from django import test
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from model_mommy import mommy
+
+from devilry.devilry_dbcache.customsql import AssignmentGroupDbCacheCustomSql
+from devilry.devilry_statistics.tests.test_api import api_test_mixin
+from devilry.devilry_statistics.api.assignment import examiner_statistics
+from devilry.devilry_group import devilry_group_mommy_factories as group_mommy
+
+
+class TestAssignmentExaminerStatisticsApi(test.TestCase, api_test_mixin.ApiTestMixin):
+    apiview_class = examiner_statistics.AssignmentExaminerStatisticsApi
+
+    def setUp(self):
+        AssignmentGroupDbCacheCustomSql().initialize()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def __make_published_group_for_relatedexaminer(self, assignment, relatedexaminer, grading_points):
+        group = mommy.make('core.AssignmentGroup', parentnode=assignment)
+        mommy.make('core.Examiner', relatedexaminer=relatedexaminer, assignmentgroup=group)
+        group_mommy.feedbackset_first_attempt_published(group=group, grading_points=grading_points,
+                                                        deadline_datetime=timezone.now())
+        return group
+
+    def __make_unpublished_group_for_relatedexaminer(self, assignment, relatedexaminer, deadline_datetime):
+        group = mommy.make('core.AssignmentGroup', parentnode=assignment)
+        mommy.make('core.Examiner', relatedexaminer=relatedexaminer, assignmentgroup=group)
+        group_mommy.feedbackset_first_attempt_unpublished(group=group, deadline_datetime=deadline_datetime)
+        return group
+
+    def __make_period_admin(self, period):
+        requestuser = self.make_user()
+        permissiongroup = mommy.make('devilry_account.PeriodPermissionGroup',
+                                     period=period)
+        mommy.make('devilry_account.PermissionGroupUser',
+                   user=requestuser,
+                   permissiongroup=permissiongroup.permissiongroup)
+        return requestuser
+
+    def test_user_not_authenticated(self):
+        response = self.make_get_request()
+        self.assertEqual(response.status_code, 403)
+
+    def test_user_has_no_access(self):
+        assignment = mommy.make('core.Assignment')
+        response = self.make_get_request(
+            requestuser=self.make_user(),
+            viewkwargs={'assignment_id': assignment.id})
+        self.assertEqual(response.status_code, 403)
+
+    def test_period_admin_has_access(self):
+        period = mommy.make('core.Period')
+        assignment = mommy.make('core.Assignment', parentnode=period)
+        response = self.make_get_request(
+            requestuser=self.__make_period_admin(period=period),
+            viewkwargs={'assignment_id': assignment.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'examiners': []})
+
+    def test_all_examiners(self):
+        period = mommy.make('core.Period')
+        assignment = mommy.make('core.Assignment', parentnode=period, passing_grade_min_points=5)
+        relatedexaminer1 = mommy.make('core.RelatedExaminer', period=period, user__fullname='Examiner One')
+        relatedexaminer2 = mommy.make('core.RelatedExaminer', period=period, user__fullname='',
+                                      user__shortname='examinertwo')
+        self.__make_published_group_for_relatedexaminer(
+            assignment=assignment, relatedexaminer=relatedexaminer1, grading_points=10)
+        self.__make_published_group_for_relatedexaminer(
+            assignment=assignment, relatedexaminer=relatedexaminer1, grading_points=2)
+        self.__make_unpublished_group_for_relatedexaminer(
+            assignment=assignment, relatedexaminer=relatedexaminer1,
+            deadline_datetime=timezone.now() - timedelta(days=1))
+        self.__make_unpublished_group_for_relatedexaminer(
+            assignment=assignment, relatedexaminer=relatedexaminer2,
+            deadline_datetime=timezone.now() + timedelta(days=1))
+        response = self.make_get_request(
+            requestuser=self.__make_period_admin(period=period),
+            viewkwargs={'assignment_id': assignment.id})
+        self.assertEqual(response.status_code, 200)
+        examiner1_data, examiner2_data = response.data['examiners']
+
+        self.assertEqual(examiner1_data['relatedexaminer_id'], relatedexaminer1.id)
+        self.assertEqual(examiner1_data['user_name'], 'Examiner One')
+        self.assertEqual(examiner1_data['total_group_count'], 3)
+        self.assertEqual(examiner1_data['groups_corrected_count'], 2)
+        self.assertEqual(examiner1_data['groups_with_passing_grade_count'], 1)
+        self.assertEqual(examiner1_data['groups_with_failing_grade_count'], 1)
+        self.assertEqual(examiner1_data['groups_waiting_for_feedback_count'], 1)
+        self.assertEqual(examiner1_data['groups_waiting_for_deadline_to_expire_count'], 0)
+        self.assertEqual(examiner1_data['points_average'], '6.00')
+        self.assertEqual(examiner1_data['points_highest'], '10.00')
+        self.assertEqual(examiner1_data['points_lowest'], '2.00')
+        self.assertEqual(examiner1_data['average_grading_points_given'], '6.00')
+        self.assertEqual(examiner1_data['groups_passed'], '33.33')
+        self.assertEqual(examiner1_data['groups_failed'], '33.33')
+        self.assertEqual(examiner1_data['groups_not_corrected'], '33.33')
+
+        self.assertEqual(examiner2_data['relatedexaminer_id'], relatedexaminer2.id)
+        self.assertEqual(examiner2_data['user_name'], 'examinertwo')
+        self.assertEqual(examiner2_data['total_group_count'], 1)
+        self.assertEqual(examiner2_data['groups_waiting_for_deadline_to_expire_count'], 1)
+        self.assertEqual(examiner2_data['points_average'], '0.00')
+        self.assertEqual(examiner2_data['groups_not_corrected'], '100.00')
+
+    def test_other_assignments_not_included(self):
+        period = mommy.make('core.Period')
+        assignment = mommy.make('core.Assignment', parentnode=period)
+        relatedexaminer = mommy.make('core.RelatedExaminer', period=period)
+        self.__make_published_group_for_relatedexaminer(
+            assignment=mommy.make('core.Assignment', parentnode=period),
+            relatedexaminer=relatedexaminer, grading_points=1)
+        response = self.make_get_request(
+            requestuser=self.__make_period_admin(period=period),
+            viewkwargs={'assignment_id': assignment.id})
+        self.assertEqual(response.data, {'examiners': []})
+
+    def test_cached_until_grading_is_published(self):
+        period = mommy.make('core.Period')
+        assignment = mommy.make('core.Assignment', parentnode=period)
+        relatedexaminer = mommy.make('core.RelatedExaminer', period=period)
+        self.__make_published_group_for_relatedexaminer(
+            assignment=assignment, relatedexaminer=relatedexaminer, grading_points=1)
+        requestuser = self.__make_period_admin(period=period)
+        self.make_get_request(requestuser=requestuser, viewkwargs={'assignment_id': assignment.id})
+
+        # Examiner added to a new group - not visible until grading is published.
+        group = self.__make_unpublished_group_for_relatedexaminer(
+            assignment=assignment, relatedexaminer=relatedexaminer,
+            deadline_datetime=timezone.now())
+        response = self.make_get_request(requestuser=requestuser, viewkwargs={'assignment_id': assignment.id})
+        self.assertEqual(response.data['examiners'][0]['total_group_count'], 1)
+
+        feedbackset = group.cached_data.last_feedbackset
+        feedbackset.grading_published_datetime = timezone.now() + timedelta(seconds=1)
+        feedbackset.grading_points = 1
+        feedbackset.grading_published_by = mommy.make('devilry_account.User')
+        feedbackset.save()
+        response = self.make_get_request(requestuser=requestuser, viewkwargs={'assignment_id': assignment.id})
+        self.assertEqual(response.data['examiners'][0]['total_group_count'], 2)
+
+    def __count_queries_for_examiner_count(self, examiner_count):
+        period = mommy.make('core.Period')
+        assignment = mommy.make('core.Assignment', parentnode=period)
+        for index in range(examiner_count):
+            self.__make_published_group_for_relatedexaminer(
+                assignment=assignment,
+                relatedexaminer=mommy.make('core.RelatedExaminer', period=period),
+                grading_points=1)
+        requestuser = self.__make_period_admin(period=period)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.make_get_request(requestuser=requestuser, viewkwargs={'assignment_id': assignment.id})
+        self.assertEqual(len(response.data['examiners']), examiner_count)
+        return len(queries)
+
+    @test.override_settings(DEVILRY_STATISTICS_ASSIGNMENT_EXAMINER_STATISTICS_CACHE_TIMEOUT=None)
+    def test_num_queries_does_not_depend_on_examiner_count(self):
+        self.assertEqual(self.__count_queries_for_examiner_count(examiner_count=1),
+                         self.__count_queries_for_examiner_count(examiner_count=5))
@@ -1,7 +1,7 @@
 from django.conf.urls import url
 
 from devilry.devilry_statistics.api.assignment import examiner_average_grading_points, examiner_group_results, \
-    examiner_details
+    examiner_details, examiner_statistics
 
 
 urlpatterns = [
@@ -13,5 +13,8 @@ urlpatterns = [
         name='devilry_assignment_statistics_examiner_group_results'),
     url(r'^assignment/examiner-details/(?P<assignment_id>\d+)/(?P<relatedexaminer_id>\d+)$',
         examiner_details.ExaminerDetailsApi.as_view(),
-        name='devilry_assignment_statistics_examiner_details')
+        name='devilry_assignment_statistics_examiner_details'),
+    url(r'^assignment/examiner-statistics/(?P<assignment_id>\d+)$',
+        examiner_statistics.AssignmentExaminerStatisticsApi.as_view(),
+        name='devilry_assignment_statistics_examiner_statistics')
 ]
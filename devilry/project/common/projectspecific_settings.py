@@ -15,6 +15,20 @@ DEVILRY_DEFAULT_GRADEEDITOR = 'approved'
 #: downloads files from an assignment or a feedbackset.
 DEVILRY_COMPRESSED_ARCHIVES_DIRECTORY = None
 
+#: If this is ``True``, assignment archives are created incrementally from the previous archive
+#: created by the same user. Files that are unchanged since the previous archive are copied
+#: without being compressed again.
+DEVILRY_COMPRESSED_ARCHIVES_INCREMENTAL = True
+
+#: Number of groups in each chunk when compressing archives for an entire assignment.
+#: The progress of the compression is reported for each chunk.
+DEVILRY_COMPRESSED_ARCHIVES_GROUPS_PER_CHUNK = 20
+
+#: Number of worker processes used to compress the chunks of an assignment archive.
+#: If this is more than ``1``, the chunks are compressed into separate archives in parallel,
+#: and merged into the final archive without compressing the files again.
+DEVILRY_COMPRESSED_ARCHIVES_WORKER_PROCESSES = 1
+
 DEVILRY_STATIC_URL = '/static'  # Must not end in / (this means that '' is the server root)
 DEVILRY_MATHJAX_URL = 'https://cdn.mathjax.org/mathjax/latest/MathJax.js'
 DEVILRY_LOGOUT_URL = '/authenticate/logout'
@@ -40,6 +54,14 @@ DEVILRY_SCHEME_AND_DOMAIN = 'https://devilry.example.com'
 
 DEVILRY_MESSAGE_RESEND_LIMIT = 2
 
+#: Number of emails sent using the same email backend connection
+#: when a message is sent to many receivers.
+DEVILRY_MESSAGE_SEND_BATCH_SIZE = 100
+
+#: Number of message receivers created with each bulk create
+#: when a message is prepared for sending.
+DEVILRY_MESSAGE_RECEIVER_BATCH_SIZE = 500
+
 # The name of the primary sync system where data is imported from.
 # This is shown in the user interface, and can be a longer string
 # with spaces.
@@ -60,6 +82,58 @@ DEVILRY_SKIP_RQ_TESTS = os.environ.get('DEVILRY_SKIP_RQ_TESTS', 'False') == 'Tru
 #: RQ email queue
 DEVILRY_RQ_EMAIL_BACKEND_QUEUENAME = 'email'
 
+#: Number of emails sent by each RQ job (over a single connection) by
+#: :class:`devilry.devilry_email.rq_backend.RQEmailBackend`.
+DEVILRY_RQ_EMAIL_BACKEND_BATCH_SIZE = 50
+
+#: Number of times an email that fails is attempted sent by the RQ email backend
+#: before giving up.
+DEVILRY_RQ_EMAIL_BACKEND_MAX_ATTEMPTS = 3
+
+#: Number of seconds to wait before the first retry of emails that failed in
+#: the RQ email backend. The delay is doubled for each retry.
+DEVILRY_RQ_EMAIL_BACKEND_RETRY_DELAY_SECONDS = 10
+
+#: Max number of emails sent per second by each RQ email backend batch job. ``None`` means no limit.
+#: The limit only holds within a batch job (see ``DEVILRY_RQ_EMAIL_BACKEND_BATCH_SIZE``), not
+#: across jobs or workers, so set this well below the messages-per-second limit of
+#: your email relay divided by the number of RQ email workers.
+DEVILRY_RQ_EMAIL_BACKEND_MAX_MESSAGES_PER_SECOND = None
+
+#: Number of seconds to cache the snapshot of the results for all students on a
+#: period in the all results overview for period admins. ``None`` disables the cache.
+#: The snapshot is invalidated when the results change, but this requires a cache
+#: shared by all the processes (memcached, redis, ...) - not the default ``LocMemCache``.
+DEVILRY_ADMIN_PERIOD_ALL_RESULTS_CACHE_TIMEOUT = None
+
+#: Number of seconds to cache the examiner statistics for an assignment. The cache
+#: is invalidated when grading is published on the assignment, but other changes
+#: (deadlines, examiners, ...) are not visible until the cache times out.
+#: ``0`` or ``None`` disables the cache.
+DEVILRY_STATISTICS_ASSIGNMENT_EXAMINER_STATISTICS_CACHE_TIMEOUT = 300
+
+#: Number of seconds to cache the HTML for markdown, like the text of comments in the
+#: feedbackfeed. The HTML is cached with a hash of the markdown as key, so edited
+#: comments never show stale HTML. ``0`` or ``None`` disables the cache.
+DEVILRY_MARKDOWN_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+#: Answer requests for the feedbackfeed with ``304 Not Modified`` if the feedbackfeed
+#: has not changed since the browser got it (using ETags). This avoids building
+#: the feedbackfeed when students and examiners reload the page.
+DEVILRY_GROUP_FEEDBACKFEED_CONDITIONAL_GET = True
+
+#: Number of seconds the rendered HTML for closed attempts (FeedbackSets) in the
+#: feedbackfeed is cached. The open attempt is always rendered. ``0`` or ``None``
+#: disables the cache.
+DEVILRY_GROUP_FEEDBACKFEED_TIMELINE_CACHE_TIMEOUT = 60 * 60 * 24
+
+#: How the triggers in ``devilry_dbcache`` maintain AssignmentGroupCachedData.
+#: ``'row'`` rebuilds the cached data for a group on each changed row.
+#: ``'statement'`` uses statement level triggers that apply deltas once per
+#: SQL statement (requires PostgreSQL 10+). Run ``ievvtasks_customsql -i``
+#: after changing this.
+DEVILRY_DBCACHE_MAINTENANCE_MODE = 'row'
+
 
 #: If this is set, and the ``DJANGO_CRADMIN_USE_EMAIL_AUTH_BACKEND``-setting
 #: is ``False``, users will be assigned
@@ -138,6 +212,15 @@ DEVILRY_ASSIGNMENT_PUBLISHING_TIME_DELAY_MINUTES = 60 * 6
 #: blob storage filesystems like AWS S3.
 DEVILRY_RESTRICT_NUMBER_OF_FILES_PER_DIRECTORY = False
 
+#: If this is ``True``, files uploaded to comments are stored by the SHA-256 of their
+#: content, so uploads with the same content share a single stored file.
+DEVILRY_COMMENTFILE_CONTENT_ADDRESSED_STORAGE = False
+
+#: If this is ``True``, reports (see :class:`devilry.devilry_report.models.DevilryReport`) are
+#: generated into a temporary file, with constant memory usage for Excel reports, and stored
+#: in a file instead of in the database.
+DEVILRY_REPORT_STREAMING = False
+
 
 #: If this is set to a value, we extract a prettier shortname for a user
 #: than "feide:myname@mydomain.no" for the provided suffix.
@@ -20,6 +20,13 @@ MIDDLEWARE_CLASSES = MIDDLEWARE_CLASSES + [
     'debug_toolbar.middleware.DebugToolbarMiddleware'
 ]
 
+querycount_middleware = False
+if querycount_middleware:
+    MIDDLEWARE_CLASSES = [
+        # Adds the X-Devilry-Query-Count header to all responses
+        'devilry.utils.querycountmiddleware.QueryCountMiddleware',
+    ] + MIDDLEWARE_CLASSES
+
 # DELAY_MIDDLEWARE_TIME = (80, 120) # Wait for randint(*DELAY_MIDDLEWARE_TIME)/100.0 before responding to each request when using DelayMiddleware
 # delay_middleware = True
 # if delay_middleware:
@@ -3,7 +3,7 @@
 
 from smtplib import SMTPException
 import logging
-from django.core.mail import send_mail
+from django.core.mail import send_mail, EmailMultiAlternatives
 from django.conf import settings
 from django.template.loader import render_to_string
 import html2text
@@ -18,22 +18,61 @@ def convert_html_to_plaintext(html):
     return html2text.html2text(html)
 
 
-def send_message(subject, message, *user_objects_to_send_to, **kwargs):
-    is_html = kwargs.get('is_html')
-    if not settings.DEVILRY_SEND_EMAIL_TO_USERS:
-        return
+def add_signature(message, is_html=False):
+    """
+    Add ``DEVILRY_EMAIL_SIGNATURE`` to the given ``message``.
+
+    Returns:
+        tuple: ``(plain_message, html_message)``. ``html_message`` is
+        ``None`` unless ``is_html`` is ``True``.
+    """
     if is_html:
         message += "<br><br>--<br>"
     else:
         message += "\n\n--\n"
     message += settings.DEVILRY_EMAIL_SIGNATURE
+    if is_html:
+        return convert_html_to_plaintext(message), message
+    return message, None
+
+
+def make_email_message(subject, message, emails, is_html=False, connection=None):
+    """
+    Make an email message with the same subject prefix and signature
+    as :func:`.send_message`, without sending it.
 
+    Used to send many emails over a single connection.
+
+    Args:
+        subject: The subject (without ``EMAIL_SUBJECT_PREFIX``).
+        message: The message.
+        emails: List of email addresses to send to.
+        is_html: Is ``message`` HTML?
+        connection: Email backend connection used when sending the message.
+
+    Returns:
+        django.core.mail.EmailMultiAlternatives: The email message.
+    """
+    plain_message, html_message = add_signature(message, is_html=is_html)
+    email_message = EmailMultiAlternatives(
+        subject=settings.EMAIL_SUBJECT_PREFIX + subject,
+        body=plain_message,
+        from_email=settings.DEVILRY_EMAIL_DEFAULT_FROM,
+        to=emails,
+        connection=connection)
+    if html_message is not None:
+        email_message.attach_alternative(html_message, 'text/html')
+    return email_message
+
+
+def send_message(subject, message, *user_objects_to_send_to, **kwargs):
+    is_html = kwargs.get('is_html')
+    if not settings.DEVILRY_SEND_EMAIL_TO_USERS:
+        return
     send_mail_kwargs = {}
+    plain_message, html_message = add_signature(message, is_html=is_html)
     if is_html:
-        plain_message = convert_html_to_plaintext(message)
-        send_mail_kwargs['html_message'] = message
-    else:
-        plain_message = message
+        send_mail_kwargs['html_message'] = html_message
 
     emails = []
 
@@ -0,0 +1,111 @@
+import logging
+
+from django.db import connection
+from django.db.backends.utils import CursorDebugWrapper, CursorWrapper
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCountingCursorWrapper(object):
+    """Cursor wrapper that counts the queries executed with a cursor.
+
+    Used by :class:`.QueryCountMiddleware`. Unlike ``connection.queries_log``, which only
+    keeps the last 9000 queries, this counts all queries.
+    """
+    def __init__(self, cursor, querycounter):
+        """
+        Args:
+            cursor: The cursor to wrap (a ``CursorWrapper`` or a ``CursorDebugWrapper``).
+            querycounter: The :class:`.QueryCounter` to count the queries with.
+        """
+        self.cursor = cursor
+        self.querycounter = querycounter
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.cursor.__exit__(exc_type, exc_value, traceback)
+
+    def callproc(self, *args, **kwargs):
+        self.querycounter.count += 1
+        return self.cursor.callproc(*args, **kwargs)
+
+    def execute(self, sql, params=None):
+        self.querycounter.count += 1
+        return self.cursor.execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self.querycounter.count += 1
+        return self.cursor.executemany(sql, param_list)
+
+
+class QueryCounter(object):
+    """Counts the queries for a request. See :class:`.QueryCountMiddleware`.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def make_cursor(self, cursor, queries_logged):
+        """Wrap a database cursor in a :class:`.QueryCountingCursorWrapper`.
+
+        Args:
+            cursor: A raw database cursor.
+            queries_logged: If ``True``, the queries are still logged in
+                ``connection.queries_log`` (``DEBUG=True``, ``assertNumQueries``, ...).
+        """
+        if queries_logged:
+            wrapped_cursor = CursorDebugWrapper(cursor, connection)
+        else:
+            wrapped_cursor = CursorWrapper(cursor, connection)
+        return QueryCountingCursorWrapper(cursor=wrapped_cursor, querycounter=self)
+
+
+class QueryCountMiddleware(MiddlewareMixin):
+    """Middleware that counts the database queries for each request.
+
+    The number of queries is added to the response in the ``X-Devilry-Query-Count``
+    header, and logged with the ``devilry.utils.querycountmiddleware`` logger
+    at DEBUG level. Useful for checking the baseline number of queries for
+    a page, and for finding pages that make a query for each item they list.
+
+    To enable it, add
+    'devilry.utils.querycountmiddleware.QueryCountMiddleware' first in
+    your setting.py's MIDDLEWARE_CLASSES. Queries made by middlewares
+    before this middleware are not counted.
+
+    The queries are counted by wrapping the cursors of the default database
+    connection in a :class:`.QueryCountingCursorWrapper`, so this adds a little
+    overhead to each query, and should not be enabled in production.
+    """
+    header_name = 'X-Devilry-Query-Count'
+
+    def process_request(self, request):
+        querycounter = QueryCounter()
+        queries_logged = connection.queries_logged
+        request._devilry_querycounter = querycounter
+        request._devilry_querycount_force_debug_cursor = connection.force_debug_cursor
+
+        # Cursors are only wrapped with make_debug_cursor() when queries are logged,
+        # so we force that, and log the queries in make_debug_cursor() only if
+        # they would have been logged without this middleware.
+        connection.make_debug_cursor = lambda cursor: querycounter.make_cursor(
+            cursor=cursor, queries_logged=queries_logged)
+        connection.force_debug_cursor = True
+
+    def process_response(self, request, response):
+        if not hasattr(request, '_devilry_querycounter'):
+            return response
+        query_count = request._devilry_querycounter.count
+        del connection.make_debug_cursor
+        connection.force_debug_cursor = request._devilry_querycount_force_debug_cursor
+        response[self.header_name] = str(query_count)
+        logger.debug('%s queries for %s %s', query_count, request.method, request.path)
+        return response
@@ -0,0 +1,70 @@
+from django import test
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connection
+from django.db import connections
+from django.http import HttpResponse
+from mock import mock
+from model_mommy import mommy
+
+from devilry.devilry_account.models import User
+from devilry.utils.querycountmiddleware import QueryCountMiddleware
+
+
+class TestQueryCountMiddleware(test.TestCase):
+    def test_no_queries(self):
+        querycount_middleware = QueryCountMiddleware()
+        mockrequest = mock.MagicMock()
+        querycount_middleware.process_request(request=mockrequest)
+        response = querycount_middleware.process_response(request=mockrequest, response=HttpResponse())
+        self.assertEqual('0', response['X-Devilry-Query-Count'])
+
+    def test_counts_queries(self):
+        mommy.make('devilry_account.User')
+        querycount_middleware = QueryCountMiddleware()
+        mockrequest = mock.MagicMock()
+        querycount_middleware.process_request(request=mockrequest)
+        list(User.objects.all())
+        User.objects.count()
+        response = querycount_middleware.process_response(request=mockrequest, response=HttpResponse())
+        self.assertEqual('2', response['X-Devilry-Query-Count'])
+
+    def test_restores_force_debug_cursor(self):
+        querycount_middleware = QueryCountMiddleware()
+        mockrequest = mock.MagicMock()
+        force_debug_cursor = connection.force_debug_cursor
+        querycount_middleware.process_request(request=mockrequest)
+        self.assertTrue(connection.force_debug_cursor)
+        querycount_middleware.process_response(request=mockrequest, response=HttpResponse())
+        self.assertEqual(force_debug_cursor, connection.force_debug_cursor)
+
+    def test_process_response_without_process_request(self):
+        querycount_middleware = QueryCountMiddleware()
+        response = querycount_middleware.process_response(request=mock.MagicMock(spec=[]),
+                                                          response=HttpResponse())
+        self.assertFalse(response.has_header('X-Devilry-Query-Count'))
+
+    def test_counts_more_queries_than_the_queries_log_keeps(self):
+        querycount_middleware = QueryCountMiddleware()
+        mockrequest = mock.MagicMock()
+        querycount_middleware.process_request(request=mockrequest)
+        with connection.cursor() as cursor:
+            for index in range(connection.queries_log.maxlen + 10):
+                cursor.execute('SELECT 1')
+        response = querycount_middleware.process_response(request=mockrequest, response=HttpResponse())
+        self.assertEqual(str(connection.queries_log.maxlen + 10), response['X-Devilry-Query-Count'])
+
+    def test_queries_still_logged(self):
+        querycount_middleware = QueryCountMiddleware()
+        mockrequest = mock.MagicMock()
+        with self.assertNumQueries(1):
+            querycount_middleware.process_request(request=mockrequest)
+            User.objects.count()
+            response = querycount_middleware.process_response(request=mockrequest, response=HttpResponse())
+        self.assertEqual('1', response['X-Devilry-Query-Count'])
+
+    def test_restores_make_debug_cursor(self):
+        querycount_middleware = QueryCountMiddleware()
+        mockrequest = mock.MagicMock()
+        querycount_middleware.process_request(request=mockrequest)
+        querycount_middleware.process_response(request=mockrequest, response=HttpResponse())
+        self.assertNotIn('make_debug_cursor', vars(connections[DEFAULT_DB_ALIAS]))